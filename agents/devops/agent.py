@@ -5,6 +5,7 @@ import logging
 from google import genai
 
 from . import config as agent_config, prompts as agent_prompts
+from .components.context_management import get_tokenizer_registry
 from .devops_agent import MyDevopsAgent
 from .tools.setup import load_all_tools_and_toolsets_async
 
@@ -92,6 +93,13 @@ except Exception as e:
     llm_client = None
     logger.error(f"Failed to create genai client: {e}")
 
+if agent_config.TOKENIZER_WARMUP:
+    get_tokenizer_registry().warm_up(
+        [agent_config.DEFAULT_AGENT_MODEL, agent_config.DEFAULT_SUB_AGENT_MODEL],
+        llm_client=llm_client,
+        background=True,
+    )
+
 
 async def create_agent():
     """Create the agent instance."""
@@ -1,6 +1,8 @@
 """Context manager initialization and package exports."""
 
+from .blob_store import Blob, BlobStore, get_default_blob_store
 from .context_manager import ContextManager
+from .context_selection import SelectionCandidate, SelectionResult, select_within_budget
 from .cross_turn_correlation import CorrelationScore, CrossTurnCorrelator
 from .dynamic_context_expansion import (
     DiscoveredContent,
@@ -18,6 +20,8 @@ from .llm_injection import (
     inject_structured_context,
 )
 from .smart_prioritization import RelevanceScore, SmartPrioritizer
+from .token_cache import TokenCountCache, get_default_token_cache
+from .tokenizer_registry import TokenizerRegistry, get_tokenizer_registry
 from .tool_hooks import (
     TOOL_PROCESSORS,
     extract_goal_from_user_message,
@@ -25,6 +29,8 @@ from .tool_hooks import (
 
 __all__ = [
     "TOOL_PROCESSORS",
+    "Blob",
+    "BlobStore",
     "ContentType",
     "ContextManager",
     "CorrelationScore",
@@ -34,10 +40,18 @@ __all__ = [
     "ExpansionContext",
     "IntelligentSummarizer",
     "RelevanceScore",
+    "SelectionCandidate",
+    "SelectionResult",
     "SmartPrioritizer",
     "SummarizationContext",
+    "TokenCountCache",
+    "TokenizerRegistry",
     "extract_goal_from_user_message",
     "file_change_tracker",
+    "get_default_blob_store",
+    "get_default_token_cache",
     "get_last_user_content",
+    "get_tokenizer_registry",
     "inject_structured_context",
+    "select_within_budget",
 ]
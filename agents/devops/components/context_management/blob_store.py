@@ -0,0 +1,118 @@
+"""Content-addressed storage of file contents shared by code snippets."""
+
+from typing import Any, Optional
+import weakref
+
+from .file_tracker import file_change_tracker
+
+
+class Blob:
+    """One interned version of a file (or snippet) content.
+
+    Blobs are immutable and identified by the same content hash that
+    ``FileChangeTracker.hash_file_content`` computes, so every snippet of one file
+    version references the same string instead of holding its own copy.
+    """
+
+    __slots__ = ("__weakref__", "_line_starts", "blob_id", "content")
+
+    def __init__(self, blob_id: str, content: str):
+        self.blob_id = blob_id
+        self.content = content
+        self._line_starts: Optional[list[int]] = None
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines, counting the text after the last newline as a line."""
+        return len(self._get_line_starts())
+
+    def _get_line_starts(self) -> list[int]:
+        if self._line_starts is None:
+            starts = [0]
+            index = self.content.find("\n")
+            while index != -1:
+                starts.append(index + 1)
+                index = self.content.find("\n", index + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    def text(self, line_range: Optional[tuple[int, int]] = None) -> str:
+        """Return the content, or the lines ``[start, end)`` of it (0-based).
+
+        A line range yields exactly ``"\\n".join(content.split("\\n")[start:end])``.
+        """
+        if line_range is None:
+            return self.content
+        starts = self._get_line_starts()
+        start, end = max(0, line_range[0]), min(line_range[1], len(starts))
+        if start >= end:
+            return ""
+        stop = starts[end] - 1 if end < len(starts) else len(self.content)
+        return self.content[starts[start] : stop]
+
+    def __repr__(self) -> str:
+        return f"Blob({self.blob_id!r}, {len(self.content)} chars)"
+
+
+class BlobStore:
+    """Interns file contents by content hash.
+
+    Blobs are held weakly: a blob stays in the store only while a snippet (or any
+    other holder) references it, so evicting snippets also releases file versions
+    nobody uses anymore.
+    """
+
+    def __init__(self):
+        self._blobs: weakref.WeakValueDictionary[str, Blob] = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def blob_id_for(content: str) -> str:
+        """Return the blob id (content hash) for a content string."""
+        return file_change_tracker.hash_file_content(content)
+
+    def intern(self, content: str, blob_id: Optional[str] = None) -> Blob:
+        """Return the shared blob for ``content``, adding it if it is not stored yet.
+
+        Args:
+            content: The file or snippet content
+            blob_id: Known hash of the content, to avoid hashing it again
+
+        Returns:
+            The interned Blob
+        """
+        blob_id = blob_id or self.blob_id_for(content)
+        blob = self._blobs.get(blob_id)
+        if blob is not None:
+            self.hits += 1
+            return blob
+        self.misses += 1
+        blob = Blob(blob_id, content)
+        self._blobs[blob_id] = blob
+        return blob
+
+    def get(self, blob_id: str) -> Optional[Blob]:
+        """Return a stored blob by id, or None if it is not (or no longer) stored."""
+        return self._blobs.get(blob_id)
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def stats(self) -> dict[str, Any]:
+        """Return store statistics for monitoring."""
+        blobs = list(self._blobs.values())
+        return {
+            "blobs": len(blobs),
+            "stored_chars": sum(len(blob.content) for blob in blobs),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_default_blob_store = BlobStore()
+
+
+def get_default_blob_store() -> BlobStore:
+    """Return the process-wide blob store."""
+    return _default_blob_store
@@ -1,7 +1,9 @@
 """Context management for agent loop to optimize token usage while preserving quality."""
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum, auto
+import heapq
 import json
 import logging
 from pathlib import Path
@@ -12,27 +14,29 @@ from google import genai
 from google.genai.types import Content, CountTokensResponse, Part  # For native token counting
 from rich.console import Console
 
+from .blob_store import Blob, BlobStore, get_default_blob_store
+from .context_selection import SelectionCandidate, select_within_budget
 from .cross_turn_correlation import CrossTurnCorrelator
 from .dynamic_context_expansion import DiscoveredContent, DynamicContextExpander, ExpansionContext
 from .intelligent_summarization import ContentType, IntelligentSummarizer, SummarizationContext
 from .proactive_context import ProactiveContextGatherer
 from .smart_prioritization import SmartPrioritizer
-
-# Attempt to import tiktoken for accurate token counting
-try:
-    import tiktoken
-
-    TIKTOKEN_AVAILABLE = True
-except ImportError:
-    TIKTOKEN_AVAILABLE = False
-    logging.warning(
-        "tiktoken library not found. Token counting will be a rough estimate based on "
-        "character count if native counter also fails."
-    )
+from .token_cache import TokenCountCache, get_default_token_cache
+from .tokenizer_registry import TIKTOKEN_AVAILABLE, get_tokenizer_registry
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Strategies whose results are worth caching (the character estimate is cheaper than hashing)
+CACHEABLE_TOKEN_COUNTING_STRATEGIES = {"native_google_counter", "tiktoken_counter"}
+
+# Upper bound on concurrent native count_tokens requests issued by count_tokens_batch
+MAX_CONCURRENT_NATIVE_COUNTS = 8
+
+
+class NativeTokenCountError(RuntimeError):
+    """Raised when the native count_tokens call fails; callers fall back to an estimate."""
+
 
 class ContextPriority(Enum):
     CRITICAL = auto()
@@ -42,16 +46,99 @@ class ContextPriority(Enum):
     MINIMAL = auto()
 
 
-@dataclass
+# Value weights used by the budget-optimal context selection
+SELECTION_PRIORITY_WEIGHTS = {
+    ContextPriority.CRITICAL: 8.0,
+    ContextPriority.HIGH: 4.0,
+    ContextPriority.MEDIUM: 2.0,
+    ContextPriority.LOW: 1.0,
+    ContextPriority.MINIMAL: 0.5,
+}
+SELECTION_RECENCY_DECAY = 0.85  # Value multiplier per turn of age
+SELECTION_TOOL_ACTIVITY_BONUS = 1.25  # Turns with tool calls carry more useful context
+
+# Emergency assembly tuning
+EMERGENCY_MINIMAL_BUDGET = 300  # At or below this budget only the latest user message is kept
+EMERGENCY_MIN_FIELD_TOKENS = 16  # Fields that cannot keep this many tokens are dropped
+EMERGENCY_MAX_FIT_PASSES = 4  # Re-measure passes to absorb JSON structure/escaping overhead
+NATIVE_TRUNCATION_CONFIRMATIONS = 3  # Native counts spent confirming an estimated cut point
+TRUNCATION_MARKER = "..."
+
+
 class CodeSnippet:
-    file_path: str
-    code: str
-    start_line: int
-    end_line: int
-    last_accessed: int
-    relevance_score: float = 1.0
-    token_count: int = 0
-    priority: ContextPriority = ContextPriority.LOW
+    """A line range of a file whose text lives in a shared, interned blob.
+
+    Snippets hold ``(blob, blob_lines)`` instead of their own copy of the code, so
+    all snippets of one file version share a single string. ``blob_lines`` is the
+    0-based ``[start, end)`` line range of the blob, or None for the whole blob.
+    Passing ``code`` interns it in the default blob store.
+    """
+
+    __slots__ = (
+        "blob",
+        "blob_lines",
+        "end_line",
+        "file_path",
+        "last_accessed",
+        "priority",
+        "relevance_score",
+        "start_line",
+        "token_count",
+    )
+
+    def __init__(
+        self,
+        file_path: str,
+        code: Optional[str] = None,
+        start_line: int = 0,
+        end_line: int = 0,
+        last_accessed: int = 0,
+        relevance_score: float = 1.0,
+        token_count: int = 0,
+        priority: ContextPriority = ContextPriority.LOW,
+        *,
+        blob: Optional[Blob] = None,
+        blob_lines: Optional[tuple[int, int]] = None,
+    ):
+        self.file_path = file_path
+        self.blob = blob if blob is not None else get_default_blob_store().intern(code or "")
+        self.blob_lines = blob_lines
+        self.start_line = start_line
+        self.end_line = end_line
+        self.last_accessed = last_accessed
+        self.relevance_score = relevance_score
+        self.token_count = token_count
+        self.priority = priority
+
+    @property
+    def code(self) -> str:
+        """The snippet text, sliced from the shared blob."""
+        return self.blob.text(self.blob_lines)
+
+    @property
+    def blob_id(self) -> str:
+        """Id (content hash) of the blob holding this snippet's file version."""
+        return self.blob.blob_id
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CodeSnippet):
+            return NotImplemented
+        fields = ("file_path", "start_line", "end_line", "last_accessed", "relevance_score")
+        return (
+            all(getattr(self, name) == getattr(other, name) for name in fields)
+            and (self.token_count, self.priority) == (other.token_count, other.priority)
+            and (
+                (self.blob is other.blob and self.blob_lines == other.blob_lines)
+                or self.code == other.code
+            )
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"CodeSnippet(file_path={self.file_path!r}, blob_id={self.blob.blob_id!r}, "
+            f"start_line={self.start_line}, end_line={self.end_line}, "
+            f"last_accessed={self.last_accessed}, token_count={self.token_count})"
+        )
 
 
 @dataclass
@@ -122,6 +209,8 @@ class ContextManager:
         target_tool_results: int = 30,
         max_stored_code_snippets: int = 100,
         max_stored_tool_results: int = 150,
+        token_cache: Optional[TokenCountCache] = None,
+        blob_store: Optional[BlobStore] = None,
     ):
         self.model_name = model_name
         self.max_token_limit = max_llm_token_limit
@@ -152,6 +241,8 @@ class ContextManager:
 
         self.llm_client = llm_client
         self._token_counting_fn = self._initialize_token_counting_strategy()
+        self.token_cache = token_cache if token_cache is not None else get_default_token_cache()
+        self.blob_store = blob_store if blob_store is not None else get_default_blob_store()
         self.state = ContextState()
         self.conversation_turns: list[ConversationTurn] = []
         self.code_snippets: list[CodeSnippet] = []
@@ -179,6 +270,7 @@ class ContextManager:
         # Performance tracking
         self._last_context_tokens = 0
         self._token_growth_history: list[tuple[int, int]] = []  # (turn, tokens)
+        self._last_selection_stats: dict[str, Any] = {}
 
         # Log detailed configuration information for optimization analysis
         self._log_configuration()
@@ -202,9 +294,25 @@ class ContextManager:
             f"Token Counting Strategy: "
             f"{self._token_counting_fn.__name__ if hasattr(self._token_counting_fn, '__name__') else 'lambda function'}"  # noqa: E501
         )
+        logger.info(f"Token Count Cache: {self.token_cache.stats()}")
         logger.info("=" * 60)
 
+    @property
+    def token_counting_strategy(self) -> str:
+        """Name of the active token counting strategy (e.g. ``native_google_counter``)."""
+        return getattr(self._token_counting_fn, "__name__", "")
+
+    def get_token_cache_stats(self) -> dict[str, Any]:
+        """Return hit/miss statistics of the token count cache."""
+        return self.token_cache.stats()
+
+    def get_blob_store_stats(self) -> dict[str, Any]:
+        """Return how many file versions the blob store holds and their total size."""
+        return self.blob_store.stats()
+
     def _initialize_token_counting_strategy(self) -> Callable[[str], int]:
+        registry = get_tokenizer_registry()
+
         # Strategy 1: Native Google GenAI client's count_tokens
         if (
             self.llm_client is not None
@@ -239,31 +347,21 @@ class ContextManager:
                                 f"Native Google count_tokens (string direct) also failed for "
                                 f"model {self.model_name}: {e_native_str_call}. Falling back."
                             )
-                            # Fall through to tiktoken if native fails unexpectedly
-                            if TIKTOKEN_AVAILABLE:
-                                try:
-                                    tokenizer = tiktoken.get_encoding("cl100k_base")
-                                    return len(tokenizer.encode(text))
-                                except Exception as te:
-                                    logger.error(f"Fallback to cl100k_base also failed: {te}")
-                            return len(text) // 4  # Ultimate fallback
-
-                # Perform a quick test call
-                # Note: The 'contents' arg is used in the new SDK for count_tokens
-                test_response = self.llm_client.models.count_tokens(
-                    model=self.model_name, contents="test"
-                )
-                if isinstance(test_response, CountTokensResponse) and hasattr(
-                    test_response, "total_tokens"
-                ):
+                            # Raised rather than estimated here, so the estimate is not cached
+                            # as if it were the native count
+                            raise NativeTokenCountError(str(e_native_str_call)) from (
+                                e_native_str_call
+                            )
+
+                # The test call is made once per process and model by the tokenizer registry
+                if registry.native_counter_available(self.model_name, self.llm_client):
                     logger.info(
                         f"Using native Google GenAI token counter for model "
                         f"{self.model_name} (via google.genai client)."
                     )
                     return native_google_counter
                 logger.warning(
-                    f"Native Google count_tokens for {self.model_name} did not return expected "
-                    f"response ({type(test_response)}). Falling back."
+                    f"Native Google count_tokens unavailable for {self.model_name}. Falling back."
                 )
             except Exception as e_init:
                 logger.warning(
@@ -283,35 +381,40 @@ class ContextManager:
             ):
                 logger.warning("llm_client does not have the required methods for token counting")
 
-        # Strategy 2: Tiktoken
+        # Strategy 2: Tiktoken (encoding shared process-wide through the registry)
         if TIKTOKEN_AVAILABLE:
-            tokenizer = None
-            try:
-                tokenizer = tiktoken.encoding_for_model(self.model_name)
-                logger.info(f"Using tiktoken with model-specific encoding for {self.model_name}.")
-            except KeyError:  # Model not found in tiktoken
-                try:
-                    tokenizer = tiktoken.get_encoding("cl100k_base")
-                    logger.info(
-                        f"Using tiktoken with cl100k_base encoding for "
-                        f"{self.model_name} (model-specific not found)."
-                    )
-                except Exception as e_cl100k:
-                    logger.error(
-                        f"Failed to get cl100k_base tokenizer: {e_cl100k}. "
-                        f"Tiktoken unavailable for {self.model_name}."
-                    )
-
+            tokenizer = registry.get_tiktoken_encoding(self.model_name)
             if tokenizer:
+                logger.info(f"Using tiktoken encoding {tokenizer.name} for {self.model_name}.")
                 final_tokenizer = tokenizer
-                return lambda text: len(final_tokenizer.encode(text))
+                self._tiktoken_tokenizer = tokenizer
+
+                def tiktoken_counter(text: str) -> int:
+                    return len(final_tokenizer.encode(text))
+
+                return tiktoken_counter
 
         # Strategy 3: Character count fallback
         logger.warning(
             f"No advanced tokenizer available for {self.model_name}. "
             "Using character-based token estimation (len // 4)."
         )
-        return lambda text: len(text) // 4
+
+        def character_count_estimator(text: str) -> int:
+            return len(text) // 4
+
+        return character_count_estimator
+
+    def _estimate_tokens(self, text: str) -> int:
+        """Estimate tokens locally (tiktoken, else len // 4) when the native count fails."""
+        if TIKTOKEN_AVAILABLE:
+            try:
+                tokenizer = get_tokenizer_registry().get_tiktoken_encoding(self.model_name)
+                if tokenizer is not None:
+                    return len(tokenizer.encode(text))
+            except Exception as e:
+                logger.error(f"Fallback to tiktoken estimate also failed: {e}")
+        return len(text) // 4
 
     def _count_tokens(self, text: str) -> int:
         if not isinstance(text, str):
@@ -323,7 +426,14 @@ class ContextManager:
         if not text:  # Handle empty or None string
             return 0
         try:
-            return self._token_counting_fn(text)
+            strategy = self.token_counting_strategy
+            if strategy not in CACHEABLE_TOKEN_COUNTING_STRATEGIES:
+                return self._token_counting_fn(text)
+            return self.token_cache.get_or_count(
+                f"{self.model_name}:{strategy}", text, self._token_counting_fn
+            )
+        except NativeTokenCountError:
+            return self._estimate_tokens(text)
         except Exception as e:
             logger.error(
                 f"Error during token counting for text '{text[:50]}...': "
@@ -332,6 +442,86 @@ class ContextManager:
             )
             return len(text) // 4
 
+    def count_tokens_batch(self, texts: list[str]) -> list[int]:
+        """Count tokens for several texts at once, returning per-item counts.
+
+        Cache hits and duplicates are resolved first; the remaining texts are counted
+        in one pass (tiktoken ``encode_batch`` or concurrent native requests) instead
+        of one blocking round-trip per item.
+        """
+        counts = [0] * len(texts)
+        strategy = self.token_counting_strategy
+        cacheable = strategy in CACHEABLE_TOKEN_COUNTING_STRATEGIES
+        namespace = f"{self.model_name}:{strategy}"
+
+        pending: dict[str, list[int]] = {}  # unique uncounted text -> positions
+        for i, text in enumerate(texts):
+            if text is None:
+                continue
+            if not isinstance(text, str):
+                text = str(text)
+            if not text:
+                continue
+            if cacheable:
+                cached = self.token_cache.get(namespace, text)
+                if cached is not None:
+                    counts[i] = cached
+                    continue
+            pending.setdefault(text, []).append(i)
+
+        if not pending:
+            return counts
+
+        unique_texts = list(pending)
+        for text, (tokens, exact) in zip(
+            unique_texts, self._count_uncached_batch(strategy, unique_texts)
+        ):
+            if cacheable and exact:
+                self.token_cache.put(namespace, text, tokens)
+            for i in pending[text]:
+                counts[i] = tokens
+        return counts
+
+    def _count_uncached_batch(self, strategy: str, texts: list[str]) -> list[tuple[int, bool]]:
+        """Count a list of non-empty texts with the active strategy in a single pass.
+
+        Each count is paired with whether it is exact; estimates used after a failed
+        count must not be cached.
+        """
+
+        def safe_count(text: str) -> tuple[int, bool]:
+            try:
+                return self._token_counting_fn(text), True
+            except NativeTokenCountError:
+                return self._estimate_tokens(text), False
+            except Exception as e:
+                logger.error(
+                    f"Error during batched token counting: {e}. Falling back to char count."
+                )
+                return len(text) // 4, False
+
+        if len(texts) == 1:
+            return [safe_count(texts[0])]
+
+        if strategy == "tiktoken_counter":
+            try:
+                return [
+                    (len(tokens), True) for tokens in self._tiktoken_tokenizer.encode_batch(texts)
+                ]
+            except Exception as e:
+                logger.debug(f"tiktoken encode_batch failed, counting sequentially: {e}")
+                return [safe_count(text) for text in texts]
+
+        if strategy == "native_google_counter":
+            # count_tokens only reports an aggregate total, so per-item counts are fetched
+            # concurrently to pay roughly one round-trip of latency for the whole batch
+            with ThreadPoolExecutor(
+                max_workers=min(MAX_CONCURRENT_NATIVE_COUNTS, len(texts))
+            ) as executor:
+                return list(executor.map(safe_count, texts))
+
+        return [safe_count(text) for text in texts]
+
     def add_system_message(self, message: str):
         tokens = self._count_tokens(message)
         self.system_messages.append((message, tokens))
@@ -379,7 +569,25 @@ class ContextManager:
         self.state.key_decisions.append(decision)
         logger.info(f"Added key decision: {decision}")  # Tokens for list calculated on assembly
 
-    def add_code_snippet(self, file_path: str, code: str, start_line: int, end_line: int) -> None:
+    def add_code_snippet(
+        self,
+        file_path: str,
+        code: str,
+        start_line: int,
+        end_line: int,
+        blob: Optional[Blob] = None,
+        blob_lines: Optional[tuple[int, int]] = None,
+    ) -> None:
+        """Add a code snippet, storing its text once in the shared blob store.
+
+        Args:
+            file_path: File the snippet comes from
+            code: The snippet text
+            start_line: First line of the snippet in the file
+            end_line: Last line of the snippet in the file
+            blob: Already interned blob holding ``code`` (e.g. the whole file)
+            blob_lines: 0-based ``[start, end)`` line range of ``code`` within ``blob``
+        """
         # Check for existing snippet at same location
         for i, snippet in enumerate(self.code_snippets):
             if (
@@ -392,13 +600,16 @@ class ContextManager:
                 logger.info(f"Updated existing code snippet: {file_path}:{start_line}-{end_line}")
                 return
 
+        if blob is None:
+            blob, blob_lines = self.blob_store.intern(code), None
         new_snippet = CodeSnippet(
             file_path=file_path,
-            code=code,
             start_line=start_line,
             end_line=end_line,
             last_accessed=self.current_turn_number,
             token_count=self._count_tokens(code),
+            blob=blob,
+            blob_lines=blob_lines,
         )
         if len(self.code_snippets) >= self.max_stored_code_snippets:
             self.code_snippets.sort(key=lambda s: (s.relevance_score, s.last_accessed))
@@ -411,25 +622,35 @@ class ContextManager:
         )
 
     def add_full_file_content(self, file_path: str, content: str) -> None:
-        """Add full file content as context when files are read/modified."""
+        """Add full file content as context when files are read/modified.
+
+        The content is interned once; each chunk snippet references a line range of it.
+        """
+        blob = self.blob_store.intern(content)
         # With 1M+ tokens available, we can afford to include full file contents
-        lines = content.split("\n")
+        line_count = blob.line_count
 
         # For small files (< 100 lines), add as single snippet
-        if len(lines) <= 100:
-            self.add_code_snippet(file_path, content, 1, len(lines))
+        if line_count <= 100:
+            self.add_code_snippet(file_path, content, 1, line_count, blob=blob)
         else:
             # For larger files, add in chunks to maintain context
             chunk_size = 50  # lines per chunk
-            for i in range(0, len(lines), chunk_size):
-                end_idx = min(i + chunk_size, len(lines))
-                chunk_content = "\n".join(lines[i:end_idx])
-                self.add_code_snippet(file_path, chunk_content, i + 1, end_idx)
+            for i in range(0, line_count, chunk_size):
+                end_idx = min(i + chunk_size, line_count)
+                self.add_code_snippet(
+                    file_path,
+                    blob.text((i, end_idx)),
+                    i + 1,
+                    end_idx,
+                    blob=blob,
+                    blob_lines=(i, end_idx),
+                )
 
         # Also track as modified file
         self.track_file_modification(file_path)
         logger.info(
-            f"Added full file content for {file_path}: {len(lines)} lines, {len(content)} chars"
+            f"Added full file content for {file_path}: {line_count} lines, {len(content)} chars"
         )
 
     def add_tool_result(self, tool_name: str, result: Any, summary: Optional[str] = None) -> None:
@@ -805,6 +1026,11 @@ class ContextManager:
         logger.info(f"   📊 Turns included: {len(context_dict.get('conversation_history', []))}")
         logger.info(f"   📊 Code snippets: {len(context_dict.get('code_snippets', []))}")
         logger.info(f"   📊 Tool results: {len(context_dict.get('tool_results', []))}")
+        if self._last_selection_stats:
+            logger.info(
+                f"   📊 Selection utilization: "
+                f"{self._last_selection_stats['utilization']:.1%} of remaining budget"
+            )
 
         return context_dict, total_tokens
 
@@ -830,38 +1056,47 @@ class ContextManager:
             used_tokens += state_tokens
             logger.debug(f"🧠 Added core state: {state_tokens:,} tokens")
 
-        # 2. HIGH PRIORITY: Recent conversation with tool activity
-        conversation_budget = min(available_tokens - used_tokens, available_tokens // 2)
-        selected_turns, turn_tokens = self._select_prioritized_turns(conversation_budget)
-        if selected_turns:
-            context_dict["conversation_history"] = selected_turns
-            used_tokens += turn_tokens
-            logger.debug(
-                f"🧠 Added conversation history: {turn_tokens:,} tokens "
-                f"({len(selected_turns)} turns)"
-            )
+        # 2. Conversation turns, tool results and code snippets compete for the remaining
+        # budget as one weighted knapsack instead of fixed per-category fractions
+        selection = select_within_budget(
+            self._build_selection_candidates(),
+            available_tokens - used_tokens,
+            limits={
+                "conversation_history": self.target_recent_turns,
+                "tool_results": self.target_tool_results,
+                "code_snippets": self.target_code_snippets,
+            },
+        )
+        self._last_selection_stats = {
+            **selection.stats(),
+            "available_tokens": available_tokens,
+            "state_tokens": used_tokens,
+        }
 
-        # 3. HIGH PRIORITY: Recent tool results
-        results_budget = min(available_tokens - used_tokens, available_tokens // 4)
-        selected_results, results_tokens = self._select_prioritized_tool_results(results_budget)
+        selected_turns = sorted(
+            selection.selected.get("conversation_history", []), key=lambda t: t.turn_number
+        )
+        if selected_turns:
+            # Chronological order for the conversation history
+            context_dict["conversation_history"] = [
+                self._turn_to_context_dict(turn) for turn in selected_turns
+            ]
+        selected_results = selection.selected.get("tool_results", [])
         if selected_results:
-            context_dict["tool_results"] = selected_results
-            used_tokens += results_tokens
-            logger.debug(
-                f"🧠 Added tool results: {results_tokens:,} tokens "
-                f"({len(selected_results)} results)"
-            )
-
-        # 4. MEDIUM PRIORITY: Code snippets (remaining budget)
-        snippets_budget = available_tokens - used_tokens
-        selected_snippets, snippets_tokens = self._select_prioritized_code_snippets(snippets_budget)
+            context_dict["tool_results"] = [
+                self._tool_result_to_context_dict(result) for result in selected_results
+            ]
+        selected_snippets = selection.selected.get("code_snippets", [])
         if selected_snippets:
-            context_dict["code_snippets"] = selected_snippets
-            used_tokens += snippets_tokens
-            logger.debug(
-                f"🧠 Added code snippets: {snippets_tokens:,} tokens "
-                f"({len(selected_snippets)} snippets)"
-            )
+            context_dict["code_snippets"] = [
+                self._code_snippet_to_context_dict(snippet) for snippet in selected_snippets
+            ]
+        used_tokens += selection.used_tokens
+        logger.debug(
+            f"🧠 Selected {len(selected_turns)} turns, {len(selected_results)} tool results, "
+            f"{len(selected_snippets)} code snippets: {selection.used_tokens:,} tokens "
+            f"({selection.utilization:.1%} of remaining budget)"
+        )
 
         return context_dict, used_tokens
 
@@ -870,236 +1105,293 @@ class ContextManager:
     ) -> tuple[dict[str, Any], int]:
         """
         Emergency context assembly when normal optimization fails.
-        Extremely aggressive truncation to fit within tiny token budgets.
+
+        Keeps core goal/phase, the latest turn and (budget permitting) the most recent
+        tool result summaries and most relevant code snippets, then fits the serialized
+        context to the exact budget with the active token counter: the largest fields
+        are truncated by binary search down to a common token level, and the
+        lowest-priority fields are dropped when that level leaves too little text.
         """
         logger.warning(f"⚠️  EMERGENCY OPTIMIZATION: Only {available_tokens} tokens available")
 
-        # For extremely small budgets (<= 300 tokens), return minimal context
-        if available_tokens <= 300:
-            minimal_context = {
-                "conversation_history": [],
-                "code_snippets": [],
-                "tool_results": [],
-                "core_goal": "Context severely limited due to token constraints",
-            }
-
-            # If we have any recent turn, include just the user message
-            if self.conversation_turns:
-                latest_turn = self.conversation_turns[-1]
-                user_message = latest_turn.user_message[:100]  # Truncate to 100 chars
-                minimal_context["conversation_history"] = [
-                    {
-                        "role": "user",
-                        "content": user_message + "..."
-                        if len(latest_turn.user_message) > 100
-                        else user_message,
-                        "turn": latest_turn.turn_number,
-                    }
-                ]
-
-            # Estimate minimal token count (very conservative)
-            estimated_tokens = min(50, available_tokens - 10)  # Leave buffer
-            return minimal_context, estimated_tokens
-
-        # For small budgets (301-1000 tokens), use aggressive optimization
-        context_dict = {
+        context_dict: dict[str, Any] = {
             "conversation_history": [],
             "code_snippets": [],
             "tool_results": [],
             "core_goal": self.state.core_goal or "Emergency mode - limited context",
             "current_phase": self.state.current_phase or "active",
         }
+        # Truncatable text fields as (owning list or None, entry, key)
+        fields: list[tuple[Optional[list], dict[str, Any], str]] = [
+            (None, context_dict, "core_goal"),
+            (None, context_dict, "current_phase"),
+        ]
+
+        # For extremely small budgets only the latest user message is kept
+        minimal = available_tokens <= EMERGENCY_MINIMAL_BUDGET
+        limits = self._adaptive_limits
+        turns = (
+            self.conversation_turns[-1:]
+            if minimal
+            else self.conversation_turns[-max(1, limits["emergency_turns"]) :]
+        )
+        for turn in reversed(turns):  # Newest first so older turns are dropped first
+            entry: dict[str, Any] = {"turn_number": turn.turn_number}
+            context_dict["conversation_history"].insert(0, entry)
+            for key in ("user_message",) if minimal else ("user_message", "agent_message"):
+                if getattr(turn, key):
+                    entry[key] = getattr(turn, key)
+                    fields.append((context_dict["conversation_history"], entry, key))
+
+        if not minimal:
+            for result in self.tool_results[-limits["emergency_results"] :][::-1]:
+                entry = {
+                    "tool_name": result.tool_name,
+                    "summary": result.result_summary,
+                    "is_error": result.is_error,
+                    "turn_number": result.turn_number,
+                }
+                context_dict["tool_results"].append(entry)
+                fields.append((context_dict["tool_results"], entry, "summary"))
 
-        remaining_tokens = available_tokens - 100  # Reserve for structure
-
-        # Only include the most recent turn if space allows
-        if self.conversation_turns and remaining_tokens > 50:
-            latest_turn = self.conversation_turns[-1]
-
-            # Drastically truncate user message
-            user_msg = (
-                latest_turn.user_message[:200] + "..."
-                if len(latest_turn.user_message) > 200
-                else latest_turn.user_message
-            )
-            user_tokens = len(user_msg.split()) * 1.3  # Conservative estimate
-
-            if user_tokens <= remaining_tokens:
-                context_dict["conversation_history"].append(
-                    {
-                        "role": "user",
-                        "content": user_msg,
-                        "turn": latest_turn.turn_number,
-                    }
-                )
-                remaining_tokens -= user_tokens
-
-        # Only include critical code snippets if space allows
-        if remaining_tokens > 50 and self.code_snippets:
-            # Sort by importance and recency
-            recent_snippets = sorted(
-                self.code_snippets.values(),
-                key=lambda x: (x.get("last_accessed", 0), -len(x.get("content", ""))),
-                reverse=True,
+            top_snippets = heapq.nlargest(
+                limits["emergency_snippets"],
+                self.code_snippets,
+                key=lambda s: (s.relevance_score, s.last_accessed),
             )
-
-            for snippet in recent_snippets[:2]:  # Max 2 snippets
-                # Extremely truncated snippet
-                content = (
-                    snippet.get("content", "")[:100] + "..."
-                    if len(snippet.get("content", "")) > 100
-                    else snippet.get("content", "")
-                )
-                snippet_tokens = len(content.split()) * 1.3
-
-                if snippet_tokens <= remaining_tokens:
-                    context_dict["code_snippets"].append(
-                        {
-                            "file_path": snippet.get("file_path", "unknown"),
-                            "content": content,
-                            "line_start": snippet.get("line_start", 1),
-                            "line_end": snippet.get("line_end", 1),
-                        }
+            for snippet in top_snippets:
+                entry = {
+                    "file_path": snippet.file_path,
+                    "code": snippet.code,
+                    "start_line": snippet.start_line,
+                    "end_line": snippet.end_line,
+                }
+                context_dict["code_snippets"].append(entry)
+                fields.append((context_dict["code_snippets"], entry, "code"))
+
+        # Fit field token counts (batched and cached) into the budget left after structure.
+        # Fields are capped at a common token level (water-filling) so the budget is shared
+        # instead of spent on one field; fields are listed in priority order and the
+        # lowest-priority ones are dropped when the level would leave too little text.
+        field_tokens = self.count_tokens_batch(
+            [json.dumps(entry[key]) for _, entry, key in fields]  # Measured as serialized
+        )
+        total_tokens = self._count_context_tokens(context_dict)
+        for _ in range(EMERGENCY_MAX_FIT_PASSES):
+            if total_tokens <= available_tokens or not fields:
+                break
+            fields_budget = sum(field_tokens) - (total_tokens - available_tokens)
+            level = self._water_level(field_tokens, fields_budget)
+            while fields and level < EMERGENCY_MIN_FIELD_TOKENS:
+                # Dropping a field frees its own tokens, so the budget for the rest is unchanged
+                owner, entry, key = fields.pop()
+                field_tokens.pop()
+                del entry[key]
+                if owner is not None and not any(e is entry for _, e, _ in fields):
+                    owner[:] = [e for e in owner if e is not entry]
+                level = self._water_level(field_tokens, fields_budget)
+            for i, (_, entry, key) in enumerate(fields):
+                if field_tokens[i] > level:
+                    entry[key], field_tokens[i] = self._truncate_to_token_budget(
+                        entry[key], level, serialized=True
                     )
-                    remaining_tokens -= snippet_tokens
-                else:
-                    break
-
-        # Calculate actual token usage
-        total_content = str(context_dict)
-        estimated_tokens = len(total_content.split()) * 1.3
+            total_tokens = self._count_context_tokens(context_dict)
 
-        # Final safety check - if still too large, return absolute minimum
-        if estimated_tokens > available_tokens:
+        if total_tokens > available_tokens:
             logger.warning(
                 f"Emergency optimization still too large "
-                f"({estimated_tokens} > {available_tokens}), "
-                f"returning absolute minimum"
+                f"({total_tokens} > {available_tokens}), returning absolute minimum"
             )
-            return {
-                "conversation_history": [],
-                "code_snippets": [],
-                "tool_results": [],
-                "core_goal": "Minimal context",
-            }, 20
-
-        logger.warning(f"Emergency optimization complete: {estimated_tokens} tokens used")
-        return context_dict, int(estimated_tokens)
-
-    def _select_prioritized_turns(self, budget: int) -> tuple[list[dict[str, Any]], int]:
-        """Select conversation turns based on priority and token budget."""
-        if not self.conversation_turns:
-            return [], 0
-
-        # Sort by priority then recency
-        sorted_turns = sorted(
-            self.conversation_turns, key=lambda t: (t.priority.value, -t.turn_number)
-        )
+            context_dict = {"core_goal": "Minimal context"}
+            total_tokens = self._count_context_tokens(context_dict)
+            if total_tokens > available_tokens:
+                return {}, 0
 
-        selected = []
-        used_tokens = 0
+        logger.warning(f"Emergency optimization complete: {total_tokens} tokens used")
+        return context_dict, total_tokens
 
-        for turn in sorted_turns:
-            if (
-                used_tokens + turn.total_tokens <= budget
-                and len(selected) < self.target_recent_turns
-            ):
-                turn_dict = {
-                    "turn_number": turn.turn_number,
-                    "user_message": turn.user_message,
-                    "agent_message": turn.agent_message,
-                    "tool_calls": turn.tool_calls,
-                    "timestamp": turn.timestamp,
-                    "has_tool_activity": turn.has_tool_activity,
-                }
-                selected.append(turn_dict)
-                used_tokens += turn.total_tokens
-            elif used_tokens + turn.total_tokens > budget:
-                break
+    @staticmethod
+    def _water_level(sizes: list[int], budget: int) -> int:
+        """Largest cap L such that sum(min(size, L)) fits within budget."""
+        if budget <= 0:
+            return 0
+        remaining = budget
+        ordered = sorted(sizes)
+        for i, size in enumerate(ordered):
+            share = remaining // (len(ordered) - i)
+            if size > share:
+                return share
+            remaining -= size
+        return ordered[-1] if ordered else 0
+
+    def _count_context_tokens(self, context_dict: dict[str, Any]) -> int:
+        """Count tokens of a context dict as serialized for injection into the request."""
+        return self._count_tokens(json.dumps(context_dict, separators=(",", ":"), default=str))
+
+    def _truncate_to_token_budget(
+        self, text: str, max_tokens: int, serialized: bool = False
+    ) -> tuple[str, int]:
+        """Truncate text to the longest prefix (plus marker) that fits within max_tokens.
+
+        Local counters (tiktoken, character estimate) are used directly in a binary search
+        over the prefix length. The native counter is a remote call, so the search probes
+        the local estimate scaled to the text's real token count instead, and only the
+        resulting cut point is confirmed with at most NATIVE_TRUNCATION_CONFIRMATIONS
+        native counts. Intermediate prefixes are never added to the token cache.
+
+        Args:
+            text: Text to truncate
+            max_tokens: Token budget for the result
+            serialized: Measure the text as a JSON string, as it appears in injected context
 
-        # Sort selected turns by turn number for chronological order
-        selected.sort(key=lambda t: t["turn_number"])
-        return selected, used_tokens
+        Returns:
+            Tuple of (truncated_text, token_count)
+        """
 
-    def _select_prioritized_tool_results(self, budget: int) -> tuple[list[dict[str, Any]], int]:
-        """Select tool results based on priority and token budget."""
-        if not self.tool_results:
-            return [], 0
+        def measure(value: str) -> str:
+            return json.dumps(value) if serialized else value
 
-        # Sort by priority then recency
-        sorted_results = sorted(self.tool_results, key=lambda r: (r.priority.value, -r.turn_number))
+        tokens = self._count_tokens(measure(text))
+        if tokens <= max_tokens:
+            return text, tokens
+        if max_tokens <= 0:
+            return "", 0
 
-        selected = []
-        used_tokens = 0
+        strategy = self.token_counting_strategy
 
-        for result in sorted_results:
-            if (
-                used_tokens + result.token_count <= budget
-                and len(selected) < self.target_tool_results
-            ):
-                result_dict = {
-                    "tool_name": result.tool_name,
-                    "response": result.full_result,
-                    "summary": result.result_summary,
-                    "is_error": result.is_error,
-                    "turn_number": result.turn_number,
-                }
-                selected.append(result_dict)
-                used_tokens += result.token_count
-            elif used_tokens + result.token_count > budget:
+        def count(value: str) -> int:
+            return self._count_uncached_batch(strategy, [measure(value)])[0][0]
+
+        if strategy != "native_google_counter":
+            return self._longest_prefix_within(text, max_tokens, count)
+
+        scale = tokens / max(1, self._estimate_tokens(measure(text)))
+        target = max_tokens
+        for _ in range(NATIVE_TRUNCATION_CONFIRMATIONS):
+            candidate, _ = self._longest_prefix_within(
+                text, target, lambda value: self._estimate_tokens(measure(value)) * scale
+            )
+            if not candidate:
                 break
+            candidate_tokens = count(candidate)
+            if candidate_tokens <= max_tokens:
+                return candidate, candidate_tokens
+            # Aim below the budget by the relative overshoot of the estimate
+            target = target * max_tokens / candidate_tokens
+        return "", 0
+
+    @staticmethod
+    def _longest_prefix_within(
+        text: str, max_tokens: float, count: Callable[[str], float]
+    ) -> tuple[str, float]:
+        """Binary search for the longest prefix (plus marker) whose count fits max_tokens."""
+        best_text, best_tokens = "", 0
+        lo, hi = 1, len(text) - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            candidate = text[:mid] + TRUNCATION_MARKER
+            candidate_tokens = count(candidate)
+            if candidate_tokens <= max_tokens:
+                best_text, best_tokens = candidate, candidate_tokens
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return best_text, best_tokens
 
-        return selected, used_tokens
+    def _recency_factor(self, turn_number: int) -> float:
+        """Decay weight for an item last touched in the given turn."""
+        age = max(0, self.current_turn_number - turn_number)
+        return SELECTION_RECENCY_DECAY**age
 
-    def _select_prioritized_code_snippets(self, budget: int) -> tuple[list[dict[str, Any]], int]:
-        """Select code snippets based on relevance and token budget."""
-        if not self.code_snippets:
-            return [], 0
+    def _build_selection_candidates(self) -> list[SelectionCandidate]:
+        """Score turns, tool results and code snippets for budget-optimal selection.
 
-        # Sort by relevance score and recency
-        sorted_snippets = sorted(
-            self.code_snippets, key=lambda s: (-s.relevance_score, -s.last_accessed)
-        )
+        The value of an item combines its priority, relevance score and recency.
+        """
+        candidates = []
+        for turn in self.conversation_turns:
+            value = SELECTION_PRIORITY_WEIGHTS[turn.priority] * self._recency_factor(
+                turn.turn_number
+            )
+            if turn.has_tool_activity:
+                value *= SELECTION_TOOL_ACTIVITY_BONUS
+            candidates.append(
+                SelectionCandidate("conversation_history", turn, turn.total_tokens, value)
+            )
+        for result in self.tool_results:
+            value = (
+                SELECTION_PRIORITY_WEIGHTS[result.priority]
+                * result.relevance_score
+                * self._recency_factor(result.turn_number)
+            )
+            candidates.append(SelectionCandidate("tool_results", result, result.token_count, value))
+        for snippet in self.code_snippets:
+            value = (
+                SELECTION_PRIORITY_WEIGHTS[snippet.priority]
+                * snippet.relevance_score
+                * self._recency_factor(snippet.last_accessed)
+            )
+            candidates.append(
+                SelectionCandidate("code_snippets", snippet, snippet.token_count, value)
+            )
+        return candidates
 
-        selected = []
-        used_tokens = 0
+    def get_context_selection_stats(self) -> dict[str, Any]:
+        """Return budget utilization of the most recent context selection."""
+        return dict(self._last_selection_stats)
 
-        for snippet in sorted_snippets:
-            if (
-                used_tokens + snippet.token_count <= budget
-                and len(selected) < self.target_code_snippets
-            ):
-                snippet_dict = {
-                    "file_path": snippet.file_path,
-                    "code": snippet.code,
-                    "start_line": snippet.start_line,
-                    "end_line": snippet.end_line,
-                    "last_accessed": snippet.last_accessed,
-                    "relevance_score": snippet.relevance_score,
-                }
-                selected.append(snippet_dict)
-                used_tokens += snippet.token_count
-            elif used_tokens + snippet.token_count > budget:
-                break
+    @staticmethod
+    def _turn_to_context_dict(turn: ConversationTurn) -> dict[str, Any]:
+        return {
+            "turn_number": turn.turn_number,
+            "user_message": turn.user_message,
+            "agent_message": turn.agent_message,
+            "tool_calls": turn.tool_calls,
+            "timestamp": turn.timestamp,
+            "has_tool_activity": turn.has_tool_activity,
+        }
+
+    @staticmethod
+    def _tool_result_to_context_dict(result: ToolResult) -> dict[str, Any]:
+        return {
+            "tool_name": result.tool_name,
+            "response": result.full_result,
+            "summary": result.result_summary,
+            "is_error": result.is_error,
+            "turn_number": result.turn_number,
+        }
 
-        return selected, used_tokens
+    @staticmethod
+    def _code_snippet_to_context_dict(snippet: CodeSnippet) -> dict[str, Any]:
+        return {
+            "file_path": snippet.file_path,
+            "code": snippet.code,
+            "start_line": snippet.start_line,
+            "end_line": snippet.end_line,
+            "last_accessed": snippet.last_accessed,
+            "relevance_score": snippet.relevance_score,
+        }
 
     def _update_state_token_counts(self) -> None:
         """Update token counts for state elements."""
-        self.state.core_goal_tokens = self._count_tokens(self.state.core_goal)
-        self.state.current_phase_tokens = self._count_tokens(self.state.current_phase)
-
         try:
             decisions_json = json.dumps(self.state.key_decisions)
-            self.state.decisions_tokens = self._count_tokens(decisions_json)
         except Exception:
-            self.state.decisions_tokens = self._count_tokens(str(self.state.key_decisions))
+            decisions_json = str(self.state.key_decisions)
 
         try:
             files_json = json.dumps(self.state.last_modified_files)
-            self.state.files_tokens = self._count_tokens(files_json)
         except Exception:
-            self.state.files_tokens = self._count_tokens(str(self.state.last_modified_files))
+            files_json = str(self.state.last_modified_files)
+
+        (
+            self.state.core_goal_tokens,
+            self.state.current_phase_tokens,
+            self.state.decisions_tokens,
+            self.state.files_tokens,
+        ) = self.count_tokens_batch(
+            [self.state.core_goal, self.state.current_phase, decisions_json, files_json]
+        )
 
     def _calculate_adaptive_limits(self) -> dict[str, int]:
         """Calculate adaptive limits based on conversation progress."""
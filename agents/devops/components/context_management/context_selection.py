@@ -0,0 +1,122 @@
+"""Budget-constrained selection of context items as a single weighted knapsack."""
+
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import logging
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SelectionCandidate:
+    """An item competing for space in the assembled context."""
+
+    kind: str  # e.g. "conversation_history", "tool_results", "code_snippets"
+    item: Any
+    tokens: int
+    value: float
+
+
+@dataclass
+class SelectionResult:
+    """Outcome of a selection run, including how well the budget was used."""
+
+    selected: dict[str, list[Any]] = field(default_factory=dict)
+    used_tokens: int = 0
+    budget: int = 0
+    total_value: float = 0.0
+    candidates: int = 0
+    skipped_over_budget: int = 0
+
+    @property
+    def utilization(self) -> float:
+        """Fraction of the budget filled by the selected items."""
+        return self.used_tokens / self.budget if self.budget > 0 else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        """Return a summary suitable for logging and monitoring."""
+        return {
+            "budget": self.budget,
+            "used_tokens": self.used_tokens,
+            "utilization": self.utilization,
+            "total_value": self.total_value,
+            "candidates": self.candidates,
+            "skipped_over_budget": self.skipped_over_budget,
+            "selected": {kind: len(items) for kind, items in self.selected.items()},
+        }
+
+
+def select_within_budget(
+    candidates: list[SelectionCandidate],
+    budget: int,
+    limits: Optional[dict[str, int]] = None,
+) -> SelectionResult:
+    """Choose the candidates that maximize total value within a token budget.
+
+    Candidates of all kinds compete in one greedy knapsack ordered by value density
+    (value per token). A heap yields the best remaining candidate incrementally, so
+    only the items actually considered are ordered, and items that do not fit are
+    skipped rather than ending the selection. As in the standard modified greedy
+    algorithm, the single most valuable candidate that fits on its own replaces the
+    greedy packing when it is worth more, which bounds the result to at least half
+    of the optimum.
+
+    Args:
+        candidates: Items to choose from
+        budget: Maximum number of tokens the selected items may use
+        limits: Optional maximum number of selected items per kind
+
+    Returns:
+        SelectionResult with the chosen items grouped by kind, in selection order
+    """
+    limits = limits or {}
+    result = SelectionResult(budget=max(0, budget), candidates=len(candidates))
+
+    tie_breaker = itertools.count()
+    heap = []
+    best_single: Optional[SelectionCandidate] = None
+    for candidate in candidates:
+        if candidate.value <= 0 or limits.get(candidate.kind, 1) <= 0:
+            continue
+        if candidate.tokens > result.budget:
+            result.skipped_over_budget += 1
+            continue
+        density = candidate.value / candidate.tokens if candidate.tokens > 0 else float("inf")
+        heap.append((-density, next(tie_breaker), candidate))
+        if best_single is None or candidate.value > best_single.value:
+            best_single = candidate
+    heapq.heapify(heap)
+
+    remaining = result.budget
+    picked: list[SelectionCandidate] = []
+    counts: dict[str, int] = {}
+    while heap:
+        _, _, candidate = heapq.heappop(heap)
+        if candidate.tokens > remaining:
+            result.skipped_over_budget += 1
+            continue
+        limit = limits.get(candidate.kind)
+        if limit is not None and counts.get(candidate.kind, 0) >= limit:
+            continue
+        picked.append(candidate)
+        counts[candidate.kind] = counts.get(candidate.kind, 0) + 1
+        remaining -= candidate.tokens
+        if remaining == 0:
+            break
+
+    greedy_value = sum(candidate.value for candidate in picked)
+    if best_single is not None and best_single.value > greedy_value:
+        picked = [best_single]
+
+    for candidate in picked:
+        result.selected.setdefault(candidate.kind, []).append(candidate.item)
+        result.used_tokens += candidate.tokens
+        result.total_value += candidate.value
+
+    logger.debug(
+        f"Context selection: {len(picked)}/{len(candidates)} items, "
+        f"{result.used_tokens:,}/{result.budget:,} tokens ({result.utilization:.1%})"
+    )
+    return result
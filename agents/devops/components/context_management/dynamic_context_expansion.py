@@ -7,6 +7,8 @@ import re
 import subprocess
 from typing import Optional
 
+from ...shared_libraries.ignore_matcher import IgnoreMatcher
+
 logger = logging.getLogger(__name__)
 
 
@@ -97,24 +99,25 @@ class DynamicContextExpander:
             ],
         }
 
-        # Ignore patterns for files/directories to skip
+        # Gitignore-style patterns for files/directories to skip, compiled once
         self.ignore_patterns = [
-            r"__pycache__",
-            r"\.pyc$",
-            r"\.git",
-            r"node_modules",
-            r"\.venv",
-            r"venv",
-            r"\.env",
-            r"build",
-            r"dist",
-            r"\.DS_Store",
-            r"\.cache",
-            r"\.pytest_cache",
-            r"\.coverage",
-            r"htmlcov",
-            r"\.tox",
+            "__pycache__",
+            "*.pyc",
+            ".git",
+            "node_modules",
+            ".venv",
+            "venv",
+            ".env",
+            "build",
+            "dist",
+            ".DS_Store",
+            ".cache",
+            ".pytest_cache",
+            ".coverage",
+            "htmlcov",
+            ".tox",
         ]
+        self.ignore_matcher = IgnoreMatcher(self.ignore_patterns)
 
         # Error pattern recognition
         self.error_patterns = {
@@ -629,8 +632,10 @@ class DynamicContextExpander:
 
         try:
             for item in directory.iterdir():
-                # Skip ignored patterns
-                if any(re.search(pattern, str(item)) for pattern in self.ignore_patterns):
+                # Skip ignored patterns; ignored directories are never descended into, so
+                # matching the name is enough
+                is_dir = item.is_dir()
+                if self.ignore_matcher.is_ignored(item.name, is_dir=is_dir):
                     continue
 
                 if item.is_file():
@@ -646,7 +651,7 @@ class DynamicContextExpander:
                                     f"Found in {directory.name}/",
                                 )
                             )
-                elif item.is_dir() and current_depth < max_depth - 1:
+                elif is_dir and current_depth < max_depth - 1:
                     # Recursively scan subdirectories
                     sub_discovered = self._scan_directory(
                         item, context, max_depth, current_depth + 1
@@ -0,0 +1,167 @@
+"""Content-addressed cache for token counts to avoid repeated tokenizer round-trips."""
+
+from collections import OrderedDict
+import hashlib
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any, Callable, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class TokenCountCache:
+    """Bounded LRU cache mapping (namespace, text digest) to a token count.
+
+    The namespace is typically the model name combined with the counting strategy,
+    so counts produced by different tokenizers never mix. An optional sqlite file
+    acts as a second tier so that restarts begin with a warm cache.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, persist_path: Optional[str] = None):
+        """Initialize the token count cache.
+
+        Args:
+            max_entries: Maximum number of entries kept in memory before LRU eviction
+            persist_path: Optional path to a sqlite file used as an on-disk tier
+        """
+        self.max_entries = max(1, max_entries)
+        self.persist_path = persist_path
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        if persist_path:
+            self._open_disk_tier(persist_path)
+
+    def _open_disk_tier(self, persist_path: str) -> None:
+        """Open (or create) the sqlite file backing the on-disk tier."""
+        try:
+            Path(persist_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute("PRAGMA synchronous=OFF")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS token_counts (key TEXT PRIMARY KEY, tokens INTEGER)"
+            )
+            self._db.commit()
+            logger.info(f"Token count cache disk tier enabled at {persist_path}")
+        except Exception as e:
+            logger.warning(f"Could not open token count cache at {persist_path}: {e}")
+            self._db = None
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        """Build the cache key for a piece of text within a namespace."""
+        digest = hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+        return f"{namespace}:{digest}"
+
+    def get(self, namespace: str, text: str) -> Optional[int]:
+        """Return the cached token count for text, or None on a miss."""
+        key = self.make_key(namespace, text)
+        with self._lock:
+            tokens = self._entries.get(key)
+            if tokens is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return tokens
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT tokens FROM token_counts WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.debug(f"Token count cache disk lookup failed: {e}")
+                    row = None
+                if row is not None:
+                    self._store(key, row[0])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, namespace: str, text: str, tokens: int) -> None:
+        """Store the token count for text."""
+        key = self.make_key(namespace, text)
+        with self._lock:
+            self._store(key, tokens)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO token_counts (key, tokens) VALUES (?, ?)",
+                        (key, tokens),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.debug(f"Token count cache disk write failed: {e}")
+
+    def get_or_count(self, namespace: str, text: str, counter: Callable[[str], int]) -> int:
+        """Return the cached count for text, computing and storing it on a miss."""
+        tokens = self.get(namespace, text)
+        if tokens is None:
+            tokens = counter(text)
+            self.put(namespace, text, tokens)
+        return tokens
+
+    def _store(self, key: str, tokens: int) -> None:
+        """Insert into the in-memory tier and evict the least recently used entries."""
+        self._entries[key] = tokens
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all in-memory entries and reset counters (the disk tier is kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.disk_hits = self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss statistics for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+
+_default_token_cache: Optional[TokenCountCache] = None
+_default_token_cache_lock = threading.Lock()
+
+
+def get_default_token_cache() -> TokenCountCache:
+    """Return the process-wide token count cache, creating it from config on first use."""
+    global _default_token_cache
+    with _default_token_cache_lock:
+        if _default_token_cache is None:
+            max_entries = DEFAULT_MAX_ENTRIES
+            persist_path = None
+            try:
+                from ... import config as agent_config
+
+                max_entries = agent_config.TOKEN_COUNT_CACHE_MAX_ENTRIES
+                persist_path = agent_config.TOKEN_COUNT_CACHE_PATH
+            except Exception as e:
+                logger.debug(f"Using default token count cache settings: {e}")
+            _default_token_cache = TokenCountCache(
+                max_entries=max_entries, persist_path=persist_path
+            )
+        return _default_token_cache
@@ -0,0 +1,203 @@
+"""Process-wide registry of resolved tokenizers shared by all token counters."""
+
+import functools
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from google.genai.types import CountTokensResponse
+
+# Attempt to import tiktoken for accurate token counting
+try:
+    import tiktoken
+
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    logging.warning(
+        "tiktoken library not found. Token counting will be a rough estimate based on "
+        "character count if native counter also fails."
+    )
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+NATIVE_STRATEGY = "native_google_counter"
+TIKTOKEN_STRATEGY = "tiktoken_counter"
+
+
+def load_tiktoken_encoding(model_name: str) -> Optional[Any]:
+    """Load the model-specific tiktoken encoding, falling back to cl100k_base."""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:  # Model not found in tiktoken
+        pass
+    except Exception as e:
+        logger.debug(f"tiktoken encoding lookup failed for {model_name}: {e}")
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.error(f"Failed to get cl100k_base tokenizer: {e}. Tiktoken unavailable.")
+        return None
+
+
+def probe_native_counter(llm_client: Any, model_name: str) -> Optional[bool]:
+    """Check with a tiny request that native count_tokens works for a model.
+
+    Returns:
+        True when available, None otherwise (so transient failures are not cached)
+    """
+    try:
+        response = llm_client.models.count_tokens(model=model_name, contents="test")
+    except Exception as e:
+        logger.warning(f"Native Google count_tokens probe failed for model {model_name}: {e}")
+        return None
+    if isinstance(response, CountTokensResponse) and hasattr(response, "total_tokens"):
+        return True
+    logger.warning(
+        f"Native Google count_tokens for {model_name} did not return expected "
+        f"response ({type(response)})."
+    )
+    return None
+
+
+class TokenizerRegistry:
+    """Resolve each (model, strategy) tokenizer once per process.
+
+    Strategy detection involves a live ``count_tokens`` probe for native counting and
+    a tiktoken encoding lookup (which may download BPE tables). Every ContextManager
+    and TokenCounter goes through this registry so that work, and the encoding memory,
+    is shared. Concurrent lookups of the same key wait for a single resolution.
+    """
+
+    def __init__(self):
+        self._entries: dict[tuple[str, str], Any] = {}
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.resolutions = 0
+
+    def get_or_resolve(
+        self,
+        model_name: str,
+        strategy: str,
+        resolver: Callable[[], Any],
+        cache_none: bool = True,
+    ) -> Any:
+        """Return the tokenizer registered for (model_name, strategy), resolving it once.
+
+        Args:
+            model_name: Model the tokenizer is used for
+            strategy: Counting strategy name
+            resolver: Called without arguments to resolve the tokenizer on a miss
+            cache_none: Whether a None result ("unavailable") is remembered
+
+        Returns:
+            The resolved tokenizer, or None if unavailable
+        """
+        key = (model_name, strategy)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key]
+            value = resolver()
+            with self._lock:
+                self.resolutions += 1
+                if value is not None or cache_none:
+                    self._entries[key] = value
+            return value
+
+    def get_tiktoken_encoding(
+        self, model_name: str, loader: Optional[Callable[[str], Any]] = None
+    ) -> Optional[Any]:
+        """Return the shared tiktoken encoding for a model (None if unavailable)."""
+        return self.get_or_resolve(
+            model_name,
+            TIKTOKEN_STRATEGY,
+            functools.partial(loader or load_tiktoken_encoding, model_name),
+        )
+
+    def native_counter_available(
+        self,
+        model_name: str,
+        llm_client: Any,
+        prober: Optional[Callable[[], Any]] = None,
+    ) -> bool:
+        """Return whether native count_tokens works for a model, probing at most once.
+
+        Only successful probes are remembered so a transient failure is retried later.
+        """
+        probe = prober or functools.partial(probe_native_counter, llm_client, model_name)
+        return bool(
+            self.get_or_resolve(
+                model_name, NATIVE_STRATEGY, lambda: probe() or None, cache_none=False
+            )
+        )
+
+    def warm_up(
+        self,
+        model_names: list[str],
+        llm_client: Any = None,
+        background: bool = False,
+    ) -> Optional[threading.Thread]:
+        """Resolve the tokenizers for the given models ahead of the first request.
+
+        Args:
+            model_names: Models to resolve tokenizers for
+            llm_client: Optional genai client used to probe native counting
+            background: Run in a daemon thread instead of blocking the caller
+
+        Returns:
+            The warm-up thread when running in the background, otherwise None
+        """
+
+        def run() -> None:
+            for model_name in dict.fromkeys(name for name in model_names if name):
+                try:
+                    if llm_client is not None:
+                        self.native_counter_available(model_name, llm_client)
+                    self.get_tiktoken_encoding(model_name)
+                except Exception as e:
+                    logger.warning(f"Tokenizer warm-up failed for {model_name}: {e}")
+            logger.info(f"Tokenizer warm-up complete: {self.stats()}")
+
+        if background:
+            thread = threading.Thread(target=run, name="tokenizer-warmup", daemon=True)
+            thread.start()
+            return thread
+        run()
+        return None
+
+    def clear(self) -> None:
+        """Forget all resolved tokenizers (e.g. after changing credentials, or in tests)."""
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+            self.hits = self.resolutions = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return registry statistics for monitoring."""
+        with self._lock:
+            return {
+                "entries": sorted(f"{model}:{strategy}" for model, strategy in self._entries),
+                "hits": self.hits,
+                "resolutions": self.resolutions,
+            }
+
+
+_tokenizer_registry = TokenizerRegistry()
+
+
+def get_tokenizer_registry() -> TokenizerRegistry:
+    """Return the process-wide tokenizer registry."""
+    return _tokenizer_registry
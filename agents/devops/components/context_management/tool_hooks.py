@@ -17,15 +17,55 @@ from .file_tracker import file_change_tracker
 logger = logging.getLogger(__name__)
 
 
+def _intern_file_blob(state: dict[str, Any], content: str, blob_id: Optional[str] = None) -> str:
+    """Store content once in ``app:file_blobs``, keyed by its content hash.
+
+    Snippet entries reference the blob by id instead of each holding a copy, so a
+    file version read several times (or split into overlapping chunks) is stored once.
+
+    Returns:
+        The blob id
+    """
+    blob_id = blob_id or file_change_tracker.hash_file_content(content)
+    file_blobs = state.get("app:file_blobs") or {}
+    file_blobs.setdefault(blob_id, content)
+    state["app:file_blobs"] = file_blobs
+    return blob_id
+
+
+def _prune_file_blobs(state: dict[str, Any]) -> None:
+    """Drop blobs from ``app:file_blobs`` that no code snippet references anymore."""
+    file_blobs = state.get("app:file_blobs")
+    if not file_blobs:
+        return
+    referenced = {snippet.get("blob_id") for snippet in state.get("app:code_snippets") or []}
+    if referenced.issuperset(file_blobs):
+        return
+    state["app:file_blobs"] = {
+        blob_id: content for blob_id, content in file_blobs.items() if blob_id in referenced
+    }
+
+
 def _add_snippet_to_state(
     code_snippets: list[dict],
     file_path: str,
-    content: str,
+    blob_id: str,
+    blob_lines: Optional[list[int]],
     start_line: int,
     end_line: int,
     relevance_score: float,
 ) -> None:
-    """Helper function to add or update a code snippet in the state."""
+    """Helper function to add or update a code snippet in the state.
+
+    Args:
+        code_snippets: Snippet entries from ``app:code_snippets``
+        file_path: File the snippet comes from
+        blob_id: Id of the ``app:file_blobs`` entry holding the content
+        blob_lines: 0-based ``[start, end)`` line range within the blob, None for all of it
+        start_line: First line of the snippet in the file
+        end_line: Last line of the snippet in the file
+        relevance_score: Initial relevance of a new snippet
+    """
     # Check if snippet already exists to update last_accessed/relevance
     found = False
     for snippet in code_snippets:
@@ -36,14 +76,18 @@ def _add_snippet_to_state(
         ):
             # Update existing snippet
             snippet["relevance_score"] = snippet.get("relevance_score", 1.0) + 0.3
-            snippet["code"] = content  # Update with latest content
+            # Point at the latest content
+            snippet.pop("code", None)
+            snippet["blob_id"] = blob_id
+            snippet["blob_lines"] = blob_lines
             found = True
             break
 
     if not found:
         new_snippet = {
             "file_path": file_path,
-            "code": content,
+            "blob_id": blob_id,
+            "blob_lines": blob_lines,
             "start_line": start_line,
             "end_line": end_line,
             "last_accessed": 0,  # Placeholder, needs current turn info from context
@@ -163,6 +207,7 @@ def process_read_file_results(
         # Register this file with the file change tracker
         # (assuming file_tracker can operate without ContextManager instance)
         file_change_tracker.register_file_read(file_path, content)
+        blob_id = _intern_file_blob(state, content, file_change_tracker.file_hashes.get(file_path))
 
         # Extract line numbers if available
         start_line = 1  # Default for MCP tools
@@ -183,18 +228,22 @@ def process_read_file_results(
                 overlap = 25  # Overlap for continuity
                 for i in range(0, len(lines), chunk_size - overlap):
                     end_idx = min(i + chunk_size, len(lines))
-                    chunk_content = "\n".join(lines[i:end_idx])
                     _add_snippet_to_state(
-                        code_snippets, file_path, chunk_content, i + 1, end_idx, 1.2
+                        code_snippets, file_path, blob_id, [i, end_idx], i + 1, end_idx, 1.2
                     )
             else:
                 # Small files - add as single snippet
-                _add_snippet_to_state(code_snippets, file_path, content, start_line, end_line, 1.0)
+                _add_snippet_to_state(
+                    code_snippets, file_path, blob_id, None, start_line, end_line, 1.0
+                )
         else:
             # Partial file read - add the specific section
-            _add_snippet_to_state(code_snippets, file_path, content, start_line, end_line, 1.1)
+            _add_snippet_to_state(
+                code_snippets, file_path, blob_id, None, start_line, end_line, 1.1
+            )
 
         state["app:code_snippets"] = code_snippets
+        _prune_file_blobs(state)
         logger.info(
             f"Enhanced code snippet capture from read_file: {file_path} ({len(lines)} lines)"
         )
@@ -276,6 +325,9 @@ def process_edit_file_results(
 
         # Register the edit with the file change tracker
         file_change_tracker.register_file_edit(file_path, new_content)
+        blob_id = _intern_file_blob(
+            state, new_content, file_change_tracker.file_hashes.get(file_path)
+        )
 
         # Add the new content as code snippets for context
         code_snippets = state.get("app:code_snippets", [])
@@ -293,13 +345,15 @@ def process_edit_file_results(
             overlap = 25
             for i in range(0, len(lines), chunk_size - overlap):
                 end_idx = min(i + chunk_size, len(lines))
-                chunk_content = "\n".join(lines[i:end_idx])
-                _add_snippet_to_state(code_snippets, file_path, chunk_content, i + 1, end_idx, 1.5)
+                _add_snippet_to_state(
+                    code_snippets, file_path, blob_id, [i, end_idx], i + 1, end_idx, 1.5
+                )
         else:
             # Small files - add as single snippet with high relevance
-            _add_snippet_to_state(code_snippets, file_path, new_content, 1, len(lines), 1.5)
+            _add_snippet_to_state(code_snippets, file_path, blob_id, None, 1, len(lines), 1.5)
 
         state["app:code_snippets"] = code_snippets
+        _prune_file_blobs(state)
         logger.info(
             f"Enhanced code snippet capture from edit_file: {file_path} ({len(lines)} lines)"
         )
@@ -354,7 +408,8 @@ def process_codebase_search_results(
         if not found:
             new_snippet = {
                 "file_path": file_path,
-                "code": content,
+                "blob_id": _intern_file_blob(state, content),
+                "blob_lines": None,
                 "start_line": start_line,
                 "end_line": end_line,
                 "last_accessed": 0,  # Placeholder
@@ -364,6 +419,7 @@ def process_codebase_search_results(
             code_snippets.append(new_snippet)
 
     state["app:code_snippets"] = code_snippets
+    _prune_file_blobs(state)
     logger.debug(f"Added {len(result['matches'])} code snippets to state from codebase_search.")
 
 
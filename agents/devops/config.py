@@ -4,6 +4,7 @@ This file is used to load the configuration for the devops agent.
 
 import logging
 import os
+from pathlib import Path
 
 from dotenv import load_dotenv
 from google.genai import types as genai_types
@@ -148,6 +149,50 @@ CHROMA_DATA_PATH = os.getenv("CHROMA_DATA_PATH")
 SOFTWARE_ENGINEER_CONTEXT = os.getenv(
     "SOFTWARE_ENGINEER_CONTEXT", "eval/project_context_empty.json"
 )
+# Embedding backend for RAG: "google" (GenAI API), "hashing" (offline, deterministic)
+# or "sentence-transformers" (local model, optional dependency)
+RAG_EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "google")
+RAG_HASHING_EMBEDDING_DIMENSIONS = int(os.getenv("RAG_HASHING_EMBEDDING_DIMENSIONS", "1024"))
+RAG_SENTENCE_TRANSFORMERS_MODEL = os.getenv("RAG_SENTENCE_TRANSFORMERS_MODEL", "all-MiniLM-L6-v2")
+# Chunks are split above RAG_CHUNK_MAX_TOKENS and merged with neighbours below
+# RAG_CHUNK_MIN_TOKENS (estimated tokens)
+RAG_CHUNK_MAX_TOKENS = int(os.getenv("RAG_CHUNK_MAX_TOKENS", "1024"))
+RAG_CHUNK_MIN_TOKENS = int(os.getenv("RAG_CHUNK_MIN_TOKENS", "64"))
+# Worker threads that read and chunk files while a directory is being indexed
+RAG_INDEXING_WORKERS = int(os.getenv("RAG_INDEXING_WORKERS", "4"))
+# Embedding requests pack chunks from many files up to these per-request limits
+RAG_EMBEDDING_BATCH_SIZE = int(os.getenv("RAG_EMBEDDING_BATCH_SIZE", "100"))
+RAG_EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("RAG_EMBEDDING_BATCH_MAX_TOKENS", "20000"))
+# Maximum number of embedding requests in flight at once
+RAG_EMBEDDING_MAX_CONCURRENCY = int(os.getenv("RAG_EMBEDDING_MAX_CONCURRENCY", "4"))
+# Embedding quota shared by all embedding calls; lowered automatically after 429s
+RAG_EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("RAG_EMBEDDING_REQUESTS_PER_MINUTE", "1500"))
+RAG_EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("RAG_EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+# In-memory caches for repeated retrieval queries
+RAG_QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("RAG_QUERY_EMBEDDING_CACHE_SIZE", "256"))
+RAG_RETRIEVAL_RESULT_CACHE_SIZE = int(os.getenv("RAG_RETRIEVAL_RESULT_CACHE_SIZE", "128"))
+# Share of the BM25 lexical ranking in hybrid retrieval (0: vector only, 1: lexical only)
+RAG_HYBRID_LEXICAL_WEIGHT = float(os.getenv("RAG_HYBRID_LEXICAL_WEIGHT", "0.5"))
+# Watch indexed directories and re-index changed files in the background
+RAG_WATCH_ENABLED = os.getenv("RAG_WATCH_ENABLED", "false").lower() in ("true", "1", "yes")
+# Seconds without new filesystem events before a burst of changes is re-indexed
+RAG_WATCH_DEBOUNCE_SECONDS = float(os.getenv("RAG_WATCH_DEBOUNCE_SECONDS", "2.0"))
+# On-disk embedding cache shared by all collections and workspaces (empty: memory only)
+RAG_EMBEDDING_CACHE_PATH = os.getenv(
+    "RAG_EMBEDDING_CACHE_PATH",
+    str(Path.home() / ".adk" / "devops_agent" / "embedding_cache.sqlite3"),
+)
+# Trigram index that narrows code searches to the files that can match
+CODE_SEARCH_TRIGRAM_INDEX = os.getenv("CODE_SEARCH_TRIGRAM_INDEX", "false").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+# Directory with one sqlite file per indexed workspace (empty: memory only)
+CODE_SEARCH_TRIGRAM_INDEX_PATH = os.getenv(
+    "CODE_SEARCH_TRIGRAM_INDEX_PATH",
+    str(Path.home() / ".adk" / "devops_agent" / "trigram_index"),
+)
 
 # --- Agent Control Configuration ---
 DEVOPS_AGENT_INTERACTIVE = os.getenv("DEVOPS_AGENT_INTERACTIVE", "").lower() in (
@@ -193,6 +238,15 @@ CONTEXT_TARGET_TOOL_RESULTS = 10
 CONTEXT_MAX_STORED_CODE_SNIPPETS = 5
 CONTEXT_MAX_STORED_TOOL_RESULTS = 20
 
+# Token count cache: avoids recounting identical text (each native count is a network call)
+TOKEN_COUNT_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_COUNT_CACHE_MAX_ENTRIES", "10000"))
+# Optional sqlite file so the cache survives restarts (disabled when unset)
+TOKEN_COUNT_CACHE_PATH = os.getenv("TOKEN_COUNT_CACHE_PATH")
+# Worker threads for token counting and context assembly kept off the event loop
+CONTEXT_ASSEMBLY_MAX_WORKERS = int(os.getenv("CONTEXT_ASSEMBLY_MAX_WORKERS", "4"))
+# Resolve tokenizers for the configured models in the background at startup
+TOKENIZER_WARMUP = os.getenv("TOKENIZER_WARMUP", "false").lower() in ("true", "1", "yes")
+
 # --- Tool Configuration ---
 # File Summarizer Tool
 SUMMARIZER_MODEL_NAME = DEFAULT_SUMMARIZER_MODEL
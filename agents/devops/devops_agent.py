@@ -1,10 +1,16 @@
 """DevOps Agent Implementation - Class Definition."""
 
-from collections.abc import AsyncGenerator
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import copy
 from dataclasses import dataclass, field
 from enum import Enum
+import hashlib
 import json
 import logging
+import threading
 import time
 import traceback
 from typing import Any, Optional
@@ -29,11 +35,11 @@ from .components.context_management import (
     TOOL_PROCESSORS,
     get_last_user_content,
 )
+from .components.context_management.blob_store import Blob
 from .components.context_management.context_manager import (
     CodeSnippet,
     ContextManager,
     ConversationTurn,
-    ToolResult,
 )
 from .components.planning_manager import PlanningManager
 from .shared_libraries import ui as ui_utils
@@ -104,6 +110,7 @@ class TurnState:
     tool_calls: list[dict[str, Any]] = field(default_factory=list)
     tool_results: list[dict[str, Any]] = field(default_factory=list)
     system_messages: list[str] = field(default_factory=list)
+    token_counts: dict[str, Any] = field(default_factory=dict)
     errors: list[str] = field(default_factory=list)
     created_at: float = field(default_factory=time.time)
     completed_at: Optional[float] = None
@@ -142,6 +149,7 @@ class StateManager:
             "code_snippets": [],
             "core_goal": "",
             "current_phase": "",
+            "file_blobs": {},
             "key_decisions": [],
             "last_modified_files": [],
         }
@@ -252,6 +260,8 @@ class StateManager:
             # Add system messages if any
             if turn.system_messages:
                 legacy_turn["system_messages"] = turn.system_messages
+            if turn.token_counts:
+                legacy_turn["token_counts"] = turn.token_counts
             legacy_history.append(legacy_turn)
 
         # Add current turn if it exists
@@ -264,6 +274,8 @@ class StateManager:
             }
             if self.current_turn.system_messages:
                 current_legacy["system_messages"] = self.current_turn.system_messages
+            if self.current_turn.token_counts:
+                current_legacy["token_counts"] = self.current_turn.token_counts
             legacy_history.append(current_legacy)
 
         return {
@@ -298,6 +310,7 @@ class StateManager:
                     tool_calls=turn_data.get("tool_calls", []),
                     tool_results=turn_data.get("tool_results", []),
                     system_messages=turn_data.get("system_messages", []),
+                    token_counts=turn_data.get("token_counts", {}),
                     phase=TurnPhase.COMPLETED,
                 )
                 turn.completed_at = time.time()  # Mark as completed since it's in history
@@ -313,6 +326,7 @@ class StateManager:
                     tool_calls=current_turn_data.get("tool_calls", []),
                     tool_results=current_turn_data.get("tool_results", []),
                     system_messages=current_turn_data.get("system_messages", []),
+                    token_counts=current_turn_data.get("token_counts", {}),
                     phase=TurnPhase.PROCESSING_USER_INPUT,
                 )
 
@@ -334,6 +348,29 @@ class StateManager:
             raise StateValidationError(f"Failed to sync from legacy state: {e}") from e
 
 
+_context_assembly_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_context_assembly_executor() -> ThreadPoolExecutor:
+    """Return the bounded executor shared by all agents for context assembly work."""
+    global _context_assembly_executor
+    if _context_assembly_executor is None:
+        _context_assembly_executor = ThreadPoolExecutor(
+            max_workers=max(1, agent_config.CONTEXT_ASSEMBLY_MAX_WORKERS),
+            thread_name_prefix="context-assembly",
+        )
+    return _context_assembly_executor
+
+
+def _content_digest(*parts: Optional[str]) -> str:
+    """Return a stable digest of the given texts, used to validate persisted token counts."""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update((part or "").encode("utf-8", errors="surrogatepass"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
 class MyDevopsAgent(LlmAgent):
     """
     This is a custom agent that uses the ADK to manage the state of the conversation.
@@ -347,6 +384,13 @@ class MyDevopsAgent(LlmAgent):
     _state_manager: StateManager = PrivateAttr(default_factory=StateManager)
     _planning_manager: Optional[PlanningManager] = PrivateAttr(default=None)
     _context_manager: Optional[ContextManager] = PrivateAttr(default=None)
+    # Bookkeeping for incremental state -> ContextManager synchronization
+    _synced_goal_and_phase: Optional[tuple[str, str]] = PrivateAttr(default=None)
+    # Off-loop context assembly: the ContextManager is shared by all sessions of this agent
+    _context_assembly_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _inflight_context_assemblies: dict[tuple[str, int], asyncio.Future] = PrivateAttr(
+        default_factory=dict
+    )
     llm_client: Optional[genai.Client] = None
 
     # 1. Initialization and Configuration
@@ -545,7 +589,9 @@ class MyDevopsAgent(LlmAgent):
 
         # Track context size for telemetry
         if llm_request and hasattr(llm_request, "messages"):
-            context_tokens = self._count_tokens(str(llm_request.messages))
+            context_tokens = await self._run_context_work(
+                self._count_tokens, str(llm_request.messages)
+            )
             telemetry.track_context_usage(context_tokens, "llm_request")
 
         # Use robust state management
@@ -705,238 +751,19 @@ class MyDevopsAgent(LlmAgent):
                 "temp:tool_results, etc.)"
             )
 
-            # Calculate accurate base prompt tokens BEFORE assembling context
-            # This is critical to prevent token limit exceeded errors
-            base_prompt_tokens = 0
-
-            # Count user message tokens
-            if user_message_content:
-                user_tokens = self._count_tokens(user_message_content)
-                base_prompt_tokens += user_tokens
-                logger.info(f"User message tokens: {user_tokens:,}")
-
-            # Count system instruction tokens
-            if hasattr(llm_request, "system_instruction") and llm_request.system_instruction:
-                system_tokens = self._count_tokens(str(llm_request.system_instruction))
-                base_prompt_tokens += system_tokens
-                logger.info(f"System instruction tokens: {system_tokens:,}")
-
-            # Count tool definition tokens (this is often the largest component)
-            if hasattr(llm_request, "tools") and llm_request.tools:
-                tools_tokens = self._count_tokens(str(llm_request.tools))
-                base_prompt_tokens += tools_tokens
-                logger.info(f"Tools definition tokens: {tools_tokens:,}")
-
-            # CRITICAL FIX: Do NOT count existing conversation history as "base prompt"
-            # Conversation history should be managed by the context manager, not included
-            # in base prompt calculation. This was causing massive token growth between turns.
-            #
-            # The ADK framework automatically includes conversation history in the request,
-            # but we want our context manager to handle that intelligently with optimization.
-            #
-            # Previous buggy code was:
-            # if hasattr(llm_request, 'messages') and isinstance(llm_request.messages, list):
-            #     for message in llm_request.messages:
-            #         ...count all existing messages as "base prompt"...
-            #
-            # This caused:
-            # - Turn 1: base = 2,011 tokens
-            # - Turn 2: base = 2,001 + previous_conversation = 7,859 tokens (242% increase!)
-            logger.info(
-                "🔧 OPTIMIZATION: Excluding conversation history from base prompt calculation"
+            # Token counting (possibly blocking HTTP calls), filtering and context assembly run
+            # in a bounded executor so a long assembly does not stall other sessions' streams
+            base_prompt_tokens = await self._run_context_work(
+                self._calculate_base_prompt_tokens, llm_request, user_message_content
             )
-            logger.info(
-                "   Conversation history will be managed by context manager with smart optimization"
+            context_dict = await self._assemble_context_coalesced(
+                self._context_session_key(callback_context),
+                callback_context.state,
+                base_prompt_tokens,
             )
-
-            # ADVANCED OPTIMIZATION: Apply smart conversation history filtering
-            # This preserves tool execution flows while optimizing token usage
-            logger.info("🔧 APPLYING SMART CONVERSATION FILTERING...")
-            self._apply_smart_conversation_filtering(llm_request, user_message_content)
-
-            # Recalculate base tokens after smart filtering
-            if hasattr(llm_request, "contents") and isinstance(llm_request.contents, list):
-                logger.info("🔧 RECALCULATING tokens after smart filtering...")
-
-                # Reset and recalculate from filtered contents
-                filtered_content_tokens = 0
-                for content in llm_request.contents:
-                    if hasattr(content, "parts") and content.parts:
-                        for part in content.parts:
-                            if hasattr(part, "text") and part.text:
-                                # Don't count context injections we'll add later
-                                if not part.text.startswith("SYSTEM CONTEXT (JSON):"):
-                                    content_tokens = self._count_tokens(part.text)
-                                    filtered_content_tokens += content_tokens
-
-                # Update base_prompt_tokens with filtered content
-                base_prompt_tokens = filtered_content_tokens
-
-                # Add back the core components
-                if user_message_content:
-                    user_tokens = self._count_tokens(user_message_content)
-                    # Only add if not already counted in filtered contents
-                    current_user_in_contents = any(
-                        hasattr(content, "parts")
-                        and content.parts
-                        and any(
-                            hasattr(part, "text") and part.text == user_message_content
-                            for part in content.parts
-                            if hasattr(part, "text")
-                        )
-                        for content in llm_request.contents
-                        if content.role == "user"
-                    )
-                    if not current_user_in_contents:
-                        base_prompt_tokens += user_tokens
-                        logger.info(f"  Added user message tokens: {user_tokens:,}")
-
-                if hasattr(llm_request, "system_instruction") and llm_request.system_instruction:
-                    system_tokens = self._count_tokens(str(llm_request.system_instruction))
-                    base_prompt_tokens += system_tokens
-                    logger.info(f"  Added system instruction tokens: {system_tokens:,}")
-
-                if hasattr(llm_request, "tools") and llm_request.tools:
-                    tools_tokens = self._count_tokens(str(llm_request.tools))
-                    base_prompt_tokens += tools_tokens
-                    logger.info(f"  Added tools tokens: {tools_tokens:,}")
-
-                logger.info("🔧 SMART FILTERING TOKEN IMPACT:")
-                logger.info(f"  Filtered content tokens: {filtered_content_tokens:,}")
-                logger.info(f"  Total base prompt tokens: {base_prompt_tokens:,}")
-
-            # Add safety margin for JSON structure overhead and response generation
-            safety_margin = 2000
-            base_prompt_tokens += safety_margin
-
-            logger.info("ACCURATE BASE PROMPT CALCULATION:")
-            logger.info(f"  Total Base Prompt Tokens: {base_prompt_tokens:,}")
-            logger.info(f"  Safety Margin: {safety_margin:,}")
-            logger.info(
-                f"  Available for Context: "
-                f"{self._context_manager.max_token_limit - base_prompt_tokens:,}"
+            await self._run_context_work(
+                self._inject_context_into_request, llm_request, context_dict, base_prompt_tokens
             )
-
-            # Ensure we don't exceed the token limit even before adding context
-            if base_prompt_tokens >= self._context_manager.max_token_limit:
-                logger.error(
-                    f"Base prompt ({base_prompt_tokens:,} tokens) already exceeds token "
-                    f"limit ({self._context_manager.max_token_limit:,})!"
-                )
-                logger.error(
-                    "This indicates the tools definition or system instructions are too large."
-                )
-                # Use minimal context in this case
-                context_dict = {}
-            else:
-                # Temporarily store the accurate base prompt tokens for context assembly
-                original_base_tokens = getattr(self, "_temp_base_prompt_tokens", None)
-                self._temp_base_prompt_tokens = base_prompt_tokens
-
-                context_dict = self._assemble_context_from_state(callback_context.state)
-
-                # Restore original value
-                if original_base_tokens is not None:
-                    self._temp_base_prompt_tokens = original_base_tokens
-                else:
-                    delattr(self, "_temp_base_prompt_tokens")
-
-            context_tokens = self._count_context_tokens(context_dict)
-
-            try:
-                if hasattr(llm_request, "model") and llm_request.model:
-                    system_context_message = (
-                        f"SYSTEM CONTEXT (JSON):\n```json\n{json.dumps(context_dict, indent=2)}\n```\n"  # noqa: E501
-                        "Use this context to inform your response. Do not directly refer to "
-                        "this context block unless asked."
-                    )
-
-                    # CRITICAL FIX PART 3: Inject context into the filtered contents, not messages
-                    # We need to inject our optimized context into the filtered contents that we
-                    # created
-                    if hasattr(llm_request, "contents") and isinstance(llm_request.contents, list):
-                        try:
-                            from google.genai import types as genai_types
-
-                            # Create our context injection
-                            system_message_part = genai_types.Part(text=system_context_message)
-                            system_content = genai_types.Content(
-                                role="user", parts=[system_message_part]
-                            )
-
-                            # Insert context at the beginning of filtered contents
-                            # (before current user message)
-                            # Our filtered contents should be:
-                            # [system_messages, context_injection, current_user_message]
-                            insert_position = 0
-
-                            # Find position after any system messages
-                            for i, content in enumerate(llm_request.contents):
-                                if content.role == "system":
-                                    insert_position = i + 1
-                                else:
-                                    break
-
-                            # Insert our context after system messages but before user messages
-                            llm_request.contents.insert(insert_position, system_content)
-                            logger.info(
-                                f"🔧 INJECTED optimized context into filtered contents at "
-                                f"position {insert_position}"
-                            )
-
-                            # Log final assembled prompt details for optimization analysis
-                            self._log_final_prompt_analysis(
-                                llm_request, context_dict, system_context_message
-                            )
-
-                        except Exception as e:
-                            logger.warning(
-                                f"Could not inject structured context into llm_request "
-                                f"contents: {e}"
-                            )
-
-                    # DEPRECATED: Remove old messages injection that was causing double-counting
-                    # This was the old approach that added context to messages even though we
-                    # already filtered contents
-                    # if hasattr(llm_request, 'messages') and isinstance(llm_request.messages, list):  # noqa: E501
-                    #     llm_request.messages.insert(0, system_content)
-
-                    total_context_block_tokens = self._count_tokens(system_context_message)
-                    logger.info(
-                        f"Total tokens for prompt (base + context_block): "
-                        f"{base_prompt_tokens + total_context_block_tokens}"
-                    )
-
-                    # Final validation: ensure we don't exceed token limit
-                    final_prompt_tokens = base_prompt_tokens + total_context_block_tokens
-                    if final_prompt_tokens > self._context_manager.max_token_limit:
-                        logger.error(
-                            f"CRITICAL: Final prompt ({final_prompt_tokens:,} tokens) "
-                            f"exceeds token limit ({self._context_manager.max_token_limit:,})!"
-                        )
-                        logger.error(
-                            "This should not happen if context manager is working correctly."
-                        )
-                        logger.error("The request will likely fail with a token limit error.")
-                    else:
-                        utilization_pct = (
-                            final_prompt_tokens / self._context_manager.max_token_limit
-                        ) * 100
-                        logger.info(
-                            f"Final prompt validation: {final_prompt_tokens:,}/"
-                            f"{self._context_manager.max_token_limit:,} tokens "
-                            f"({utilization_pct:.1f}%)"
-                        )
-
-                else:
-                    logger.warning(
-                        "Skipping structured context injection as LlmRequest seems incomplete."
-                    )
-            except Exception as e:
-                logger.error(
-                    f"Failed to inject structured context: {e} - LlmRequest: {llm_request}",
-                    exc_info=True,
-                )
         else:
             logger.info("Plan generation turn: Skipping general context assembly and injection.")
 
@@ -1622,6 +1449,294 @@ class MyDevopsAgent(LlmAgent):
 
     # 5. Context and State Management Helpers
 
+    async def _run_context_work(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run blocking context work (token counting, assembly) in the bounded executor."""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()  # Keep telemetry/tracing context in the worker thread
+        return await loop.run_in_executor(
+            _get_context_assembly_executor(), lambda: ctx.run(func, *args)
+        )
+
+    @staticmethod
+    def _context_session_key(callback_context: CallbackContext) -> str:
+        """Identify the session a callback belongs to, for coalescing context assembly."""
+        invocation_context = getattr(callback_context, "_invocation_context", None)
+        session_id = getattr(getattr(invocation_context, "session", None), "id", None)
+        if isinstance(session_id, str) and session_id:
+            return session_id
+        return f"state-{id(callback_context.state)}"
+
+    async def _assemble_context_coalesced(
+        self, session_key: str, state: dict[str, Any], base_prompt_tokens: int
+    ) -> dict[str, Any]:
+        """Assemble context off the event loop, sharing one in-flight assembly per session.
+
+        Concurrent requests for the same session read the same state, so a request that
+        arrives while an assembly for its session and base prompt size is running reuses
+        that result instead of queueing a duplicate assembly. The context is sized for
+        the base prompt, so requests whose prompts differ in size never share it.
+        """
+        coalescing_key = (session_key, base_prompt_tokens)
+        in_flight = self._inflight_context_assemblies.get(coalescing_key)
+        if in_flight is not None and not in_flight.done():
+            logger.info(f"Coalescing context assembly with in-flight request for {session_key}")
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.ensure_future(
+            self._run_context_work(self._assemble_context_for_request, state, base_prompt_tokens)
+        )
+        self._inflight_context_assemblies[coalescing_key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._inflight_context_assemblies.get(coalescing_key) is future:
+                del self._inflight_context_assemblies[coalescing_key]
+
+    def _calculate_base_prompt_tokens(
+        self, llm_request: LlmRequest, user_message_content: Optional[str]
+    ) -> int:
+        """Count the prompt tokens outside managed context, after smart conversation filtering.
+
+        Runs in the context assembly executor; may block on native token counting.
+        """
+        # Calculate accurate base prompt tokens BEFORE assembling context
+        # This is critical to prevent token limit exceeded errors
+        # User message, system instruction and tool definitions (often the largest
+        # component) are counted in one batch
+        user_tokens, system_tokens, tools_tokens = self._count_tokens_batch(
+            [
+                user_message_content,
+                str(llm_request.system_instruction)
+                if getattr(llm_request, "system_instruction", None)
+                else None,
+                str(llm_request.tools) if getattr(llm_request, "tools", None) else None,
+            ]
+        )
+        base_prompt_tokens = user_tokens + system_tokens + tools_tokens
+        if user_message_content:
+            logger.info(f"User message tokens: {user_tokens:,}")
+        if system_tokens:
+            logger.info(f"System instruction tokens: {system_tokens:,}")
+        if tools_tokens:
+            logger.info(f"Tools definition tokens: {tools_tokens:,}")
+
+        # CRITICAL FIX: Do NOT count existing conversation history as "base prompt"
+        # Conversation history should be managed by the context manager, not included
+        # in base prompt calculation. This was causing massive token growth between turns.
+        #
+        # The ADK framework automatically includes conversation history in the request,
+        # but we want our context manager to handle that intelligently with optimization.
+        #
+        # Previous buggy code was:
+        # if hasattr(llm_request, 'messages') and isinstance(llm_request.messages, list):
+        #     for message in llm_request.messages:
+        #         ...count all existing messages as "base prompt"...
+        #
+        # This caused:
+        # - Turn 1: base = 2,011 tokens
+        # - Turn 2: base = 2,001 + previous_conversation = 7,859 tokens (242% increase!)
+        logger.info("🔧 OPTIMIZATION: Excluding conversation history from base prompt calculation")
+        logger.info(
+            "   Conversation history will be managed by context manager with smart optimization"
+        )
+
+        # ADVANCED OPTIMIZATION: Apply smart conversation history filtering
+        # This preserves tool execution flows while optimizing token usage
+        logger.info("🔧 APPLYING SMART CONVERSATION FILTERING...")
+        self._apply_smart_conversation_filtering(llm_request, user_message_content)
+
+        # Recalculate base tokens after smart filtering
+        if hasattr(llm_request, "contents") and isinstance(llm_request.contents, list):
+            logger.info("🔧 RECALCULATING tokens after smart filtering...")
+
+            # Reset and recalculate from filtered contents
+            filtered_part_texts = [
+                part.text
+                for content in llm_request.contents
+                if hasattr(content, "parts") and content.parts
+                for part in content.parts
+                if hasattr(part, "text")
+                and part.text
+                # Don't count context injections we'll add later
+                and not part.text.startswith("SYSTEM CONTEXT (JSON):")
+            ]
+            filtered_content_tokens = sum(self._count_tokens_batch(filtered_part_texts))
+
+            # Update base_prompt_tokens with filtered content
+            base_prompt_tokens = filtered_content_tokens
+
+            # Add back the core components (counted above)
+            if user_message_content:
+                # Only add if not already counted in filtered contents
+                current_user_in_contents = any(
+                    hasattr(content, "parts")
+                    and content.parts
+                    and any(
+                        hasattr(part, "text") and part.text == user_message_content
+                        for part in content.parts
+                        if hasattr(part, "text")
+                    )
+                    for content in llm_request.contents
+                    if content.role == "user"
+                )
+                if not current_user_in_contents:
+                    base_prompt_tokens += user_tokens
+                    logger.info(f"  Added user message tokens: {user_tokens:,}")
+
+            if system_tokens:
+                base_prompt_tokens += system_tokens
+                logger.info(f"  Added system instruction tokens: {system_tokens:,}")
+
+            if tools_tokens:
+                base_prompt_tokens += tools_tokens
+                logger.info(f"  Added tools tokens: {tools_tokens:,}")
+
+            logger.info("🔧 SMART FILTERING TOKEN IMPACT:")
+            logger.info(f"  Filtered content tokens: {filtered_content_tokens:,}")
+            logger.info(f"  Total base prompt tokens: {base_prompt_tokens:,}")
+
+        # Add safety margin for JSON structure overhead and response generation
+        safety_margin = 2000
+        base_prompt_tokens += safety_margin
+
+        logger.info("ACCURATE BASE PROMPT CALCULATION:")
+        logger.info(f"  Total Base Prompt Tokens: {base_prompt_tokens:,}")
+        logger.info(f"  Safety Margin: {safety_margin:,}")
+        logger.info(
+            f"  Available for Context: "
+            f"{self._context_manager.max_token_limit - base_prompt_tokens:,}"
+        )
+        return base_prompt_tokens
+
+    def _assemble_context_for_request(
+        self, state: dict[str, Any], base_prompt_tokens: int
+    ) -> dict[str, Any]:
+        """Assemble the context dict for a request with the given base prompt size.
+
+        Runs in the context assembly executor, serialized on the shared ContextManager.
+        """
+        with self._context_assembly_lock:
+            # Ensure we don't exceed the token limit even before adding context
+            if base_prompt_tokens >= self._context_manager.max_token_limit:
+                logger.error(
+                    f"Base prompt ({base_prompt_tokens:,} tokens) already exceeds token "
+                    f"limit ({self._context_manager.max_token_limit:,})!"
+                )
+                logger.error(
+                    "This indicates the tools definition or system instructions are too large."
+                )
+                # Use minimal context in this case
+                context_dict = {}
+            else:
+                # Temporarily store the accurate base prompt tokens for context assembly
+                original_base_tokens = getattr(self, "_temp_base_prompt_tokens", None)
+                self._temp_base_prompt_tokens = base_prompt_tokens
+
+                context_dict = self._assemble_context_from_state(state)
+
+                # Restore original value
+                if original_base_tokens is not None:
+                    self._temp_base_prompt_tokens = original_base_tokens
+                else:
+                    delattr(self, "_temp_base_prompt_tokens")
+            return context_dict
+
+    def _inject_context_into_request(
+        self, llm_request: LlmRequest, context_dict: dict[str, Any], base_prompt_tokens: int
+    ) -> None:
+        """Inject the assembled context into the request contents and validate the total size."""
+        try:
+            if hasattr(llm_request, "model") and llm_request.model:
+                system_context_message = (
+                    f"SYSTEM CONTEXT (JSON):\n```json\n{json.dumps(context_dict, indent=2)}\n```\n"
+                    "Use this context to inform your response. Do not directly refer to "
+                    "this context block unless asked."
+                )
+
+                # CRITICAL FIX PART 3: Inject context into the filtered contents, not messages
+                # We need to inject our optimized context into the filtered contents that we
+                # created
+                if hasattr(llm_request, "contents") and isinstance(llm_request.contents, list):
+                    try:
+                        from google.genai import types as genai_types
+
+                        # Create our context injection
+                        system_message_part = genai_types.Part(text=system_context_message)
+                        system_content = genai_types.Content(
+                            role="user", parts=[system_message_part]
+                        )
+
+                        # Insert context at the beginning of filtered contents
+                        # (before current user message)
+                        # Our filtered contents should be:
+                        # [system_messages, context_injection, current_user_message]
+                        insert_position = 0
+
+                        # Find position after any system messages
+                        for i, content in enumerate(llm_request.contents):
+                            if content.role == "system":
+                                insert_position = i + 1
+                            else:
+                                break
+
+                        # Insert our context after system messages but before user messages
+                        llm_request.contents.insert(insert_position, system_content)
+                        logger.info(
+                            f"🔧 INJECTED optimized context into filtered contents at "
+                            f"position {insert_position}"
+                        )
+
+                        # Log final assembled prompt details for optimization analysis
+                        self._log_final_prompt_analysis(
+                            llm_request, context_dict, system_context_message
+                        )
+
+                    except Exception as e:
+                        logger.warning(
+                            f"Could not inject structured context into llm_request contents: {e}"
+                        )
+
+                # DEPRECATED: Remove old messages injection that was causing double-counting
+                # This was the old approach that added context to messages even though we
+                # already filtered contents
+                # if hasattr(llm_request, 'messages') and isinstance(llm_request.messages, list):
+                #     llm_request.messages.insert(0, system_content)
+
+                total_context_block_tokens = self._count_tokens(system_context_message)
+                logger.info(
+                    f"Total tokens for prompt (base + context_block): "
+                    f"{base_prompt_tokens + total_context_block_tokens}"
+                )
+
+                # Final validation: ensure we don't exceed token limit
+                final_prompt_tokens = base_prompt_tokens + total_context_block_tokens
+                if final_prompt_tokens > self._context_manager.max_token_limit:
+                    logger.error(
+                        f"CRITICAL: Final prompt ({final_prompt_tokens:,} tokens) "
+                        f"exceeds token limit ({self._context_manager.max_token_limit:,})!"
+                    )
+                    logger.error("This should not happen if context manager is working correctly.")
+                    logger.error("The request will likely fail with a token limit error.")
+                else:
+                    utilization_pct = (
+                        final_prompt_tokens / self._context_manager.max_token_limit
+                    ) * 100
+                    logger.info(
+                        f"Final prompt validation: {final_prompt_tokens:,}/"
+                        f"{self._context_manager.max_token_limit:,} tokens "
+                        f"({utilization_pct:.1f}%)"
+                    )
+
+            else:
+                logger.warning(
+                    "Skipping structured context injection as LlmRequest seems incomplete."
+                )
+        except Exception as e:
+            logger.error(
+                f"Failed to inject structured context: {e} - LlmRequest: {llm_request}",
+                exc_info=True,
+            )
+
     def _assemble_context_from_state(self, state: dict[str, Any]) -> dict[str, Any]:
         """Assembles context dictionary from state for LLM injection, respecting token limits.
 
@@ -1647,95 +1762,35 @@ class MyDevopsAgent(LlmAgent):
             # Continue with default empty state
             history_count = snippets_count = decisions_count = 0
 
-        # Synchronize conversation history
+        # Synchronize conversation history incrementally: only new or changed turns are
+        # converted and token-counted, unchanged turns keep their existing counts
         history = state.get("user:conversation_history", [])
-        # Convert the history format from context.state to the ConversationTurn objects expected by ContextManager # noqa: E501
-        self._context_manager.conversation_turns = []  # Clear existing turns
-        for i, turn_data in enumerate(history):
-            turn = ConversationTurn(
-                turn_number=i + 1,  # Assign turn number based on list index
-                user_message=turn_data.get("user_message"),
-                agent_message=turn_data.get("agent_message"),
-                tool_calls=turn_data.get("tool_calls", []),  # Assume tool_calls is a list of dicts
-                # Token counts will be calculated by ContextManager
-            )
-            # Manually count tokens for the synchronized turn data to set initial token counts
-            # This is needed because ContextManager's add methods calculate tokens upon addition.
-            # If we just copy, the token counts might be zero.
-            turn.user_message_tokens = (
-                self._context_manager._count_tokens(turn.user_message) if turn.user_message else 0
-            )
-            turn.agent_message_tokens = (
-                self._context_manager._count_tokens(turn.agent_message) if turn.agent_message else 0
-            )
-
-            # Safe JSON serialization for tool_calls
-            if turn.tool_calls:
-                try:
-                    tool_calls_json = json.dumps(turn.tool_calls)
-                    turn.tool_calls_tokens = self._context_manager._count_tokens(tool_calls_json)
-                except (TypeError, ValueError) as e:
-                    logger.warning(f"Failed to JSON serialize tool_calls for token counting: {e}")
-                    try:
-                        tool_calls_json = json.dumps(turn.tool_calls, default=str)
-                        turn.tool_calls_tokens = self._context_manager._count_tokens(
-                            tool_calls_json
-                        )
-                    except Exception as e2:
-                        logger.error(f"Failed to serialize tool_calls even with default=str: {e2}")
-                        turn.tool_calls_tokens = self._context_manager._count_tokens(
-                            str(turn.tool_calls)
-                        )
-            else:
-                turn.tool_calls_tokens = 0
-
-            self._context_manager.conversation_turns.append(turn)
-        self._context_manager.current_turn_number = len(
-            self._context_manager.conversation_turns
-        )  # Update current turn number
+        recounted_turns = self._sync_conversation_turns(history)
         logger.info(
-            f"Synchronized {len(self._context_manager.conversation_turns)} conversation turns"
+            f"Synchronized {len(self._context_manager.conversation_turns)} conversation turns "
+            f"({recounted_turns} new or changed)"
         )
 
         # Synchronize code snippets with enhanced tracking
         code_snippets_data = state.get("app:code_snippets", [])
-        self._context_manager.code_snippets = []  # Clear existing snippets
-        total_snippet_chars = 0
-        for snippet_data in code_snippets_data:
-            snippet = CodeSnippet(
-                file_path=snippet_data.get("file_path", ""),
-                code=snippet_data.get("code", ""),
-                start_line=snippet_data.get("start_line", 0),
-                end_line=snippet_data.get("end_line", 0),
-                last_accessed=snippet_data.get(
-                    "last_accessed", self._context_manager.current_turn_number
-                ),  # Default to current turn
-                relevance_score=snippet_data.get("relevance_score", 1.0),
-                token_count=self._context_manager._count_tokens(snippet_data.get("code", "")),
-            )
-            self._context_manager.code_snippets.append(snippet)
-            total_snippet_chars += len(snippet_data.get("code", ""))
+        recounted_snippets = self._sync_code_snippets(
+            code_snippets_data, state.get("app:file_blobs") or {}
+        )
+        snippet_blobs = {
+            snippet.blob_id: snippet.blob for snippet in self._context_manager.code_snippets
+        }
         logger.info(
-            f"Synchronized {len(self._context_manager.code_snippets)} code snippets, "
-            f"{total_snippet_chars:,} total chars"
+            f"Synchronized {len(self._context_manager.code_snippets)} code snippets "
+            f"({recounted_snippets} new or changed) backed by {len(snippet_blobs)} file "
+            f"versions, {sum(len(blob.content) for blob in snippet_blobs.values()):,} total chars"
         )
 
         # Synchronize tool results from temp storage
         temp_tool_results = state.get("temp:tool_results_current_turn", [])
         if temp_tool_results:
-            # Add these to the context manager's tool results storage
-            for tool_result_data in temp_tool_results:
-                tool_result = ToolResult(
-                    tool_name=tool_result_data["tool_name"],
-                    response=tool_result_data["response"],
-                    summary=tool_result_data.get("summary", ""),
-                    is_error=tool_result_data.get("is_error", False),
-                    turn_number=self._context_manager.current_turn_number,
-                )
-                self._context_manager.add_tool_result(tool_result)
+            transferred = self._sync_tool_results(state, temp_tool_results)
             logger.info(
-                f"Transferred {len(temp_tool_results)} tool results from temp storage to "
-                "context manager"
+                f"Transferred {transferred} new tool results from temp storage to context manager"
             )
 
             # Clear temp storage after transfer
@@ -1755,13 +1810,16 @@ class MyDevopsAgent(LlmAgent):
             "app:last_modified_files", self._context_manager.state.last_modified_files
         )
 
-        # Calculate initial token counts for ContextState elements
-        self._context_manager.state.core_goal_tokens = self._context_manager._count_tokens(
-            self._context_manager.state.core_goal
-        )
-        self._context_manager.state.current_phase_tokens = self._context_manager._count_tokens(
-            self._context_manager.state.current_phase
-        )
+        # Calculate initial token counts for ContextState elements that changed
+        context_state = self._context_manager.state
+        if (context_state.core_goal, context_state.current_phase) != self._synced_goal_and_phase:
+            (
+                context_state.core_goal_tokens,
+                context_state.current_phase_tokens,
+            ) = self._context_manager.count_tokens_batch(
+                [context_state.core_goal, context_state.current_phase]
+            )
+            self._synced_goal_and_phase = (context_state.core_goal, context_state.current_phase)
 
         logger.info(
             f"Context state: goal={bool(self._context_manager.state.core_goal)}, "
@@ -1812,6 +1870,259 @@ class MyDevopsAgent(LlmAgent):
 
         return context_dict
 
+    def _sync_conversation_turns(self, history: list[dict[str, Any]]) -> int:
+        """Mirror ``user:conversation_history`` into the ContextManager incrementally.
+
+        A turn whose messages and tool calls are unchanged since the previous sync is
+        reused together with its token counts, so per-call cost no longer grows with
+        the length of the session. Computed counts are also stored on the history entry
+        under ``token_counts`` (see ``_token_counts_record``) so that a resumed session
+        or a fresh worker can restore them instead of recounting.
+
+        Returns:
+            Number of turns that were (re)converted and token-counted
+        """
+        previous_turns = self._context_manager.conversation_turns
+        synced_turns: list[ConversationTurn] = []
+        changed_turns: list[tuple[ConversationTurn, dict[str, Any], str]] = []
+        texts_to_count: list[Optional[str]] = []
+
+        for i, turn_data in enumerate(history):
+            user_message = turn_data.get("user_message")
+            agent_message = turn_data.get("agent_message")
+            tool_calls = turn_data.get("tool_calls", [])  # Assume tool_calls is a list of dicts
+
+            if i < len(previous_turns):
+                previous = previous_turns[i]
+                if (
+                    previous.turn_number == i + 1
+                    and previous.user_message == user_message
+                    and previous.agent_message == agent_message
+                    and previous.tool_calls == tool_calls
+                ):
+                    synced_turns.append(previous)
+                    if not self._is_current_token_counts_record(turn_data.get("token_counts")):
+                        tool_calls_text = (
+                            self._serialize_tool_calls(previous.tool_calls)
+                            if previous.tool_calls
+                            else None
+                        )
+                        turn_data["token_counts"] = self._token_counts_record(
+                            _content_digest(user_message, agent_message, tool_calls_text),
+                            user_message=previous.user_message_tokens,
+                            agent_message=previous.agent_message_tokens,
+                            tool_calls=previous.tool_calls_tokens,
+                        )
+                    continue
+
+            # Snapshot tool_calls: state lists are appended to in place during a turn
+            try:
+                tool_calls_snapshot = copy.deepcopy(tool_calls)
+            except Exception:
+                tool_calls_snapshot = list(tool_calls)
+
+            turn = ConversationTurn(
+                turn_number=i + 1,  # Assign turn number based on list index
+                user_message=user_message,
+                agent_message=agent_message,
+                tool_calls=tool_calls_snapshot,
+            )
+            synced_turns.append(turn)
+            tool_calls_text = (
+                self._serialize_tool_calls(tool_calls_snapshot) if tool_calls_snapshot else None
+            )
+            digest = _content_digest(user_message, agent_message, tool_calls_text)
+
+            # Restore counts persisted with the entry by an earlier sync (e.g. before resume)
+            stored = turn_data.get("token_counts")
+            if self._is_current_token_counts_record(stored, digest):
+                turn.user_message_tokens = stored.get("user_message", 0)
+                turn.agent_message_tokens = stored.get("agent_message", 0)
+                turn.tool_calls_tokens = stored.get("tool_calls", 0)
+                continue
+
+            # ContextManager's add methods calculate tokens upon addition; synchronized
+            # turns are counted here in a single batch instead
+            texts_to_count.extend([user_message, agent_message, tool_calls_text])
+            changed_turns.append((turn, turn_data, digest))
+
+        turn_token_counts = self._context_manager.count_tokens_batch(texts_to_count)
+        for i, (turn, turn_data, digest) in enumerate(changed_turns):
+            (
+                turn.user_message_tokens,
+                turn.agent_message_tokens,
+                turn.tool_calls_tokens,
+            ) = turn_token_counts[3 * i : 3 * i + 3]
+            turn_data["token_counts"] = self._token_counts_record(
+                digest,
+                user_message=turn.user_message_tokens,
+                agent_message=turn.agent_message_tokens,
+                tool_calls=turn.tool_calls_tokens,
+            )
+
+        self._context_manager.conversation_turns = synced_turns
+        self._context_manager.current_turn_number = len(synced_turns)
+        return len(changed_turns)
+
+    def _sync_code_snippets(
+        self,
+        code_snippets_data: list[dict[str, Any]],
+        file_blobs: Optional[dict[str, str]] = None,
+    ) -> int:
+        """Mirror ``app:code_snippets`` into the ContextManager, reusing known token counts.
+
+        Snippet text is resolved through the shared blob store: entries reference an
+        ``app:file_blobs`` blob by id and line range (entries with inline ``code`` are
+        interned), so one file version is held once however many snippets use it.
+        Counts are reused from the previous sync when the snippet still points at the
+        same blob range, otherwise restored from the ``token_counts`` record persisted
+        on the snippet entry, and only counted when neither is valid.
+
+        Returns:
+            Number of snippets whose code was new or changed and had to be token-counted
+        """
+        file_blobs = file_blobs or {}
+        known_counts = {
+            (snippet.file_path, snippet.start_line, snippet.end_line): snippet
+            for snippet in self._context_manager.code_snippets
+        }
+
+        snippets: list[CodeSnippet] = []
+        uncounted: list[tuple[CodeSnippet, dict[str, Any]]] = []
+        for snippet_data in code_snippets_data:
+            blob, blob_lines = self._resolve_snippet_blob(snippet_data, file_blobs)
+            snippet = CodeSnippet(
+                file_path=snippet_data.get("file_path", ""),
+                start_line=snippet_data.get("start_line", 0),
+                end_line=snippet_data.get("end_line", 0),
+                last_accessed=snippet_data.get(
+                    "last_accessed", self._context_manager.current_turn_number
+                ),  # Default to current turn
+                relevance_score=snippet_data.get("relevance_score", 1.0),
+                blob=blob,
+                blob_lines=blob_lines,
+            )
+            snippets.append(snippet)
+
+            known = known_counts.get((snippet.file_path, snippet.start_line, snippet.end_line))
+            stored = snippet_data.get("token_counts")
+            digest = self._snippet_digest(snippet)
+            if known is not None and known.blob is blob and known.blob_lines == blob_lines:
+                snippet.token_count = known.token_count
+                if self._is_current_token_counts_record(stored, digest):
+                    continue
+            else:
+                if self._is_current_token_counts_record(stored, digest):
+                    snippet.token_count = stored.get("code", 0)
+                    continue
+                uncounted.append((snippet, snippet_data))
+                continue
+            snippet_data["token_counts"] = self._token_counts_record(
+                digest, code=snippet.token_count
+            )
+
+        token_counts = self._context_manager.count_tokens_batch(
+            [snippet.code for snippet, _ in uncounted]
+        )
+        for (snippet, snippet_data), token_count in zip(uncounted, token_counts):
+            snippet.token_count = token_count
+            snippet_data["token_counts"] = self._token_counts_record(
+                self._snippet_digest(snippet), code=token_count
+            )
+
+        self._context_manager.code_snippets = snippets
+        return len(uncounted)
+
+    def _resolve_snippet_blob(
+        self, snippet_data: dict[str, Any], file_blobs: dict[str, str]
+    ) -> tuple[Blob, Optional[tuple[int, int]]]:
+        """Return the interned blob and line range holding a state snippet's text."""
+        blob_store = self._context_manager.blob_store
+        blob_id = snippet_data.get("blob_id")
+        if blob_id:
+            blob = blob_store.get(blob_id)
+            if blob is None and blob_id in file_blobs:
+                blob = blob_store.intern(file_blobs[blob_id], blob_id=blob_id)
+            if blob is not None:
+                blob_lines = snippet_data.get("blob_lines")
+                return blob, tuple(blob_lines) if blob_lines else None
+            logger.warning(f"Blob {blob_id} for {snippet_data.get('file_path')} not found")
+        return blob_store.intern(snippet_data.get("code", "")), None
+
+    @staticmethod
+    def _snippet_digest(snippet: CodeSnippet) -> str:
+        """Digest identifying a snippet's text by its blob (content hash) and line range."""
+        return _content_digest(snippet.blob_id, repr(snippet.blob_lines))
+
+    def _token_counts_record(self, digest: str, **counts: int) -> dict[str, Any]:
+        """Build the ``token_counts`` record stored alongside a state entry.
+
+        The record is tagged with the model and counting strategy that produced it and
+        with a digest of the counted content, so it is ignored once either changes.
+        """
+        return {
+            "model": self._context_manager.model_name,
+            "strategy": self._context_manager.token_counting_strategy,
+            "digest": digest,
+            **counts,
+        }
+
+    def _is_current_token_counts_record(self, record: Any, digest: Optional[str] = None) -> bool:
+        """Check whether a stored ``token_counts`` record is valid for the active tokenizer."""
+        return (
+            isinstance(record, dict)
+            and record.get("model") == self._context_manager.model_name
+            and record.get("strategy") == self._context_manager.token_counting_strategy
+            and (digest is None or record.get("digest") == digest)
+        )
+
+    def _sync_tool_results(
+        self, state: dict[str, Any], temp_tool_results: list[dict[str, Any]]
+    ) -> int:
+        """Transfer tool results from temp storage, skipping ones already transferred.
+
+        The current turn's tool results are re-published to state on every model call,
+        so each result is fingerprinted and only added (and summarized/counted) once.
+        Fingerprints are kept in the session's ``temp:synced_tool_result_keys`` for the
+        current turn only, since this agent is shared by all sessions.
+
+        Returns:
+            Number of tool results added to the ContextManager
+        """
+        current_turn = self._context_manager.current_turn_number
+        synced_keys = {
+            tuple(key)
+            for key in state.get("temp:synced_tool_result_keys") or []
+            if key[-1] == current_turn
+        }
+        transferred = 0
+        for tool_result_data in temp_tool_results:
+            tool_name = tool_result_data.get("tool_name", "unknown_tool")
+            # StateManager stores "result"; older state used "response"
+            result = tool_result_data.get("result", tool_result_data.get("response"))
+            fingerprint = (tool_name, tool_result_data.get("timestamp"), current_turn)
+            if fingerprint in synced_keys:
+                continue
+            synced_keys.add(fingerprint)
+            self._context_manager.add_tool_result(
+                tool_name, result, summary=tool_result_data.get("summary") or None
+            )
+            transferred += 1
+        state["temp:synced_tool_result_keys"] = [list(key) for key in synced_keys]
+        return transferred
+
+    def _serialize_tool_calls(self, tool_calls: list[dict[str, Any]]) -> str:
+        """Safely JSON-serialize tool calls for token counting."""
+        try:
+            return json.dumps(tool_calls)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Failed to JSON serialize tool_calls for token counting: {e}")
+            try:
+                return json.dumps(tool_calls, default=str)
+            except Exception as e2:
+                logger.error(f"Failed to serialize tool_calls even with default=str: {e2}")
+                return str(tool_calls)
+
     def _count_tokens(self, text: str) -> int:
         """Counts tokens for a given text using the ContextManager's strategy."""
         if self._context_manager:
@@ -1819,6 +2130,13 @@ class MyDevopsAgent(LlmAgent):
         logger.warning("ContextManager not initialized. Using fallback token counting.")
         return len(text) // 4  # Original fallback
 
+    def _count_tokens_batch(self, texts: list[Optional[str]]) -> list[int]:
+        """Counts tokens for several texts in one batch using the ContextManager's strategy."""
+        if self._context_manager:
+            return self._context_manager.count_tokens_batch(texts)
+        logger.warning("ContextManager not initialized. Using fallback token counting.")
+        return [len(text) // 4 if text else 0 for text in texts]
+
     def _count_context_tokens(self, context_dict: dict[str, Any]) -> int:
         """
         Counts tokens for the assembled context dictionary using the ContextManager's strategy.
@@ -2390,6 +2708,18 @@ class MyDevopsAgent(LlmAgent):
                     self._state_manager.app_state["code_snippets"] = self._state_manager.app_state[
                         "code_snippets"
                     ][:3]
+                    # Drop the file contents only the removed snippets referenced
+                    referenced = {
+                        snippet.get("blob_id")
+                        for snippet in self._state_manager.app_state["code_snippets"]
+                    }
+                    self._state_manager.app_state["file_blobs"] = {
+                        blob_id: content
+                        for blob_id, content in self._state_manager.app_state.get(
+                            "file_blobs", {}
+                        ).items()
+                        if blob_id in referenced
+                    }
                     logger.info(f"Reduced code snippets from {original_count} to 3")
                     optimization_applied = True
 
@@ -2409,6 +2739,7 @@ class MyDevopsAgent(LlmAgent):
                 # Remove all code snippets
                 if self._state_manager.app_state["code_snippets"]:
                     self._state_manager.app_state["code_snippets"] = []
+                    self._state_manager.app_state["file_blobs"] = {}
                     logger.info("Removed all code snippets")
                     optimization_applied = True
 
@@ -2441,6 +2772,7 @@ class MyDevopsAgent(LlmAgent):
                     "code_snippets": [],
                     "core_goal": "",
                     "current_phase": "",
+                    "file_blobs": {},
                     "key_decisions": [],
                     "last_modified_files": [],
                 }
@@ -0,0 +1,185 @@
+"""Compiled gitignore-style path matching shared by directory walks.
+
+RAG indexing (``.indexignore``), project structure mapping and dynamic context
+expansion all skip paths by gitignore-style patterns. Matching every path against
+every pattern with ``fnmatch`` dominates walks over large trees, so ``IgnoreMatcher``
+translates all patterns into a few alternation regexes once and matches each path
+with a single regex call.
+"""
+
+from collections.abc import Iterable, Iterator
+import logging
+import os
+from pathlib import Path
+import re
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def _translate_segment(segment: str) -> str:
+    """Translate one path segment of a glob into a regex that never crosses '/'."""
+    regex = []
+    i = 0
+    while i < len(segment):
+        char = segment[i]
+        if char == "*":
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "\\" and i + 1 < len(segment):
+            i += 1
+            regex.append(re.escape(segment[i]))
+        elif char == "[":
+            end = segment.find("]", i + 2 if segment[i + 1 : i + 2] in ("!", "^") else i + 1)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                body = segment[i + 1 : end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                regex.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return "".join(regex)
+
+
+def _translate_pattern(pattern: str) -> Optional[tuple[str, bool, bool, bool]]:
+    """Translate a gitignore pattern into ``(regex, negated, directory_only, anchored)``.
+
+    The regex matches the leading path components of a POSIX path relative to the root
+    when anchored, or any run of its components otherwise. Blank lines and comments
+    translate to None.
+    """
+    pattern = pattern.strip()
+    if not pattern or pattern.startswith("#"):
+        return None
+    negated = pattern.startswith("!")
+    if negated:
+        pattern = pattern[1:]
+    elif pattern.startswith(("\\!", "\\#")):
+        pattern = pattern[1:]
+    directory_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    # A slash anywhere but at the end anchors the pattern to the root
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    if not pattern:
+        return None
+
+    segments = pattern.split("/")
+    regex = ""
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "**":
+            regex += ".*" if last else "(?:.*/)?"
+        else:
+            regex += _translate_segment(segment) + ("" if last else "/")
+    return regex, negated, directory_only, anchored
+
+
+def _alternation(patterns: list[tuple[str, bool]]) -> str:
+    """Join ``(regex, anchored)`` pairs, sharing one any-depth prefix for unanchored ones."""
+    alternatives = [regex for regex, anchored in patterns if anchored]
+    unanchored = [regex for regex, anchored in patterns if not anchored]
+    if unanchored:
+        alternatives.append("(?:.*/)?(?:" + "|".join(unanchored) + ")")
+    return "(?:" + "|".join(alternatives) + ")"
+
+
+class IgnoreMatcher:
+    """Decides whether relative paths are ignored, following gitignore semantics.
+
+    - Patterns without a slash match a name at any depth; patterns with a slash are
+      anchored to the root. ``*`` and ``?`` do not match ``/``; ``**`` matches any
+      number of directories.
+    - A trailing ``/`` matches directories only. A matching directory also ignores
+      everything below it, so walks can prune it instead of descending.
+    - ``!pattern`` re-includes paths ignored by earlier patterns; the last matching
+      pattern wins.
+
+    Consecutive patterns of the same polarity are compiled into one regex, so a path
+    is usually decided by a single regex match.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.patterns = [pattern for pattern in patterns if _translate_pattern(pattern)]
+        # Runs of (negated, file regex, directory regex), in pattern order
+        self._runs: list[tuple[bool, re.Pattern, re.Pattern]] = []
+        run: list[tuple[str, bool, bool]] = []
+        run_negated = False
+        for pattern in self.patterns:
+            regex, negated, directory_only, anchored = _translate_pattern(pattern)
+            if run and negated != run_negated:
+                self._runs.append(self._compile_run(run_negated, run))
+                run = []
+            run_negated = negated
+            run.append((regex, directory_only, anchored))
+        if run:
+            self._runs.append(self._compile_run(run_negated, run))
+
+    @staticmethod
+    def _compile_run(
+        negated: bool, run: list[tuple[str, bool, bool]]
+    ) -> tuple[bool, re.Pattern, re.Pattern]:
+        any_type = [(regex, anchored) for regex, dir_only, anchored in run if not dir_only]
+        directories = [(regex, anchored) for regex, dir_only, anchored in run if dir_only]
+        # A match followed by "/" is an ignored parent directory, which ignores the path
+        # too; files only match directory patterns that way
+        file_regexes = []
+        if any_type:
+            file_regexes.append(_alternation(any_type) + r"(?:/.*)?\Z")
+        if directories:
+            file_regexes.append(_alternation(directories) + r"/.*\Z")
+        return (
+            negated,
+            re.compile("|".join(file_regexes), re.DOTALL),
+            re.compile(_alternation(any_type + directories) + r"(?:/.*)?\Z", re.DOTALL),
+        )
+
+    @classmethod
+    def from_file(
+        cls, ignore_file: Union[str, Path], extra_patterns: Iterable[str] = ()
+    ) -> "IgnoreMatcher":
+        """Build a matcher from an ignore file (if it exists) plus extra patterns."""
+        patterns = list(extra_patterns)
+        ignore_file = Path(ignore_file)
+        if ignore_file.is_file():
+            try:
+                patterns.extend(ignore_file.read_text(encoding="utf-8").splitlines())
+            except Exception as e:
+                logger.error(f"Error reading {ignore_file}: {e}")
+        return cls(patterns)
+
+    def __bool__(self) -> bool:
+        return bool(self._runs)
+
+    def is_ignored(self, relative_path: str, is_dir: bool = False) -> bool:
+        """Whether a POSIX path relative to the root (e.g. ``src/app.py``) is ignored."""
+        for negated, file_regex, dir_regex in reversed(self._runs):
+            if (dir_regex if is_dir else file_regex).match(relative_path):
+                return not negated
+        return False
+
+    def walk(self, root: Union[str, Path]) -> Iterator[tuple[str, str, list[str], list[str]]]:
+        """Walk a tree top-down, pruning ignored directories and skipping ignored files.
+
+        Yields ``(directory, relative_directory, dir_names, file_names)`` like
+        ``os.walk``, where ``relative_directory`` is POSIX and ``""`` for the root.
+        Removing names from ``dir_names`` prunes them as with ``os.walk``.
+        """
+        root = str(root)
+        for directory, dir_names, file_names in os.walk(root, topdown=True):
+            relative_directory = os.path.relpath(directory, root).replace(os.sep, "/")
+            prefix = "" if relative_directory == "." else relative_directory + "/"
+            dir_names[:] = [
+                name for name in dir_names if not self.is_ignored(prefix + name, is_dir=True)
+            ]
+            yield (
+                directory,
+                prefix.rstrip("/"),
+                dir_names,
+                [name for name in file_names if not self.is_ignored(prefix + name)],
+            )
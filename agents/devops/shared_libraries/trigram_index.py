@@ -0,0 +1,608 @@
+"""Persistent trigram index that narrows code searches to candidate files.
+
+Code search runs ripgrep over the whole workspace for every query, which reads every
+file of a large repository each time. ``TrigramIndex`` keeps an on-disk map from each
+trigram of (lowercased) file content to the files containing it. A query's required
+literal text is split into trigrams, and only the files containing all of them can
+match, so ripgrep is given those files instead of the whole tree.
+
+The index is only trusted while it is known to match the disk. A watchdog observer
+records the files that change; a search re-indexes those few files before using the
+index. Until the first full scan has finished, after changes that need a full scan
+(new directories, edited ignore files, large bursts), or when the index finds no
+candidates, ``find_candidate_files`` returns None and the caller searches with
+ripgrep alone.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import stat
+import threading
+import time
+from typing import Any, Optional, Union
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from .ignore_matcher import IgnoreMatcher
+
+logger = logging.getLogger(__name__)
+
+# Files larger than this are not indexed and are always searched
+MAX_INDEXED_FILE_BYTES = 1_000_000
+# A search re-indexes at most this many changed files itself; more are left to a
+# full background refresh while searches fall back to ripgrep
+MAX_SYNC_REFRESH_FILES = 200
+# Events that do not change file contents or the set of files
+_IGNORED_EVENT_TYPES = {"opened", "closed_no_write"}
+# Ignore files honoured in every directory, as ripgrep does by default; ripgrep only
+# reads .gitignore files inside git repositories
+IGNORE_FILE_NAMES = (".gitignore", ".ignore", ".rgignore")
+# Bytes sniffed for a NUL byte to detect binary files, which ripgrep skips
+_BINARY_SNIFF_BYTES = 8192
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH_SIZE = 500
+
+_REPEAT_OPCODES = {
+    opcode
+    for opcode in (
+        sre_parse.MAX_REPEAT,
+        sre_parse.MIN_REPEAT,
+        getattr(sre_parse, "POSSESSIVE_REPEAT", None),
+    )
+    if opcode is not None
+}
+
+
+def _collect_literals(parsed: Any, literals: list[str]) -> None:
+    """Append the runs of literal characters that every match of a parsed regex contains."""
+    run: list[str] = []
+
+    def flush() -> None:
+        if len(run) >= 3:
+            literals.append("".join(run))
+        run.clear()
+
+    for opcode, argument in parsed:
+        if opcode is sre_parse.LITERAL:
+            run.append(chr(argument))
+        elif opcode is sre_parse.AT:
+            # Anchors such as ^ or \b consume no characters
+            continue
+        elif opcode is sre_parse.SUBPATTERN:
+            flush()
+            _collect_literals(argument[-1], literals)
+        elif opcode in _REPEAT_OPCODES:
+            flush()
+            minimum, _, item = argument
+            if minimum >= 1:
+                _collect_literals(item, literals)
+        else:
+            # Alternations, classes, wildcards and lookarounds guarantee no literal
+            flush()
+    flush()
+
+
+def query_trigrams(query: str) -> Optional[set[str]]:
+    """Return the lowercase trigrams every line matching a regex query must contain.
+
+    Returns None when the query cannot be parsed or requires no literal run of at
+    least three characters, in which case the index cannot narrow the search.
+    """
+    try:
+        parsed = sre_parse.parse(query)
+    except Exception:
+        return None
+    literals: list[str] = []
+    _collect_literals(parsed, literals)
+    literals = [literal.lower() for literal in literals]
+    trigrams = {literal[i : i + 3] for literal in literals for i in range(len(literal) - 2)}
+    return {trigram for trigram in trigrams if "\n" not in trigram} or None
+
+
+def content_trigrams(content: str) -> set[str]:
+    """Return the lowercase trigrams of a file's content that do not span lines."""
+    trigrams: set[str] = set()
+    # Repeated lines (blank lines, closing brackets, common imports) are split once
+    for line in set(content.lower().split("\n")):
+        trigrams.update(line[i : i + 3] for i in range(len(line) - 2))
+    return trigrams
+
+
+class _IndexEventHandler(FileSystemEventHandler):
+    """Forwards filesystem events below the root to a trigram index."""
+
+    def __init__(self, index: "TrigramIndex"):
+        self.index = index
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.event_type in _IGNORED_EVENT_TYPES:
+            return
+        if event.is_directory and event.event_type == "modified":
+            # Only says that entries changed, which are reported by their own events
+            return
+        self.index.record_event(event)
+
+
+class TrigramIndex:
+    """SQLite-backed trigram index of the searchable files below a root directory.
+
+    The files indexed are the ones ripgrep searches by default: hidden files and
+    directories are skipped, ``.ignore`` and ``.rgignore`` files (and ``.gitignore``
+    files in git repositories) are honoured in every directory, and binary files
+    never match. Files larger than ``max_file_bytes`` are tracked without postings
+    and are always candidates.
+
+    ``refresh`` brings the whole index up to date with a walk of the tree. While
+    ``start_watching`` is active, changed files are collected from filesystem events
+    and ``update_changed`` re-indexes just those; ``current`` says whether the index
+    is known to match the disk.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        path: Optional[str] = None,
+        max_file_bytes: int = MAX_INDEXED_FILE_BYTES,
+    ):
+        """Initialize the index.
+
+        Args:
+            root: Directory whose files are indexed
+            path: Path to the sqlite file; None keeps the index in memory only
+            max_file_bytes: Files larger than this are always searched
+        """
+        self.root = Path(root).resolve()
+        self.path = path
+        self.max_file_bytes = max_file_bytes
+        self._lock = threading.Lock()
+        # Held for a whole refresh or update, so they do not index the same changes twice
+        self._refresh_lock = threading.Lock()
+        self._db = self._open(path)
+        self._refresh_thread: Optional[threading.Thread] = None
+        in_git_repository = any(
+            (directory / ".git").exists() for directory in (self.root, *self.root.parents)
+        )
+        self.ignore_file_names = tuple(
+            name for name in IGNORE_FILE_NAMES if in_git_repository or name != ".gitignore"
+        )
+        # Ignore matchers by the relative directory holding their ignore file
+        self._ignore_matchers: dict[str, list[IgnoreMatcher]] = {}
+
+        # Change tracking, guarded by _changes_lock: files and directories reported by
+        # events since they were last indexed, and whether only a full refresh will do
+        self._changes_lock = threading.Lock()
+        self._changed_files: set[str] = set()
+        self._removed_directories: set[str] = set()
+        self._needs_full_refresh = True
+        self._observer: Optional[Observer] = None
+
+    def _open(self, path: Optional[str]) -> sqlite3.Connection:
+        if path:
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(path, check_same_thread=False)
+                self._create_schema(db)
+                logger.info(f"Trigram index for {self.root} at {path}")
+                return db
+            except Exception as e:
+                logger.warning(f"Could not open trigram index at {path}, using memory: {e}")
+        self.path = None
+        db = sqlite3.connect(":memory:", check_same_thread=False)
+        self._create_schema(db)
+        return db
+
+    @staticmethod
+    def _create_schema(db: sqlite3.Connection) -> None:
+        db.execute("PRAGMA synchronous=OFF")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, mtime_ns INTEGER NOT NULL, "
+            "size INTEGER NOT NULL, indexed INTEGER NOT NULL)"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "trigram TEXT NOT NULL, file_id INTEGER NOT NULL, "
+            "PRIMARY KEY (trigram, file_id)) WITHOUT ROWID"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS postings_by_file ON postings (file_id)")
+        db.commit()
+
+    @property
+    def refreshing(self) -> bool:
+        """Whether a background refresh is running."""
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+
+    @property
+    def watching(self) -> bool:
+        """Whether filesystem events are being collected."""
+        return self._observer is not None and self._observer.is_alive()
+
+    @property
+    def needs_full_refresh(self) -> bool:
+        """Whether changes happened that only a full refresh picks up."""
+        with self._changes_lock:
+            return self._needs_full_refresh
+
+    @property
+    def current(self) -> bool:
+        """Whether the index is known to match the files on disk."""
+        with self._changes_lock:
+            return (
+                self.watching
+                and not self._needs_full_refresh
+                and not self._changed_files
+                and not self._removed_directories
+            )
+
+    def start_watching(self) -> None:
+        """Collect changed files from filesystem events; does nothing if already watching."""
+        if self.watching:
+            return
+        observer = Observer()
+        observer.daemon = True
+        observer.schedule(_IndexEventHandler(self), str(self.root), recursive=True)
+        observer.start()
+        self._observer = observer
+        # Changes made while nobody was watching are only found by walking the tree
+        with self._changes_lock:
+            self._needs_full_refresh = True
+
+    def stop_watching(self, timeout: Optional[float] = None) -> None:
+        """Stop collecting filesystem events."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+
+    def _relative(self, path: str) -> Optional[str]:
+        """Return a path relative to the root in POSIX form, or None if it is outside."""
+        try:
+            relative_path = Path(path).resolve().relative_to(self.root).as_posix()
+        except (OSError, ValueError):
+            return None
+        return "" if relative_path == "." else relative_path
+
+    def record_event(self, event: FileSystemEvent) -> None:
+        """Record the files or directories a filesystem event changed."""
+        paths = [(event.src_path, False)]
+        if getattr(event, "dest_path", ""):
+            paths.append((event.dest_path, True))
+        for path, is_destination in paths:
+            relative_path = self._relative(str(path))
+            if relative_path is None:
+                continue
+            if not relative_path:
+                self._mark_full_refresh()
+                return
+            parts = relative_path.split("/")
+            if any(part.startswith(".") for part in parts[:-1]):
+                # Inside a hidden directory such as .git, which is never searched
+                continue
+            if parts[-1] in self.ignore_file_names:
+                # Which files are searchable changed
+                self._mark_full_refresh()
+                return
+            if parts[-1].startswith("."):
+                continue
+            if event.is_directory:
+                if is_destination or event.event_type == "created":
+                    # Its files may have arrived without events of their own
+                    self._mark_full_refresh()
+                    return
+                with self._changes_lock:
+                    self._removed_directories.add(relative_path)
+            elif self._is_searchable(relative_path):
+                with self._changes_lock:
+                    self._changed_files.add(relative_path)
+                    if len(self._changed_files) > MAX_SYNC_REFRESH_FILES:
+                        self._needs_full_refresh = True
+                        self._changed_files.clear()
+
+    def _mark_full_refresh(self) -> None:
+        with self._changes_lock:
+            self._needs_full_refresh = True
+            self._changed_files.clear()
+            self._removed_directories.clear()
+
+    def _is_searchable(self, relative_path: str, is_dir: bool = False) -> bool:
+        """Whether a path is skipped by no ignore file of the directories above it."""
+        parts = relative_path.split("/")
+        for depth in range(1, len(parts) + 1):
+            path = "/".join(parts[:depth])
+            path_is_dir = is_dir or depth < len(parts)
+            for base_depth in range(depth):
+                base = "/".join(parts[:base_depth])
+                for matcher in self._ignore_matchers.get(base, ()):
+                    relative_to_base = path[len(base) :].lstrip("/")
+                    if matcher.is_ignored(relative_to_base, path_is_dir):
+                        return False
+        return True
+
+    def scan(self) -> dict[str, tuple[int, int]]:
+        """Stat the searchable files, returning ``{relative_path: (mtime_ns, size)}``."""
+        files: dict[str, tuple[int, int]] = {}
+        ignore_matchers: dict[str, list[IgnoreMatcher]] = {}
+        # Directories still to visit, with the ignore matchers (and the directory each
+        # one is relative to) that apply to their entries
+        stack: list[tuple[str, str, list[tuple[str, IgnoreMatcher]]]] = [(str(self.root), "", [])]
+        while stack:
+            directory, relative_directory, matchers = stack.pop()
+            own_matchers = [
+                matcher
+                for matcher in (
+                    IgnoreMatcher.from_file(Path(directory) / name)
+                    for name in self.ignore_file_names
+                )
+                if matcher
+            ]
+            if own_matchers:
+                ignore_matchers[relative_directory] = own_matchers
+                matchers = matchers + [(relative_directory, matcher) for matcher in own_matchers]
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                relative_path = f"{relative_directory}/{entry.name}".lstrip("/")
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if not is_dir and not entry.is_file(follow_symlinks=False):
+                        continue
+                    if any(
+                        matcher.is_ignored(relative_path[len(base) :].lstrip("/"), is_dir)
+                        for base, matcher in matchers
+                    ):
+                        continue
+                    if is_dir:
+                        stack.append((entry.path, relative_path, matchers))
+                    else:
+                        file_stat = entry.stat(follow_symlinks=False)
+                        files[relative_path] = (file_stat.st_mtime_ns, file_stat.st_size)
+                except OSError:
+                    continue
+        self._ignore_matchers = ignore_matchers
+        return files
+
+    def _read_trigrams(self, relative_path: str, size: int) -> Optional[set[str]]:
+        """Return a file's trigrams, an empty set if it is binary, or None if too large."""
+        if size > self.max_file_bytes:
+            return None
+        try:
+            data = (self.root / relative_path).read_bytes()
+        except OSError:
+            return set()
+        if b"\0" in data[:_BINARY_SNIFF_BYTES]:
+            return set()
+        return content_trigrams(data.decode("utf-8", errors="ignore"))
+
+    def refresh(self) -> dict[str, int]:
+        """Bring the whole index up to date by walking the tree.
+
+        Returns:
+            Counts of re-indexed, removed and tracked files
+        """
+        with self._refresh_lock:
+            # Events from now on are kept; earlier ones are covered by the walk
+            with self._changes_lock:
+                self._needs_full_refresh = False
+                self._changed_files.clear()
+                self._removed_directories.clear()
+            try:
+                current = self.scan()
+                with self._lock:
+                    stored = {
+                        path: (file_id, mtime_ns, size)
+                        for file_id, path, mtime_ns, size in self._db.execute(
+                            "SELECT id, path, mtime_ns, size FROM files"
+                        )
+                    }
+                changed, removed = self._apply(current, stored)
+            except Exception:
+                self._mark_full_refresh()
+                raise
+        return {"indexed": changed, "removed": removed, "files": len(current)}
+
+    def update_changed(self) -> dict[str, int]:
+        """Re-index the files and directories that events reported as changed.
+
+        Returns:
+            Counts of re-indexed and removed files
+        """
+        with self._refresh_lock:
+            with self._changes_lock:
+                changed_files, self._changed_files = self._changed_files, set()
+                removed_directories, self._removed_directories = self._removed_directories, set()
+            try:
+                current = {}
+                for relative_path in changed_files:
+                    try:
+                        file_stat = os.lstat(self.root / relative_path)
+                    except OSError:
+                        # Deleted, or moved away
+                        continue
+                    if stat.S_ISREG(file_stat.st_mode):
+                        current[relative_path] = (file_stat.st_mtime_ns, file_stat.st_size)
+                with self._lock:
+                    stored = self._stored_rows(changed_files, removed_directories)
+                changed, removed = self._apply(current, stored)
+            except Exception:
+                self._mark_full_refresh()
+                raise
+        return {"indexed": changed, "removed": removed}
+
+    def _stored_rows(
+        self, paths: set[str], directories: set[str]
+    ) -> dict[str, tuple[int, int, int]]:
+        """Return ``{path: (file_id, mtime_ns, size)}`` for the given paths and directories."""
+        rows = []
+        paths = list(paths)
+        for start in range(0, len(paths), _LOOKUP_BATCH_SIZE):
+            batch = paths[start : start + _LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(
+                self._db.execute(
+                    f"SELECT id, path, mtime_ns, size FROM files WHERE path IN ({placeholders})",
+                    batch,
+                )
+            )
+        for directory in directories:
+            # Paths below "dir/" sort between "dir/" and "dir0" ("0" follows "/")
+            rows.extend(
+                self._db.execute(
+                    "SELECT id, path, mtime_ns, size FROM files WHERE path >= ? AND path < ?",
+                    (directory + "/", directory + "0"),
+                )
+            )
+        return {path: (file_id, mtime_ns, size) for file_id, path, mtime_ns, size in rows}
+
+    def _apply(
+        self, current: dict[str, tuple[int, int]], stored: dict[str, tuple[int, int, int]]
+    ) -> tuple[int, int]:
+        """Write the difference between files on disk and their stored rows.
+
+        Returns:
+            Numbers of re-indexed and removed files
+        """
+        changed = [
+            path
+            for path, signature in current.items()
+            if path not in stored or stored[path][1:] != signature
+        ]
+        removed = [stored[path][0] for path in stored.keys() - current.keys()]
+        updates = [
+            (path, current[path], self._read_trigrams(path, current[path][1])) for path in changed
+        ]
+        with self._lock:
+            stale_ids = removed + [stored[path][0] for path in changed if path in stored]
+            for start in range(0, len(stale_ids), _LOOKUP_BATCH_SIZE):
+                batch = stale_ids[start : start + _LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                self._db.execute(f"DELETE FROM postings WHERE file_id IN ({placeholders})", batch)
+                self._db.execute(f"DELETE FROM files WHERE id IN ({placeholders})", batch)
+            for path, (mtime_ns, size), trigrams in updates:
+                file_id = self._db.execute(
+                    "INSERT INTO files (path, mtime_ns, size, indexed) VALUES (?, ?, ?, ?)",
+                    (path, mtime_ns, size, int(trigrams is not None)),
+                ).lastrowid
+                self._db.executemany(
+                    "INSERT INTO postings (trigram, file_id) VALUES (?, ?)",
+                    # In primary key order, which makes the inserts append-like
+                    ((trigram, file_id) for trigram in sorted(trigrams or ())),
+                )
+            self._db.commit()
+        return len(changed), len(removed)
+
+    def refresh_in_background(self) -> None:
+        """Start a full refresh in a background thread, unless one is already running."""
+        with self._lock:
+            if self.refreshing:
+                return
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_logged, name=f"trigram-index-{self.root.name}", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def _refresh_logged(self) -> None:
+        started = time.monotonic()
+        try:
+            stats = self.refresh()
+            logger.info(
+                f"Trigram index for {self.root} refreshed in {time.monotonic() - started:.1f}s: "
+                f"{stats}"
+            )
+        except Exception as e:
+            logger.error(f"Error refreshing the trigram index for {self.root}: {e}")
+
+    def candidates(self, query: str) -> Optional[list[str]]:
+        """Return the relative paths of the files that may contain a match for a query.
+
+        Returns None when the query has no literal text to narrow the search by.
+        """
+        trigrams = query_trigrams(query)
+        if trigrams is None:
+            return None
+        trigrams = sorted(trigrams)[: _LOOKUP_BATCH_SIZE - 1]
+        placeholders = ",".join("?" * len(trigrams))
+        with self._lock:
+            matching = [
+                path
+                for (path,) in self._db.execute(
+                    "SELECT files.path FROM postings JOIN files ON files.id = postings.file_id "
+                    f"WHERE postings.trigram IN ({placeholders}) "
+                    "GROUP BY postings.file_id HAVING COUNT(*) = ?",
+                    (*trigrams, len(trigrams)),
+                )
+            ]
+            unindexed = [
+                path for (path,) in self._db.execute("SELECT path FROM files WHERE indexed = 0")
+            ]
+        return sorted(matching + unindexed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+
+_indexes: dict[Path, TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_trigram_index(root: Union[str, Path]) -> TrigramIndex:
+    """Return the process-wide trigram index of a root, creating it from config on first use."""
+    from ..config import CODE_SEARCH_TRIGRAM_INDEX_PATH
+
+    root = Path(root).resolve()
+    with _indexes_lock:
+        if root not in _indexes:
+            path = None
+            if CODE_SEARCH_TRIGRAM_INDEX_PATH:
+                digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+                path = str(Path(CODE_SEARCH_TRIGRAM_INDEX_PATH) / f"{digest}.sqlite3")
+            _indexes[root] = TrigramIndex(root, path)
+        return _indexes[root]
+
+
+def find_candidate_files(root: Union[str, Path], query: str) -> Optional[list[str]]:
+    """Return the files below root (relative POSIX paths) that may match a regex query.
+
+    Returns None when the search has to scan every file instead: the index is
+    disabled, cannot watch the tree, is not known to be current, or finds no
+    candidates, or the query has no literal text to narrow by. Files reported
+    changed by filesystem events are re-indexed first; anything needing a walk of
+    the tree is left to a background refresh, never done inside the search.
+    """
+    from ..config import CODE_SEARCH_TRIGRAM_INDEX
+
+    if not CODE_SEARCH_TRIGRAM_INDEX or query_trigrams(query) is None:
+        return None
+    index = get_trigram_index(root)
+    try:
+        index.start_watching()
+    except Exception as e:
+        logger.warning(f"Cannot watch {index.root}, searching without the trigram index: {e}")
+        return None
+    if index.refreshing:
+        return None
+    if index.needs_full_refresh:
+        index.refresh_in_background()
+        return None
+    try:
+        index.update_changed()
+    except Exception as e:
+        logger.warning(f"Could not update the trigram index for {index.root}: {e}")
+        return None
+    if not index.current:
+        return None
+    # No candidates means "the index cannot tell", so rg still searches the paths
+    return index.candidates(query) or None
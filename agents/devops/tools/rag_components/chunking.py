@@ -1,187 +1,628 @@
 # /Users/james/Agents/devops_v2/rag_components/chunking.py
 import ast
+from collections.abc import Callable
+from dataclasses import dataclass, field
 import logging
+from pathlib import Path
+import re
+from typing import Optional
+
+from ...config import RAG_CHUNK_MAX_TOKENS, RAG_CHUNK_MIN_TOKENS
+from .rate_limiter import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+# Chunk types whose names are generated from their line range rather than a symbol
+FRAGMENT_TYPES = {"module-level-block", "text"}
+# Symbol names listed in the name of a chunk coalesced from several fragments
+MAX_MERGED_NAMES = 4
+
+_DEF_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_MARKDOWN_FENCE = re.compile(r"^\s*(```|~~~)")
+_YAML_DOCUMENT_SEPARATOR = re.compile(r"^---(\s|$)")
+_YAML_TOP_LEVEL_KEY = re.compile(r"""^(["']?)([^\s#:'"-][^:'"]*)\1\s*:(\s|$)""")
+_YAML_KIND = re.compile(r"""^kind:\s*["']?([\w.-]+)""")
+_YAML_METADATA_NAME = re.compile(r"""^\s+name:\s*["']?([\w.:-]+)""")
+_HCL_BLOCK = re.compile(r"""^([A-Za-z_][\w-]*)((?:\s+(?:"[^"]*"|[A-Za-z_][\w-]*))*)\s*\{""")
+_GO_FUNC = re.compile(r"^func\s*(?:\(\s*(?:\w+\s+)?\*?(\w+)[^)]*\)\s*)?(\w+)")
+_GO_TYPE = re.compile(r"^type\s+(\w+)")
+_GO_DECLARATION = re.compile(r"^(var|const|import)\b")
+
+
+@dataclass
+class _Section:
+    """A named range of lines (1-based, inclusive) that becomes one or more chunks."""
+
+    start_line: int
+    end_line: int
+    name: str
+    type: str
+
+
+@dataclass
+class _Piece:
+    """A chunk under construction, before small neighbours are coalesced."""
+
+    start_line: int
+    end_line: int
+    name: str
+    type: str
+    content: str
+    tokens: int
+    symbols: list[str] = field(default_factory=list)
+    mergeable: bool = True
+
+
+def _line_tokens(lines: list[str], start_line: int, end_line: int) -> int:
+    return estimate_tokens("\n".join(lines[start_line - 1 : end_line]))
+
+
+def _slice_size(max_tokens: int) -> int:
+    """Characters per slice of a line too long for one chunk."""
+    return max(1, max_tokens - 1) * 4
+
 
-def chunk_python_code(file_path: str, code_content: str) -> list[dict]:
+def _trim_blank_lines(lines: list[str], start_line: int, end_line: int) -> tuple[int, int]:
+    while start_line <= end_line and not lines[start_line - 1].strip():
+        start_line += 1
+    while end_line >= start_line and not lines[end_line - 1].strip():
+        end_line -= 1
+    return start_line, end_line
+
+
+def _split_lines(
+    lines: list[str], start_line: int, end_line: int, max_tokens: int
+) -> list[tuple[int, int, Optional[int]]]:
+    """Split a line range into windows within the token budget.
+
+    Windows end at a blank line where possible, so paragraphs and blocks stay together.
+    A single line over the budget is cut into character slices, returned as
+    (line, line, part) with part counting from 1; other windows have part None.
+    """
+    windows: list[tuple[int, int, Optional[int]]] = []
+    window_start, tokens, last_blank = start_line, 0, None
+    line_no = start_line
+    while line_no <= end_line:
+        line = lines[line_no - 1]
+        tokens_needed = estimate_tokens(line)
+        if tokens_needed > max_tokens:
+            if line_no > window_start:
+                windows.append((window_start, line_no - 1, None))
+            part_count = -(-len(line) // _slice_size(max_tokens))
+            windows.extend((line_no, line_no, part) for part in range(1, part_count + 1))
+            window_start, tokens, last_blank = line_no + 1, 0, None
+            line_no += 1
+        elif tokens + tokens_needed > max_tokens and line_no > window_start:
+            cut = line_no - 1
+            if last_blank is not None and last_blank > window_start:
+                cut = last_blank
+            windows.append((window_start, cut, None))
+            window_start, last_blank = cut + 1, None
+            tokens = sum(estimate_tokens(lines[i - 1]) for i in range(window_start, line_no))
+        else:
+            tokens += tokens_needed
+            if not line.strip():
+                last_blank = line_no
+            line_no += 1
+    if window_start <= end_line:
+        windows.append((window_start, end_line, None))
+    return windows
+
+
+def _section_pieces(lines: list[str], section: _Section, max_tokens: int) -> list[_Piece]:
+    """Turn a section into pieces, splitting it by lines if it is over the budget."""
+    start_line, end_line = _trim_blank_lines(lines, section.start_line, section.end_line)
+    if start_line > end_line:
+        return []
+    pieces = []
+    windows = (
+        [(start_line, end_line, None)]
+        if _line_tokens(lines, start_line, end_line) <= max_tokens
+        else _split_lines(lines, start_line, end_line, max_tokens)
+    )
+    for window_start, window_end, part in windows:
+        if part is None:
+            window_start, window_end = _trim_blank_lines(lines, window_start, window_end)
+            if window_start > window_end:
+                continue
+            content = "\n".join(lines[window_start - 1 : window_end])
+        else:
+            slice_size = _slice_size(max_tokens)
+            content = lines[window_start - 1][(part - 1) * slice_size : part * slice_size]
+        name = section.name
+        if section.type in FRAGMENT_TYPES:
+            name = f"{section.type}_{window_start}-{window_end}"
+        if part is not None:
+            name = f"{name}[{part}]"
+        pieces.append(
+            _Piece(
+                window_start,
+                window_end,
+                name,
+                section.type,
+                content,
+                estimate_tokens(content),
+                symbols=[] if section.type in FRAGMENT_TYPES else [section.name],
+                mergeable=part is None,
+            )
+        )
+    return pieces
+
+
+def _merge_pieces(lines: list[str], first: _Piece, second: _Piece) -> _Piece:
+    content = "\n".join(lines[first.start_line - 1 : second.end_line])
+    if first.type == second.type or second.type in FRAGMENT_TYPES:
+        chunk_type = first.type
+    elif first.type in FRAGMENT_TYPES:
+        chunk_type = second.type
+    else:
+        chunk_type = "mixed"
+    symbols = first.symbols + [symbol for symbol in second.symbols if symbol not in first.symbols]
+    if symbols:
+        name = ", ".join(symbols[:MAX_MERGED_NAMES])
+        if len(symbols) > MAX_MERGED_NAMES:
+            name += f" (+{len(symbols) - MAX_MERGED_NAMES} more)"
+    else:
+        name = f"{chunk_type}_{first.start_line}-{second.end_line}"
+    return _Piece(
+        first.start_line,
+        second.end_line,
+        name,
+        chunk_type,
+        content,
+        estimate_tokens(content),
+        symbols,
+    )
+
+
+def _coalesce(
+    lines: list[str], pieces: list[_Piece], min_tokens: int, max_tokens: int
+) -> list[_Piece]:
+    """Merge small pieces into their neighbours while the result fits ``max_tokens``.
+
+    A piece below ``min_tokens`` absorbs the pieces after it until it reaches
+    ``min_tokens``, and small unnamed fragments join the piece before them, so merged
+    chunks stay close to ``min_tokens`` instead of growing to the budget.
+    """
+    merged: list[_Piece] = []
+    for piece in pieces:
+        previous = merged[-1] if merged else None
+        if (
+            previous is not None
+            and previous.mergeable
+            and piece.mergeable
+            and (previous.tokens < min_tokens or (piece.tokens < min_tokens and not piece.symbols))
+            and _line_tokens(lines, previous.start_line, piece.end_line) <= max_tokens
+        ):
+            merged[-1] = _merge_pieces(lines, previous, piece)
+        else:
+            merged.append(piece)
+    return merged
+
+
+def _sections_to_chunks(
+    file_path: str,
+    lines: list[str],
+    sections: list[_Section],
+    max_tokens: int,
+    min_tokens: int,
+) -> list[dict]:
+    """Bound every section by ``max_tokens``, coalesce small neighbours and build chunks."""
+    pieces = [
+        piece for section in sections for piece in _section_pieces(lines, section, max_tokens)
+    ]
+    return [
+        {
+            "file_path": file_path,
+            "name": piece.name,
+            "type": piece.type,
+            "content": piece.content,
+            "start_line": piece.start_line,
+            "end_line": piece.end_line,
+        }
+        for piece in _coalesce(lines, pieces, min_tokens, max_tokens)
+    ]
+
+
+# --- Python ---
+def _node_start(node: ast.AST) -> int:
+    """First line of a statement, including its decorators."""
+    decorators = getattr(node, "decorator_list", None) or []
+    return min([node.lineno] + [decorator.lineno for decorator in decorators])
+
+
+def _nested_statements(node: ast.AST) -> list[ast.AST]:
+    nested = [
+        child
+        for name in ("body", "handlers", "orelse", "finalbody")
+        for child in getattr(node, name, None) or []
+        if hasattr(child, "lineno")
+    ]
+    return sorted(nested, key=_node_start)
+
+
+def _pack_statements(
+    lines: list[str], statements: list[ast.AST], start_line: int, end_line: int, max_tokens: int
+) -> list[tuple[int, int]]:
+    """Split a line range at statement boundaries into ranges within the token budget.
+
+    Each statement owns the lines up to the next one (the first also owns any header
+    before it). A statement over the budget is split at its nested blocks; one without
+    nested blocks is kept whole and split by lines later.
+    """
+    if not statements or _line_tokens(lines, start_line, end_line) <= max_tokens:
+        return [(start_line, end_line)]
+
+    starts = [start_line] + [_node_start(statement) for statement in statements[1:]]
+    ends = [next_start - 1 for next_start in starts[1:]] + [end_line]
+    ranges: list[tuple[int, int]] = []
+    window_start = window_end = None
+    for statement, segment_start, segment_end in zip(statements, starts, ends):
+        if _line_tokens(lines, segment_start, segment_end) > max_tokens:
+            if window_start is not None:
+                ranges.append((window_start, window_end))
+                window_start = None
+            ranges.extend(
+                _pack_statements(
+                    lines, _nested_statements(statement), segment_start, segment_end, max_tokens
+                )
+            )
+        elif window_start is None:
+            window_start, window_end = segment_start, segment_end
+        elif _line_tokens(lines, window_start, segment_end) <= max_tokens:
+            window_end = segment_end
+        else:
+            ranges.append((window_start, window_end))
+            window_start, window_end = segment_start, segment_end
+    if window_start is not None:
+        ranges.append((window_start, window_end))
+    return ranges
+
+
+def _python_definition_sections(
+    lines: list[str], node: ast.AST, scope: str, max_tokens: int
+) -> list[_Section]:
+    """Sections of a function or class, split at its methods or blocks if over budget."""
+    name = f"{scope}.{node.name}" if scope else node.name
+    if isinstance(node, ast.ClassDef):
+        node_type = "class"
+    else:
+        node_type = "method" if scope else "function"
+    start_line, end_line = _node_start(node), node.end_lineno
+    if _line_tokens(lines, start_line, end_line) <= max_tokens:
+        return [_Section(start_line, end_line, name, node_type)]
+
+    if isinstance(node, ast.ClassDef):
+        # The header (signature and docstring) stays a "class" chunk; methods and other
+        # statements of the body are chunked like a module of their own
+        body = node.body
+        if len(body) > 1 and isinstance(body[0], ast.Expr):
+            body = body[1:]
+        body_start = _node_start(body[0])
+        return [
+            _Section(start_line, body_start - 1, name, "class"),
+            *_python_scope_sections(lines, body, body_start, end_line, name, max_tokens),
+        ]
+
+    ranges = _pack_statements(lines, node.body, start_line, end_line, max_tokens)
+    return [
+        _Section(range_start, range_end, name, node_type if i == 0 else f"{node_type}-part")
+        for i, (range_start, range_end) in enumerate(ranges)
+    ]
+
+
+def _python_scope_sections(
+    lines: list[str],
+    body: list[ast.AST],
+    start_line: int,
+    end_line: int,
+    scope: str,
+    max_tokens: int,
+) -> list[_Section]:
+    """Sections of a module or class body.
+
+    Functions and classes become sections of their own; the statements and comments
+    between them are grouped into fragments.
+    """
+    fragment_type = "class-body" if scope else "module-level-block"
+    sections: list[_Section] = []
+    pending_start, pending_statements = start_line, []
+
+    def flush(fragment_end: int) -> None:
+        if pending_start <= fragment_end:
+            sections.extend(
+                _Section(range_start, range_end, scope, fragment_type)
+                for range_start, range_end in _pack_statements(
+                    lines, pending_statements, pending_start, fragment_end, max_tokens
+                )
+            )
+
+    for node in body:
+        if not isinstance(node, _DEF_NODES):
+            pending_statements.append(node)
+            continue
+        flush(_node_start(node) - 1)
+        sections.extend(_python_definition_sections(lines, node, scope, max_tokens))
+        pending_start, pending_statements = node.end_lineno + 1, []
+    flush(end_line)
+    return sections
+
+
+def chunk_python_code(
+    file_path: str,
+    code_content: str,
+    max_tokens: int = RAG_CHUNK_MAX_TOKENS,
+    min_tokens: int = RAG_CHUNK_MIN_TOKENS,
+) -> list[dict]:
     """
     Chunks Python code into functions and classes.
     Each chunk includes the name, type (function/class), and the code block.
     Also includes 'module-level' code that is not part of any function/class.
 
+    Chunks are bounded by ``max_tokens``: a larger class is split into its header and
+    its methods (named ``Class.method``), and a larger function into consecutive
+    blocks of statements. Adjacent chunks below ``min_tokens`` are coalesced, so
+    one-line fragments do not each cost an embedding.
+
     Args:
         file_path: The path to the Python file (for context in metadata).
         code_content: The string content of the Python file.
+        max_tokens: Maximum estimated tokens per chunk.
+        min_tokens: Chunks smaller than this are merged with a neighbour.
 
     Returns:
         A list of dictionaries, where each dictionary represents a chunk:
         {'file_path': str, 'name': str, 'type': str, 'content': str,
          'start_line': int, 'end_line': int}
     """
-    chunks = []
+    lines = code_content.splitlines()
     try:
         tree = ast.parse(code_content)
-        lines = code_content.splitlines()
-
-        current_pos = 0  # To track module-level code
-
-        for node in tree.body:
-            start_line = node.lineno
-            # end_lineno might be None for some nodes or not precise enough for
-            # ast.get_source_segment
-            # We will rely on ast.get_source_segment for content, and calculate
-            # end_line from it if possible
-
-            # Capture module-level code before this node
-            if start_line > current_pos + 1:
-                module_level_code_chunk = "\n".join(lines[current_pos : start_line - 1]).strip()
-                if module_level_code_chunk:
-                    chunks.append(
-                        {
-                            "file_path": file_path,
-                            "name": f"module-level_{current_pos + 1}-{start_line - 1}",
-                            "type": "module-level",
-                            "content": module_level_code_chunk,
-                            "start_line": current_pos + 1,
-                            "end_line": start_line - 1,
-                        }
-                    )
-
-            chunk_content = ast.get_source_segment(code_content, node)
-            if chunk_content is None:
-                # Fallback if get_source_segment fails (e.g. older Python or complex cases)
-                # Calculate end_line based on the node's reported end_lineno if available
-                node_end_lineno = getattr(node, "end_lineno", start_line)
-                chunk_content = (
-                    "\n".join(lines[start_line - 1 : node_end_lineno])
-                    if node_end_lineno
-                    else lines[start_line - 1]
-                )
-                actual_end_line = start_line + len(chunk_content.splitlines()) - 1
-            else:
-                actual_end_line = start_line + len(chunk_content.splitlines()) - 1
-
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                chunks.append(
-                    {
-                        "file_path": file_path,
-                        "name": node.name,
-                        "type": "function",
-                        "content": chunk_content,
-                        "start_line": start_line,
-                        "end_line": actual_end_line,
-                    }
-                )
-            elif isinstance(node, ast.ClassDef):
-                chunks.append(
-                    {
-                        "file_path": file_path,
-                        "name": node.name,
-                        "type": "class",
-                        "content": chunk_content,
-                        "start_line": start_line,
-                        "end_line": actual_end_line,
-                    }
-                )
-            else:
-                # Other top-level statements (imports, assignments, etc.)
-                # Group consecutive non-function/class nodes as a single chunk
-                if (
-                    not chunks
-                    or chunks[-1]["type"] not in ["module-level-block"]
-                    or chunks[-1]["end_line"] != start_line - 1
-                ):
-                    chunks.append(
-                        {
-                            "file_path": file_path,
-                            "name": f"module-level-block_{start_line}-{actual_end_line}",
-                            "type": "module-level-block",
-                            "content": chunk_content,
-                            "start_line": start_line,
-                            "end_line": actual_end_line,
-                        }
-                    )
-                else:  # Append to existing module-level-block
-                    chunks[-1]["content"] += "\n" + chunk_content
-                    chunks[-1]["end_line"] = actual_end_line
-                    chunks[-1]["name"] = (
-                        f"module-level-block_{chunks[-1]['start_line']}-{actual_end_line}"
-                    )
-            current_pos = actual_end_line
-
-        # Capture any remaining module-level code after the last node
-        if current_pos < len(lines):
-            remaining_code_chunk = "\n".join(lines[current_pos:]).strip()
-            if remaining_code_chunk:
-                chunks.append(
-                    {
-                        "file_path": file_path,
-                        "name": f"module-level_{current_pos + 1}-{len(lines)}",
-                        "type": "module-level",
-                        "content": remaining_code_chunk,
-                        "start_line": current_pos + 1,
-                        "end_line": len(lines),
-                    }
-                )
-
+        sections = _python_scope_sections(lines, tree.body, 1, len(lines), "", max_tokens)
     except SyntaxError as e:
         logger.error(f"Syntax error parsing Python file {file_path}: {e}")
-        return [
-            {
-                "file_path": file_path,
-                "name": "file_content_fallback",
-                "type": "file",
-                "content": code_content,
-                "start_line": 1,
-                "end_line": len(code_content.splitlines()),
-            }
-        ]
+        sections = [_Section(1, len(lines), "file_content_fallback", "file")]
     except Exception as e:
         logger.error(f"Error chunking Python file {file_path}: {e}")
-        return [
-            {
-                "file_path": file_path,
-                "name": "file_content_error_fallback",
-                "type": "file",
-                "content": code_content,
-                "start_line": 1,
-                "end_line": len(code_content.splitlines()),
-            }
+        sections = [_Section(1, len(lines), "file_content_error_fallback", "file")]
+
+    return _sections_to_chunks(file_path, lines, sections, max_tokens, min_tokens)
+
+
+# --- Other structured formats ---
+def _boundary_sections(
+    lines: list[str],
+    boundaries: list[tuple[int, str, str]],
+    comment_prefixes: tuple[str, ...] = (),
+) -> list[_Section]:
+    """Sections from (start line, name, type) boundaries, each running to the next one.
+
+    Comment lines directly above a boundary belong to the section it starts. Lines
+    before the first boundary become a text fragment.
+    """
+    starts = []
+    for start_line, name, section_type in sorted(boundaries):
+        floor = starts[-1][0] + 1 if starts else 1
+        while (
+            comment_prefixes
+            and start_line > floor
+            and lines[start_line - 2].lstrip().startswith(comment_prefixes)
+        ):
+            start_line -= 1
+        starts.append((start_line, name, section_type))
+
+    sections = []
+    if not starts or starts[0][0] > 1:
+        first_end = starts[0][0] - 1 if starts else len(lines)
+        sections.append(_Section(1, first_end, "", "text"))
+    for i, (start_line, name, section_type) in enumerate(starts):
+        end_line = starts[i + 1][0] - 1 if i + 1 < len(starts) else len(lines)
+        sections.append(_Section(start_line, end_line, name, section_type))
+    return sections
+
+
+def _markdown_sections(lines: list[str], max_tokens: int) -> list[_Section]:  # noqa: ARG001
+    """One section per heading, named by its heading path (``Install > Linux``)."""
+    boundaries = []
+    headings: list[tuple[int, str]] = []
+    in_fence = False
+    for line_no, line in enumerate(lines, start=1):
+        if _MARKDOWN_FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else _MARKDOWN_HEADING.match(line)
+        if match:
+            level = len(match.group(1))
+            headings = [heading for heading in headings if heading[0] < level]
+            headings.append((level, match.group(2)))
+            boundaries.append((line_no, " > ".join(title for _, title in headings), "section"))
+    return _boundary_sections(lines, boundaries)
+
+
+def _yaml_sections(lines: list[str], max_tokens: int) -> list[_Section]:
+    """One section per YAML document; a document over budget is split at top-level keys."""
+    documents = []
+    document_start = 1
+    for line_no, line in enumerate(lines, start=1):
+        if _YAML_DOCUMENT_SEPARATOR.match(line) and line_no > document_start:
+            documents.append((document_start, line_no - 1))
+            document_start = line_no
+    documents.append((document_start, len(lines)))
+
+    sections = []
+    for index, (start_line, end_line) in enumerate(documents, start=1):
+        kind = resource_name = None
+        in_metadata = False
+        for line in lines[start_line - 1 : end_line]:
+            kind_match = _YAML_KIND.match(line)
+            if kind_match:
+                kind = kind_match.group(1)
+            if line.startswith("metadata:"):
+                in_metadata = True
+            elif in_metadata and resource_name is None:
+                name_match = _YAML_METADATA_NAME.match(line)
+                if name_match:
+                    resource_name = name_match.group(1)
+                elif line and not line[0].isspace():
+                    in_metadata = False
+        name = "/".join(part for part in (kind, resource_name) if part) or f"document_{index}"
+
+        if _line_tokens(lines, start_line, end_line) <= max_tokens:
+            sections.append(_Section(start_line, end_line, name, "yaml-document"))
+            continue
+        key_boundaries = [
+            (line_no, f"{name}.{match.group(2).strip()}", "yaml-key")
+            for line_no in range(start_line, end_line + 1)
+            if (match := _YAML_TOP_LEVEL_KEY.match(lines[line_no - 1]))
         ]
+        if not key_boundaries or key_boundaries[0][0] != start_line:
+            key_boundaries.insert(0, (start_line, name, "yaml-document"))
+        for i, (key_start, key_name, key_type) in enumerate(key_boundaries):
+            key_end = key_boundaries[i + 1][0] - 1 if i + 1 < len(key_boundaries) else end_line
+            sections.append(_Section(key_start, key_end, key_name, key_type))
+    return sections
+
+
+def _json_sections(lines: list[str], max_tokens: int) -> list[_Section]:
+    """The whole document if it fits, otherwise one section per top-level member."""
+    if _line_tokens(lines, 1, len(lines)) <= max_tokens:
+        return [_Section(1, len(lines), "file_content", "file")]
+
+    boundaries = []
+    depth = 0
+    in_string = escaped = expecting_member = False
+    container = ""
+    key: Optional[list[str]] = None  # Characters of the top-level key being read
+    key_line = 0
+    for line_no, line in enumerate(lines, start=1):
+        for char in line:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                    continue
+                elif char == '"':
+                    in_string = False
+                    if key is not None:
+                        boundaries.append((key_line, "".join(key), "json-member"))
+                        key = None
+                    continue
+                if key is not None:
+                    key.append(char)
+                continue
+            if char.isspace():
+                continue
+            if expecting_member and char not in "]}":
+                expecting_member = False
+                if container == "[":
+                    boundaries.append((line_no, f"[{len(boundaries)}]", "json-member"))
+                elif char == '"':
+                    key, key_line = [], line_no
+            if char == '"':
+                in_string = True
+            elif char in "{[":
+                depth += 1
+                if depth == 1:
+                    container, expecting_member = char, True
+            elif char in "}]":
+                depth -= 1
+            elif char == "," and depth == 1:
+                expecting_member = True
+
+    # A minified document has all members on one line; it is split by characters instead
+    if len({line_no for line_no, _, _ in boundaries}) < len(boundaries):
+        return [_Section(1, len(lines), "file_content", "file")]
+    return _boundary_sections(lines, boundaries)
+
 
-    return chunks
+def _hcl_sections(lines: list[str], max_tokens: int) -> list[_Section]:  # noqa: ARG001
+    """One section per top-level block, named like ``resource.aws_instance.web``."""
+    boundaries = []
+    for line_no, line in enumerate(lines, start=1):
+        match = _HCL_BLOCK.match(line)
+        if match:
+            labels = [label.strip('"') for label in match.group(2).split()]
+            boundaries.append((line_no, ".".join([match.group(1), *labels]), "hcl-block"))
+    return _boundary_sections(lines, boundaries, comment_prefixes=("#", "//", "/*", "*"))
 
 
-def chunk_file_content(file_path: str, content: str, strategy: str = "python_ast") -> list[dict]:
+def _go_sections(lines: list[str], max_tokens: int) -> list[_Section]:  # noqa: ARG001
+    """One section per top-level func, type and var/const/import declaration."""
+    boundaries = []
+    for line_no, line in enumerate(lines, start=1):
+        if match := _GO_FUNC.match(line):
+            receiver, func_name = match.groups()
+            if receiver:
+                boundaries.append((line_no, f"{receiver}.{func_name}", "method"))
+            else:
+                boundaries.append((line_no, func_name, "function"))
+        elif match := _GO_TYPE.match(line):
+            boundaries.append((line_no, match.group(1), "type"))
+        elif _GO_DECLARATION.match(line):
+            boundaries.append((line_no, "", "text"))
+    return _boundary_sections(lines, boundaries, comment_prefixes=("//",))
+
+
+# Structure-aware splitters by file extension; other files are split by lines
+_SPLITTERS: dict[str, Callable[[list[str], int], list[_Section]]] = {
+    ".md": _markdown_sections,
+    ".markdown": _markdown_sections,
+    ".yaml": _yaml_sections,
+    ".yml": _yaml_sections,
+    ".json": _json_sections,
+    ".tf": _hcl_sections,
+    ".tfvars": _hcl_sections,
+    ".hcl": _hcl_sections,
+    ".go": _go_sections,
+}
+
+
+def chunk_file_content(
+    file_path: str,
+    content: str,
+    strategy: str = "python_ast",
+    max_tokens: int = RAG_CHUNK_MAX_TOKENS,
+    min_tokens: int = RAG_CHUNK_MIN_TOKENS,
+) -> list[dict]:
     """
     Chunks file content based on the specified strategy.
-    Currently supports 'python_ast' for Python files.
-    Other file types will be returned as a single chunk.
+    The default 'python_ast' strategy chunks by structure: Python by functions and
+    classes, Markdown by headings, YAML by documents, JSON by top-level members,
+    Terraform/HCL by blocks and Go by top-level declarations. Other file types and
+    strategies are split by lines.
+
+    Every chunk stays within ``max_tokens``, and adjacent chunks smaller than
+    ``min_tokens`` are coalesced.
 
     Args:
         file_path: The path to the file.
         content: The string content of the file.
         strategy: The chunking strategy to use.
+        max_tokens: Maximum estimated tokens per chunk.
+        min_tokens: Chunks smaller than this are merged with a neighbour.
 
     Returns:
         A list of dictionaries, where each dictionary represents a chunk.
     """
-    if strategy == "python_ast" and file_path.endswith(".py"):
-        return chunk_python_code(file_path, content)
-    # Fallback for non-Python files or other strategies
-    logger.info(f"Using fallback chunking for {file_path} (strategy: {strategy})")
-    return [
-        {
-            "file_path": file_path,
-            "name": "file_content",
-            "type": "file",  # General type for non-specific chunking
-            "content": content,
-            "start_line": 1,
-            "end_line": len(content.splitlines()),
-        }
-    ]
+    suffix = Path(file_path).suffix.lower()
+    if strategy == "python_ast" and suffix == ".py":
+        return chunk_python_code(file_path, content, max_tokens, min_tokens)
+
+    lines = content.splitlines()
+    splitter = _SPLITTERS.get(suffix) if strategy == "python_ast" else None
+    if splitter is not None:
+        try:
+            sections = splitter(lines, max_tokens)
+        except Exception as e:
+            logger.error(f"Error chunking {file_path} by structure, splitting by lines: {e}")
+            splitter = None
+    if splitter is None:
+        # Fallback for unstructured files or other strategies
+        logger.info(f"Using fallback chunking for {file_path} (strategy: {strategy})")
+        sections = [_Section(1, len(lines), "file_content", "file")]
+    return _sections_to_chunks(file_path, lines, sections, max_tokens, min_tokens)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+"""Embedding backends for RAG indexing and retrieval.
+
+The Google GenAI backend lives in ``indexing`` next to the client it uses; this module
+defines the backend interface and the local CPU backends that work without network
+access.
+"""
+
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+import logging
+import math
+import re
+from typing import Optional
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HASHING_DIMENSIONS = 1024
+DEFAULT_SENTENCE_TRANSFORMERS_MODEL = "all-MiniLM-L6-v2"
+
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_CASE_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z]|\d|\b)|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_COLLECTION_NAME_INVALID = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def tokenize_identifiers(text: str) -> list[str]:
+    """Lowercased identifiers plus the snake_case/camelCase words they are composed of."""
+    tokens = []
+    for identifier in _IDENTIFIER_PATTERN.findall(text):
+        tokens.append(identifier.lower())
+        parts = [
+            part.lower()
+            for piece in identifier.split("_")
+            for part in _CAMEL_CASE_PATTERN.findall(piece)
+        ]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class EmbeddingBackend(ABC):
+    """Turns texts into vectors for one embedding model.
+
+    Attributes:
+        name: Short backend identifier used to select it in configuration
+        model_name: Identifier of the model and its settings; vectors from different
+            model names must never be mixed in one collection or cache entry
+        cacheable: Whether embeddings are expensive enough to be worth caching on disk
+    """
+
+    name: str = ""
+    model_name: str = ""
+    cacheable: bool = True
+
+    @abstractmethod
+    def embed(
+        self, texts: list[str], task_type: str = "RETRIEVAL_DOCUMENT", max_retries: int = 3
+    ) -> Optional[list[list[float]]]:
+        """Embed texts, returning one vector per text or None on failure.
+
+        Args:
+            texts: The texts to embed
+            task_type: RETRIEVAL_DOCUMENT for indexed chunks, RETRIEVAL_QUERY for queries
+            max_retries: Retries for transient failures of remote backends
+        """
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """Deterministic CPU embeddings from a signed hashing vectorizer.
+
+    Texts are split into identifiers and their snake_case/camelCase parts, term counts
+    are weighted sublinearly (1 + log tf) and hashed into a fixed number of signed
+    dimensions, and the result is L2-normalized. No model download or network access
+    is needed, which makes indexing fast and reproducible in CI and air-gapped setups,
+    at the cost of purely lexical (not semantic) similarity.
+    """
+
+    name = "hashing"
+    cacheable = False
+
+    def __init__(self, dimensions: int = DEFAULT_HASHING_DIMENSIONS):
+        self.dimensions = max(16, dimensions)
+        self.model_name = f"hashing-v1-{self.dimensions}"
+        self._feature = lru_cache(maxsize=65536)(self._hash_feature)
+
+    tokenize = staticmethod(tokenize_identifiers)
+
+    def _hash_feature(self, token: str) -> tuple[int, float]:
+        digest = zlib.crc32(token.encode("utf-8"))
+        return digest % self.dimensions, 1.0 if (digest // self.dimensions) & 1 else -1.0
+
+    def embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token, count in Counter(self.tokenize(text)).items():
+            index, sign = self._feature(token)
+            vector[index] += sign * (1.0 + math.log(count))
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def embed(
+        self,
+        texts: list[str],
+        task_type: str = "RETRIEVAL_DOCUMENT",  # noqa: ARG002
+        max_retries: int = 3,  # noqa: ARG002
+    ) -> Optional[list[list[float]]]:
+        return [self.embed_one(text).tolist() for text in texts]
+
+
+class SentenceTransformerEmbeddingBackend(EmbeddingBackend):
+    """Local embeddings from a sentence-transformers model (optional dependency)."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model: str = DEFAULT_SENTENCE_TRANSFORMERS_MODEL):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The sentence-transformers embedding backend requires the "
+                "'sentence-transformers' package (pip install sentence-transformers)."
+            ) from e
+        self.model_name = f"sentence-transformers/{model}"
+        self._model = SentenceTransformer(model)
+
+    def embed(
+        self,
+        texts: list[str],
+        task_type: str = "RETRIEVAL_DOCUMENT",  # noqa: ARG002
+        max_retries: int = 3,  # noqa: ARG002
+    ) -> Optional[list[list[float]]]:
+        try:
+            vectors = self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+            return vectors.tolist()
+        except Exception as e:
+            logger.error(f"sentence-transformers embedding failed: {e}")
+            return None
+
+
+def create_local_backend(
+    name: str, hashing_dimensions: int, sentence_transformers_model: str
+) -> EmbeddingBackend:
+    """Create a local embedding backend by its configuration name.
+
+    Raises:
+        ValueError: If the name is not a known local backend
+        ImportError: If the backend's optional dependency is not installed
+    """
+    if name == HashingEmbeddingBackend.name:
+        return HashingEmbeddingBackend(hashing_dimensions)
+    if name == SentenceTransformerEmbeddingBackend.name:
+        return SentenceTransformerEmbeddingBackend(sentence_transformers_model)
+    raise ValueError(f"Unknown embedding backend: {name!r}")
+
+
+def collection_name_for_backend(base_name: str, backend: EmbeddingBackend) -> str:
+    """Return the Chroma collection name holding vectors of a backend's model.
+
+    Each model gets its own collection so vectors of different models never mix.
+    Chroma collection names are limited to 63 characters of ``[A-Za-z0-9._-]``.
+    """
+    suffix = _COLLECTION_NAME_INVALID.sub("-", backend.model_name).strip("-_")
+    return f"{base_name}_{suffix}"[:63].rstrip("-_")
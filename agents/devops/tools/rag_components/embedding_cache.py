@@ -0,0 +1,154 @@
+"""Persistent cache of embeddings keyed by model, task type and content hash."""
+
+from array import array
+import hashlib
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH_SIZE = 500
+
+
+def content_digest(content: str) -> str:
+    """Return the sha256 hex digest that identifies a chunk's content."""
+    return hashlib.sha256(content.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed store of float32 embedding vectors.
+
+    Entries are keyed by (embedding model, task type, sha256 of the content), so the
+    same text is embedded once no matter which collection, workspace or re-index run
+    asks for it. The cache lives outside the ChromaDB data directory and therefore
+    survives purging the index. Vectors are stored as packed float32 blobs.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Initialize the embedding cache.
+
+        Args:
+            path: Path to the sqlite file; None keeps the cache in memory only
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = self._open(path)
+        self.hits = 0
+        self.misses = 0
+
+    def _open(self, path: Optional[str]) -> sqlite3.Connection:
+        if path:
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(path, check_same_thread=False)
+                self._create_schema(db)
+                logger.info(f"Embedding cache enabled at {path}")
+                return db
+            except Exception as e:
+                logger.warning(f"Could not open embedding cache at {path}, using memory: {e}")
+        self.path = None
+        db = sqlite3.connect(":memory:", check_same_thread=False)
+        self._create_schema(db)
+        return db
+
+    @staticmethod
+    def _create_schema(db: sqlite3.Connection) -> None:
+        db.execute("PRAGMA synchronous=OFF")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, task_type TEXT NOT NULL, digest TEXT NOT NULL, "
+            "vector BLOB NOT NULL, PRIMARY KEY (model, task_type, digest))"
+        )
+        db.commit()
+
+    def get_many(
+        self, model: str, task_type: str, contents: list[str]
+    ) -> list[Optional[list[float]]]:
+        """Return the cached embedding for each content, or None where it is missing."""
+        digests = [content_digest(content) for content in contents]
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(digests))
+            for start in range(0, len(unique), _LOOKUP_BATCH_SIZE):
+                batch = unique[start : start + _LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                try:
+                    rows = self._db.execute(
+                        "SELECT digest, vector FROM embeddings WHERE model = ? AND task_type = ? "
+                        f"AND digest IN ({placeholders})",
+                        (model, task_type, *batch),
+                    ).fetchall()
+                except sqlite3.Error as e:
+                    logger.debug(f"Embedding cache lookup failed: {e}")
+                    rows = []
+                for digest, vector in rows:
+                    found[digest] = array("f", vector).tolist()
+
+            results = [found.get(digest) for digest in digests]
+            hits = sum(1 for result in results if result is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+            return results
+
+    def put_many(
+        self, model: str, task_type: str, contents: list[str], embeddings: list[list[float]]
+    ) -> None:
+        """Store embeddings for the given contents."""
+        rows = [
+            (model, task_type, content_digest(content), array("f", embedding).tobytes())
+            for content, embedding in zip(contents, embeddings)
+            if embedding
+        ]
+        with self._lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, task_type, digest, vector) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.debug(f"Embedding cache write failed: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self) -> None:
+        """Delete every cached embedding and reset counters."""
+        with self._lock:
+            self._db.execute("DELETE FROM embeddings")
+            self._db.commit()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Return cache size and hit statistics for monitoring."""
+        entries = len(self)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "path": self.path,
+            }
+
+
+_default_embedding_cache: Optional[EmbeddingCache] = None
+_default_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, creating it from config on first use."""
+    global _default_embedding_cache
+    with _default_embedding_cache_lock:
+        if _default_embedding_cache is None:
+            from ...config import RAG_EMBEDDING_CACHE_PATH
+
+            _default_embedding_cache = EmbeddingCache(RAG_EMBEDDING_CACHE_PATH or None)
+        return _default_embedding_cache
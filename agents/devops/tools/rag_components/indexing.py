@@ -2,7 +2,7 @@ import logging
 import os
 from pathlib import Path
 import tempfile
-import time
+import threading
 
 import chromadb
 from dotenv import load_dotenv  # Added import
@@ -10,9 +10,31 @@ from google import (
     genai as google_genai_sdk,  # Renamed to avoid conflict with a potential genai client instance
 )
 from google.api_core import exceptions as google_exceptions
+from google.genai import errors as google_genai_errors
 
 # Import agent configuration
-from ...config import CHROMA_DATA_PATH as CONFIGURED_CHROMA_DATA_PATH, GOOGLE_API_KEY
+from ...config import (
+    CHROMA_DATA_PATH as CONFIGURED_CHROMA_DATA_PATH,
+    GOOGLE_API_KEY,
+    RAG_EMBEDDING_BACKEND,
+    RAG_HASHING_EMBEDDING_DIMENSIONS,
+    RAG_SENTENCE_TRANSFORMERS_MODEL,
+)
+from .embedding_backends import (
+    EmbeddingBackend,
+    HashingEmbeddingBackend,
+    collection_name_for_backend,
+    create_local_backend,
+)
+from .embedding_cache import get_embedding_cache
+from .lexical_index import LexicalIndex, get_lexical_index
+from .manifest import IndexManifest, get_index_manifest
+from .rate_limiter import (
+    estimate_tokens,
+    get_embedding_rate_limiter,
+    get_retry_after,
+    is_rate_limit_error,
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -66,7 +88,7 @@ def get_chroma_data_path():
 
 
 CHROMA_DATA_PATH = get_chroma_data_path()
-CHROMA_COLLECTION_NAME = "devops_codebase_index_v2"  # Changed name to reflect new library
+BASE_COLLECTION_NAME = "devops_codebase_index_v2"  # Changed name to reflect new library
 EMBEDDING_MODEL_NAME = "models/text-embedding-004"
 
 # --- Google AI Client ---
@@ -86,6 +108,58 @@ except Exception as e:
     genai_client = None  # Set client to None on other errors
 
 
+# --- Embedding Backend ---
+class GoogleGenAIEmbeddingBackend(EmbeddingBackend):
+    """Embeddings from the Google GenAI API, rate limited and retried on 429s."""
+
+    name = "google"
+    model_name = EMBEDDING_MODEL_NAME
+
+    def embed(
+        self, texts: list[str], task_type: str = "RETRIEVAL_DOCUMENT", max_retries: int = 3
+    ) -> list[list[float]] | None:
+        return _request_embeddings(texts, task_type, max_retries)
+
+
+def create_embedding_backend(name: str) -> EmbeddingBackend:
+    """Create the embedding backend selected in configuration.
+
+    A local backend whose optional dependency is missing falls back to the hashing
+    backend, so offline setups keep working.
+    """
+    name = (name or GoogleGenAIEmbeddingBackend.name).strip().lower()
+    if name == GoogleGenAIEmbeddingBackend.name:
+        return GoogleGenAIEmbeddingBackend()
+    try:
+        return create_local_backend(
+            name, RAG_HASHING_EMBEDDING_DIMENSIONS, RAG_SENTENCE_TRANSFORMERS_MODEL
+        )
+    except ImportError as e:
+        logger.error(f"{e} Falling back to the hashing embedding backend.")
+    except ValueError as e:
+        logger.error(f"{e}. Falling back to the hashing embedding backend.")
+    return HashingEmbeddingBackend(RAG_HASHING_EMBEDDING_DIMENSIONS)
+
+
+EMBEDDING_BACKEND = create_embedding_backend(RAG_EMBEDDING_BACKEND)
+# Every backend writes to its own collection so vectors of different models never mix;
+# the Google backend keeps the original collection name.
+CHROMA_COLLECTION_NAME = (
+    BASE_COLLECTION_NAME
+    if isinstance(EMBEDDING_BACKEND, GoogleGenAIEmbeddingBackend)
+    else collection_name_for_backend(BASE_COLLECTION_NAME, EMBEDDING_BACKEND)
+)
+logger.info(
+    f"Using embedding backend '{EMBEDDING_BACKEND.name}' ({EMBEDDING_BACKEND.model_name}) "
+    f"with collection '{CHROMA_COLLECTION_NAME}'"
+)
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """Return the configured embedding backend."""
+    return EMBEDDING_BACKEND
+
+
 # --- ChromaDB Client and Collection ---
 def create_chroma_client():
     """Create a ChromaDB client with robust error handling and fallbacks."""
@@ -144,19 +218,60 @@ def get_chroma_collection():
 def embed_chunks_batch(
     chunks_content: list[str], task_type="RETRIEVAL_DOCUMENT", max_retries=3
 ) -> list[list[float]] | None:
+    """Embed texts with the configured backend.
+
+    For backends worth caching, repeated content is served from the embedding cache:
+    only cache misses are embedded (deduplicated), and their embeddings are stored
+    for later calls.
+    """
     if not chunks_content:
         logger.warning("No content provided to embed_chunks_batch.")
         return []
 
+    backend = get_embedding_backend()
+    if not backend.cacheable:
+        return backend.embed(chunks_content, task_type, max_retries)
+
+    cache = get_embedding_cache()
+    embeddings = cache.get_many(backend.model_name, task_type, chunks_content)
+    misses = list(
+        dict.fromkeys(
+            content for content, embedding in zip(chunks_content, embeddings) if embedding is None
+        )
+    )
+    if not misses:
+        logger.info(f"Served {len(chunks_content)} embeddings from the embedding cache.")
+        return embeddings
+
+    new_embeddings = backend.embed(misses, task_type, max_retries)
+    if new_embeddings is None or len(new_embeddings) != len(misses):
+        return new_embeddings
+    cache.put_many(backend.model_name, task_type, misses, new_embeddings)
+
+    by_content = dict(zip(misses, new_embeddings))
+    return [
+        embedding if embedding is not None else by_content[content]
+        for content, embedding in zip(chunks_content, embeddings)
+    ]
+
+
+def _request_embeddings(
+    chunks_content: list[str], task_type: str, max_retries: int
+) -> list[list[float]] | None:
+    """Call the embedding API, going through the shared rate limiter."""
     # Ensure the GenAI client is available
     if not genai_client:
         logger.error("Google GenAI client not initialized. Cannot generate embeddings.")
         return None
 
     embeddings_list = []
+    rate_limiter = get_embedding_rate_limiter()
+    request_tokens = sum(estimate_tokens(content) for content in chunks_content)
 
     for attempt in range(max_retries + 1):
         try:
+            # Wait for quota instead of sending a request the API would reject
+            rate_limiter.acquire(request_tokens)
             logger.info(
                 f"Requesting embeddings for {len(chunks_content)} chunks using "
                 f"{EMBEDDING_MODEL_NAME}..."
@@ -167,6 +282,7 @@ def embed_chunks_batch(
                 contents=chunks_content,
                 config=google_genai_sdk.types.EmbedContentConfig(task_type=task_type),
             )
+            rate_limiter.record_success()
             raw_embeddings = result.embeddings
             if raw_embeddings:
                 embeddings_list = [embedding.values for embedding in raw_embeddings]
@@ -175,24 +291,16 @@ def embed_chunks_batch(
             logger.info(f"Successfully generated {len(embeddings_list)} embeddings.")
             return embeddings_list
 
-        except google_exceptions.GoogleAPIError as e:
-            error_str = str(e)
-
-            # Check if this is a rate limit error
-            if (
-                ("429" in error_str and "RESOURCE_EXHAUSTED" in error_str)
-                or ("quota" in error_str.lower())
-                or ("rate limit" in error_str.lower())
-            ):
+        except (google_exceptions.GoogleAPIError, google_genai_errors.APIError) as e:
+            if is_rate_limit_error(e):
+                # The limiter pauses every caller until Retry-After and lowers its rates;
+                # the next acquire() waits accordingly
+                delay = rate_limiter.record_rate_limited(get_retry_after(e))
                 if attempt < max_retries:
-                    # Calculate exponential backoff delay (60s, 120s, 240s)
-                    delay = 60 * (2**attempt)
                     logger.warning(
                         f"Rate limit hit during embedding (attempt {attempt + 1}/"
-                        f"{max_retries + 1}). "
-                        f"Waiting {delay} seconds before retry..."
+                        f"{max_retries + 1}). Retrying in {delay:.1f} seconds..."
                     )
-                    time.sleep(delay)
                     continue
                 logger.error(
                     f"Rate limit exceeded after {max_retries + 1} attempts during embedding. "
@@ -202,10 +310,10 @@ def embed_chunks_batch(
             logger.error(f"Google API error during embedding: {e}")
             return None
 
-        except AttributeError:
+        except AttributeError as ae:
             logger.error(
                 "Attribute error during embedding (check SDK setup or API changes for "
-                "embed_content): {ae}"
+                f"embed_content): {ae}"
             )
             return None
         except Exception as e:
@@ -215,6 +323,75 @@ def embed_chunks_batch(
     return None
 
 
+# Bumped on every change to the indexed data so retrieval caches know when to invalidate
+_index_generation = 0
+_index_generation_lock = threading.Lock()
+
+
+def get_index_generation() -> int:
+    """Return the current index generation."""
+    return _index_generation
+
+
+def bump_index_generation() -> int:
+    """Record that the indexed data changed, returning the new generation."""
+    global _index_generation
+    with _index_generation_lock:
+        _index_generation += 1
+        return _index_generation
+
+
+def get_collection_manifest() -> IndexManifest:
+    """Return the manifest of files indexed into the configured collection."""
+    return get_index_manifest(CHROMA_DATA_PATH, CHROMA_COLLECTION_NAME)
+
+
+def get_collection_lexical_index() -> LexicalIndex:
+    """Return the lexical (BM25) index of the chunks in the configured collection."""
+    return get_lexical_index(CHROMA_DATA_PATH, CHROMA_COLLECTION_NAME)
+
+
+def rebuild_lexical_index(collection, page_size: int = 1000) -> int:
+    """Rebuild the lexical index from the chunks stored in the collection.
+
+    Used when a collection was indexed before the lexical index existed, or when the
+    lexical index file was lost. Returns the number of chunks indexed.
+    """
+    lexical_index = get_collection_lexical_index()
+    lexical_index.clear()
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas", "documents"], limit=page_size, offset=offset)
+        if not page or not page["ids"]:
+            break
+        lexical_index.add_chunks(page["ids"], page["metadatas"], page["documents"])
+        offset += len(page["ids"])
+    lexical_index.save()
+    bump_index_generation()
+    logger.info(f"Rebuilt lexical index with {offset} chunks from collection '{collection.name}'.")
+    return offset
+
+
+def make_chunk_id(chunk_data: dict) -> str:
+    """Return the collection id of a chunk produced by the chunking module."""
+    return f"{chunk_data['file_path']}_{chunk_data['type']}_{chunk_data['name']}_{chunk_data['start_line']}-{chunk_data['end_line']}"  # noqa: E501
+
+
+def delete_chunks(collection, chunk_ids: list[str]) -> bool:
+    """Delete chunks by id, returning False if the deletion failed."""
+    if not chunk_ids:
+        return True
+    try:
+        collection.delete(ids=list(chunk_ids))
+        get_collection_lexical_index().remove_chunks(chunk_ids)
+        bump_index_generation()
+        logger.info(f"Deleted {len(chunk_ids)} chunks from collection '{collection.name}'.")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to delete {len(chunk_ids)} chunks: {e}")
+        return False
+
+
 def index_file_chunks(collection, file_chunks_data: list[dict]):
     if not collection:
         logger.error("ChromaDB collection not available. Cannot index chunks.")
@@ -239,13 +416,23 @@ def index_file_chunks(collection, file_chunks_data: list[dict]):
         )
         return False
 
+    return upsert_embedded_chunks(collection, file_chunks_data, embeddings)
+
+
+def upsert_embedded_chunks(
+    collection, chunks_data: list[dict], embeddings: list[list[float]]
+) -> bool:
+    """Write chunks and their embeddings to the collection in a single upsert.
+
+    Upserting (rather than adding) means re-indexing a file replaces chunks that keep
+    their id. The chunks may come from any number of files.
+    """
     ids = []
     metadatas = []
     documents = []
 
-    for _i, chunk_data in enumerate(file_chunks_data):
-        chunk_id = f"{chunk_data['file_path']}_{chunk_data['type']}_{chunk_data['name']}_{chunk_data['start_line']}-{chunk_data['end_line']}"  # noqa: E501
-        ids.append(chunk_id)
+    for chunk_data in chunks_data:
+        ids.append(make_chunk_id(chunk_data))
 
         metadata = {
             "file_path": str(chunk_data["file_path"]),
@@ -257,15 +444,16 @@ def index_file_chunks(collection, file_chunks_data: list[dict]):
         metadatas.append(metadata)
         documents.append(chunk_data["content"])
 
+    file_count = len({chunk_data["file_path"] for chunk_data in chunks_data})
     try:
         logger.info(f"Adding {len(ids)} documents to ChromaDB collection '{collection.name}'...")
-        collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
-        logger.info(
-            f"Successfully added {len(ids)} documents to collection for file {file_path_logging}."
-        )
+        collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+        get_collection_lexical_index().add_chunks(ids, metadatas, documents)
+        bump_index_generation()
+        logger.info(f"Successfully added {len(ids)} documents from {file_count} file(s).")
         return True
     except Exception as e:
-        logger.error(f"Failed to add documents to ChromaDB for {file_path_logging}: {e}")
+        logger.error(f"Failed to add documents to ChromaDB for {file_count} file(s): {e}")
 
         # Special case for readonly database error
         if "readonly database" in str(e).lower():
@@ -287,8 +475,8 @@ def index_file_chunks(collection, file_chunks_data: list[dict]):
                 chroma_client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
                 new_collection = chroma_client.get_or_create_collection(name=CHROMA_COLLECTION_NAME)
 
-                # Try indexing again with the new collection
-                return index_file_chunks(new_collection, file_chunks_data)
+                # Try writing again with the new collection
+                return upsert_embedded_chunks(new_collection, chunks_data, embeddings)
             except Exception as e2:
                 logger.error(f"Failed to recover from readonly database error: {e2}")
 
@@ -304,6 +492,13 @@ def clear_index():
 
     try:
         collection.delete(where={})  # Delete all documents
+        bump_index_generation()
+        manifest = get_collection_manifest()
+        manifest.clear()
+        manifest.save()
+        lexical_index = get_collection_lexical_index()
+        lexical_index.clear()
+        lexical_index.save()
         logger.info(f"Successfully cleared all documents from collection {collection.name}.")
         return True
     except Exception as e:
@@ -327,6 +522,9 @@ def clear_index():
                 chroma_client = chromadb.PersistentClient(path=CHROMA_DATA_PATH)
                 # Getting a new collection in a new DB means it will be empty
                 get_chroma_collection()
+                get_collection_manifest().clear()
+                get_collection_lexical_index().clear()
+                bump_index_generation()
                 logger.info(f"Successfully created new empty database at {CHROMA_DATA_PATH}")
                 return True
             except Exception as e2:
@@ -348,9 +546,20 @@ def get_index_stats():
             "count": count,
             "collection_name": CHROMA_COLLECTION_NAME,
             "data_path": CHROMA_DATA_PATH,
+            "index_generation": get_index_generation(),
+            "embedding_backend": EMBEDDING_BACKEND.name,
+            "embedding_model": EMBEDDING_BACKEND.model_name,
+            "lexical_index_chunks": len(get_collection_lexical_index()),
+            "rate_limiter": get_embedding_rate_limiter().state(),
+            "embedding_cache": get_embedding_cache().stats(),
         }
     except Exception as e:
-        return {"status": "error", "message": str(e), "data_path": CHROMA_DATA_PATH}
+        return {
+            "status": "error",
+            "message": str(e),
+            "data_path": CHROMA_DATA_PATH,
+            "rate_limiter": get_embedding_rate_limiter().state(),
+        }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+"""BM25 inverted index over chunk text and symbol names for lexical RAG retrieval."""
+
+from collections import Counter
+import heapq
+import json
+import logging
+import math
+import os
+from pathlib import Path
+import threading
+
+from .embedding_backends import tokenize_identifiers
+
+logger = logging.getLogger(__name__)
+
+LEXICAL_INDEX_VERSION = 1
+
+# BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Symbol names count as this many occurrences, so identifier lookups favor definitions
+SYMBOL_NAME_BOOST = 3
+
+
+def chunk_terms(content: str, name: str = "", chunk_type: str = "") -> Counter:
+    """Term frequencies of a chunk: its text, its boosted symbol name and its type."""
+    terms = Counter(tokenize_identifiers(content))
+    for term in tokenize_identifiers(name):
+        terms[term] += SYMBOL_NAME_BOOST
+    if chunk_type:
+        terms[f"type:{chunk_type.lower()}"] += 1
+    return terms
+
+
+class LexicalIndex:
+    """BM25 inverted index mapping terms to the chunk ids containing them.
+
+    Only term frequencies are kept; chunk text and metadata stay in the Chroma
+    collection. The index is stored as JSON next to the ChromaDB data (one file per
+    collection) and written atomically, like the index manifest.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._documents: dict[str, dict[str, int]] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._lengths: dict[str, int] = {}
+        self._total_length = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.is_file():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") != LEXICAL_INDEX_VERSION:
+                logger.warning(f"Ignoring lexical index {self.path} with unknown version")
+                return
+            for chunk_id, terms in data["documents"].items():
+                self._add(chunk_id, terms)
+            logger.info(f"Loaded lexical index with {len(self._documents)} chunks from {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not load lexical index {self.path}, starting empty: {e}")
+            self._documents, self._postings, self._lengths = {}, {}, {}
+            self._total_length = 0
+
+    def _add(self, chunk_id: str, terms: dict[str, int]) -> None:
+        self._remove(chunk_id)
+        self._documents[chunk_id] = dict(terms)
+        length = sum(terms.values())
+        self._lengths[chunk_id] = length
+        self._total_length += length
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[chunk_id] = frequency
+
+    def _remove(self, chunk_id: str) -> None:
+        terms = self._documents.pop(chunk_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(chunk_id)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def add_chunks(self, chunk_ids: list[str], metadatas: list[dict], documents: list[str]) -> None:
+        """Index (or re-index) chunks with their Chroma metadata and text."""
+        with self._lock:
+            for chunk_id, metadata, document in zip(chunk_ids, metadatas, documents):
+                metadata = metadata or {}
+                terms = chunk_terms(
+                    document or "", metadata.get("chunk_name", ""), metadata.get("type", "")
+                )
+                self._add(chunk_id, terms)
+            self._dirty = True
+
+    def remove_chunks(self, chunk_ids: list[str]) -> None:
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+            self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents, self._postings, self._lengths = {}, {}, {}
+            self._total_length = 0
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def search(self, query: str, top_k: int) -> list[tuple[str, float]]:
+        """Return up to ``top_k`` (chunk id, BM25 score) pairs, best first."""
+        query_terms = set(tokenize_identifiers(query))
+        with self._lock:
+            document_count = len(self._documents)
+            if not document_count or not query_terms:
+                return []
+            average_length = self._total_length / document_count
+            scores: dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    length_norm = 1.0 - BM25_B + BM25_B * self._lengths[chunk_id] / average_length
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * (
+                        frequency * (BM25_K1 + 1.0) / (frequency + BM25_K1 * length_norm)
+                    )
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def save(self) -> None:
+        """Write the index atomically if it changed since it was loaded or last saved."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": LEXICAL_INDEX_VERSION, "documents": dict(self._documents)}
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".tmp{os.getpid()}")
+            tmp_path.write_text(json.dumps(data), encoding="utf-8")
+            tmp_path.replace(self.path)
+        except Exception as e:
+            logger.error(f"Failed to save lexical index {self.path}: {e}")
+
+
+_indexes: dict[Path, LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(data_path: Path, collection_name: str) -> LexicalIndex:
+    """Return the (cached) lexical index for a collection stored under ``data_path``."""
+    path = Path(data_path) / f"lexical_index_{collection_name}.json"
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = LexicalIndex(path)
+        return index
@@ -0,0 +1,117 @@
+"""Per-collection manifest of indexed files for incremental RAG indexing."""
+
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class ManifestEntry:
+    """What was indexed for one file: its stat signature, content hash and chunk ids."""
+
+    size: int
+    mtime_ns: int
+    content_hash: str
+    chunk_ids: list[str] = field(default_factory=list)
+
+    def matches_stat(self, stat_result: os.stat_result) -> bool:
+        """Whether the file's size and modification time are unchanged."""
+        return self.size == stat_result.st_size and self.mtime_ns == stat_result.st_mtime_ns
+
+
+def hash_content(content: str) -> str:
+    """Content hash recorded in the manifest."""
+    return hashlib.sha256(content.encode("utf-8", errors="ignore")).hexdigest()
+
+
+class IndexManifest:
+    """Maps absolute file paths to the ``ManifestEntry`` they were indexed with.
+
+    The manifest is stored as JSON next to the ChromaDB data (one file per collection)
+    and written atomically, so an interrupted run leaves the previous manifest intact.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._entries: dict[str, ManifestEntry] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.is_file():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") != MANIFEST_VERSION:
+                logger.warning(f"Ignoring index manifest {self.path} with unknown version")
+                return
+            self._entries = {
+                file_path: ManifestEntry(**entry) for file_path, entry in data["files"].items()
+            }
+            logger.info(f"Loaded index manifest with {len(self._entries)} files from {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not load index manifest {self.path}, starting empty: {e}")
+            self._entries = {}
+
+    def get(self, file_path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            return self._entries.get(file_path)
+
+    def set(self, file_path: str, entry: ManifestEntry) -> None:
+        with self._lock:
+            self._entries[file_path] = entry
+
+    def remove(self, file_path: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            return self._entries.pop(file_path, None)
+
+    def paths_under(self, root: Path) -> list[str]:
+        """Return the indexed file paths located under a directory."""
+        prefix = str(root).rstrip(os.sep) + os.sep
+        with self._lock:
+            return [file_path for file_path in self._entries if file_path.startswith(prefix)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        with self._lock:
+            data = {
+                "version": MANIFEST_VERSION,
+                "files": {path: asdict(entry) for path, entry in self._entries.items()},
+            }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".tmp{os.getpid()}")
+            tmp_path.write_text(json.dumps(data), encoding="utf-8")
+            tmp_path.replace(self.path)
+        except Exception as e:
+            logger.error(f"Failed to save index manifest {self.path}: {e}")
+
+
+_manifests: dict[Path, IndexManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_index_manifest(data_path: Path, collection_name: str) -> IndexManifest:
+    """Return the (cached) manifest for a collection stored under ``data_path``."""
+    path = Path(data_path) / f"index_manifest_{collection_name}.json"
+    with _manifests_lock:
+        manifest = _manifests.get(path)
+        if manifest is None:
+            manifest = _manifests[path] = IndexManifest(path)
+        return manifest
@@ -0,0 +1,180 @@
+"""Batched, concurrent embedding of chunks from many files for RAG indexing."""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import logging
+from typing import Any
+
+from ...config import (
+    RAG_EMBEDDING_BATCH_MAX_TOKENS,
+    RAG_EMBEDDING_BATCH_SIZE,
+    RAG_EMBEDDING_MAX_CONCURRENCY,
+)
+from . import indexing
+from .rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Chunks buffered before they are written to the collection in one upsert
+DEFAULT_WRITE_BATCH_SIZE = 500
+
+
+class EmbeddingPipeline:
+    """Embeds the chunks of many files with few, full and concurrent requests.
+
+    Chunks are packed into embedding requests across file boundaries, up to
+    ``max_batch_size`` chunks and ``max_batch_tokens`` estimated tokens per request.
+    At most ``max_in_flight`` requests run at once; adding more chunks blocks until a
+    request finishes, which bounds memory and keeps throughput at the quota the API
+    grants rather than at a fixed pace.
+
+    A file is written to the collection only once all of its chunks are embedded, and
+    completed files are written together in bulk upserts. If any request carrying a
+    chunk of a file fails, nothing of that file is written.
+
+    Usage::
+
+        with EmbeddingPipeline(collection) as pipeline:
+            for file_path, chunks in files:
+                pipeline.add_file(file_path, chunks)
+            results = pipeline.close()  # {file_path: indexed successfully}
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_batch_size: int = RAG_EMBEDDING_BATCH_SIZE,
+        max_batch_tokens: int = RAG_EMBEDDING_BATCH_MAX_TOKENS,
+        max_in_flight: int = RAG_EMBEDDING_MAX_CONCURRENCY,
+        write_batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+    ):
+        self.collection = collection
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self.max_in_flight = max(1, max_in_flight)
+        self.write_batch_size = max(1, write_batch_size)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix="rag-embed"
+        )
+        self._in_flight: dict[Future, list[tuple[str, dict]]] = {}
+        self._batch: list[tuple[str, dict]] = []
+        self._batch_tokens = 0
+
+        # Completion callbacks run on the caller's thread (in _wait_for), so no locking
+        self._pending_chunks: dict[str, int] = {}
+        self._embedded: dict[str, list[tuple[dict, list[float]]]] = {}
+        self._failed_files: set[str] = set()
+        self._write_buffer: list[tuple[dict, list[float]]] = []
+        self._buffered_files: list[str] = []
+        self.results: dict[str, bool] = {}
+        self.stats: dict[str, int] = {
+            "files": 0,
+            "chunks": 0,
+            "embedding_requests": 0,
+            "failed_requests": 0,
+            "writes": 0,
+        }
+
+    def __enter__(self) -> "EmbeddingPipeline":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def add_file(self, file_path: str, chunks: list[dict]) -> None:
+        """Queue all chunks of one file for embedding."""
+        if not chunks:
+            return
+        self.stats["files"] += 1
+        self.stats["chunks"] += len(chunks)
+        self._pending_chunks[file_path] = self._pending_chunks.get(file_path, 0) + len(chunks)
+        self._embedded.setdefault(file_path, [])
+
+        for chunk in chunks:
+            tokens = estimate_tokens(chunk["content"])
+            if self._batch and (
+                len(self._batch) >= self.max_batch_size
+                or self._batch_tokens + tokens > self.max_batch_tokens
+            ):
+                self._submit_batch()
+            self._batch.append((file_path, chunk))
+            self._batch_tokens += tokens
+
+    def close(self) -> dict[str, bool]:
+        """Embed and write everything queued, returning whether each file was indexed."""
+        if self._batch:
+            self._submit_batch()
+        while self._in_flight:
+            self._wait_for(FIRST_COMPLETED)
+        self._flush_writes()
+        self._executor.shutdown(wait=True)
+        logger.info(
+            f"Embedded {self.stats['chunks']} chunks from {self.stats['files']} files in "
+            f"{self.stats['embedding_requests']} requests and {self.stats['writes']} writes."
+        )
+        return self.results
+
+    def _submit_batch(self) -> None:
+        while len(self._in_flight) >= self.max_in_flight:
+            self._wait_for(FIRST_COMPLETED)
+
+        batch, self._batch, self._batch_tokens = self._batch, [], 0
+        contents = [chunk["content"] for _, chunk in batch]
+        future = self._executor.submit(
+            indexing.embed_chunks_batch, contents, task_type="RETRIEVAL_DOCUMENT"
+        )
+        self._in_flight[future] = batch
+        self.stats["embedding_requests"] += 1
+
+    def _wait_for(self, return_when: str) -> None:
+        done, _ = wait(list(self._in_flight), return_when=return_when)
+        for future in done:
+            batch = self._in_flight.pop(future)
+            try:
+                embeddings = future.result()
+            except Exception as e:
+                logger.error(f"Embedding request for {len(batch)} chunks raised: {e}")
+                embeddings = None
+            self._on_batch_embedded(batch, embeddings)
+
+    def _on_batch_embedded(
+        self, batch: list[tuple[str, dict]], embeddings: list[list[float]] | None
+    ) -> None:
+        if embeddings is None or len(embeddings) != len(batch):
+            self.stats["failed_requests"] += 1
+            failed = {file_path for file_path, _ in batch}
+            logger.error(
+                f"Failed to generate embeddings for a batch of {len(batch)} chunks from "
+                f"{len(failed)} file(s)."
+            )
+            self._failed_files.update(failed)
+            embeddings = [None] * len(batch)
+
+        for (file_path, chunk), embedding in zip(batch, embeddings):
+            if file_path not in self._failed_files:
+                self._embedded[file_path].append((chunk, embedding))
+            self._pending_chunks[file_path] -= 1
+            if self._pending_chunks[file_path] == 0:
+                self._on_file_embedded(file_path)
+
+    def _on_file_embedded(self, file_path: str) -> None:
+        del self._pending_chunks[file_path]
+        embedded = self._embedded.pop(file_path)
+        if file_path in self._failed_files:
+            self.results[file_path] = False
+            return
+        self._write_buffer.extend(embedded)
+        self._buffered_files.append(file_path)
+        if len(self._write_buffer) >= self.write_batch_size:
+            self._flush_writes()
+
+    def _flush_writes(self) -> None:
+        if not self._write_buffer:
+            return
+        chunks = [chunk for chunk, _ in self._write_buffer]
+        embeddings = [embedding for _, embedding in self._write_buffer]
+        success = indexing.upsert_embedded_chunks(self.collection, chunks, embeddings)
+        self.stats["writes"] += 1
+        for file_path in self._buffered_files:
+            self.results[file_path] = success
+        self._write_buffer, self._buffered_files = [], []
@@ -1,11 +1,15 @@
 import logging
 import shutil
 
+from .lexical_index import get_lexical_index
+from .manifest import get_index_manifest
+
 # Attempt to import CHROMA_DATA_PATH from indexing.py in the same directory
 try:
     from .indexing import (  # Also get collection name for context
         CHROMA_COLLECTION_NAME,
         CHROMA_DATA_PATH,
+        bump_index_generation,
     )
 except ImportError as e:
     # This fallback is less likely to be needed if they are in the same directory
@@ -55,6 +59,11 @@ def purge_rag_index_data():
             return {"status": "error", "message": message}
         try:
             shutil.rmtree(CHROMA_DATA_PATH)
+            # The manifest and lexical index lived in the deleted directory; forget their
+            # in-memory copies too
+            get_index_manifest(CHROMA_DATA_PATH, CHROMA_COLLECTION_NAME).clear()
+            get_lexical_index(CHROMA_DATA_PATH, CHROMA_COLLECTION_NAME).clear()
+            bump_index_generation()
             message = f"Successfully deleted RAG index data directory: {CHROMA_DATA_PATH}"
             logging.info(message)
             return {"status": "success", "message": message}
@@ -0,0 +1,224 @@
+"""Adaptive token-bucket rate limiting for embedding API calls."""
+
+from collections.abc import Callable
+import logging
+import re
+import threading
+import time
+from typing import Any, Optional
+
+from ...config import RAG_EMBEDDING_REQUESTS_PER_MINUTE, RAG_EMBEDDING_TOKENS_PER_MINUTE
+
+logger = logging.getLogger(__name__)
+
+# Rates never adapt below this fraction of the configured quota
+MIN_RATE_FRACTION = 0.1
+# Multiplicative decrease on a 429, additive increase (of the quota) per success
+BACKOFF_FACTOR = 0.5
+RECOVERY_FRACTION = 0.05
+# Pause applied after a 429 without a Retry-After hint, doubled per consecutive 429
+DEFAULT_BACKOFF_SECONDS = 5.0
+MAX_BACKOFF_SECONDS = 120.0
+
+_RETRY_DELAY_PATTERN = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for embedding request budgets."""
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an API error reports an exhausted quota or rate limit."""
+    if getattr(error, "code", None) == 429:
+        return True
+    error_str = str(error)
+    return (
+        ("429" in error_str and "RESOURCE_EXHAUSTED" in error_str)
+        or ("quota" in error_str.lower())
+        or ("rate limit" in error_str.lower())
+    )
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Extract the server's retry hint (seconds) from a rate limit error, if any.
+
+    Looks at the HTTP ``Retry-After`` header first, then at a ``google.rpc.RetryInfo``
+    ``retryDelay`` in the error details.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            retry_after = headers.get("retry-after") or headers.get("Retry-After")
+            if retry_after is not None:
+                return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    match = _RETRY_DELAY_PATTERN.search(str(getattr(error, "details", None) or error))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """A bucket holding up to one minute of quota that refills continuously."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.rate_per_minute = per_minute
+        self.capacity = per_minute
+        self.available = per_minute
+        self._updated = now
+
+    def refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self.available = min(self.capacity, self.available + elapsed * self.rate_per_minute / 60)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (amounts above capacity wait for a full bucket)."""
+        missing = min(amount, self.capacity) - self.available
+        return 0.0 if missing <= 0 else missing * 60 / self.rate_per_minute
+
+    def consume(self, amount: float) -> None:
+        self.available -= min(amount, self.capacity)
+
+    def set_rate(self, per_minute: float) -> None:
+        self.rate_per_minute = per_minute
+        self.available = min(self.available, per_minute)
+        self.capacity = per_minute
+
+
+class EmbeddingRateLimiter:
+    """Shared requests/min and tokens/min limiter that every embedding call goes through.
+
+    ``acquire`` blocks until both buckets can pay for a request. The rates adapt to
+    what the API actually grants: a 429 halves them (down to a floor) and pauses all
+    callers until the server's ``Retry-After`` has elapsed, and each success recovers a
+    little of the configured quota.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = RAG_EMBEDDING_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = RAG_EMBEDDING_TOKENS_PER_MINUTE,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.configured_requests_per_minute = max(1, requests_per_minute)
+        self.configured_tokens_per_minute = max(1, tokens_per_minute)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        now = clock()
+        self._requests = TokenBucket(self.configured_requests_per_minute, now)
+        self._tokens = TokenBucket(self.configured_tokens_per_minute, now)
+        self._blocked_until = now
+        self._consecutive_rate_limits = 0
+
+        self.requests_granted = 0
+        self.rate_limited_responses = 0
+        self.total_wait_seconds = 0.0
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Block until a request of ``tokens`` estimated tokens may be sent.
+
+        Returns:
+            The number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                delay = max(
+                    self._blocked_until - now,
+                    self._requests.wait_time(1),
+                    self._tokens.wait_time(tokens),
+                )
+                if delay <= 0:
+                    self._requests.consume(1)
+                    self._tokens.consume(tokens)
+                    self.requests_granted += 1
+                    self.total_wait_seconds += waited
+                    return waited
+            self._sleep(delay)
+            waited += delay
+
+    def record_success(self) -> None:
+        """Recover part of the configured quota after a successful call."""
+        with self._lock:
+            self._consecutive_rate_limits = 0
+            self._adjust_rates(
+                lambda current, configured: min(
+                    configured, current + configured * RECOVERY_FRACTION
+                )
+            )
+
+    def record_rate_limited(self, retry_after: Optional[float] = None) -> float:
+        """Slow down after a 429 and pause every caller until a retry makes sense.
+
+        Args:
+            retry_after: The server's retry hint in seconds, if it sent one
+
+        Returns:
+            The pause in seconds applied before the next request
+        """
+        with self._lock:
+            self.rate_limited_responses += 1
+            self._consecutive_rate_limits += 1
+            if retry_after is None:
+                retry_after = min(
+                    MAX_BACKOFF_SECONDS,
+                    DEFAULT_BACKOFF_SECONDS * 2 ** (self._consecutive_rate_limits - 1),
+                )
+            self._blocked_until = max(self._blocked_until, self._clock() + retry_after)
+            self._adjust_rates(
+                lambda current, configured: max(
+                    configured * MIN_RATE_FRACTION, current * BACKOFF_FACTOR
+                )
+            )
+            # Whatever was left in the buckets evidently was not available server-side
+            self._requests.available = min(self._requests.available, 0.0)
+            self._tokens.available = min(self._tokens.available, 0.0)
+            logger.warning(
+                f"Embedding rate limit hit; pausing {retry_after:.1f}s and lowering the rate to "
+                f"{self._requests.rate_per_minute:.0f} requests/min and "
+                f"{self._tokens.rate_per_minute:.0f} tokens/min."
+            )
+            return retry_after
+
+    def _adjust_rates(self, adjust: Callable[[float, float], float]) -> None:
+        self._requests.set_rate(
+            adjust(self._requests.rate_per_minute, self.configured_requests_per_minute)
+        )
+        self._tokens.set_rate(
+            adjust(self._tokens.rate_per_minute, self.configured_tokens_per_minute)
+        )
+
+    def state(self) -> dict[str, Any]:
+        """Return the limiter's current rates, bucket levels and counters."""
+        with self._lock:
+            now = self._clock()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            return {
+                "configured_requests_per_minute": self.configured_requests_per_minute,
+                "configured_tokens_per_minute": self.configured_tokens_per_minute,
+                "requests_per_minute": round(self._requests.rate_per_minute, 1),
+                "tokens_per_minute": round(self._tokens.rate_per_minute, 1),
+                "available_requests": round(self._requests.available, 1),
+                "available_tokens": round(self._tokens.available, 1),
+                "paused_for_seconds": round(max(0.0, self._blocked_until - now), 2),
+                "requests_granted": self.requests_granted,
+                "rate_limited_responses": self.rate_limited_responses,
+                "total_wait_seconds": round(self.total_wait_seconds, 2),
+            }
+
+
+_embedding_rate_limiter = EmbeddingRateLimiter()
+
+
+def get_embedding_rate_limiter() -> EmbeddingRateLimiter:
+    """Return the process-wide limiter shared by all embedding calls."""
+    return _embedding_rate_limiter
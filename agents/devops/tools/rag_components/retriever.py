@@ -1,14 +1,30 @@
 # /Users/james/Agents/devops_v2/rag_components/retriever.py
+from collections import OrderedDict
+import copy
 import logging
+import threading
+from typing import Any, Optional
 
 # Import agent configuration
-from ...config import GOOGLE_API_KEY
+from ...config import (
+    GOOGLE_API_KEY,
+    RAG_HYBRID_LEXICAL_WEIGHT,
+    RAG_QUERY_EMBEDDING_CACHE_SIZE,
+    RAG_RETRIEVAL_RESULT_CACHE_SIZE,
+)
 
 # Attempt to import components from the sibling indexing module
 # This allows sharing the initialized chroma_client and embedding_model_instance
 # when used as part of the larger agent.
 try:
-    from .indexing import CHROMA_COLLECTION_NAME, embed_chunks_batch, get_chroma_collection
+    from .indexing import (
+        CHROMA_COLLECTION_NAME,
+        embed_chunks_batch,
+        get_chroma_collection,
+        get_collection_lexical_index,
+        get_embedding_backend,
+        get_index_generation,
+    )
 
     logger = logging.getLogger(__name__)
     logger.info("Retriever: Successfully imported from .indexing")
@@ -23,14 +39,168 @@ except ImportError:
     logger.warning(
         "Retriever: Could not import from .indexing, attempting standalone initialization."
     )
-    from indexing import CHROMA_COLLECTION_NAME, embed_chunks_batch, get_chroma_collection
+    from indexing import (
+        CHROMA_COLLECTION_NAME,
+        embed_chunks_batch,
+        get_chroma_collection,
+        get_collection_lexical_index,
+        get_embedding_backend,
+        get_index_generation,
+    )
+
+
+class _LRUCache:
+    """Small thread-safe LRU mapping with hit/miss counters."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, max_entries)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Query embeddings by (model, query); retrieval results by (collection, query, top_k,
+# index generation), so results are dropped as soon as indexing or purging changes the data
+_query_embedding_cache = _LRUCache(RAG_QUERY_EMBEDDING_CACHE_SIZE)
+_result_cache = _LRUCache(RAG_RETRIEVAL_RESULT_CACHE_SIZE)
+
+
+def _normalize_query(query_text: str) -> str:
+    return " ".join(query_text.split())
+
+
+def clear_retrieval_caches() -> None:
+    """Drop all cached query embeddings and retrieval results."""
+    _query_embedding_cache.clear()
+    _result_cache.clear()
+
+
+def get_retrieval_cache_stats() -> dict[str, dict[str, int]]:
+    """Return statistics of the query embedding and result caches."""
+    return {
+        "query_embeddings": _query_embedding_cache.stats(),
+        "results": _result_cache.stats(),
+    }
+
+
+# Reciprocal rank fusion: a chunk at rank r of a ranking scores weight / (RRF_K + r)
+RRF_K = 60
+# Candidates taken from each ranking per requested result before the rankings are fused
+CANDIDATE_MULTIPLIER = 4
+
+
+def _get_query_embedding(normalized_query: str) -> Optional[list[float]]:
+    """Embed a query with the RETRIEVAL_QUERY task type, serving repeats from cache."""
+    embedding_key = (get_embedding_backend().model_name, normalized_query)
+    query_embedding = _query_embedding_cache.get(embedding_key)
+    if query_embedding is None:
+        logger.info(f'Generating embedding for query: "{normalized_query}"')
+        query_embedding_list = embed_chunks_batch([normalized_query], task_type="RETRIEVAL_QUERY")
+        if not query_embedding_list or not query_embedding_list[0]:
+            return None
+        query_embedding = query_embedding_list[0]  # embed_chunks_batch returns a list
+        _query_embedding_cache.put(embedding_key, query_embedding)
+    return query_embedding
+
+
+def _vector_search(collection, query_embedding: list[float], n_results: int) -> list[dict]:
+    """Return the chunks nearest to the query embedding, nearest first."""
+    logger.info(f"Querying collection '{collection.name}' for top {n_results} relevant chunks.")
+    results = collection.query(
+        query_embeddings=[query_embedding],  # Must be a list of embeddings
+        n_results=n_results,
+        include=["metadatas", "documents", "distances"],  # Specify what to include in results
+    )
+
+    chunks = []
+    # ChromaDB query results are structured with lists for each included field,
+    # corresponding to each query embedding (we only have one here).
+    if results and results["ids"] and results["ids"][0]:
+        for i in range(len(results["ids"][0])):
+            chunks.append(
+                {
+                    "id": results["ids"][0][i],
+                    "metadata": results["metadatas"][0][i]
+                    if results["metadatas"] and results["metadatas"][0]
+                    else None,
+                    "document": results["documents"][0][i]
+                    if results["documents"] and results["documents"][0]
+                    else None,
+                    "distance": results["distances"][0][i]
+                    if results["distances"] and results["distances"][0]
+                    else None,
+                }
+            )
+    return chunks
+
+
+def _fetch_chunks(collection, chunk_ids: list[str]) -> dict[str, dict]:
+    """Load lexical hits the vector search did not return, keyed by chunk id."""
+    if not chunk_ids:
+        return {}
+    try:
+        results = collection.get(ids=chunk_ids, include=["metadatas", "documents"])
+    except Exception as e:
+        logger.error(f"Failed to load lexical matches from the collection: {e}")
+        return {}
+    return {
+        chunk_id: {"id": chunk_id, "metadata": metadata, "document": document, "distance": None}
+        for chunk_id, metadata, document in zip(
+            results["ids"], results["metadatas"], results["documents"]
+        )
+    }
+
+
+def _fuse_rankings(
+    vector_ids: list[str], lexical_ids: list[str], lexical_weight: float
+) -> list[tuple[str, float]]:
+    """Fuse two rankings with weighted reciprocal rank fusion, best first."""
+    scores: dict[str, float] = {}
+    for rank, chunk_id in enumerate(vector_ids, start=1):
+        scores[chunk_id] = scores.get(chunk_id, 0.0) + (1.0 - lexical_weight) / (RRF_K + rank)
+    for rank, chunk_id in enumerate(lexical_ids, start=1):
+        scores[chunk_id] = scores.get(chunk_id, 0.0) + lexical_weight / (RRF_K + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
 
 
 def retrieve_relevant_chunks(
     query_text: str, top_k: int = 5, collection_name: str = CHROMA_COLLECTION_NAME
 ) -> list[dict] | None:
     """
-    Retrieves the top_k most relevant chunks for a given query from ChromaDB.
+    Retrieves the top_k most relevant chunks for a given query.
+
+    Chunks are ranked by vector distance in ChromaDB and by BM25 over chunk text and
+    symbol names, and the two rankings are fused (see RAG_HYBRID_LEXICAL_WEIGHT). If the
+    query cannot be embedded, lexical matches are returned on their own.
 
     Args:
         query_text: The user's query string.
@@ -40,64 +210,93 @@ def retrieve_relevant_chunks(
     Returns:
         A list of dictionaries, where each dictionary contains the retrieved chunk's
         metadata and content ('document'), or None if an error occurs.
-        Example: [{'id': str, 'metadata': dict, 'document': str, 'distance': float}, ...]
+        Repeated queries are answered from an in-memory cache until the index changes.
+        'distance' is None for chunks found only by lexical search; 'score' is the fused
+        rank score and 'lexical_score' the BM25 score (0.0 without a lexical match).
+        Example: [{'id': str, 'metadata': dict, 'document': str, 'distance': float,
+                   'score': float, 'lexical_score': float}, ...]
     """
+    normalized_query = _normalize_query(query_text) if query_text else ""
+    result_key = (collection_name, normalized_query, top_k, get_index_generation())
+    if normalized_query:
+        cached_results = _result_cache.get(result_key)
+        if cached_results is not None:
+            logger.info(f'Serving cached retrieval results for query: "{query_text}"')
+            return copy.deepcopy(cached_results)
+
     collection = get_chroma_collection()  # Uses the shared or re-initialized client
     if not collection:
         logger.error(f"Failed to get ChromaDB collection '{collection_name}' for retrieval.")
         return None
 
-    if not query_text:
+    if not normalized_query:
         logger.warning("Empty query text provided for retrieval.")
         return []
 
-    logger.info(f'Generating embedding for query: "{query_text}"')
-    # Embed the query using the same model, but with RETRIEVAL_QUERY task type
-    query_embedding_list = embed_chunks_batch([query_text], task_type="RETRIEVAL_QUERY")
-
-    if not query_embedding_list or not query_embedding_list[0]:
-        logger.error("Failed to generate embedding for the query.")
-        return None
+    lexical_weight = min(1.0, max(0.0, RAG_HYBRID_LEXICAL_WEIGHT))
+    candidate_count = top_k * CANDIDATE_MULTIPLIER
+    lexical_hits = (
+        get_collection_lexical_index().search(normalized_query, candidate_count)
+        if lexical_weight > 0.0
+        else []
+    )
+    lexical_scores = dict(lexical_hits)
+    degraded = False
 
-    query_embedding = query_embedding_list[0]  # embed_chunks_batch returns a list of embeddings
+    vector_chunks: list[dict] = []
+    if lexical_weight < 1.0:
+        query_embedding = _get_query_embedding(normalized_query)
+        if query_embedding is None:
+            if not lexical_hits:
+                logger.error("Failed to generate embedding for the query.")
+                return None
+            logger.warning("Failed to embed the query; falling back to lexical retrieval.")
+            degraded = True
+        else:
+            try:
+                vector_chunks = _vector_search(
+                    collection, query_embedding, candidate_count if lexical_hits else top_k
+                )
+            except Exception as e:
+                if not lexical_hits:
+                    logger.error(f"An error occurred during ChromaDB query: {e}")
+                    return None
+                logger.warning(f"ChromaDB query failed ({e}); falling back to lexical retrieval.")
+                degraded = True
 
-    try:
-        logger.info(f"Querying collection '{collection.name}' for top {top_k} relevant chunks.")
-        results = collection.query(
-            query_embeddings=[query_embedding],  # Must be a list of embeddings
-            n_results=top_k,
-            include=["metadatas", "documents", "distances"],  # Specify what to include in results
+    ranked = _fuse_rankings(
+        [chunk["id"] for chunk in vector_chunks],
+        [chunk_id for chunk_id, _ in lexical_hits],
+        1.0 if degraded or not vector_chunks else lexical_weight,
+    )[:top_k]
+    chunks_by_id = {chunk["id"]: chunk for chunk in vector_chunks}
+    chunks_by_id.update(
+        _fetch_chunks(
+            collection, [chunk_id for chunk_id, _ in ranked if chunk_id not in chunks_by_id]
         )
+    )
 
-        retrieved_chunks = []
-        # ChromaDB query results are structured with lists for each included field,
-        # corresponding to each query embedding (we only have one here).
-        if (
-            results and results["ids"] and results["ids"][0]
-        ):  # Check if results['ids'][0] is not empty
-            for i in range(len(results["ids"][0])):
-                chunk_info = {
-                    "id": results["ids"][0][i],
-                    "metadata": results["metadatas"][0][i]
-                    if results["metadatas"] and results["metadatas"][0]
-                    else None,
-                    "document": results["documents"][0][i]
-                    if results["documents"] and results["documents"][0]
-                    else None,
-                    "distance": results["distances"][0][i]
-                    if results["distances"] and results["distances"][0]
-                    else None,
-                }
-                retrieved_chunks.append(chunk_info)
-            logger.info(f"Retrieved {len(retrieved_chunks)} chunks.")
-        else:
-            logger.info("No relevant chunks found for the query.")
+    retrieved_chunks = []
+    for chunk_id, score in ranked:
+        chunk = chunks_by_id.get(chunk_id)
+        if chunk is None:
+            continue  # Stale lexical entry for a chunk no longer in the collection
+        chunk["score"] = score
+        chunk["lexical_score"] = lexical_scores.get(chunk_id, 0.0)
+        retrieved_chunks.append(chunk)
 
-        return retrieved_chunks
+    if retrieved_chunks:
+        logger.info(
+            f"Retrieved {len(retrieved_chunks)} chunks ({len(vector_chunks)} vector and "
+            f"{len(lexical_hits)} lexical candidates)."
+        )
+    else:
+        logger.info("No relevant chunks found for the query.")
 
-    except Exception as e:
-        logger.error(f"An error occurred during ChromaDB query: {e}")
-        return None
+    # Degraded results are not cached, so retrieval recovers once embedding works again
+    if not degraded:
+        _result_cache.put(result_key, copy.deepcopy(retrieved_chunks))
+    return retrieved_chunks
 
 
 if __name__ == "__main__":
@@ -130,8 +329,8 @@ if __name__ == "__main__":
                 print(f'\n--- Top {len(retrieved)} relevant chunks for query: "{sample_query}" ---')
                 for i, chunk_dict in enumerate(retrieved):
                     print(
-                        f"\nChunk {i + 1} (ID: {chunk_dict['id']}, Distance: "
-                        f"{chunk_dict['distance']:.4f}):"
+                        f"\nChunk {i + 1} (ID: {chunk_dict['id']}, Score: "
+                        f"{chunk_dict['score']:.4f}):"
                     )
                     print("Metadata:", chunk_dict["metadata"])
                     print("Content:\n", chunk_dict["document"])
@@ -150,8 +349,8 @@ if __name__ == "__main__":
                 )
                 for i, chunk_dict in enumerate(retrieved_again):
                     print(
-                        f"\nChunk {i + 1} (ID: {chunk_dict['id']}, Distance: "
-                        f"{chunk_dict['distance']:.4f}):"
+                        f"\nChunk {i + 1} (ID: {chunk_dict['id']}, Score: "
+                        f"{chunk_dict['score']:.4f}):"
                     )
                     print("Metadata:", chunk_dict["metadata"])
                     print("Content:\n", chunk_dict["document"])
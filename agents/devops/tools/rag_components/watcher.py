@@ -0,0 +1,141 @@
+"""Debounced filesystem watching that keeps an indexed directory up to date."""
+
+from collections.abc import Callable
+import logging
+from pathlib import Path
+import threading
+import time
+from typing import Optional
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+logger = logging.getLogger(__name__)
+
+# Events that do not change file contents or the set of files
+_IGNORED_EVENT_TYPES = {"opened", "closed_no_write"}
+# A burst of changes is flushed at the latest after this many debounce intervals
+MAX_DELAY_FACTOR = 10
+
+
+class _ChangeCollector(FileSystemEventHandler):
+    """Forwards the paths touched by filesystem events to a watcher."""
+
+    def __init__(self, watcher: "DebouncedIndexWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.event_type in _IGNORED_EVENT_TYPES:
+            return
+        if event.is_directory and event.event_type == "modified":
+            # Only says that entries changed, which are reported by their own events
+            return
+        paths = [event.src_path]
+        if getattr(event, "dest_path", ""):
+            paths.append(event.dest_path)
+        self.watcher.record(str(path) for path in paths)
+
+
+class DebouncedIndexWatcher:
+    """Watches a directory tree and reports the paths that changed, in debounced batches.
+
+    Paths touched by events are collected until no new event has arrived for
+    ``debounce_seconds`` (or a burst has lasted ``MAX_DELAY_FACTOR`` intervals), then
+    ``on_changes`` is called with the batch from a background thread. A path in a batch
+    may have been created, modified, moved or deleted; ``on_changes`` checks the disk.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        on_changes: Callable[[set[str]], None],
+        debounce_seconds: float = 2.0,
+        path_filter: Optional[Callable[[str], bool]] = None,
+    ):
+        self.root = Path(root)
+        self.on_changes = on_changes
+        self.debounce_seconds = max(0.0, debounce_seconds)
+        self.path_filter = path_filter
+        self._pending: set[str] = set()
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._observer: Optional[Observer] = None
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self) -> None:
+        """Start watching; does nothing if the watcher is already running."""
+        if self.running:
+            return
+        self._stopped = False
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._observer.schedule(_ChangeCollector(self), str(self.root), recursive=True)
+        self._observer.start()
+        self._worker = threading.Thread(
+            target=self._run, name=f"rag-watch-{self.root.name}", daemon=True
+        )
+        self._worker.start()
+        logger.info(f"Watching {self.root} for changes to keep the RAG index up to date.")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop watching; pending changes that were not flushed yet are dropped."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def record(self, paths) -> None:
+        """Add changed paths to the pending batch and restart the debounce interval."""
+        paths = {path for path in paths if self.path_filter is None or self.path_filter(path)}
+        if not paths:
+            return
+        with self._condition:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_event = now
+            self._last_event = now
+            self._pending.update(paths)
+            self._condition.notify_all()
+
+    def flush(self) -> set[str]:
+        """Hand the pending batch to ``on_changes`` now, returning the paths flushed."""
+        with self._condition:
+            batch, self._pending = self._pending, set()
+        if batch:
+            try:
+                self.on_changes(batch)
+            except Exception as e:
+                logger.error(f"Error updating the RAG index for changes in {self.root}: {e}")
+        return batch
+
+    def _due_in(self) -> Optional[float]:
+        """Seconds until the pending batch is due, or None when nothing is pending."""
+        if not self._pending:
+            return None
+        quiet_at = self._last_event + self.debounce_seconds
+        latest_at = self._first_event + self.debounce_seconds * MAX_DELAY_FACTOR
+        return min(quiet_at, latest_at) - time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    due_in = self._due_in()
+                    if due_in is not None and due_in <= 0:
+                        break
+                    self._condition.wait(due_in)
+                if self._stopped:
+                    return
+            self.flush()
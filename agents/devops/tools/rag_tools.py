@@ -1,14 +1,22 @@
 # /Users/james/Agents/devops_v2/tools/rag_tools.py
-import fnmatch  # Added for .indexignore
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 import logging
 import os
 from pathlib import Path  # Added for .indexignore and path manipulation
-import time
-from typing import Optional  # Added import
+import threading
+from typing import Optional, Union  # Added import
 
 from google.adk.tools import FunctionTool  # For defining ADK tools
 
+from ..config import RAG_INDEXING_WORKERS, RAG_WATCH_DEBOUNCE_SECONDS, RAG_WATCH_ENABLED
+from ..shared_libraries.ignore_matcher import IgnoreMatcher
 from .rag_components import chunking, indexing, purging  # Relative import from parent dir
+from .rag_components.manifest import IndexManifest, ManifestEntry, hash_content
+from .rag_components.pipeline import EmbeddingPipeline
+from .rag_components.watcher import DebouncedIndexWatcher
 
 logger = logging.getLogger(__name__)
 
@@ -33,65 +41,340 @@ def _load_ignore_patterns(base_dir: Path, ignore_filename: str = ".indexignore")
     return patterns
 
 
-def _is_path_ignored(relative_path_str: str, ignore_patterns: list[str], is_dir: bool) -> bool:
+# --- End of helper functions ---
+
+
+def _delete_file_chunks(collection, file_path: str) -> None:
+    """Delete every chunk stored for a file, whether or not the manifest knows about it."""
+    try:
+        query_results = collection.get(where={"file_path": file_path}, include=[])
+        if query_results and query_results["ids"]:
+            logger.info(f"Deleting {len(query_results['ids'])} existing chunks for {file_path}.")
+            collection.delete(ids=query_results["ids"])
+            indexing.get_collection_lexical_index().remove_chunks(query_results["ids"])
+            indexing.bump_index_generation()
+    except Exception as e_del:
+        logger.error(f"Error deleting existing chunks for {file_path}: {e_del}")
+
+
+@dataclass
+class _FilePlan:
+    """What indexing has to do for one file, decided by a read/chunk worker."""
+
+    file_path: str
+    status: str  # "unchanged", "touched" (new stat, same content) or "changed"
+    size: int
+    mtime_ns: int
+    content_hash: str = ""
+    previous: Optional[ManifestEntry] = None
+    chunks: list[dict] = field(default_factory=list)
+    chunk_ids: list[str] = field(default_factory=list)
+
+    def manifest_entry(self, chunk_ids: list[str]) -> ManifestEntry:
+        return ManifestEntry(self.size, self.mtime_ns, self.content_hash, chunk_ids)
+
+
+def _plan_file(manifest: IndexManifest, file_abs_path: Path, force_reindex: bool) -> _FilePlan:
+    """Stat, read, hash and chunk one file unless the manifest shows it is unchanged.
+
+    Runs in a worker thread, so it only reads the manifest; the caller applies the plan.
     """
-    Checks if a given relative path string matches any ignore patterns.
-    - relative_path_str: Path relative to the indexing root (e.g., "src/utils.py", "node_modules").
-                         Uses POSIX-style separators ('/').
-    - ignore_patterns: List of patterns from .indexignore.
-    - is_dir: Boolean, true if the path is a directory.
+    file_path = str(file_abs_path)
+    stat_result = file_abs_path.stat()
+    entry = manifest.get(file_path)
+    plan = _FilePlan(file_path, "unchanged", stat_result.st_size, stat_result.st_mtime_ns)
+    if entry is not None and not force_reindex and entry.matches_stat(stat_result):
+        return plan
+
+    with Path.open(file_abs_path, encoding="utf-8", errors="ignore") as f:
+        content = f.read()
+    plan.content_hash = hash_content(content)
+    plan.previous = entry
+
+    if entry is not None and not force_reindex and entry.content_hash == plan.content_hash:
+        # Touched but not modified: remember the new stat so the next run skips the read
+        plan.status = "touched"
+        return plan
+
+    logger.info(f"Processing file: {file_abs_path}")
+    plan.status = "changed"
+    plan.chunks = chunking.chunk_file_content(file_path, content)
+    return plan
+
+
+def _plan_files(
+    manifest: IndexManifest, file_paths: list[Path], force_reindex: bool
+) -> Iterator[tuple[Path, Union[_FilePlan, Exception]]]:
+    """Plan files on a worker pool, yielding results in order.
+
+    Only a bounded window of files is read ahead of the consumer, so file contents do
+    not pile up in memory while the embedding stage applies back-pressure.
     """
-    # Ensure consistent path separator for matching (POSIX style)
-    # Path objects from pathlib will produce OS-specific, convert to POSIX for matching
-    # relative_path_str is already expected to be posix from .as_posix()
-
-    for pattern in ignore_patterns:
-        # Pattern normalization:
-        # If pattern is "foo/", it should match a directory named "foo"
-        # or anything under "foo/"
-        # If pattern is "foo", it could match a file or directory named "foo"
-
-        is_dir_pattern = pattern.endswith("/")
-        normalized_pattern = pattern.rstrip("/")
-
-        # 1. Direct match for directory patterns
-        if is_dir_pattern:
-            if (
-                is_dir and relative_path_str == normalized_pattern
-            ):  # e.g. pattern "build/", path "build"
-                # logger.debug(f"Ignoring dir '{relative_path_str}' due to dir pattern '{pattern}'")
-                return True
-            if (relative_path_str + "/").startswith(
-                normalized_pattern + "/"
-            ):  # e.g. pattern "build/", path "build/foo"
-                # logger.debug(f"Ignoring path '{relative_path_str}' due to item under dir pattern '{pattern}'")  # noqa: E501
-                return True
-            # No else here, a dir pattern like "foo/" should not match a file "foo"
-
-        # 2. fnmatch for glob patterns (files or directories if not a dir_pattern)
-        # fnmatch matches the whole string against the pattern.
-        # For a pattern like "*.log", relative_path_str must be "file.log", not "somedir/file.log"
-        # For a pattern like "somedir/*.log", relative_path_str must be "somedir/file.log"
-
-        # Check against the full relative path
-        if fnmatch.fnmatch(relative_path_str, pattern):
-            # logger.debug(f"Ignoring '{relative_path_str}' due to full match with pattern '{pattern}'")  # noqa: E501
-            return True
-
-        # 3. If pattern has no slashes, it can match a basename anywhere (like .gitignore)
-        #    e.g. pattern "*.tmp" should match "foo.tmp" and "bar/baz.tmp"
-        #    e.g. pattern "node_modules" (no trailing slash) should match a dir "node_modules"
-        #    anywhere
-        if "/" not in pattern:
-            item_name = Path(relative_path_str).name
-            if fnmatch.fnmatch(item_name, pattern):
-                # logger.debug(f"Ignoring '{relative_path_str}' (basename '{item_name}') due to basename pattern '{pattern}'")  # noqa: E501
-                return True
+    workers = max(1, RAG_INDEXING_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-read") as pool:
+        window: deque = deque()
+        paths = iter(file_paths)
+        for file_abs_path in paths:
+            window.append(
+                (file_abs_path, pool.submit(_plan_file, manifest, file_abs_path, force_reindex))
+            )
+            if len(window) >= workers * 4:
+                break
+        while window:
+            file_abs_path, future = window.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                window.append(
+                    (next_path, pool.submit(_plan_file, manifest, next_path, force_reindex))
+                )
+            try:
+                yield file_abs_path, future.result()
+            except Exception as e:
+                yield file_abs_path, e
 
-    return False
 
+@dataclass
+class _IndexingResult:
+    """Counts from re-indexing a set of candidate files."""
+
+    processed_files: int = 0
+    unchanged_files: int = 0
+    chunks_indexed: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+def _scan_directory(
+    root_scan_path: Path,
+    ignore_matcher: IgnoreMatcher,
+    file_extensions_set: set[str],
+    start_path: Optional[Path] = None,
+) -> tuple[list[Path], int, int]:
+    """Walk start_path (default: the root) for indexable files, pruning ignored directories.
+
+    Ignore patterns are matched relative to root_scan_path. Returns the candidate files
+    and the numbers of ignored files and directories.
+    """
+    candidate_files: list[Path] = []
+    ignored_files_count = 0
+    ignored_dirs_count = 0
+
+    for current_root_str, dir_names, file_names in os.walk(
+        str(start_path or root_scan_path), topdown=True
+    ):
+        current_root_path = Path(current_root_str)
+        relative_root = current_root_path.relative_to(root_scan_path).as_posix()
+        prefix = "" if relative_root == "." else relative_root + "/"
+
+        # Prune ignored directories (dir_names is modified in-place by os.walk when topdown=True)
+        kept_dir_names = []
+        for d_name in dir_names:
+            if ignore_matcher.is_ignored(prefix + d_name, is_dir=True):
+                logger.info(f"Ignoring directory: {prefix}{d_name} due to .indexignore rules.")
+                ignored_dirs_count += 1
+            else:
+                kept_dir_names.append(d_name)
+        dir_names[:] = kept_dir_names
+
+        for file_name in file_names:
+            file_abs_path = current_root_path / file_name
+
+            # 1. Check if file itself is ignored by .indexignore
+            if ignore_matcher.is_ignored(prefix + file_name):
+                logger.info(f"Ignoring file: {prefix}{file_name} due to .indexignore rules.")
+                ignored_files_count += 1
+                continue
+
+            # 2. Check file extension
+            if file_abs_path.suffix not in file_extensions_set:
+                # This check is fine, but ensure file_extensions_set is correctly populated
+                # logger.debug(f"Skipping file due to extension: {file_rel_path_str} (suffix: {file_abs_path.suffix})")  # noqa: E501
+                continue
+
+            candidate_files.append(file_abs_path)
+
+    return candidate_files, ignored_files_count, ignored_dirs_count
+
+
+def _index_files(
+    collection, manifest: IndexManifest, candidate_files: list[Path], force_reindex: bool
+) -> _IndexingResult:
+    """Re-index the candidate files that changed since the manifest recorded them."""
+    result = _IndexingResult()
+
+    # Read and chunk files on a worker pool and feed their chunks to the embedding
+    # pipeline, which packs them into full requests and writes completed files in bulk
+    changed_plans: dict[str, _FilePlan] = {}
+    with EmbeddingPipeline(collection) as pipeline:
+        for file_abs_path, plan in _plan_files(manifest, candidate_files, force_reindex):
+            if isinstance(plan, Exception):
+                logger.error(f"Error processing file {file_abs_path}: {plan}")
+                result.errors.append(str(file_abs_path))
+                continue
+
+            if plan.status == "unchanged":
+                result.unchanged_files += 1
+                continue
+            if plan.status == "touched":
+                result.unchanged_files += 1
+                manifest.set(plan.file_path, plan.manifest_entry(plan.previous.chunk_ids))
+                continue
+
+            if plan.previous is None or force_reindex:
+                # Chunks may exist from before the manifest did; find them by file path
+                _delete_file_chunks(collection, plan.file_path)
+            if not plan.chunks:
+                logger.warning(f"No chunks generated for {file_abs_path}. Skipping.")
+                if plan.previous is not None:
+                    indexing.delete_chunks(collection, plan.previous.chunk_ids)
+                manifest.set(plan.file_path, plan.manifest_entry([]))
+                continue
+
+            pipeline.add_file(plan.file_path, plan.chunks)
+            # Keep what the manifest needs, not the chunk contents
+            plan.chunk_ids = [indexing.make_chunk_id(chunk) for chunk in plan.chunks]
+            plan.chunks = []
+            changed_plans[plan.file_path] = plan
+
+        results = pipeline.close()
+
+    for file_path, plan in changed_plans.items():
+        if not results.get(file_path):
+            logger.error(f"Failed to index chunks from {file_path}.")
+            result.errors.append(file_path)
+            if force_reindex:
+                # Its chunks were deleted up front; forget the file so the next run indexes it
+                manifest.remove(file_path)
+            continue
+        if plan.previous is not None:
+            new_ids = set(plan.chunk_ids)
+            indexing.delete_chunks(
+                collection,
+                [chunk_id for chunk_id in plan.previous.chunk_ids if chunk_id not in new_ids],
+            )
+        manifest.set(file_path, plan.manifest_entry(plan.chunk_ids))
+        result.processed_files += 1
+        result.chunks_indexed += len(plan.chunk_ids)
+
+    return result
+
+
+def _remove_indexed_files(collection, manifest: IndexManifest, file_paths: list[str]) -> int:
+    """Remove indexed files and their chunks, returning how many were removed."""
+    removed_files = 0
+    for file_path in file_paths:
+        entry = manifest.get(file_path)
+        if entry is not None and indexing.delete_chunks(collection, entry.chunk_ids):
+            manifest.remove(file_path)
+            removed_files += 1
+    return removed_files
+
+
+# --- Live index maintenance ---
+
+# Full indexing runs and watcher updates share the manifest and the lexical index
+_indexing_lock = threading.Lock()
+# Watched root -> (watcher, indexed file extensions)
+_index_watchers: dict[str, tuple[DebouncedIndexWatcher, set[str]]] = {}
+_index_watchers_lock = threading.Lock()
+
+
+def _update_changed_files(
+    root_scan_path: Path, file_extensions_set: set[str], changed_paths: set[str]
+) -> None:
+    """Bring the index up to date for paths reported by a watcher under an indexed root.
+
+    Existing files are re-indexed through the manifest like index_directory_tool does,
+    new directories are scanned, and files that were deleted, moved away or are now
+    ignored are removed from the index.
+    """
+    ignore_matcher = IgnoreMatcher(_load_ignore_patterns(root_scan_path))
+    with _indexing_lock:
+        collection = indexing.get_chroma_collection()
+        if not collection:
+            logger.error("Failed to get ChromaDB collection. Watched changes not indexed.")
+            return
+        manifest = indexing.get_collection_manifest()
+
+        candidate_files: dict[str, Path] = {}
+        gone_paths: list[str] = []
+        for changed_path in sorted(changed_paths):
+            path = Path(changed_path)
+            try:
+                relative_path = path.relative_to(root_scan_path).as_posix()
+            except ValueError:
+                continue
+            if path.is_dir():
+                if not ignore_matcher.is_ignored(relative_path, is_dir=True):
+                    files, _, _ = _scan_directory(
+                        root_scan_path, ignore_matcher, file_extensions_set, path
+                    )
+                    candidate_files.update((str(file_path), file_path) for file_path in files)
+            elif (
+                path.is_file()
+                and path.suffix in file_extensions_set
+                and not ignore_matcher.is_ignored(relative_path)
+            ):
+                candidate_files[changed_path] = path
+            else:
+                # A deleted or moved directory takes its indexed files with it
+                gone_paths.append(changed_path)
+                gone_paths.extend(manifest.paths_under(path))
+
+        result = _index_files(collection, manifest, list(candidate_files.values()), False)
+        removed_files = _remove_indexed_files(
+            collection, manifest, [p for p in gone_paths if p not in candidate_files]
+        )
+        manifest.save()
+        indexing.get_collection_lexical_index().save()
+
+    if result.processed_files or removed_files or result.errors:
+        logger.info(
+            f"Updated RAG index for changes in {root_scan_path}: "
+            f"{result.processed_files} files re-indexed ({result.chunks_indexed} chunks), "
+            f"{removed_files} removed, {len(result.errors)} errors."
+        )
+
+
+def start_index_watcher(root_path: Union[str, Path], file_extensions: list[str]) -> bool:
+    """Keep the index of a directory up to date from filesystem events.
+
+    Changes are debounced for RAG_WATCH_DEBOUNCE_SECONDS and only the touched files
+    are re-indexed. Returns False if the directory could not be watched.
+    """
+    root_scan_path = Path(root_path).resolve()
+    file_extensions_set = set(file_extensions)
+    data_path = str(Path(indexing.CHROMA_DATA_PATH).resolve()) + os.sep
+    with _index_watchers_lock:
+        if str(root_scan_path) in _index_watchers:
+            watcher, watched_extensions = _index_watchers[str(root_scan_path)]
+            if watcher.running:
+                # Later runs may index other extensions; the running watcher follows them
+                watched_extensions.clear()
+                watched_extensions.update(file_extensions_set)
+                return True
+        watcher = DebouncedIndexWatcher(
+            root_scan_path,
+            lambda paths: _update_changed_files(root_scan_path, file_extensions_set, paths),
+            debounce_seconds=RAG_WATCH_DEBOUNCE_SECONDS,
+            # The index itself may live inside the workspace
+            path_filter=lambda path: not path.startswith(data_path),
+        )
+        try:
+            watcher.start()
+        except Exception as e:
+            logger.error(f"Could not watch {root_scan_path} for changes: {e}")
+            return False
+        _index_watchers[str(root_scan_path)] = (watcher, file_extensions_set)
+        return True
 
-# --- End of helper functions ---
+
+def stop_index_watchers() -> None:
+    """Stop every watcher started by start_index_watcher."""
+    with _index_watchers_lock:
+        watchers = [watcher for watcher, _ in _index_watchers.values()]
+        _index_watchers.clear()
+    for watcher in watchers:
+        watcher.stop()
 
 
 @FunctionTool  # Assuming FunctionTool decorator or similar
@@ -101,14 +384,26 @@ def index_directory_tool(
     """
     Scans a directory for specified file types, chunks their content,
     generates embeddings, and indexes them into the ChromaDB vector store.
-    Respects an .indexignore file in the root of directory_path.
+    Respects an .indexignore file (gitignore syntax) in the root of directory_path.
+
+    Indexing is incremental: a manifest of (size, mtime, content hash, chunk ids) per file
+    is kept next to the vector store, so unchanged files are skipped without being read
+    or embedded, changed files have their stale chunks replaced, and files that were
+    deleted (or are now ignored) are removed from the index.
+
+    A BM25 lexical index over chunk text and symbol names is maintained alongside the
+    vectors, so retrieval can match exact identifiers.
+
+    When RAG_WATCH_ENABLED is set, the directory is then watched and files that change
+    are re-indexed in the background, so the index stays fresh without running this again.
 
     Args:
         directory_path: The absolute path to the directory to scan.
         file_extensions: Optional list of file extensions to process (e.g., ['.py', '.md']).
                          Defaults to ['.py', '.md', '.txt', '.sh', '.yaml', '.yml', '.json',
                          '.tf', '.hcl', '.go'] if None.
-        force_reindex: If True, existing entries for a file will be removed and re-indexed.
+        force_reindex: If True, every file is re-indexed even if the index manifest says it is
+                       unchanged since the last run.
     Returns:
         A summary message of the indexing process.
     """
@@ -140,120 +435,56 @@ def index_directory_tool(
     if not collection:
         return "Error: Failed to get ChromaDB collection. Indexing aborted."
 
-    processed_files = 0
-    total_chunks_indexed = 0
-    errors = []
-    ignored_files_count = 0
-    ignored_dirs_count = 0
-
     root_scan_path = Path(directory_path).resolve()
     if not root_scan_path.is_dir():
         return f"Error: Directory not found at {root_scan_path}"
 
-    # Load ignore patterns
-    ignore_patterns = _load_ignore_patterns(root_scan_path)
-
-    for current_root_str, dir_names, file_names in os.walk(str(root_scan_path), topdown=True):
-        current_root_path = Path(current_root_str)
-
-        # Filter directories (dir_names is modified in-place by os.walk when topdown=True)
-        original_dir_names = list(dir_names)  # Iterate over a copy
-        dir_names[:] = []  # Clear and add back non-ignored ones
-        for d_name in original_dir_names:
-            dir_abs_path = current_root_path / d_name
-            dir_rel_path_str = dir_abs_path.relative_to(root_scan_path).as_posix()
-            if not _is_path_ignored(dir_rel_path_str, ignore_patterns, is_dir=True):
-                dir_names.append(d_name)
-            else:
-                logger.info(f"Ignoring directory: {dir_rel_path_str} due to .indexignore rules.")
-                ignored_dirs_count += 1
-
-        for file_name in file_names:
-            file_abs_path = current_root_path / file_name
-            file_rel_path_str = file_abs_path.relative_to(root_scan_path).as_posix()
-
-            # 1. Check if file itself is ignored by .indexignore
-            if _is_path_ignored(file_rel_path_str, ignore_patterns, is_dir=False):
-                logger.info(f"Ignoring file: {file_rel_path_str} due to .indexignore rules.")
-                ignored_files_count += 1
-                continue
-
-            # 2. Check file extension
-            if file_abs_path.suffix not in file_extensions_set:
-                # This check is fine, but ensure file_extensions_set is correctly populated
-                # logger.debug(f"Skipping file due to extension: {file_rel_path_str} (suffix: {file_abs_path.suffix})")  # noqa: E501
-                continue
-
-            logger.info(f"Processing file: {file_abs_path}")
-            try:
-                with Path.open(
-                    file_abs_path, encoding="utf-8", errors="ignore"
-                ) as f:  # Added errors='ignore'
-                    content = f.read()
-
-                file_chunks_data = chunking.chunk_file_content(
-                    str(file_abs_path), content
-                )  # Ensure file_path is str
-
-                if not file_chunks_data:
-                    logger.warning(f"No chunks generated for {file_abs_path}. Skipping.")
-                    continue
-
-                if force_reindex:
-                    logger.info(
-                        f"Force re-index: Attempting to delete existing chunks for {file_abs_path}"
-                    )
-                    try:
-                        query_results = collection.get(
-                            where={"file_path": str(file_abs_path)}, include=[]
-                        )  # Ensure str
-                        if query_results and query_results["ids"]:
-                            existing_ids_to_delete = query_results["ids"]
-                            if existing_ids_to_delete:
-                                logger.info(
-                                    f"Deleting {len(existing_ids_to_delete)} existing chunks for "
-                                    f"{file_abs_path}."
-                                )
-                                collection.delete(ids=existing_ids_to_delete)
-                            # else:
-                            #     logger.info(f"No existing chunks found to delete for {file_abs_path} during force_reindex.")  # noqa: E501
-                        # else:
-                        #     logger.info(f"No existing chunks found (or query failed) for {file_abs_path} during force_reindex attempt.")  # noqa: E501
-                    except Exception as e_del:
-                        logger.error(
-                            f"Error deleting existing chunks for {file_abs_path} during "
-                            f"force_reindex: {e_del}"
-                        )
-
-                success = indexing.index_file_chunks(collection, file_chunks_data)
-                if success:
-                    processed_files += 1
-                    total_chunks_indexed += len(file_chunks_data)
-                    logger.info(
-                        f"Successfully indexed {len(file_chunks_data)} chunks from {file_abs_path}."
-                    )
-
-                    # Add a small delay between file processing to avoid hitting rate limits
-                    # Only delay if we successfully processed a file and there are more files to
-                    # process
-                    time.sleep(0.5)  # 500ms delay between files
-                else:
-                    logger.error(f"Failed to index chunks from {file_abs_path}.")
-                    errors.append(str(file_abs_path))
-
-            except Exception as e:
-                logger.error(f"Error processing file {file_abs_path}: {e}")
-                errors.append(str(file_abs_path))
+    # Load ignore patterns, compiled once for the whole walk
+    ignore_matcher = IgnoreMatcher(_load_ignore_patterns(root_scan_path))
+
+    with _indexing_lock:
+        manifest = indexing.get_collection_manifest()
+        if len(manifest) and not collection.count():
+            # The collection was emptied behind the manifest's back; nothing it lists is indexed
+            logger.warning("Index manifest is out of sync with an empty collection, resetting it.")
+            manifest.clear()
+        lexical_index = indexing.get_collection_lexical_index()
+        if not len(lexical_index) and collection.count():
+            # Collections indexed before the lexical index existed get one without re-embedding
+            indexing.rebuild_lexical_index(collection)
+
+        candidate_files, ignored_files_count, ignored_dirs_count = _scan_directory(
+            root_scan_path, ignore_matcher, file_extensions_set
+        )
+        result = _index_files(collection, manifest, candidate_files, force_reindex)
+
+        # Files indexed by earlier runs that were deleted, or are now ignored, are removed
+        seen_files = {str(file_path) for file_path in candidate_files}
+        removed_files = _remove_indexed_files(
+            collection,
+            manifest,
+            [
+                stale_path
+                for stale_path in manifest.paths_under(root_scan_path)
+                if stale_path not in seen_files and Path(stale_path).suffix in file_extensions_set
+            ],
+        )
+        manifest.save()
+        lexical_index.save()
 
     summary_message = (
         f"Indexing complete for directory: {root_scan_path}.\n"
-        f"Processed {processed_files} files.\n"
-        f"Indexed a total of {total_chunks_indexed} chunks.\n"
+        f"Processed {result.processed_files} files "
+        f"({result.unchanged_files} unchanged files skipped).\n"
+        f"Indexed a total of {result.chunks_indexed} chunks.\n"
+        f"Removed {removed_files} deleted or ignored files from the index.\n"
         f"Ignored {ignored_files_count} files and {ignored_dirs_count} directories based on .indexignore rules.\n"  # noqa: E501
         f"Current collection size: {collection.count()} items."
     )
-    if errors:
-        summary_message += f"\nEncountered errors with files: {', '.join(errors)}"
+    if result.errors:
+        summary_message += f"\nEncountered errors with files: {', '.join(result.errors)}"
+    if RAG_WATCH_ENABLED and start_index_watcher(root_scan_path, file_extensions):
+        summary_message += "\nWatching the directory to keep the index up to date."
 
     return summary_message
 
@@ -262,6 +493,8 @@ def index_directory_tool(
 def retrieve_code_context_tool(query: str, top_k: int = 5) -> dict | str:
     """
     Retrieves relevant code chunks from the indexed codebase based on a natural language query.
+    Vector similarity is combined with a BM25 lexical index, so exact identifiers
+    (function, class or variable names) in the query are matched precisely.
 
     Args:
         query: The natural language query to search for.
@@ -273,7 +506,8 @@ def retrieve_code_context_tool(query: str, top_k: int = 5) -> dict | str:
         Structure: {
             "query": str,
             "retrieved_chunks": [
-                {"id": str, "metadata": dict, "document": str, "distance": float}, ...
+                {"id": str, "metadata": dict, "document": str, "distance": float | None,
+                 "score": float, "lexical_score": float}, ...
             ]
         }
     """
@@ -306,4 +540,6 @@ def purge_rag_index_tool():  # The decorated function
 
     No parameters_schema needed here as purge_rag_index_data takes no arguments.
     """
+    # Watchers would otherwise write into the index that is being deleted
+    stop_index_watchers()
     return purging.purge_rag_index_data()
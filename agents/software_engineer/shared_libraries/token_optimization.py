@@ -1,5 +1,6 @@
 """Token optimization utilities for Software Engineer Agent."""
 
+from concurrent.futures import ThreadPoolExecutor
 import functools
 import logging
 from typing import Callable, Optional
@@ -22,6 +23,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent native count_tokens requests issued by count_tokens_batch
+MAX_CONCURRENT_NATIVE_COUNTS = 8
+
 
 def _token_counting_error_handler(func):
     """Decorator to handle token counting errors gracefully."""
@@ -40,6 +44,34 @@ def _token_counting_error_handler(func):
     return wrapper
 
 
+def _get_shared_tokenizer_registry():
+    """Return the process-wide tokenizer registry shared with the DevOps agent, if available."""
+    try:
+        from ...devops.components.context_management.tokenizer_registry import (
+            get_tokenizer_registry,
+        )
+    except ImportError:
+        logger.debug("Shared tokenizer registry not available; resolving tokenizers locally")
+        return None
+    return get_tokenizer_registry()
+
+
+def _load_working_tiktoken_encoding(model_name: str):
+    """Load the tiktoken encoding for a model and check that it encodes, or return None."""
+    try:
+        try:
+            tokenizer = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            # Model not found, try generic encoder
+            tokenizer = tiktoken.get_encoding("cl100k_base")
+
+        if tokenizer and len(tokenizer.encode("test")) > 0:
+            return tokenizer
+    except Exception as e:
+        logger.debug(f"Tiktoken test failed: {e}")
+    return None
+
+
 class TokenCounter:
     """Token counting with multiple fallback strategies for reliability."""
 
@@ -60,8 +92,16 @@ class TokenCounter:
         Returns:
             A function that takes text and returns token count
         """
+        registry = _get_shared_tokenizer_registry()
+
         # Strategy 1: Native Google GenAI client's count_tokens
-        if self._try_native_google_counter():
+        if registry is not None and isinstance(self.llm_client, genai.Client):
+            native_available = registry.native_counter_available(
+                self.model_name, self.llm_client, prober=self._try_native_google_counter
+            )
+        else:
+            native_available = self._try_native_google_counter()
+        if native_available:
             logger.info(f"Using native Google GenAI token counter for {self.model_name}")
             return self._native_google_counter
 
@@ -98,22 +138,22 @@ class TokenCounter:
         return False
 
     def _try_tiktoken_counter(self) -> bool:
-        """Test if tiktoken is available and working."""
-        try:
-            tokenizer = None
-            try:
-                tokenizer = tiktoken.encoding_for_model(self.model_name)
-            except KeyError:
-                # Model not found, try generic encoder
-                tokenizer = tiktoken.get_encoding("cl100k_base")
-
-            if tokenizer:
-                # Test tokenizer
-                test_tokens = tokenizer.encode("test")
-                self._tiktoken_tokenizer = tokenizer
-                return len(test_tokens) > 0
-        except Exception as e:
-            logger.debug(f"Tiktoken test failed: {e}")
+        """Test if tiktoken is available and working.
+
+        The encoding is shared with every other counter for the same model through the
+        process-wide tokenizer registry when it is available.
+        """
+        registry = _get_shared_tokenizer_registry()
+        if registry is not None:
+            tokenizer = registry.get_tiktoken_encoding(
+                self.model_name, loader=_load_working_tiktoken_encoding
+            )
+        else:
+            tokenizer = _load_working_tiktoken_encoding(self.model_name)
+
+        if tokenizer:
+            self._tiktoken_tokenizer = tokenizer
+            return True
         return False
 
     @_token_counting_error_handler
@@ -173,6 +213,56 @@ class TokenCounter:
             )
             return len(text) // 4
 
+    def count_tokens_batch(self, texts: list[Optional[str]]) -> list[int]:
+        """Count tokens for several texts at once.
+
+        Duplicates are counted once and the unique texts are counted in a single pass
+        (tiktoken ``encode_batch`` or concurrent native requests) instead of one
+        round-trip per item.
+
+        Args:
+            texts: The texts to count tokens for (None and empty strings count as 0)
+
+        Returns:
+            Token counts in the same order as the input texts
+        """
+        counts = [0] * len(texts)
+        pending: dict[str, list[int]] = {}  # unique text -> positions
+        for i, text in enumerate(texts):
+            if text is None:
+                continue
+            if not isinstance(text, str):
+                text = str(text)
+            if text:
+                pending.setdefault(text, []).append(i)
+
+        if not pending:
+            return counts
+
+        unique_texts = list(pending)
+        for text, tokens in zip(unique_texts, self._count_unique_texts(unique_texts)):
+            for i in pending[text]:
+                counts[i] = tokens
+        return counts
+
+    def _count_unique_texts(self, texts: list[str]) -> list[int]:
+        """Count a list of non-empty texts with the selected strategy in a single pass."""
+        if len(texts) > 1 and self._token_counting_fn == self._tiktoken_counter:
+            try:
+                return [len(tokens) for tokens in self._tiktoken_tokenizer.encode_batch(texts)]
+            except Exception as e:
+                logger.debug(f"tiktoken encode_batch failed, counting sequentially: {e}")
+
+        if len(texts) > 1 and self._token_counting_fn == self._native_google_counter:
+            # count_tokens only reports an aggregate total, so per-item counts are fetched
+            # concurrently to pay roughly one round-trip of latency for the whole batch
+            with ThreadPoolExecutor(
+                max_workers=min(MAX_CONCURRENT_NATIVE_COUNTS, len(texts))
+            ) as executor:
+                return list(executor.map(self.count_tokens, texts))
+
+        return [self.count_tokens(text) for text in texts]
+
     def count_llm_request_tokens(self, llm_request: LlmRequest) -> dict[str, int]:
         """Count tokens for different components of an LLM request.
 
@@ -191,33 +281,45 @@ class TokenCounter:
         }
 
         try:
-            # Count system instruction tokens
+            # Gather every component first so all of them are counted in one batch
+            system_text = None
             if hasattr(llm_request, "system_instruction") and llm_request.system_instruction:
-                token_breakdown["system_instruction"] = self.count_tokens(
-                    str(llm_request.system_instruction)
-                )
+                system_text = str(llm_request.system_instruction)
 
-            # Count tools definition tokens
+            tools_text = None
             if hasattr(llm_request, "tools") and llm_request.tools:
-                token_breakdown["tools"] = self.count_tokens(str(llm_request.tools))
-
-            # Count conversation content tokens
-            if hasattr(llm_request, "contents") and isinstance(llm_request.contents, list):
-                conversation_tokens = 0
-                current_user_tokens = 0
+                tools_text = str(llm_request.tools)
 
+            has_contents = hasattr(llm_request, "contents") and isinstance(
+                llm_request.contents, list
+            )
+            part_texts = []  # (text, is_user_message)
+            if has_contents:
                 for content in llm_request.contents:
                     if hasattr(content, "parts") and content.parts:
                         for part in content.parts:
                             if hasattr(part, "text") and part.text:
-                                part_tokens = self.count_tokens(part.text)
-                                conversation_tokens += part_tokens
-
                                 # Try to identify current user message
-                                if content.role == "user" and not part.text.startswith(
-                                    "SYSTEM CONTEXT (JSON):"
-                                ):
-                                    current_user_tokens = part_tokens
+                                is_user_message = content.role == "user" and not (
+                                    part.text.startswith("SYSTEM CONTEXT (JSON):")
+                                )
+                                part_texts.append((part.text, is_user_message))
+
+            counts = self.count_tokens_batch(
+                [system_text, tools_text] + [text for text, _ in part_texts]
+            )
+            token_breakdown["system_instruction"] = counts[0]
+            token_breakdown["tools"] = counts[1]
+
+            # Count conversation content tokens
+            if has_contents:
+                conversation_tokens = 0
+                current_user_tokens = 0
+
+                for (_, is_user_message), part_tokens in zip(part_texts, counts[2:]):
+                    conversation_tokens += part_tokens
+                    if is_user_message:
+                        current_user_tokens = part_tokens
 
                 token_breakdown["conversation_history"] = conversation_tokens
                 token_breakdown["user_message"] = current_user_tokens
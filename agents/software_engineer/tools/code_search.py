@@ -1,7 +1,10 @@
 """Code search functionality for software engineer agents using ripgrep."""
 
+from collections.abc import Iterator
+import heapq
 import json
 import logging
+import os
 from pathlib import Path
 import subprocess
 from typing import Any, Optional
@@ -11,21 +14,37 @@ from google.adk.tools import FunctionTool, ToolContext
 logger = logging.getLogger(__name__)
 
 
+# Matches kept per file, so one noisy file cannot crowd out the rest of the results
+MAX_MATCHES_PER_FILE = 5
+# The search stops early once max_results matches scoring at least this much are kept...
+HIGH_RELEVANCE_SCORE = 0.75
+# ...or once this many matches per requested result have been read
+MAX_SCANNED_MATCHES_PER_RESULT = 20
+# rg searches the trigram index's candidate files only if there are at most this many
+MAX_INDEXED_CANDIDATE_FILES = 1000
+
+
 def ripgrep_code_search(
     query: str,
     target_directories: Optional[list[str]] = None,
     explanation: Optional[str] = None,
+    max_results: int = 50,
     tool_context: Optional[ToolContext] = None,
 ) -> dict[str, Any]:
     """
     Perform a context-aware code search using ripgrep (rg) and return the results.
 
     Enhanced with project structure awareness and dependency-based prioritization.
+    All search paths are searched by a single rg process whose output is read as it
+    is produced; only the best max_results matches are kept, at most
+    MAX_MATCHES_PER_FILE per file, and rg is stopped once enough relevant matches
+    have been found.
 
     Args:
         query: The search query to find relevant code
         target_directories: Optional list of directories to search in (glob patterns supported)
         explanation: Optional explanation of why this search is being performed
+        max_results: Maximum number of matches to return, most relevant first
         tool_context: ADK tool context for accessing session state
 
     Returns:
@@ -34,70 +53,72 @@ def ripgrep_code_search(
     try:
         # Get context-aware search paths
         search_paths = _get_context_aware_search_paths(target_directories, query, tool_context)
+        rg_paths = _collapse_search_paths(search_paths)
 
         logger.info(f"Context-aware code search in paths: {search_paths}")
 
-        results = []
-        for path in search_paths:
-            # Build the ripgrep command with enhanced options
-            cmd = [
-                "rg",
-                "--json",
-                "--context",
-                "2",  # Show 2 lines before and after matches
-                "--max-columns",
-                "1000",  # Reasonable line length limit
-                "--type-add",
-                "config:*.{toml,json,yaml,yml,ini,cfg}",  # Include config files
-                "--smart-case",  # Smart case sensitivity
-                query,
-            ]
-
-            # Add path to search
-            cmd.append(path)
-
-            # Execute the search
-            process = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=False,  # Don't raise exception if nothing found
+        # With a fresh trigram index, rg only reads the files that can contain a match
+        candidate_paths = _indexed_candidate_paths(query, rg_paths)
+        rg_targets = rg_paths if candidate_paths is None else candidate_paths
+
+        # Build the ripgrep command with enhanced options
+        cmd = [
+            "rg",
+            "--json",
+            "--max-columns",
+            "1000",  # Reasonable line length limit
+            "--max-count",
+            str(MAX_MATCHES_PER_FILE),
+            "--type-add",
+            "config:*.{toml,json,yaml,yml,ini,cfg}",  # Include config files
+            "--smart-case",  # Smart case sensitivity
+            "--regexp",
+            query,
+            *rg_targets,
+        ]
+
+        # Relevance depends only on the file, so it is computed once per file
+        scorer = _RelevanceScorer(query, tool_context)
+
+        # Min-heap of (relevance, -sequence, result): the weakest, latest match is evicted
+        max_results = max(1, max_results)
+        top_results: list[tuple[float, int, dict[str, Any]]] = []
+        truncated = False
+        for sequence, match in enumerate(_stream_ripgrep_matches(cmd)):
+            file_path = match.get("path", {}).get("text", "")
+            line_number = match.get("line_number", 0)
+            match_content = match.get("lines", {}).get("text", "").strip()
+
+            # Add relevance scoring based on project context
+            relevance_score = scorer.score(file_path)
+
+            entry = (
+                relevance_score,
+                -sequence,
+                {
+                    "file": file_path,
+                    "line": line_number,
+                    "content": match_content,
+                    "relevance_score": relevance_score,
+                    "search_path": _search_path_for(file_path, rg_paths),
+                },
             )
+            if len(top_results) < max_results:
+                heapq.heappush(top_results, entry)
+            elif entry[:2] > top_results[0][:2]:
+                heapq.heapreplace(top_results, entry)
 
-            # Process the output - each line is a JSON object
-            for line in process.stdout.strip().split("\n"):
-                if not line:
-                    continue
-
-                try:
-                    data = json.loads(line)
-
-                    # Only process match data
-                    if data.get("type") == "match":
-                        file_path = data.get("data", {}).get("path", {}).get("text", "")
-                        line_number = data.get("data", {}).get("line_number", 0)
-                        match_content = (
-                            data.get("data", {}).get("lines", {}).get("text", "").strip()
-                        )
-
-                        # Add relevance scoring based on project context
-                        relevance_score = _calculate_relevance_score(file_path, query, tool_context)
-
-                        results.append(
-                            {
-                                "file": file_path,
-                                "line": line_number,
-                                "content": match_content,
-                                "relevance_score": relevance_score,
-                                "search_path": path,
-                            }
-                        )
-                except json.JSONDecodeError:
-                    # Skip lines that aren't valid JSON
-                    continue
-
-        # Sort results by relevance score (highest first)
-        results.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+            enough_relevant = (
+                len(top_results) == max_results and top_results[0][0] >= HIGH_RELEVANCE_SCORE
+            )
+            if enough_relevant or sequence + 1 >= max_results * MAX_SCANNED_MATCHES_PER_RESULT:
+                # Stopping here kills rg instead of reading matches that would be dropped
+                truncated = True
+                break
+
+        # Sort results by relevance score (highest first), then in the order rg found them
+        top_results.sort(key=lambda entry: entry[:2], reverse=True)
+        results = [result for _, _, result in top_results]
 
         # Add context summary to results
         context_summary = _generate_search_context_summary(query, search_paths, tool_context)
@@ -110,6 +131,7 @@ def ripgrep_code_search(
             "search_paths_used": search_paths,
             "context_summary": context_summary,
             "total_results": len(results),
+            "truncated": truncated,
         }
 
     except Exception as e:
@@ -122,6 +144,95 @@ def ripgrep_code_search(
         }
 
 
+def _stream_ripgrep_matches(cmd: list[str]) -> Iterator[dict[str, Any]]:
+    """Run ripgrep and yield the data of each match as soon as rg prints it.
+
+    rg is killed when the consumer stops early, so it does not keep searching for
+    matches nobody reads.
+    """
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    try:
+        for line in process.stdout:
+            # Begin, end and summary messages are skipped without being parsed
+            if '"match"' not in line[:20]:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                # Skip lines that aren't valid JSON
+                continue
+            yield data.get("data", {})
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+
+
+def _is_within(path: str, parent: str) -> bool:
+    """Whether a normalized path is parent or below it."""
+    if parent == ".":
+        return not (Path(path).is_absolute() or path == ".." or path.startswith(".." + os.sep))
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+def _collapse_search_paths(search_paths: list[str]) -> list[str]:
+    """Drop duplicate search paths and paths inside another one, keeping priority order."""
+    unique_paths = list(dict.fromkeys(os.path.normpath(path) for path in search_paths))
+    collapsed = [
+        path
+        for path in unique_paths
+        if not any(other != path and _is_within(path, other) for other in unique_paths)
+    ]
+    return collapsed or ["."]
+
+
+def _search_path_for(file_path: str, search_paths: list[str]) -> str:
+    """Return the search path a result was found under."""
+    normalized = os.path.normpath(file_path)
+    return next((path for path in search_paths if _is_within(normalized, path)), search_paths[0])
+
+
+def _indexed_candidate_paths(query: str, search_paths: list[str]) -> Optional[list[str]]:
+    """Narrow the search paths to the files the trigram index says may match.
+
+    Returns None when rg should search the paths itself: the index is disabled or
+    not known to be current, the query has no literal text, a path is outside the
+    working directory, or there are no candidates or too many of them.
+    """
+    if any(not _is_within(path, ".") for path in search_paths):
+        return None
+    try:
+        from ...devops.shared_libraries.trigram_index import find_candidate_files
+
+        candidates = find_candidate_files(Path.cwd(), query)
+    except Exception as e:
+        logger.debug(f"Trigram index unavailable, searching without it: {e}")
+        return None
+    if candidates is None:
+        return None
+
+    selected = [
+        os.path.normpath(candidate)
+        for candidate in candidates
+        if any(_is_within(os.path.normpath(candidate), path) for path in search_paths)
+    ]
+    if not selected or len(selected) > MAX_INDEXED_CANDIDATE_FILES:
+        return None
+    if search_paths == ["."]:
+        # Keep result paths as rg prints them when searching "."
+        selected = [os.curdir + os.sep + path for path in selected]
+    logger.debug(f"Trigram index narrowed the search to {len(selected)} files")
+    return selected
+
+
 def _get_context_aware_search_paths(
     target_directories: Optional[list[str]], query: str, tool_context: Optional[ToolContext]
 ) -> list[str]:
@@ -233,7 +344,7 @@ def _get_structure_based_paths(query: str, structure: dict[str, Any]) -> list[st
 
     try:
         query_lower = query.lower()
-        directory_tree = structure.get("directory_tree", {})
+        directory_names = _directory_names_in_structure(structure)
 
         # Keywords that suggest specific directory types
         path_keywords = {
@@ -252,7 +363,7 @@ def _get_structure_based_paths(query: str, structure: dict[str, Any]) -> list[st
         for keyword, dir_names in path_keywords.items():
             if keyword in query_lower:
                 for dir_name in dir_names:
-                    if _directory_exists_in_structure(dir_name, directory_tree):
+                    if dir_name.lower() in directory_names:
                         paths.append(dir_name)
 
         # Add paths based on file extensions mentioned in query
@@ -276,20 +387,110 @@ def _get_structure_based_paths(query: str, structure: dict[str, Any]) -> list[st
     return paths
 
 
-def _directory_exists_in_structure(dir_name: str, directory_tree: dict[str, Any]) -> bool:
-    """Check if a directory exists in the project structure."""
-    try:
-        children = directory_tree.get("children", {})
-        for name, info in children.items():
-            if name.lower() == dir_name.lower() and info.get("type") == "directory":
-                return True
-            # Recursively check subdirectories
-            if info.get("type") == "directory":
-                if _directory_exists_in_structure(dir_name, info):
-                    return True
-        return False
-    except Exception:
-        return False
+def _directory_names_in_structure(structure: dict[str, Any]) -> set[str]:
+    """Return the lowercased names of all directories in the project structure."""
+    if "directories" in structure:
+        return {Path(path).name.lower() for path in structure["directories"]}
+
+    # Structures mapped with the nested tree only
+    names = set()
+    pending = [structure.get("directory_tree", {})]
+    while pending:
+        for name, info in pending.pop().get("children", {}).items():
+            if isinstance(info, dict) and info.get("type") == "directory":
+                names.add(name.lower())
+                pending.append(info)
+    return names
+
+
+class _RelevanceScorer:
+    """
+    Scores the results of one search by the file they were found in.
+
+    Session state is read once when the search starts, and each file is scored once
+    however many of its lines match.
+    """
+
+    def __init__(self, query: str, tool_context: Optional[ToolContext]):
+        self.query_lower = query.lower()
+        self.has_context = bool(tool_context) and hasattr(tool_context, "state")
+        self.key_files: tuple[str, ...] = ()
+        self.common_file_types: frozenset[str] = frozenset()
+        self.current_directory = Path()
+        self._scores: dict[str, float] = {}
+        if not self.has_context:
+            return
+
+        try:
+            session_state = tool_context.state
+            project_structure = session_state.get("project_structure", {})
+            self.key_files = tuple(project_structure.get("key_files", []))
+            # File types seen more than once in the project
+            self.common_file_types = frozenset(
+                file_ext
+                for file_ext, count in project_structure.get("file_types", {}).items()
+                if count > 1
+            )
+            self.current_directory = Path(session_state.get("current_directory", "."))
+        except Exception as e:
+            logger.debug(f"Error reading project context for relevance scoring: {e}")
+            self.has_context = False
+
+    def score(self, file_path: str) -> float:
+        """Return the relevance score (0.0 to 1.0) of a result found in file_path."""
+        score = self._scores.get(file_path)
+        if score is None:
+            score = self._scores[file_path] = self._score_file(file_path)
+        return score
+
+    def _score_file(self, file_path: str) -> float:
+        score = 0.5  # Base score
+        if not self.has_context:
+            return score
+
+        try:
+            path_lower = file_path.lower()
+
+            # Boost score for key project files
+            if any(key_file in file_path for key_file in self.key_files):
+                score += 0.2
+
+            # Boost score for source directories
+            if any(src_dir in path_lower for src_dir in ["src/", "lib/", "agents/", "tools/"]):
+                score += 0.15
+
+            # Boost score for files matching project type
+            if Path(file_path).suffix.lower() in self.common_file_types:
+                score += 0.1
+
+            # Boost score for recent files (if we tracked modification times)
+            try:
+                full_path = self.current_directory / file_path
+                if full_path.exists():
+                    # Simple proximity boost - files closer to root get slight boost
+                    depth = len(Path(file_path).parts)
+                    if depth <= 3:  # Shallow files get boost
+                        score += 0.05
+            except Exception as e:
+                logger.debug(f"Could not check file existence or depth for {file_path}: {e}")
+
+            # Penalize deeply nested files more aggressively
+            depth_count = len(Path(file_path).parts)
+            if depth_count > 3:
+                score -= 0.11 * (depth_count - 3)  # -0.11 for each level beyond 3
+
+            # Boost for exact query matches in file name
+            file_name = Path(file_path).name.lower()
+            if self.query_lower in file_name:
+                score += 0.1
+
+            # Ensure score stays in valid range
+            score = max(0.0, min(1.0, score))
+
+        except Exception as e:
+            logger.debug(f"Error calculating relevance score: {e}")
+
+        return score
 
 
 def _calculate_relevance_score(
@@ -298,6 +499,8 @@ def _calculate_relevance_score(
     """
     Calculate relevance score for a search result based on project context.
 
+    Searches score many results with one _RelevanceScorer instead.
+
     Args:
         file_path: Path to the file containing the match
         query: Original search query
@@ -306,62 +509,7 @@ def _calculate_relevance_score(
     Returns:
         Relevance score (0.0 to 1.0)
     """
-    score = 0.5  # Base score
-
-    try:
-        if not tool_context or not hasattr(tool_context, "state"):
-            return score
-
-        session_state = tool_context.state
-        project_structure = session_state.get("project_structure", {})
-
-        path_lower = file_path.lower()
-        query_lower = query.lower()
-
-        # Boost score for key project files
-        key_files = project_structure.get("key_files", [])
-        if any(key_file in file_path for key_file in key_files):
-            score += 0.2
-
-        # Boost score for source directories
-        if any(src_dir in path_lower for src_dir in ["src/", "lib/", "agents/", "tools/"]):
-            score += 0.15
-
-        # Boost score for files matching project type
-        file_types = project_structure.get("file_types", {})
-        file_ext = Path(file_path).suffix.lower()
-        if file_ext in file_types and file_types[file_ext] > 1:  # Common file type
-            score += 0.1
-
-        # Boost score for recent files (if we tracked modification times)
-        current_dir = session_state.get("current_directory", ".")
-        try:
-            full_path = Path(current_dir) / file_path
-            if full_path.exists():
-                # Simple proximity boost - files closer to root get slight boost
-                depth = len(Path(file_path).parts)
-                if depth <= 3:  # Shallow files get boost
-                    score += 0.05
-        except Exception as e:
-            logger.debug(f"Could not check file existence or depth for {file_path}: {e}")
-
-        # Penalize deeply nested files more aggressively
-        depth_count = len(Path(file_path).parts)
-        if depth_count > 3:
-            score -= 0.11 * (depth_count - 3)  # -0.11 for each level beyond 3
-
-        # Boost for exact query matches in file name
-        file_name = Path(file_path).name.lower()
-        if query_lower in file_name:
-            score += 0.1
-
-        # Ensure score stays in valid range
-        score = max(0.0, min(1.0, score))
-
-    except Exception as e:
-        logger.debug(f"Error calculating relevance score: {e}")
-
-    return score
+    return _RelevanceScorer(query, tool_context).score(file_path)
 
 
 def _generate_search_context_summary(
@@ -1,10 +1,14 @@
 """Project context loading for the Software Engineer Agent."""
 
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
-import fnmatch
 import logging
+import os
 from pathlib import Path
 import re
+import threading
+import time
 from typing import Any, Optional
 
 from ..shared_libraries.constants import DEFAULT_IGNORE_PATTERNS
@@ -66,75 +70,105 @@ def load_project_context(callback_context) -> Optional[dict[str, Any]]:
         return None
 
 
-def map_project_structure(
-    root_path: str, max_depth: int = 3, ignore_patterns: Optional[list[str]] = None
-) -> dict[str, Any]:
-    """
-    Recursively map the project's file and directory structure.
+# Files whose presence says what kind of project this is
+KEY_PROJECT_FILES = frozenset(
+    {
+        "pyproject.toml",
+        "package.json",
+        "Cargo.toml",
+        "go.mod",
+        "requirements.txt",
+        "Dockerfile",
+        "docker-compose.yml",
+        "README.md",
+        "LICENSE",
+        "Makefile",
+        ".gitignore",
+    }
+)
+# A directory or file changed this close to being read may change again within the
+# same mtime tick, so what was read is not trusted on the next call
+_RACY_MTIME_NS = 2_000_000_000
+# Project roots (with their ignore patterns) whose directory listings are cached
+_MAX_CACHED_STRUCTURES = 8
 
-    Args:
-        root_path: The root directory path to start mapping from
-        max_depth: Maximum depth for recursive traversal (default: 3)
-        ignore_patterns: List of patterns to ignore (gitignore-style)
 
-    Returns:
-        Dictionary containing the project structure with metadata
-    """
-    if ignore_patterns is None:
-        ignore_patterns = DEFAULT_IGNORE_PATTERNS
+@dataclass(frozen=True)
+class _DirectoryListing:
+    """The entries of one directory, as of the directory's modification time."""
 
-    try:
-        root = Path(root_path).resolve()
-        if not root.exists() or not root.is_dir():
-            return {"error": f"Invalid root directory: {root_path}"}
+    mtime_ns: int
+    scanned_ns: int
+    # (name, is_directory, size) of the entries that are not ignored, sorted by name
+    entries: tuple[tuple[str, bool, int], ...]
+
+
+class _ProjectStructureCache:
+    """Directory listings of one project tree, scanned again only where they changed.
 
+    Adding, removing or renaming an entry changes its directory's mtime, so a listing
+    is reused for as long as the directory's mtime is the same. Editing a file in
+    place does not, so the sizes of existing files may lag until their directory
+    changes.
+    """
+
+    def __init__(self, root: Path, ignore_patterns: tuple[str, ...]):
+        from ...devops.shared_libraries.ignore_matcher import IgnoreMatcher
+
+        self.root = root
+        # Compiled once; paths are matched relative to the root, which is never ignored
+        self.ignore_matcher = IgnoreMatcher(ignore_patterns)
+        self._listings: dict[str, _DirectoryListing] = {}
+        self._lock = threading.Lock()
+
+    def _listing(self, directory: str, relative_directory: str) -> _DirectoryListing:
+        """Return a directory's listing, scanning it only if it changed since last time."""
+        mtime_ns = Path(directory).stat().st_mtime_ns
+        cached = self._listings.get(relative_directory)
+        if (
+            cached is not None
+            and cached.mtime_ns == mtime_ns
+            and cached.scanned_ns - mtime_ns > _RACY_MTIME_NS
+        ):
+            return cached
+
+        scanned_ns = time.time_ns()
+        prefix = f"{relative_directory}/" if relative_directory else ""
+        entries = []
+        with os.scandir(directory) as iterator:
+            for entry in iterator:
+                try:
+                    is_dir = entry.is_dir()
+                    if self.ignore_matcher.is_ignored(prefix + entry.name, is_dir=is_dir):
+                        continue
+                    if is_dir:
+                        entries.append((entry.name, True, 0))
+                    elif entry.is_file():
+                        entries.append((entry.name, False, entry.stat().st_size))
+                except OSError:
+                    # Vanished or unreadable entries are skipped
+                    continue
+        entries.sort()
+        return _DirectoryListing(mtime_ns, scanned_ns, tuple(entries))
+
+    def map(self, max_depth: int, include_tree: bool) -> dict[str, Any]:
+        """Build the structure dictionary returned by map_project_structure."""
         structure = {
-            "root_path": str(root),
-            "project_name": root.name,
+            "root_path": str(self.root),
+            "project_name": self.root.name,
             "total_files": 0,
             "total_directories": 0,
             "file_types": {},
-            "directory_tree": {},
+            "directories": [],
             "key_files": [],
             "generated_at": datetime.now().isoformat(),  # Actual timestamp
         }
+        listings: dict[str, _DirectoryListing] = {}
 
-        def _should_ignore(path: Path) -> bool:
-            """Check if path should be ignored based on patterns using robust pattern matching"""
-            path_name = path.name
-            path_str = str(path)
-
-            for pattern in ignore_patterns:
-                # Handle directory patterns (ending with /)
-                if pattern.endswith("/"):
-                    dir_pattern = pattern[:-1]
-                    if path.is_dir() and (
-                        fnmatch.fnmatch(path_name, dir_pattern)
-                        or fnmatch.fnmatch(path_str, f"*/{dir_pattern}")
-                    ):
-                        return True
-                # Handle file and directory patterns
-                else:
-                    # Check exact name match and path patterns
-                    if (
-                        fnmatch.fnmatch(path_name, pattern)
-                        or fnmatch.fnmatch(path_str, f"*/{pattern}")
-                        or fnmatch.fnmatch(path_str, pattern)
-                    ):
-                        return True
-                    # For directories, also check if any parent path component matches
-                    if path.is_dir():
-                        parts = path.parts
-                        for part in parts:
-                            if fnmatch.fnmatch(part, pattern):
-                                return True
-            return False
-
-        def _map_directory(dir_path: Path, current_depth: int = 0) -> dict[str, Any]:
+        def _map_directory(
+            directory: str, relative_directory: str, current_depth: int = 0
+        ) -> dict[str, Any]:
             """Recursively map a directory"""
-            if current_depth > max_depth or _should_ignore(dir_path):
-                return {}
-
             dir_info = {
                 "type": "directory",
                 "children": {},
@@ -143,61 +177,109 @@ def map_project_structure(
             }
 
             try:
-                for item in sorted(dir_path.iterdir()):
-                    if _should_ignore(item):
-                        continue
-
-                    item_name = item.name
-                    if item.is_file():
-                        # Track file information
-                        file_ext = item.suffix.lower()
-                        if file_ext:
-                            structure["file_types"][file_ext] = (
-                                structure["file_types"].get(file_ext, 0) + 1
-                            )
-
-                        dir_info["children"][item_name] = {
-                            "type": "file",
-                            "size": item.stat().st_size if item.exists() else 0,
-                            "extension": file_ext,
-                        }
-
-                        # Track key project files
-                        if item_name in [
-                            "pyproject.toml",
-                            "package.json",
-                            "Cargo.toml",
-                            "go.mod",
-                            "requirements.txt",
-                            "Dockerfile",
-                            "docker-compose.yml",
-                            "README.md",
-                            "LICENSE",
-                            "Makefile",
-                            ".gitignore",
-                        ]:
-                            structure["key_files"].append(str(item.relative_to(root)))
-
-                        structure["total_files"] += 1
-                        dir_info["file_count"] += 1
-
-                    elif item.is_dir() and current_depth < max_depth:
-                        subdir_info = _map_directory(item, current_depth + 1)
-                        if subdir_info:  # Only add if not empty
-                            dir_info["children"][item_name] = subdir_info
-                            structure["total_directories"] += 1
-                            dir_info["subdir_count"] += 1
-
+                listing = self._listing(directory, relative_directory)
             except PermissionError:
-                logger.debug(f"Permission denied accessing: {dir_path}")
+                logger.debug(f"Permission denied accessing: {directory}")
+                return dir_info
             except Exception as e:
-                logger.debug(f"Error processing directory {dir_path}: {e}")
+                logger.debug(f"Error processing directory {directory}: {e}")
+                return dir_info
+            listings[relative_directory] = listing
+
+            prefix = f"{relative_directory}/" if relative_directory else ""
+            for name, is_dir, size in listing.entries:
+                if not is_dir:
+                    # Track file information
+                    file_ext = Path(name).suffix.lower()
+                    if file_ext:
+                        structure["file_types"][file_ext] = (
+                            structure["file_types"].get(file_ext, 0) + 1
+                        )
+
+                    dir_info["children"][name] = {
+                        "type": "file",
+                        "size": size,
+                        "extension": file_ext,
+                    }
+
+                    # Track key project files
+                    if name in KEY_PROJECT_FILES:
+                        structure["key_files"].append(str(Path(prefix + name)))
+
+                    structure["total_files"] += 1
+                    dir_info["file_count"] += 1
+
+                elif current_depth < max_depth:
+                    structure["directories"].append(prefix + name)
+                    subdir_info = _map_directory(
+                        str(Path(directory) / name), prefix + name, current_depth + 1
+                    )
+                    dir_info["children"][name] = subdir_info
+                    structure["total_directories"] += 1
+                    dir_info["subdir_count"] += 1
 
             return dir_info
 
-        # Start mapping from root
-        structure["directory_tree"] = _map_directory(root)
+        with self._lock:
+            directory_tree = _map_directory(str(self.root), "")
+            # Listings of directories that are gone or out of reach are dropped
+            self._listings = listings
+
+        if include_tree:
+            structure["directory_tree"] = directory_tree
         structure["total_directories"] += 1  # Count root directory
+        return structure
+
+
+_structure_caches: OrderedDict[tuple[Path, tuple[str, ...]], _ProjectStructureCache] = OrderedDict()
+_structure_caches_lock = threading.Lock()
+
+
+def _get_structure_cache(root: Path, ignore_patterns: list[str]) -> _ProjectStructureCache:
+    """Return the cached listings of a project tree mapped with the given patterns."""
+    key = (root, tuple(ignore_patterns))
+    with _structure_caches_lock:
+        cache = _structure_caches.get(key)
+        if cache is None:
+            cache = _structure_caches[key] = _ProjectStructureCache(root, key[1])
+            if len(_structure_caches) > _MAX_CACHED_STRUCTURES:
+                _structure_caches.popitem(last=False)
+        else:
+            _structure_caches.move_to_end(key)
+        return cache
+
+
+def map_project_structure(
+    root_path: str,
+    max_depth: int = 3,
+    ignore_patterns: Optional[list[str]] = None,
+    include_tree: bool = True,
+) -> dict[str, Any]:
+    """
+    Recursively map the project's file and directory structure.
+
+    Directory listings are cached per root and ignore patterns; repeated calls only
+    scan the directories whose modification time changed since the previous call.
+
+    Args:
+        root_path: The root directory path to start mapping from
+        max_depth: Maximum depth for recursive traversal (default: 3)
+        ignore_patterns: List of patterns to ignore (gitignore-style)
+        include_tree: Whether to include the nested ``directory_tree``; the flat
+            ``directories`` list of relative paths is always included
+
+    Returns:
+        Dictionary containing the project structure with metadata
+    """
+    if ignore_patterns is None:
+        ignore_patterns = DEFAULT_IGNORE_PATTERNS
+
+    try:
+        root = Path(root_path).resolve()
+        if not root.exists() or not root.is_dir():
+            return {"error": f"Invalid root directory: {root_path}"}
+
+        structure = _get_structure_cache(root, ignore_patterns).map(max_depth, include_tree)
 
         logger.info(
             f"Mapped project structure: {structure['total_files']} files, "
@@ -211,10 +293,177 @@ def map_project_structure(
         return {"error": str(e)}
 
 
+def _parse_pyproject(path: Path) -> dict[str, list[str]]:
+    """Parse Python dependencies from pyproject.toml."""
+    found = {"python": [], "dev_dependencies": []}
+    try:
+        import tomllib
+
+        with path.open("rb") as f:
+            pyproject_data = tomllib.load(f)
+
+        # Extract dependencies from pyproject.toml
+        if "project" in pyproject_data and "dependencies" in pyproject_data["project"]:
+            found["python"] = pyproject_data["project"]["dependencies"]
+
+        # Extract optional dependencies
+        if "project" in pyproject_data and "optional-dependencies" in pyproject_data["project"]:
+            for _group, deps in pyproject_data["project"]["optional-dependencies"].items():
+                found["dev_dependencies"].extend(deps)
+
+    except ImportError:
+        # Fallback: read as text and parse basic patterns
+        content = path.read_text()
+        found["python"] = _extract_deps_from_text(content, "dependencies")
+    except Exception as e:
+        logger.debug(f"Error parsing pyproject.toml: {e}")
+    return found
+
+
+def _parse_requirements(path: Path) -> dict[str, list[str]]:
+    """Parse Python dependencies from requirements.txt."""
+    found = {"python": []}
+    try:
+        content = path.read_text()
+        found["python"] = [
+            line.strip()
+            for line in content.split("\n")
+            if line.strip() and not line.startswith("#")
+        ]
+    except Exception as e:
+        logger.debug(f"Error reading requirements.txt: {e}")
+    return found
+
+
+def _parse_package_json(path: Path) -> dict[str, list[str]]:
+    """Parse JavaScript dependencies from package.json."""
+    found = {"javascript": [], "dev_dependencies": []}
+    try:
+        import json
+
+        content = path.read_text()
+        package_data = json.loads(content)
+
+        if "dependencies" in package_data:
+            found["javascript"].extend(list(package_data["dependencies"].keys()))
+        if "devDependencies" in package_data:
+            found["dev_dependencies"].extend(list(package_data["devDependencies"].keys()))
+    except Exception as e:
+        logger.debug(f"Error parsing package.json: {e}")
+    return found
+
+
+def _parse_cargo_toml(path: Path) -> dict[str, list[str]]:
+    """Parse Rust dependencies from Cargo.toml."""
+    found = {"rust": [], "dev_dependencies": []}
+    try:
+        import tomllib
+
+        with path.open("rb") as f:
+            cargo_data = tomllib.load(f)
+
+        if "dependencies" in cargo_data:
+            found["rust"] = list(cargo_data["dependencies"].keys())
+
+        if "dev-dependencies" in cargo_data:
+            found["dev_dependencies"].extend(cargo_data["dev-dependencies"].keys())
+
+    except ImportError:
+        # Fallback parsing
+        content = path.read_text()
+        found["rust"] = _extract_deps_from_text(content, "dependencies")
+    except Exception as e:
+        logger.debug(f"Error parsing Cargo.toml: {e}")
+    return found
+
+
+def _parse_go_mod(path: Path) -> dict[str, list[str]]:
+    """Parse Go dependencies from go.mod."""
+    found = {"go": []}
+    try:
+        content = path.read_text()
+        deps = []
+
+        # Use regex to robustly find all require blocks and dependencies
+        # Handle both single-line and multi-line require blocks
+        require_patterns = [
+            r"require\s+([^\s]+)\s+([^\s]+)",  # Single line: require module version
+            r"require\s*\(\s*([^)]+)\)",  # Multi-line: require ( ... )
+        ]
+
+        for pattern in require_patterns:
+            matches = re.finditer(pattern, content, re.MULTILINE | re.DOTALL)
+            for match in matches:
+                if pattern.endswith(r"([^\s]+)\s+([^\s]+)"):
+                    # Single-line require
+                    module_name = match.group(1)
+                    if module_name and not module_name.startswith("//"):
+                        deps.append(module_name)
+                else:
+                    # Multi-line require block
+                    block_content = match.group(1)
+                    # Extract all module names from the block
+                    module_matches = re.finditer(
+                        r"^\s*([^\s]+)\s+[^\s]+", block_content, re.MULTILINE
+                    )
+                    for module_match in module_matches:
+                        line = module_match.group(0).strip()
+                        if not line.startswith("//"):
+                            module_name = module_match.group(1)
+                            if module_name:
+                                deps.append(module_name)
+
+        found["go"] = list(set(deps))  # Remove duplicates
+    except Exception as e:
+        logger.debug(f"Error parsing go.mod: {e}")
+    return found
+
+
+# Dependency manifests in the order their dependencies are merged, with their parsers
+_DEPENDENCY_MANIFESTS = (
+    ("pyproject.toml", _parse_pyproject),
+    ("requirements.txt", _parse_requirements),
+    ("package.json", _parse_package_json),
+    ("Cargo.toml", _parse_cargo_toml),
+    ("go.mod", _parse_go_mod),
+)
+# Parsed manifests by path, with the (size, mtime_ns) they were parsed at
+_parsed_manifests: dict[Path, tuple[tuple[int, int], dict[str, list[str]]]] = {}
+_parsed_manifests_lock = threading.Lock()
+
+
+def _parse_manifest(path: Path, parser) -> Optional[dict[str, list[str]]]:
+    """Return a manifest's parsed dependencies, parsing it only if it changed.
+
+    Returns None when the manifest does not exist.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        with _parsed_manifests_lock:
+            _parsed_manifests.pop(path, None)
+        return None
+    fingerprint = (stat.st_size, stat.st_mtime_ns)
+    with _parsed_manifests_lock:
+        cached = _parsed_manifests.get(path)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    parsed = parser(path)
+    if time.time_ns() - stat.st_mtime_ns > _RACY_MTIME_NS:
+        # A manifest written just now could change again without changing its mtime
+        with _parsed_manifests_lock:
+            _parsed_manifests[path] = (fingerprint, parsed)
+    return parsed
+
+
 def infer_project_dependencies(project_path: str) -> dict[str, Any]:
     """
     Infer project dependencies from common dependency files.
 
+    Each dependency file is parsed once and cached by its (size, mtime); later calls
+    only parse the files that changed.
+
     Args:
         project_path: Path to the project root
 
@@ -234,132 +483,13 @@ def infer_project_dependencies(project_path: str) -> dict[str, Any]:
     try:
         root = Path(project_path).resolve()
 
-        # Python dependencies
-        pyproject_file = root / "pyproject.toml"
-        requirements_file = root / "requirements.txt"
-
-        if pyproject_file.exists():
-            dependencies["dependency_files_found"].append("pyproject.toml")
-            try:
-                import tomllib
-
-                with pyproject_file.open("rb") as f:
-                    pyproject_data = tomllib.load(f)
-
-                # Extract dependencies from pyproject.toml
-                if "project" in pyproject_data and "dependencies" in pyproject_data["project"]:
-                    dependencies["python"] = pyproject_data["project"]["dependencies"]
-
-                # Extract optional dependencies
-                if (
-                    "project" in pyproject_data
-                    and "optional-dependencies" in pyproject_data["project"]
-                ):
-                    for _group, deps in pyproject_data["project"]["optional-dependencies"].items():
-                        dependencies["dev_dependencies"].extend(deps)
-
-            except ImportError:
-                # Fallback: read as text and parse basic patterns
-                content = pyproject_file.read_text()
-                dependencies["python"] = _extract_deps_from_text(content, "dependencies")
-            except Exception as e:
-                logger.debug(f"Error parsing pyproject.toml: {e}")
-
-        if requirements_file.exists():
-            dependencies["dependency_files_found"].append("requirements.txt")
-            try:
-                content = requirements_file.read_text()
-                deps = [
-                    line.strip()
-                    for line in content.split("\n")
-                    if line.strip() and not line.startswith("#")
-                ]
-                dependencies["python"].extend(deps)
-            except Exception as e:
-                logger.debug(f"Error reading requirements.txt: {e}")
-
-        # JavaScript dependencies
-        package_json_file = root / "package.json"
-        if package_json_file.exists():
-            dependencies["dependency_files_found"].append("package.json")
-            try:
-                import json
-
-                content = package_json_file.read_text()
-                package_data = json.loads(content)
-
-                if "dependencies" in package_data:
-                    dependencies["javascript"].extend(list(package_data["dependencies"].keys()))
-                if "devDependencies" in package_data:
-                    dependencies["dev_dependencies"].extend(
-                        list(package_data["devDependencies"].keys())
-                    )
-            except Exception as e:
-                logger.debug(f"Error parsing package.json: {e}")
-
-        # Rust dependencies
-        cargo_file = root / "Cargo.toml"
-        if cargo_file.exists():
-            dependencies["dependency_files_found"].append("Cargo.toml")
-            try:
-                import tomllib
-
-                with cargo_file.open("rb") as f:
-                    cargo_data = tomllib.load(f)
-
-                if "dependencies" in cargo_data:
-                    dependencies["rust"] = list(cargo_data["dependencies"].keys())
-
-                if "dev-dependencies" in cargo_data:
-                    dependencies["dev_dependencies"].extend(cargo_data["dev-dependencies"].keys())
-
-            except ImportError:
-                # Fallback parsing
-                content = cargo_file.read_text()
-                dependencies["rust"] = _extract_deps_from_text(content, "dependencies")
-            except Exception as e:
-                logger.debug(f"Error parsing Cargo.toml: {e}")
-
-        # Go dependencies
-        go_mod_file = root / "go.mod"
-        if go_mod_file.exists():
-            dependencies["dependency_files_found"].append("go.mod")
-            try:
-                content = go_mod_file.read_text()
-                deps = []
-
-                # Use regex to robustly find all require blocks and dependencies
-                # Handle both single-line and multi-line require blocks
-                require_patterns = [
-                    r"require\s+([^\s]+)\s+([^\s]+)",  # Single line: require module version
-                    r"require\s*\(\s*([^)]+)\)",  # Multi-line: require ( ... )
-                ]
-
-                for pattern in require_patterns:
-                    matches = re.finditer(pattern, content, re.MULTILINE | re.DOTALL)
-                    for match in matches:
-                        if pattern.endswith(r"([^\s]+)\s+([^\s]+)"):
-                            # Single-line require
-                            module_name = match.group(1)
-                            if module_name and not module_name.startswith("//"):
-                                deps.append(module_name)
-                        else:
-                            # Multi-line require block
-                            block_content = match.group(1)
-                            # Extract all module names from the block
-                            module_matches = re.finditer(
-                                r"^\s*([^\s]+)\s+[^\s]+", block_content, re.MULTILINE
-                            )
-                            for module_match in module_matches:
-                                line = module_match.group(0).strip()
-                                if not line.startswith("//"):
-                                    module_name = module_match.group(1)
-                                    if module_name:
-                                        deps.append(module_name)
-
-                dependencies["go"] = list(set(deps))  # Remove duplicates
-            except Exception as e:
-                logger.debug(f"Error parsing go.mod: {e}")
+        for file_name, parser in _DEPENDENCY_MANIFESTS:
+            parsed = _parse_manifest(root / file_name, parser)
+            if parsed is None:
+                continue
+            dependencies["dependency_files_found"].append(file_name)
+            for key, deps in parsed.items():
+                dependencies[key].extend(deps)
 
         # Remove duplicates and empty entries
         for key in dependencies:
@@ -428,8 +558,8 @@ def update_project_context_in_session(
         project_path = str(Path.cwd())
 
     try:
-        # Map project structure
-        structure = map_project_structure(project_path)
+        # Map project structure; session state keeps the flat directory list, not the tree
+        structure = map_project_structure(project_path, include_tree=False)
 
         # Infer dependencies
         dependencies = infer_project_dependencies(project_path)
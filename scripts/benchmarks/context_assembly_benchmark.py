@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Context assembly benchmark suite.
+
+Builds deterministic synthetic sessions (10/100/1000 turns by default) with realistic
+tool calls, tool outputs and code snippets, and measures the context pipeline:
+
+- ContextManager.assemble_context
+- MyDevopsAgent._assemble_context_from_state (cold start and incremental sync)
+- token_optimization_before_model (software engineer callbacks)
+- ConversationFilter.filter_conversation
+
+For every benchmark and session size it records latency percentiles, the process
+peak RSS, the traced Python allocation peak of a single run and the number of tokens
+emitted. Token counting is pinned to the offline character estimator (len // 4) so
+runs are deterministic and need no network. Results are written as JSON; pass
+``--compare`` with an earlier result file to print the change per benchmark.
+
+Usage:
+    uv run python scripts/benchmarks/context_assembly_benchmark.py
+    uv run python scripts/benchmarks/context_assembly_benchmark.py --turns 10 100 \\
+        --iterations 20 --compare test_reports/benchmarks/baseline.json
+"""
+
+import argparse
+from collections.abc import Callable
+import copy
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+import json
+import logging
+from pathlib import Path
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from google.adk.models.llm_request import LlmRequest  # noqa: E402
+from google.genai.types import (  # noqa: E402
+    Content,
+    FunctionCall,
+    FunctionResponse,
+    GenerateContentConfig,
+    Part,
+)
+
+from agents.devops.components.context_management import (  # noqa: E402
+    ContextManager,
+    TokenCountCache,
+    get_tokenizer_registry,
+)
+from agents.devops.components.context_management.tokenizer_registry import (  # noqa: E402
+    TIKTOKEN_STRATEGY,
+)
+from agents.devops.devops_agent import MyDevopsAgent  # noqa: E402
+from agents.software_engineer.shared_libraries.callbacks import (  # noqa: E402
+    create_token_optimization_callbacks,
+)
+from agents.software_engineer.shared_libraries.conversation_filter import (  # noqa: E402
+    ConversationFilter,
+)
+from agents.software_engineer.shared_libraries.token_optimization import (  # noqa: E402
+    TokenCounter,
+)
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_MODEL = "benchmark-offline-model"
+DEFAULT_TURNS = [10, 100, 1000]
+DEFAULT_ITERATIONS = 10
+DEFAULT_SEED = 1234
+MAX_LLM_TOKEN_LIMIT = 1_000_000
+BASE_PROMPT_TOKENS = 4_000
+SYSTEM_INSTRUCTION = (
+    "You are a DevOps assistant. Investigate infrastructure issues, read code, run "
+    "vetted shell commands and explain your findings clearly. "
+) * 20
+
+
+class OfflineLLMClient:
+    """Stand-in client without ``count_tokens`` so no native counting is attempted."""
+
+
+# ---------------------------------------------------------------------------
+# Synthetic sessions
+# ---------------------------------------------------------------------------
+
+_FILES = [
+    "deploy/k8s/deployment.yaml",
+    "services/api/handlers.py",
+    "services/api/models.py",
+    "infra/terraform/main.tf",
+    "scripts/release.sh",
+    "services/worker/queue.py",
+]
+_TOPICS = ["pod restarts", "latency spike", "failed rollout", "memory leak", "TLS expiry"]
+
+
+@dataclass
+class SyntheticSession:
+    """A generated session in the shapes each benchmarked component consumes."""
+
+    turns: int
+    state: dict[str, Any]
+    contents: list[Content]
+
+    def llm_request(self) -> LlmRequest:
+        """Build a fresh request containing the whole session."""
+        return LlmRequest(
+            model=BENCHMARK_MODEL,
+            contents=copy.deepcopy(self.contents),
+            config=GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION),
+        )
+
+
+def _code_block(rng: random.Random, lines: int) -> str:
+    body = []
+    for i in range(lines):
+        name = rng.choice(["config", "replicas", "retry", "timeout", "client", "result"])
+        body.append(f"    {name}_{i} = fetch_{name}(ctx, attempt={rng.randint(1, 5)})")
+    return "def handler(ctx):\n" + "\n".join(body) + "\n    return ctx\n"
+
+
+def _shell_output(rng: random.Random, lines: int) -> str:
+    return "\n".join(
+        f"2025-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00Z "
+        f"{rng.choice(['INFO', 'WARN', 'ERROR'])} pod/api-{rng.randint(1000, 9999)} "
+        f"{rng.choice(['restarted', 'OOMKilled', 'probe failed', 'ready'])}"
+        for _ in range(lines)
+    )
+
+
+def _search_output(rng: random.Random, matches: int) -> str:
+    return "\n".join(
+        f"{rng.choice(_FILES)}:{rng.randint(1, 400)}: timeout = {rng.randint(5, 120)}"
+        for _ in range(matches)
+    )
+
+
+def build_session(turns: int, seed: int = DEFAULT_SEED) -> SyntheticSession:
+    """Generate a deterministic session with ``turns`` user/agent exchanges."""
+    rng = random.Random(seed + turns)
+    history = []
+    snippets = []
+    contents = []
+
+    for i in range(turns):
+        topic = rng.choice(_TOPICS)
+        file_path = rng.choice(_FILES)
+        user_message = f"Turn {i}: can you look into the {topic} affecting {file_path}?"
+        agent_message = (
+            f"I checked {file_path} and the recent logs. The {topic} is most likely caused "
+            f"by the retry settings; I suggest lowering the timeout to {rng.randint(5, 60)}s."
+        )
+
+        tool_kind = i % 3
+        if tool_kind == 0:
+            tool_name, args = "read_file_content", {"filepath": file_path}
+            code = _code_block(rng, rng.randint(20, 80))
+            output = code
+            start_line = rng.randint(1, 200)
+            snippets.append(
+                {
+                    "file_path": file_path,
+                    "code": code,
+                    "start_line": start_line,
+                    "end_line": start_line + code.count("\n"),
+                }
+            )
+        elif tool_kind == 1:
+            tool_name = "execute_vetted_shell_command"
+            args = {"command": f"kubectl logs deploy/api --since={rng.randint(1, 24)}h"}
+            output = _shell_output(rng, rng.randint(10, 60))
+        else:
+            tool_name, args = "codebase_search", {"query": f"{topic} timeout"}
+            output = _search_output(rng, rng.randint(5, 30))
+
+        history.append(
+            {
+                "user_message": user_message,
+                "agent_message": agent_message,
+                "tool_calls": [{"tool_name": tool_name, "args": args, "result": output}],
+            }
+        )
+        contents.extend(
+            [
+                Content(role="user", parts=[Part(text=user_message)]),
+                Content(
+                    role="model",
+                    parts=[Part(function_call=FunctionCall(name=tool_name, args=args))],
+                ),
+                Content(
+                    role="user",
+                    parts=[
+                        Part(
+                            function_response=FunctionResponse(
+                                name=tool_name, response={"result": output}
+                            )
+                        )
+                    ],
+                ),
+                Content(role="model", parts=[Part(text=agent_message)]),
+            ]
+        )
+
+    contents.append(Content(role="user", parts=[Part(text="Summarize what we found so far.")]))
+    state = {
+        "app:core_goal": "Stabilize the production API deployment",
+        "app:current_phase": "investigation",
+        "user:conversation_history": history,
+        "app:code_snippets": snippets[-100:],
+    }
+    return SyntheticSession(turns=turns, state=state, contents=contents)
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements for one benchmark at one session size."""
+
+    benchmark: str
+    turns: int
+    iterations: int
+    latency_ms: dict[str, float] = field(default_factory=dict)
+    peak_rss_mb: float = 0.0
+    traced_peak_mb: float = 0.0
+    tokens_emitted: int = 0
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(
+    benchmark: str,
+    turns: int,
+    setup: Callable[[], Any],
+    run: Callable[[Any], int],
+    iterations: int,
+) -> BenchmarkResult:
+    """Time ``run(setup())`` over several iterations; setup is excluded from timings.
+
+    ``run`` returns the number of tokens emitted by the measured call. One untimed
+    warm-up run is made first, and one extra run under tracemalloc records the peak
+    of Python allocations.
+    """
+    run(setup())
+
+    timings = []
+    tokens = 0
+    for _ in range(iterations):
+        subject = setup()
+        start = time.perf_counter()
+        tokens = run(subject)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    subject = setup()
+    tracemalloc.start()
+    try:
+        run(subject)
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return BenchmarkResult(
+        benchmark=benchmark,
+        turns=turns,
+        iterations=iterations,
+        latency_ms={
+            "min": round(timings[0], 3),
+            "p50": round(_percentile(timings, 50), 3),
+            "p90": round(_percentile(timings, 90), 3),
+            "p99": round(_percentile(timings, 99), 3),
+            "max": round(timings[-1], 3),
+            "mean": round(sum(timings) / len(timings), 3),
+        },
+        peak_rss_mb=round(_peak_rss_mb(), 1),
+        traced_peak_mb=round(traced_peak / (1024 * 1024), 3),
+        tokens_emitted=tokens,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+def use_offline_token_counter() -> None:
+    """Pin every counter for the benchmark model to the character estimator."""
+    registry = get_tokenizer_registry()
+    registry.clear()
+    # Registering "no tiktoken encoding" keeps counting deterministic and offline
+    registry.get_or_resolve(BENCHMARK_MODEL, TIKTOKEN_STRATEGY, lambda: None)
+
+
+def _context_manager() -> ContextManager:
+    return ContextManager(
+        model_name=BENCHMARK_MODEL,
+        max_llm_token_limit=MAX_LLM_TOKEN_LIMIT,
+        llm_client=OfflineLLMClient(),
+        token_cache=TokenCountCache(),
+    )
+
+
+def _devops_agent() -> MyDevopsAgent:
+    agent = MyDevopsAgent(name="benchmark_devops_agent", model=BENCHMARK_MODEL)
+    agent._context_manager = _context_manager()
+    return agent
+
+
+def bench_assemble_context(session: SyntheticSession, iterations: int) -> BenchmarkResult:
+    agent = _devops_agent()
+    agent._assemble_context_from_state(copy.deepcopy(session.state))
+    manager = agent._context_manager
+
+    def run(_subject) -> int:
+        _, total_tokens = manager.assemble_context(BASE_PROMPT_TOKENS)
+        return total_tokens
+
+    return measure("assemble_context", session.turns, lambda: None, run, iterations)
+
+
+def bench_state_sync_cold(session: SyntheticSession, iterations: int) -> BenchmarkResult:
+    def setup():
+        return _devops_agent(), copy.deepcopy(session.state)
+
+    def run(subject) -> int:
+        agent, state = subject
+        context_dict = agent._assemble_context_from_state(state)
+        return agent._context_manager._count_context_tokens(context_dict)
+
+    return measure("assemble_context_from_state.cold", session.turns, setup, run, iterations)
+
+
+def bench_state_sync_incremental(session: SyntheticSession, iterations: int) -> BenchmarkResult:
+    agent = _devops_agent()
+    state = copy.deepcopy(session.state)
+    agent._assemble_context_from_state(state)
+    history = state["user:conversation_history"]
+
+    def setup():
+        # Each run sees one new turn on top of an already synced session
+        history.append(copy.deepcopy(history[-1]) | {"user_message": f"Turn {len(history)}"})
+        return state
+
+    def run(subject) -> int:
+        context_dict = agent._assemble_context_from_state(subject)
+        return agent._context_manager._count_context_tokens(context_dict)
+
+    return measure("assemble_context_from_state.incremental", session.turns, setup, run, iterations)
+
+
+def bench_token_optimization_before_model(
+    session: SyntheticSession, iterations: int
+) -> BenchmarkResult:
+    counter = TokenCounter(BENCHMARK_MODEL)
+    request_tokens = counter.count_llm_request_tokens(session.llm_request())["total"]
+    # Size the limit so the request sits at ~85% utilization and the full pipeline runs
+    callbacks = create_token_optimization_callbacks(
+        agent_name="benchmark_agent",
+        model_name=BENCHMARK_MODEL,
+        max_token_limit=max(8_000, int(request_tokens / 0.85)),
+    )
+    before_model = callbacks["before_model"]
+
+    def setup():
+        return SimpleNamespace(invocation_id="benchmark"), session.llm_request()
+
+    def run(subject) -> int:
+        callback_context, llm_request = subject
+        before_model(callback_context, llm_request)
+        return counter.count_llm_request_tokens(llm_request)["total"]
+
+    return measure("token_optimization_before_model", session.turns, setup, run, iterations)
+
+
+def bench_filter_conversation(session: SyntheticSession, iterations: int) -> BenchmarkResult:
+    conversation_filter = ConversationFilter(token_counter=TokenCounter(BENCHMARK_MODEL))
+    budget = max(1, conversation_filter._calculate_content_tokens(session.contents) // 2)
+
+    def run(_subject) -> int:
+        result = conversation_filter.filter_conversation(session.contents, budget)
+        return result.filtered_tokens
+
+    return measure("filter_conversation", session.turns, lambda: None, run, iterations)
+
+
+BENCHMARKS: dict[str, Callable[[SyntheticSession, int], BenchmarkResult]] = {
+    "assemble_context": bench_assemble_context,
+    "assemble_context_from_state.cold": bench_state_sync_cold,
+    "assemble_context_from_state.incremental": bench_state_sync_incremental,
+    "token_optimization_before_model": bench_token_optimization_before_model,
+    "filter_conversation": bench_filter_conversation,
+}
+
+
+def run_benchmarks(
+    turns: list[int],
+    iterations: int = DEFAULT_ITERATIONS,
+    benchmarks: Optional[list[str]] = None,
+    seed: int = DEFAULT_SEED,
+) -> dict[str, Any]:
+    """Run the selected benchmarks for each session size and return the JSON report."""
+    use_offline_token_counter()
+    selected = benchmarks or list(BENCHMARKS)
+    results = []
+    for turn_count in turns:
+        session = build_session(turn_count, seed)
+        for name in selected:
+            result = BENCHMARKS[name](session, iterations)
+            logger.info(
+                f"{name} @ {turn_count} turns: p50={result.latency_ms['p50']:.2f}ms "
+                f"p99={result.latency_ms['p99']:.2f}ms tokens={result.tokens_emitted:,}"
+            )
+            results.append(asdict(result))
+
+    return {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "token_counter": "character_count_estimator",
+            "iterations": iterations,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare_reports(baseline: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """Describe the p50 latency and token changes between two reports."""
+    previous = {(r["benchmark"], r["turns"]): r for r in baseline.get("results", [])}
+    lines = []
+    for result in current["results"]:
+        before = previous.get((result["benchmark"], result["turns"]))
+        if before is None:
+            continue
+        old_p50, new_p50 = before["latency_ms"]["p50"], result["latency_ms"]["p50"]
+        change = (new_p50 - old_p50) / old_p50 * 100 if old_p50 else 0.0
+        lines.append(
+            f"{result['benchmark']:<42} {result['turns']:>5} turns  "
+            f"p50 {old_p50:>9.2f} -> {new_p50:>9.2f} ms ({change:+.1f}%)  "
+            f"tokens {before['tokens_emitted']:,} -> {result['tokens_emitted']:,}"
+        )
+    return lines
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=DEFAULT_TURNS)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--benchmark", choices=list(BENCHMARKS), action="append")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="JSON output path (default: test_reports/benchmarks/context_assembly_<time>.json)",
+    )
+    parser.add_argument("--compare", type=Path, help="Earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.ERROR, format="%(levelname)s:%(name)s:%(message)s", force=True
+    )
+    logger.setLevel(logging.INFO)
+
+    report = run_benchmarks(args.turns, args.iterations, args.benchmark, args.seed)
+
+    output = args.output or (
+        REPO_ROOT
+        / "test_reports"
+        / "benchmarks"
+        / f"context_assembly_{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Benchmark results written to {output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        print("\n".join(compare_reports(baseline, report)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Ignore matcher benchmark suite.
+
+Builds deterministic synthetic project trees (10k/50k files by default) in a temporary
+directory, shaped like real repositories: source packages next to large vendored and
+generated subtrees (node_modules, __pycache__, build output, .git) that a typical
+.indexignore excludes. It measures:
+
+- match.*: deciding every path of the full tree, with the previous per-pattern
+  fnmatch loop and with the compiled IgnoreMatcher
+- walk.*: a top-down walk that prunes ignored directories, as RAG indexing does,
+  with either matcher
+
+For every benchmark and tree size it records latency percentiles, the process peak
+RSS, the traced Python allocation peak of a single run and the number of paths kept.
+Results are written as JSON; pass ``--compare`` with an earlier result file to print
+the change per benchmark.
+
+Usage:
+    uv run python scripts/benchmarks/ignore_matcher_benchmark.py
+    uv run python scripts/benchmarks/ignore_matcher_benchmark.py --files 100000 \\
+        --iterations 5 --compare test_reports/benchmarks/baseline.json
+"""
+
+import argparse
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+import fnmatch
+import json
+import logging
+import os
+from pathlib import Path
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from agents.devops.shared_libraries.ignore_matcher import IgnoreMatcher  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILES = [10_000, 50_000]
+DEFAULT_ITERATIONS = 5
+DEFAULT_SEED = 1234
+
+# A representative .indexignore
+IGNORE_PATTERNS = [
+    ".git/",
+    "node_modules/",
+    "__pycache__/",
+    "*.pyc",
+    ".venv/",
+    "venv/",
+    "build/",
+    "dist/",
+    "*.egg-info/",
+    ".pytest_cache/",
+    ".mypy_cache/",
+    ".ruff_cache/",
+    "htmlcov/",
+    ".coverage",
+    "*.log",
+    "*.tmp",
+    "*.min.js",
+    "*.map",
+    ".DS_Store",
+    "coverage.xml",
+    "docs/_build/",
+    "test_reports/",
+    ".index_data/",
+    "*.lock",
+]
+
+
+# ---------------------------------------------------------------------------
+# Matchers
+# ---------------------------------------------------------------------------
+
+
+def legacy_is_path_ignored(relative_path: str, ignore_patterns: list[str], is_dir: bool) -> bool:
+    """The per-pattern fnmatch loop RAG indexing used before IgnoreMatcher."""
+    for pattern in ignore_patterns:
+        if pattern.endswith("/"):
+            normalized_pattern = pattern.rstrip("/")
+            if is_dir and relative_path == normalized_pattern:
+                return True
+            if (relative_path + "/").startswith(normalized_pattern + "/"):
+                return True
+        if fnmatch.fnmatch(relative_path, pattern):
+            return True
+        if "/" not in pattern and fnmatch.fnmatch(Path(relative_path).name, pattern):
+            return True
+    return False
+
+
+def _legacy_matcher() -> Callable[[str, bool], bool]:
+    return lambda path, is_dir: legacy_is_path_ignored(path, IGNORE_PATTERNS, is_dir)
+
+
+def _compiled_matcher() -> Callable[[str, bool], bool]:
+    return IgnoreMatcher(IGNORE_PATTERNS).is_ignored
+
+
+MATCHERS: dict[str, Callable[[], Callable[[str, bool], bool]]] = {
+    "legacy_fnmatch": _legacy_matcher,
+    "compiled": _compiled_matcher,
+}
+
+
+# ---------------------------------------------------------------------------
+# Synthetic trees
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class SyntheticTree:
+    """A generated tree on disk and every (relative path, is_dir) entry in it."""
+
+    root: Path
+    files: int
+    entries: list[tuple[str, bool]]
+
+
+def _tree_layout(files: int, rng: random.Random) -> list[str]:
+    """Relative file paths, ~45% of them under directories an .indexignore prunes."""
+    paths = []
+    for i in range(files):
+        kind = rng.random()
+        package = f"services/svc_{i % 40}/pkg_{i % 7}"
+        if kind < 0.45:
+            paths.append(f"{package}/module_{i}.{rng.choice(['py', 'yaml', 'md', 'go'])}")
+        elif kind < 0.55:
+            paths.append(f"{package}/{rng.choice(['app', 'debug', 'trace'])}_{i}.log")
+        elif kind < 0.75:
+            paths.append(f"web/node_modules/lib_{i % 300}/dist/index_{i}.min.js")
+        elif kind < 0.85:
+            paths.append(f"{package}/__pycache__/module_{i}.cpython-311.pyc")
+        elif kind < 0.95:
+            paths.append(f"build/lib/services/svc_{i % 40}/module_{i}.py")
+        else:
+            paths.append(f".git/objects/{i % 256:02x}/{i:038x}")
+    return paths
+
+
+def build_tree(files: int, parent: Path, seed: int = DEFAULT_SEED) -> SyntheticTree:
+    """Create a deterministic tree of ``files`` empty files under ``parent``."""
+    root = parent / f"tree_{files}"
+    directories: set[str] = set()
+    relative_files = _tree_layout(files, random.Random(seed + files))
+    for relative_path in relative_files:
+        directory = relative_path.rpartition("/")[0]
+        while directory and directory not in directories:
+            directories.add(directory)
+            directory = directory.rpartition("/")[0]
+    for directory in sorted(directories):
+        (root / directory).mkdir(parents=True, exist_ok=True)
+    for relative_path in relative_files:
+        (root / relative_path).touch()
+
+    entries = [(directory, True) for directory in sorted(directories)]
+    entries.extend((relative_path, False) for relative_path in relative_files)
+    return SyntheticTree(root=root, files=files, entries=entries)
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements for one benchmark at one tree size."""
+
+    benchmark: str
+    files: int
+    iterations: int
+    latency_ms: dict[str, float] = field(default_factory=dict)
+    peak_rss_mb: float = 0.0
+    traced_peak_mb: float = 0.0
+    paths_kept: int = 0
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(benchmark: str, files: int, run: Callable[[], int], iterations: int) -> BenchmarkResult:
+    """Time ``run()`` over several iterations.
+
+    ``run`` returns the number of paths kept. One untimed warm-up run is made first
+    (which also warms the OS directory cache for walks), and one extra run under
+    tracemalloc records the peak of Python allocations.
+    """
+    run()
+
+    timings = []
+    kept = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        kept = run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return BenchmarkResult(
+        benchmark=benchmark,
+        files=files,
+        iterations=iterations,
+        latency_ms={
+            "min": round(timings[0], 3),
+            "p50": round(_percentile(timings, 50), 3),
+            "p90": round(_percentile(timings, 90), 3),
+            "p99": round(_percentile(timings, 99), 3),
+            "max": round(timings[-1], 3),
+            "mean": round(sum(timings) / len(timings), 3),
+        },
+        peak_rss_mb=round(_peak_rss_mb(), 1),
+        traced_peak_mb=round(traced_peak / (1024 * 1024), 3),
+        paths_kept=kept,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+def bench_match(tree: SyntheticTree, matcher_name: str, iterations: int) -> BenchmarkResult:
+    is_ignored = MATCHERS[matcher_name]()
+
+    def run() -> int:
+        return sum(1 for path, is_dir in tree.entries if not is_ignored(path, is_dir))
+
+    return measure(f"match.{matcher_name}", tree.files, run, iterations)
+
+
+def bench_walk(tree: SyntheticTree, matcher_name: str, iterations: int) -> BenchmarkResult:
+    is_ignored = MATCHERS[matcher_name]()
+    root = str(tree.root)
+
+    def run() -> int:
+        kept = 0
+        for directory, dir_names, file_names in os.walk(root, topdown=True):
+            relative_directory = os.path.relpath(directory, root).replace(os.sep, "/")
+            prefix = "" if relative_directory == "." else relative_directory + "/"
+            dir_names[:] = [name for name in dir_names if not is_ignored(prefix + name, True)]
+            kept += sum(1 for name in file_names if not is_ignored(prefix + name, False))
+        return kept
+
+    return measure(f"walk.{matcher_name}", tree.files, run, iterations)
+
+
+def run_benchmarks(
+    file_counts: list[int],
+    iterations: int = DEFAULT_ITERATIONS,
+    seed: int = DEFAULT_SEED,
+) -> dict[str, Any]:
+    """Run every benchmark with both matchers for each tree size and return the report."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ignore_matcher_benchmark_") as tmp_dir:
+        for files in file_counts:
+            tree = build_tree(files, Path(tmp_dir), seed)
+            for bench in (bench_match, bench_walk):
+                for matcher_name in MATCHERS:
+                    result = bench(tree, matcher_name, iterations)
+                    logger.info(
+                        f"{result.benchmark} @ {files:,} files: "
+                        f"p50={result.latency_ms['p50']:.2f}ms "
+                        f"p99={result.latency_ms['p99']:.2f}ms kept={result.paths_kept:,}"
+                    )
+                    results.append(asdict(result))
+
+    return {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ignore_patterns": len(IGNORE_PATTERNS),
+            "iterations": iterations,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare_reports(baseline: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """Describe the p50 latency and kept path changes between two reports."""
+    previous = {(r["benchmark"], r["files"]): r for r in baseline.get("results", [])}
+    lines = []
+    for result in current["results"]:
+        before = previous.get((result["benchmark"], result["files"]))
+        if before is None:
+            continue
+        old_p50, new_p50 = before["latency_ms"]["p50"], result["latency_ms"]["p50"]
+        change = (new_p50 - old_p50) / old_p50 * 100 if old_p50 else 0.0
+        lines.append(
+            f"{result['benchmark']:<22} {result['files']:>8} files  "
+            f"p50 {old_p50:>9.2f} -> {new_p50:>9.2f} ms ({change:+.1f}%)  "
+            f"kept {before['paths_kept']:,} -> {result['paths_kept']:,}"
+        )
+    return lines
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, nargs="+", default=DEFAULT_FILES)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="JSON output path (default: test_reports/benchmarks/ignore_matcher_<time>.json)",
+    )
+    parser.add_argument("--compare", type=Path, help="Earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.ERROR, format="%(levelname)s:%(name)s:%(message)s", force=True
+    )
+    logger.setLevel(logging.INFO)
+
+    report = run_benchmarks(args.files, args.iterations, args.seed)
+
+    output = args.output or (
+        REPO_ROOT
+        / "test_reports"
+        / "benchmarks"
+        / f"ignore_matcher_{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Benchmark results written to {output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        print("\n".join(compare_reports(baseline, report)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,8 @@ used across all test modules.
 import asyncio
 import logging
 import os
+import sys
+import tempfile
 import time
 from unittest.mock import patch
 
@@ -127,6 +129,24 @@ def reset_logging():
     )
 
 
+@pytest.fixture(autouse=True)
+def reset_tokenizer_registry():
+    """Forget tokenizers resolved by earlier tests so per-test tiktoken patches apply."""
+    registry_module = sys.modules.get(
+        "agents.devops.components.context_management.tokenizer_registry"
+    )
+    if registry_module is not None:
+        registry_module.get_tokenizer_registry().clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_rag_retrieval_caches():
+    """Forget retrieval results cached by earlier tests, which may have used mocks."""
+    retriever_module = sys.modules.get("agents.devops.tools.rag_components.retriever")
+    if retriever_module is not None:
+        retriever_module.clear_retrieval_caches()
+
+
 @pytest.fixture
 def mock_time():
     """Mock time.time() for consistent testing."""
@@ -179,6 +199,12 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "orchestration: Tool orchestration phase tests")
     config.addinivalue_line("markers", "verification: Performance verification phase tests")
 
+    # Keep the RAG embedding cache in memory so tests never touch the user's cache file
+    os.environ.setdefault("RAG_EMBEDDING_CACHE_PATH", "")
+    # Keep ChromaDB data out of the working tree, where it defaults to .index_data/
+    if "CHROMA_DATA_PATH" not in os.environ:
+        os.environ["CHROMA_DATA_PATH"] = tempfile.mkdtemp(prefix="test_chroma_data_")
+
     # Set up global aiohttp cleanup suppression
     global _aiohttp_cleanup_suppressed
     if not _aiohttp_cleanup_suppressed:
@@ -11,6 +11,7 @@ These tests verify that the enhanced contextual awareness features work correctl
 with real project structures and dependencies.
 """
 
+import io
 import json
 from pathlib import Path
 import tempfile
@@ -389,12 +390,12 @@ class TestContextAwareCodeSearch:
         )
         assert score < 0.6  # Should get penalty for deep nesting
 
-    @patch("subprocess.run")
+    @patch("subprocess.Popen")
     def test_ripgrep_code_search_with_context(self, mock_subprocess, temp_project_structure):
         """Test ripgrep search with project context"""
-        # Mock ripgrep output
+        # Mock ripgrep output, streamed from a single rg process
         mock_process = MagicMock()
-        mock_process.stdout = (
+        mock_process.stdout = io.StringIO(
             '{"type":"match","data":{"path":{"text":"src/main.py"},"line_number":1,'
             '"lines":{"text":"def test_function():"}}}\n'
             '{"type":"match","data":{"path":{"text":"agents/agent.py"},"line_number":5,'
@@ -0,0 +1,62 @@
+"""Smoke tests for the context assembly benchmark runner in scripts/benchmarks."""
+
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+BENCHMARK_SCRIPT = (
+    Path(__file__).resolve().parents[3] / "scripts" / "benchmarks" / "context_assembly_benchmark.py"
+)
+
+
+@pytest.fixture(scope="module")
+def benchmark_module():
+    """Load the benchmark runner script as a module."""
+    spec = importlib.util.spec_from_file_location("context_assembly_benchmark", BENCHMARK_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestContextAssemblyBenchmark:
+    """Test cases for the context assembly benchmark runner."""
+
+    def test_sessions_are_deterministic(self, benchmark_module):
+        """The same seed and size should always produce the same session."""
+        first = benchmark_module.build_session(10, seed=7)
+        second = benchmark_module.build_session(10, seed=7)
+
+        assert first.state == second.state
+        assert len(first.state["user:conversation_history"]) == 10
+        assert len(first.contents) == 10 * 4 + 1
+
+    def test_report_covers_every_benchmark(self, benchmark_module, tmp_path):
+        """A small run should report latency, memory and tokens for each benchmark as JSON."""
+        report = benchmark_module.run_benchmarks([10], iterations=2)
+        output = tmp_path / "report.json"
+        assert (
+            benchmark_module.main(["--turns", "10", "--iterations", "1", "--output", str(output)])
+            == 0
+        )
+
+        results = {r["benchmark"]: r for r in report["results"]}
+        assert set(results) == set(benchmark_module.BENCHMARKS)
+        for result in results.values():
+            assert result["turns"] == 10
+            assert 0 <= result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+            assert result["peak_rss_mb"] > 0
+            assert result["tokens_emitted"] > 0
+        assert report["metadata"]["token_counter"] == "character_count_estimator"
+        assert json.loads(output.read_text())["results"]
+
+    def test_token_counts_are_reproducible(self, benchmark_module):
+        """Tokens emitted should not depend on the run when counting offline."""
+        first = benchmark_module.run_benchmarks([10], iterations=1, benchmarks=["assemble_context"])
+        second = benchmark_module.run_benchmarks(
+            [10], iterations=1, benchmarks=["assemble_context"]
+        )
+
+        assert first["results"][0]["tokens_emitted"] == second["results"][0]["tokens_emitted"]
+        assert benchmark_module.compare_reports(first, second)
@@ -0,0 +1,159 @@
+"""Unit tests for content-addressed snippet storage."""
+
+import gc
+from types import SimpleNamespace
+
+import pytest
+
+from agents.devops.components.context_management.blob_store import Blob, BlobStore
+from agents.devops.components.context_management.context_manager import (
+    CodeSnippet,
+    ContextManager,
+)
+from agents.devops.components.context_management.file_tracker import file_change_tracker
+from agents.devops.components.context_management.tool_hooks import process_read_file_results
+from agents.devops.devops_agent import MyDevopsAgent
+from tests.shared.helpers import create_mock_llm_client
+
+
+def _file_content(lines: int, version: int = 1) -> str:
+    return "\n".join(f"line {i} of version {version}" for i in range(lines))
+
+
+@pytest.fixture
+def context_manager():
+    """Create a ContextManager with its own blob store."""
+    return ContextManager(
+        model_name="test-model",
+        max_llm_token_limit=100000,
+        llm_client=create_mock_llm_client(),
+        blob_store=BlobStore(),
+    )
+
+
+class TestBlobStore:
+    """Test cases for Blob and BlobStore."""
+
+    @pytest.mark.parametrize("content", ["", "one line", "a\nb\nc", "a\nb\n", "\n\nx\n"])
+    def test_line_ranges_match_split_and_join(self, content):
+        """Blob.text with a line range should equal joining the split lines."""
+        blob = Blob("id", content)
+        lines = content.split("\n")
+
+        assert blob.line_count == len(lines)
+        for start in range(len(lines) + 1):
+            for end in range(start, len(lines) + 2):
+                assert blob.text((start, end)) == "\n".join(lines[start:end])
+
+    def test_intern_returns_one_blob_per_content(self):
+        """Interning equal content should return the same blob, keyed by the file hash."""
+        store = BlobStore()
+        first = store.intern("print('hello')\n")
+        second = store.intern("print('hello')" + "\n")
+
+        assert first is second
+        assert first.blob_id == file_change_tracker.hash_file_content("print('hello')\n")
+        assert store.stats()["hits"] == 1
+
+    def test_unreferenced_blobs_are_released(self):
+        """Blobs should only stay stored while something references them."""
+        store = BlobStore()
+        blob = store.intern("temporary")
+        blob_id = blob.blob_id
+
+        del blob
+        gc.collect()
+
+        assert store.get(blob_id) is None
+        assert len(store) == 0
+
+
+class TestSnippetStorage:
+    """Test cases for snippets backed by shared blobs."""
+
+    def test_full_file_chunks_share_one_blob(self, context_manager):
+        """All chunks of a large file should reference a single interned copy."""
+        content = _file_content(230)
+
+        context_manager.add_full_file_content("big.py", content)
+
+        snippets = context_manager.code_snippets
+        assert len(snippets) == 5
+        assert len({id(snippet.blob) for snippet in snippets}) == 1
+        assert context_manager.get_blob_store_stats()["stored_chars"] == len(content)
+        lines = content.split("\n")
+        assert snippets[1].code == "\n".join(lines[50:100])
+        assert (snippets[1].start_line, snippets[1].end_line) == (51, 100)
+
+    def test_rereading_a_file_keeps_one_copy_per_version(self, context_manager):
+        """Reading the same file version again should not store another copy."""
+        context_manager.add_code_snippet("a.py", "x = 1\n", 1, 1)
+        context_manager.add_code_snippet("a.py", "x = 1\n", 10, 10)
+        context_manager.add_code_snippet("a.py", "x = 2\n", 20, 20)
+
+        assert len(context_manager.code_snippets) == 3
+        assert context_manager.get_blob_store_stats()["blobs"] == 2
+
+    def test_snippets_use_slots(self):
+        """Snippet records should not carry a per-instance __dict__."""
+        snippet = CodeSnippet("a.py", "x = 1", 1, 1)
+
+        assert not hasattr(snippet, "__dict__")
+        assert snippet.code == "x = 1"
+        assert snippet == CodeSnippet("a.py", "x = 1", 1, 1)
+
+
+class TestSessionStateBlobs:
+    """Test cases for blob references in session state."""
+
+    def _read(self, state, path, content):
+        tool = SimpleNamespace(name="read_file", args={"path": path})
+        process_read_file_results(state, tool, {"content": content})
+
+    def test_read_file_hook_stores_file_once(self):
+        """Overlapping chunks of a re-read file should reference a single state blob."""
+        state = {"app:code_snippets": []}
+        content = _file_content(200)
+
+        self._read(state, "big.py", content)
+        self._read(state, "big.py", content)
+
+        blob_id = file_change_tracker.hash_file_content(content)
+        assert state["app:file_blobs"] == {blob_id: content}
+        assert all(s["blob_id"] == blob_id for s in state["app:code_snippets"])
+        assert all("code" not in s for s in state["app:code_snippets"])
+
+    def test_new_file_version_replaces_old_blob(self):
+        """Once no snippet references an old version, its blob should be pruned."""
+        state = {"app:code_snippets": []}
+        self._read(state, "small.py", _file_content(10, version=1))
+        self._read(state, "small.py", _file_content(10, version=2))
+
+        assert list(state["app:file_blobs"]) == [
+            file_change_tracker.hash_file_content(_file_content(10, version=2))
+        ]
+
+    def test_state_sync_resolves_blob_references(self):
+        """The agent should rebuild snippet text from blobs and accept legacy inline code."""
+        agent = MyDevopsAgent(name="test_devops_agent")
+        agent._context_manager = ContextManager(
+            model_name="test-model",
+            max_llm_token_limit=100000,
+            llm_client=create_mock_llm_client(),
+            blob_store=BlobStore(),
+        )
+        state = {"app:code_snippets": []}
+        content = _file_content(200)
+        self._read(state, "big.py", content)
+        state["app:code_snippets"].append(
+            {"file_path": "legacy.py", "code": "print('hi')", "start_line": 1, "end_line": 1}
+        )
+
+        agent._assemble_context_from_state(state)
+
+        snippets = agent._context_manager.code_snippets
+        chunk_blobs = {id(s.blob) for s in snippets if s.file_path == "big.py"}
+        assert len(chunk_blobs) == 1
+        assert snippets[0].code == "\n".join(content.split("\n")[0:75])
+        assert snippets[-1].code == "print('hi')"
+        assert all(s.token_count > 0 for s in snippets)
@@ -0,0 +1,150 @@
+"""Unit tests for streaming ripgrep code search."""
+
+import io
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from agents.devops.shared_libraries import trigram_index
+from agents.software_engineer.tools import code_search
+
+
+def _rg_output(matches: list[tuple[str, int]]) -> io.StringIO:
+    lines = [json.dumps({"type": "begin", "data": {}})]
+    for path, line_number in matches:
+        lines.append(
+            json.dumps(
+                {
+                    "type": "match",
+                    "data": {
+                        "path": {"text": path},
+                        "line_number": line_number,
+                        "lines": {"text": f"match {line_number}\n"},
+                    },
+                }
+            )
+        )
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def _fake_rg(matches: list[tuple[str, int]]) -> MagicMock:
+    process = MagicMock()
+    process.stdout = _rg_output(matches)
+    process.poll.return_value = None
+    return process
+
+
+class TestRipgrepCodeSearch:
+    """Test cases for ripgrep_code_search."""
+
+    def test_all_paths_are_searched_by_one_process(self):
+        """Search paths should be collapsed into a single rg invocation."""
+        process = _fake_rg([("src/app.py", 3)])
+        with patch("subprocess.Popen", return_value=process) as popen:
+            result = code_search.ripgrep_code_search(
+                "app", target_directories=["src", "./src/api", "tests", "src"]
+            )
+
+        popen.assert_called_once()
+        cmd = popen.call_args.args[0]
+        assert cmd[-2:] == ["src", "tests"]
+        assert cmd[cmd.index("--max-count") + 1] == str(code_search.MAX_MATCHES_PER_FILE)
+        assert result["snippets"][0]["search_path"] == "src"
+        assert result["truncated"] is False
+
+    def test_only_the_top_results_are_kept_in_order(self):
+        """Results should be the most relevant matches, ties kept in rg order."""
+        matches = [("very/deep/nested/dir/file.py", 1), ("a.py", 2), ("b.py", 3), ("c.py", 4)]
+        with patch("subprocess.Popen", return_value=_fake_rg(matches)):
+            result = code_search.ripgrep_code_search(
+                "query", max_results=2, tool_context=SimpleNamespace(state={})
+            )
+
+        assert [(s["file"], s["line"]) for s in result["snippets"]] == [("a.py", 2), ("b.py", 3)]
+
+    def test_rg_is_killed_once_enough_relevant_matches_are_found(self):
+        """Reading should stop, and rg be killed, when the heap is full of relevant matches."""
+        process = _fake_rg([(f"src/mod_{i}.py", i) for i in range(100)])
+        with (
+            patch("subprocess.Popen", return_value=process),
+            patch.object(code_search._RelevanceScorer, "score", return_value=0.9),
+        ):
+            result = code_search.ripgrep_code_search("mod", max_results=3)
+
+        assert result["total_results"] == 3
+        assert result["truncated"] is True
+        process.kill.assert_called_once()
+        assert process.stdout.closed
+
+    def test_each_file_is_scored_once(self):
+        """Relevance should be computed per file, however many of its lines match."""
+        matches = [("src/a.py", i) for i in range(5)] + [("src/b.py", i) for i in range(5)]
+        with (
+            patch("subprocess.Popen", return_value=_fake_rg(matches)),
+            patch.object(
+                code_search._RelevanceScorer, "_score_file", autospec=True, return_value=0.5
+            ) as score_file,
+        ):
+            result = code_search.ripgrep_code_search(
+                "query", tool_context=SimpleNamespace(state={})
+            )
+
+        assert result["total_results"] == 10
+        assert [call.args[1] for call in score_file.call_args_list] == ["src/a.py", "src/b.py"]
+
+    def test_search_is_narrowed_to_indexed_candidates(self):
+        """rg should only be given the index's candidate files below the search paths."""
+        with (
+            patch.object(
+                trigram_index, "find_candidate_files", return_value=["docs/a.md", "src/a.py"]
+            ),
+            patch("subprocess.Popen", return_value=_fake_rg([("src/a.py", 1)])) as popen,
+        ):
+            result = code_search.ripgrep_code_search("handler", target_directories=["src"])
+
+        assert popen.call_args.args[0][-1:] == ["src/a.py"]
+        assert result["snippets"][0]["search_path"] == "src"
+
+    def test_no_candidates_fall_back_to_the_search_paths(self):
+        """An empty candidate set should not be taken to mean that nothing matches."""
+        with (
+            patch.object(trigram_index, "find_candidate_files", return_value=["docs/a.md"]),
+            patch("subprocess.Popen", return_value=_fake_rg([("src/a.py", 1)])) as popen,
+        ):
+            result = code_search.ripgrep_code_search("handler", target_directories=["src"])
+
+        assert popen.call_args.args[0][-1:] == ["src"]
+        assert result["total_results"] == 1
+
+    def test_too_many_candidates_fall_back_to_the_search_paths(self):
+        """Above the candidate limit rg should walk the search paths itself."""
+        candidates = [f"src/mod_{i}.py" for i in range(code_search.MAX_INDEXED_CANDIDATE_FILES + 1)]
+        with (
+            patch.object(trigram_index, "find_candidate_files", return_value=candidates),
+            patch("subprocess.Popen", return_value=_fake_rg([])) as popen,
+        ):
+            code_search.ripgrep_code_search("handler")
+
+        assert popen.call_args.args[0][-1:] == ["."]
+
+
+class TestRelevanceScorer:
+    """Test cases for _RelevanceScorer."""
+
+    def test_matches_calculate_relevance_score(self):
+        """The search-scoped scorer should give the same scores as the per-call helper."""
+        tool_context = SimpleNamespace(
+            state={
+                "current_directory": "/test/path",
+                "project_structure": {
+                    "key_files": ["pyproject.toml"],
+                    "file_types": {".py": 10, ".txt": 1},
+                },
+            }
+        )
+        scorer = code_search._RelevanceScorer("main", tool_context)
+
+        for file_path in ["pyproject.toml", "src/main.py", "notes.txt", "a/b/c/d/e.py"]:
+            assert scorer.score(file_path) == code_search._calculate_relevance_score(
+                file_path, "main", tool_context
+            )
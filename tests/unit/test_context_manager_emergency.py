@@ -0,0 +1,98 @@
+"""Unit tests for tokenizer-accurate emergency context assembly."""
+
+import json
+from unittest.mock import Mock
+
+from google import genai
+from google.genai.types import CountTokensResponse
+import pytest
+
+from agents.devops.components.context_management.context_manager import (
+    NATIVE_TRUNCATION_CONFIRMATIONS,
+    CodeSnippet,
+    ContextManager,
+    ConversationTurn,
+)
+from agents.devops.components.context_management.token_cache import TokenCountCache
+from tests.shared.helpers import create_mock_llm_client
+
+
+@pytest.fixture
+def context_manager():
+    """Create a ContextManager using the offline character estimator."""
+    manager = ContextManager(
+        model_name="test-model",
+        max_llm_token_limit=100000,
+        llm_client=create_mock_llm_client(),
+    )
+    manager.conversation_turns = [
+        ConversationTurn(
+            turn_number=1,
+            user_message="please fix the deployment " * 200,
+            agent_message="looking into the deployment " * 200,
+        )
+    ]
+    manager.current_turn_number = 1
+    manager.code_snippets = [
+        CodeSnippet("deploy.py", "def deploy():\n    pass\n" * 300, 1, 600, last_accessed=1)
+    ]
+    return manager
+
+
+def _serialized_tokens(manager: ContextManager, context_dict: dict) -> int:
+    return manager._count_tokens(json.dumps(context_dict, separators=(",", ":")))
+
+
+class TestEmergencyAssembly:
+    """Test cases for ContextManager._assemble_with_emergency_optimization."""
+
+    @pytest.mark.parametrize("budget", [120, 400, 900])
+    def test_fits_exact_budget_with_real_counter(self, context_manager, budget):
+        """The reported count should be the real count and stay within the budget."""
+        context_dict, tokens = context_manager._assemble_with_emergency_optimization(budget)
+
+        assert tokens == _serialized_tokens(context_manager, context_dict)
+        assert tokens <= budget
+
+    def test_keeps_as_much_context_as_the_budget_allows(self, context_manager):
+        """Truncation should fill the budget rather than leave it mostly empty."""
+        context_dict, tokens = context_manager._assemble_with_emergency_optimization(900)
+
+        assert tokens >= 900 * 0.9
+        assert context_dict["conversation_history"][0]["user_message"].endswith("...")
+        assert context_dict["code_snippets"][0]["file_path"] == "deploy.py"
+
+    def test_truncate_to_token_budget_finds_longest_prefix(self, context_manager):
+        """Binary search should return the longest prefix that fits."""
+        text = "abcd" * 100
+
+        truncated, tokens = context_manager._truncate_to_token_budget(text, 10)
+
+        assert tokens <= 10
+        assert truncated.endswith("...")
+        longer = text[: len(truncated) - len("...") + 4] + "..."
+        assert context_manager._count_tokens(longer) > 10
+
+    def test_native_truncation_confirms_an_estimated_cut_point(self):
+        """With a remote counter only a few real counts should be spent per truncation."""
+
+        def count_tokens(contents, **_):
+            text = contents if isinstance(contents, str) else contents.parts[0].text
+            return Mock(spec=CountTokensResponse, total_tokens=len(text) // 3)
+
+        mock_client = Mock(spec=genai.Client)
+        mock_client.models.count_tokens.side_effect = count_tokens
+        manager = ContextManager(
+            model_name="test-native-truncation",
+            max_llm_token_limit=100000,
+            llm_client=mock_client,
+            token_cache=TokenCountCache(max_entries=10),
+        )
+        calls_before = mock_client.models.count_tokens.call_count
+
+        truncated, tokens = manager._truncate_to_token_budget("word " * 1000, 100)
+
+        assert tokens == len(truncated) // 3 <= 100
+        assert tokens >= 90
+        calls = mock_client.models.count_tokens.call_count - calls_before
+        assert calls <= 1 + NATIVE_TRUNCATION_CONFIRMATIONS
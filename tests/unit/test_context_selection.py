@@ -0,0 +1,95 @@
+"""Unit tests for budget-optimal context selection."""
+
+from agents.devops.components.context_management.context_manager import (
+    CodeSnippet,
+    ContextManager,
+    ConversationTurn,
+)
+from agents.devops.components.context_management.context_selection import (
+    SelectionCandidate,
+    select_within_budget,
+)
+from tests.shared.helpers import create_mock_llm_client
+
+
+class TestSelectWithinBudget:
+    """Test cases for select_within_budget."""
+
+    def test_skips_items_that_do_not_fit_and_keeps_packing(self):
+        """A large item that does not fit must not stop smaller items from being selected."""
+        candidates = [
+            SelectionCandidate("code_snippets", "big", tokens=80, value=4.0),
+            SelectionCandidate("code_snippets", "medium", tokens=60, value=5.0),
+            SelectionCandidate("tool_results", "small", tokens=30, value=3.0),
+        ]
+
+        result = select_within_budget(candidates, budget=100)
+
+        assert result.selected == {"tool_results": ["small"], "code_snippets": ["medium"]}
+        assert result.used_tokens == 90
+        assert result.utilization == 0.9
+        assert result.skipped_over_budget == 1
+
+    def test_prefers_value_density_across_kinds(self):
+        """Turns, tool results and snippets compete in a single ranking."""
+        candidates = [
+            SelectionCandidate("conversation_history", "turn", tokens=50, value=1.0),
+            SelectionCandidate("tool_results", "result", tokens=10, value=2.0),
+            SelectionCandidate("code_snippets", "snippet", tokens=40, value=4.0),
+        ]
+
+        result = select_within_budget(candidates, budget=50)
+
+        assert result.selected == {"tool_results": ["result"], "code_snippets": ["snippet"]}
+        assert result.used_tokens == 50
+        assert result.utilization == 1.0
+
+    def test_best_single_item_beats_poor_greedy_packing(self):
+        """The single most valuable fitting item wins when greedy packing is worth less."""
+        candidates = [
+            SelectionCandidate("code_snippets", "tiny", tokens=1, value=2.0),
+            SelectionCandidate("code_snippets", "whole", tokens=100, value=90.0),
+        ]
+
+        result = select_within_budget(candidates, budget=100)
+
+        assert result.selected == {"code_snippets": ["whole"]}
+
+    def test_respects_per_kind_limits(self):
+        """Per-kind limits cap how many items of each kind are selected."""
+        candidates = [SelectionCandidate("tool_results", i, tokens=1, value=1.0) for i in range(5)]
+
+        result = select_within_budget(candidates, budget=100, limits={"tool_results": 2})
+
+        assert len(result.selected["tool_results"]) == 2
+
+
+class TestContextManagerSelection:
+    """Test cases for the selection engine inside ContextManager.assemble_context."""
+
+    def test_assemble_context_reports_utilization(self):
+        """Assembly should fill the budget across categories and record utilization."""
+        manager = ContextManager(
+            model_name="test-model",
+            max_llm_token_limit=100000,
+            llm_client=create_mock_llm_client(),
+        )
+        manager.conversation_turns = [
+            ConversationTurn(turn_number=i, user_message="hi", user_message_tokens=100)
+            for i in range(1, 4)
+        ]
+        manager.current_turn_number = 3
+        manager.code_snippets = [
+            CodeSnippet("a.py", "x = 1", 1, 1, last_accessed=3, token_count=50),
+            CodeSnippet("b.py", "y = 2", 1, 1, last_accessed=1, token_count=50),
+        ]
+
+        context_dict, total_tokens = manager.assemble_context(base_prompt_tokens=1000)
+
+        assert [t["turn_number"] for t in context_dict["conversation_history"]] == [1, 2, 3]
+        assert len(context_dict["code_snippets"]) == 2
+        stats = manager.get_context_selection_stats()
+        assert stats["used_tokens"] == 400
+        assert 0 < stats["utilization"] <= 1.0
+        assert stats["selected"] == {"conversation_history": 3, "code_snippets": 2}
+        assert total_tokens >= stats["used_tokens"]
@@ -0,0 +1,248 @@
+"""Unit tests for incremental state synchronization in MyDevopsAgent."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from agents.devops.components.context_management.context_manager import ContextManager
+from agents.devops.devops_agent import MyDevopsAgent, StateManager
+from tests.shared.helpers import create_mock_llm_client
+
+
+def _create_agent() -> MyDevopsAgent:
+    agent = MyDevopsAgent(name="test_devops_agent")
+    agent._context_manager = ContextManager(
+        model_name="test-model",
+        max_llm_token_limit=100000,
+        llm_client=create_mock_llm_client(),
+    )
+    return agent
+
+
+@pytest.fixture
+def devops_agent():
+    """Create a devops agent wired to a ContextManager using the offline estimator."""
+    return _create_agent()
+
+
+def _history(turns: int) -> list[dict]:
+    return [
+        {
+            "user_message": f"user message {i}",
+            "agent_message": f"agent message {i}",
+            "tool_calls": [{"tool_name": "read_file", "args": {"path": f"file_{i}.py"}}],
+        }
+        for i in range(turns)
+    ]
+
+
+class TestIncrementalStateSync:
+    """Test cases for the state -> ContextManager synchronization."""
+
+    def test_unchanged_turns_are_not_recounted(self, devops_agent):
+        """Only the turns added since the last sync should be token-counted."""
+        state = {"user:conversation_history": _history(3)}
+        devops_agent._assemble_context_from_state(state)
+        first_turns = list(devops_agent._context_manager.conversation_turns)
+
+        state["user:conversation_history"] = _history(4)
+        with patch.object(
+            devops_agent._context_manager,
+            "count_tokens_batch",
+            wraps=devops_agent._context_manager.count_tokens_batch,
+        ) as spy:
+            devops_agent._assemble_context_from_state(state)
+
+        counted_texts = [text for call in spy.call_args_list for text in call.args[0]]
+        assert "user message 3" in counted_texts
+        assert "user message 0" not in counted_texts
+
+        turns = devops_agent._context_manager.conversation_turns
+        assert len(turns) == 4
+        assert devops_agent._context_manager.current_turn_number == 4
+        assert turns[:3] == first_turns
+        assert turns[3].user_message_tokens > 0
+
+    def test_in_place_tool_call_mutation_triggers_recount(self, devops_agent):
+        """Tool calls appended to a turn in place should be picked up on the next sync."""
+        history = _history(1)
+        state = {"user:conversation_history": history}
+        devops_agent._assemble_context_from_state(state)
+        before = devops_agent._context_manager.conversation_turns[0].tool_calls_tokens
+
+        history[0]["tool_calls"].append({"tool_name": "list_dir", "args": {"path": "."}})
+        devops_agent._assemble_context_from_state(state)
+
+        turn = devops_agent._context_manager.conversation_turns[0]
+        assert len(turn.tool_calls) == 2
+        assert turn.tool_calls_tokens > before
+
+    def test_tool_results_are_transferred_once(self, devops_agent):
+        """Tool results re-published on every model call should only be added once."""
+        tool_result = {"tool_name": "read_file", "result": "file contents", "timestamp": 1.0}
+        state = {
+            "user:conversation_history": _history(1),
+            "temp:tool_results_current_turn": [tool_result],
+        }
+        devops_agent._assemble_context_from_state(state)
+        assert state["temp:tool_results_current_turn"] == []
+
+        state["temp:tool_results_current_turn"] = [tool_result]
+        devops_agent._assemble_context_from_state(state)
+
+        tool_results = devops_agent._context_manager.tool_results
+        assert len(tool_results) == 1
+        assert tool_results[0].tool_name == "read_file"
+        assert tool_results[0].full_result == "file contents"
+
+    def test_tool_result_fingerprints_are_scoped_to_the_session(self, devops_agent):
+        """Identical results from another session must not be skipped by this one."""
+        tool_result = {"tool_name": "read_file", "result": "file contents", "timestamp": 1.0}
+        states = [
+            {
+                "user:conversation_history": _history(1),
+                "temp:tool_results_current_turn": [dict(tool_result)],
+            }
+            for _ in range(2)
+        ]
+
+        for state in states:
+            devops_agent._assemble_context_from_state(state)
+
+        assert len(devops_agent._context_manager.tool_results) == 2
+        assert states[0]["temp:synced_tool_result_keys"] == [["read_file", 1.0, 1]]
+
+
+class TestPersistedTokenCounts:
+    """Test cases for token counts persisted alongside state entries."""
+
+    def _state(self) -> dict:
+        return {
+            "user:conversation_history": _history(2),
+            "app:code_snippets": [
+                {"file_path": "main.py", "code": "print('hello')", "start_line": 1, "end_line": 1}
+            ],
+        }
+
+    def test_counts_are_stored_with_entries(self, devops_agent):
+        """Computed counts should be tagged with the model and strategy that produced them."""
+        state = self._state()
+        devops_agent._assemble_context_from_state(state)
+
+        turn_counts = state["user:conversation_history"][0]["token_counts"]
+        assert turn_counts["model"] == "test-model"
+        assert turn_counts["strategy"] == "character_count_estimator"
+        assert turn_counts["user_message"] == len("user message 0") // 4
+        snippet_counts = state["app:code_snippets"][0]["token_counts"]
+        assert snippet_counts["code"] == len("print('hello')") // 4
+
+    def test_resumed_session_reuses_stored_counts(self, devops_agent):
+        """A fresh agent loading persisted state should not recount anything."""
+        state = self._state()
+        devops_agent._assemble_context_from_state(state)
+
+        resumed_agent = _create_agent()
+        with patch.object(
+            resumed_agent._context_manager,
+            "count_tokens_batch",
+            wraps=resumed_agent._context_manager.count_tokens_batch,
+        ) as spy:
+            resumed_agent._assemble_context_from_state(state)
+
+        counted_texts = [text for call in spy.call_args_list for text in call.args[0]]
+        assert "user message 0" not in counted_texts
+        assert "print('hello')" not in counted_texts
+        turns = resumed_agent._context_manager.conversation_turns
+        assert turns[0].user_message_tokens == len("user message 0") // 4
+        assert resumed_agent._context_manager.code_snippets[0].token_count > 0
+
+    def test_stored_counts_are_invalidated_by_strategy_or_content_change(self, devops_agent):
+        """Counts from another strategy or for different content must be recounted."""
+        state = self._state()
+        devops_agent._assemble_context_from_state(state)
+        state["user:conversation_history"][0]["token_counts"]["strategy"] = "tiktoken_counter"
+        state["user:conversation_history"][1]["user_message"] = "edited message"
+
+        resumed_agent = _create_agent()
+        with patch.object(
+            resumed_agent._context_manager,
+            "count_tokens_batch",
+            wraps=resumed_agent._context_manager.count_tokens_batch,
+        ) as spy:
+            resumed_agent._assemble_context_from_state(state)
+
+        counted_texts = [text for call in spy.call_args_list for text in call.args[0]]
+        assert "user message 0" in counted_texts
+        assert "edited message" in counted_texts
+        history = state["user:conversation_history"]
+        assert history[0]["token_counts"]["strategy"] == "character_count_estimator"
+
+    def test_state_manager_round_trip_keeps_token_counts(self):
+        """Token counts on history entries should survive StateManager synchronization."""
+        record = {"model": "test-model", "strategy": "s", "digest": "d", "user_message": 3}
+        state_manager = StateManager()
+        state_manager.sync_from_legacy_state(
+            {"user:conversation_history": [{"user_message": "hi", "token_counts": record}]}
+        )
+
+        history = state_manager.get_state_for_context()["user:conversation_history"]
+        assert history[0]["token_counts"] == record
+
+
+class TestOffLoopContextAssembly:
+    """Test cases for running context assembly in the bounded executor."""
+
+    async def test_assembly_runs_off_the_event_loop(self, devops_agent):
+        """Assembly should execute in a worker thread, not the event loop thread."""
+        threads = []
+
+        def assemble(_state, _base_prompt_tokens):
+            threads.append(threading.current_thread())
+            return {"core_goal": "goal"}
+
+        with patch.object(devops_agent, "_assemble_context_for_request", side_effect=assemble):
+            result = await devops_agent._assemble_context_coalesced("session-1", {}, 100)
+
+        assert result == {"core_goal": "goal"}
+        assert threads and threads[0] is not threading.main_thread()
+
+    async def test_concurrent_requests_for_same_session_are_coalesced(self, devops_agent):
+        """Concurrent assemblies for one session should share a single run."""
+        calls = []
+
+        def assemble(_state, base_prompt_tokens):
+            calls.append(base_prompt_tokens)
+            time.sleep(0.2)
+            return {"core_goal": "goal"}
+
+        with patch.object(devops_agent, "_assemble_context_for_request", side_effect=assemble):
+            results = await asyncio.gather(
+                devops_agent._assemble_context_coalesced("session-1", {}, 100),
+                devops_agent._assemble_context_coalesced("session-1", {}, 100),
+                devops_agent._assemble_context_coalesced("session-2", {}, 100),
+            )
+
+        assert len(calls) == 2
+        assert results[0] is results[1]
+        assert devops_agent._inflight_context_assemblies == {}
+
+    async def test_requests_with_different_base_prompts_are_not_coalesced(self, devops_agent):
+        """Context sized for one base prompt must not be reused for a larger prompt."""
+        calls = []
+
+        def assemble(_state, base_prompt_tokens):
+            calls.append(base_prompt_tokens)
+            time.sleep(0.2)
+            return {"base_prompt_tokens": base_prompt_tokens}
+
+        with patch.object(devops_agent, "_assemble_context_for_request", side_effect=assemble):
+            results = await asyncio.gather(
+                devops_agent._assemble_context_coalesced("session-1", {}, 100),
+                devops_agent._assemble_context_coalesced("session-1", {}, 5000),
+            )
+
+        assert sorted(calls) == [100, 5000]
+        assert [result["base_prompt_tokens"] for result in results] == [100, 5000]
@@ -0,0 +1,81 @@
+"""Unit tests for the compiled gitignore-style IgnoreMatcher."""
+
+from agents.devops.shared_libraries.ignore_matcher import IgnoreMatcher
+
+
+class TestIgnoreMatcher:
+    """Test cases for IgnoreMatcher.is_ignored."""
+
+    def test_names_match_at_any_depth(self):
+        """Patterns without a slash should match a name anywhere, and everything below it."""
+        matcher = IgnoreMatcher(["node_modules", "*.pyc", "# comment", ""])
+
+        assert matcher.is_ignored("node_modules", is_dir=True)
+        assert matcher.is_ignored("web/node_modules/react/index.js")
+        assert matcher.is_ignored("pkg/__pycache__/mod.cpython-311.pyc")
+        assert not matcher.is_ignored("src/node_modules_helper.py")
+        assert not matcher.is_ignored("src/app.py")
+        assert matcher.patterns == ["node_modules", "*.pyc"]
+
+    def test_trailing_slash_matches_directories_only(self):
+        """A directory pattern should ignore the directory and its contents, not a file."""
+        matcher = IgnoreMatcher(["build/"])
+
+        assert matcher.is_ignored("services/build", is_dir=True)
+        assert matcher.is_ignored("build/lib/app.py")
+        assert not matcher.is_ignored("scripts/build")
+
+    def test_slashes_anchor_to_the_root(self):
+        """A pattern with a slash should only match relative to the root."""
+        matcher = IgnoreMatcher(["/dist", "docs/_build/", "logs/*.log"])
+
+        assert matcher.is_ignored("dist", is_dir=True)
+        assert not matcher.is_ignored("web/dist", is_dir=True)
+        assert matcher.is_ignored("docs/_build/index.html")
+        assert matcher.is_ignored("logs/app.log")
+        assert not matcher.is_ignored("logs/2024/app.log")
+
+    def test_double_star_matches_any_number_of_directories(self):
+        """** should match zero or more directories at the start, middle or end."""
+        matcher = IgnoreMatcher(["**/fixtures/*.json", "vendor/**", "a/**/z"])
+
+        assert matcher.is_ignored("fixtures/data.json")
+        assert matcher.is_ignored("tests/unit/fixtures/data.json")
+        assert matcher.is_ignored("vendor/lib/mod.go")
+        assert not matcher.is_ignored("vendor", is_dir=True)
+        assert matcher.is_ignored("a/z")
+        assert matcher.is_ignored("a/b/c/z")
+
+    def test_last_matching_pattern_wins(self):
+        """Negated patterns should re-include paths ignored by earlier patterns."""
+        matcher = IgnoreMatcher(["*.log", "!keep.log", "debug/keep.log"])
+
+        assert matcher.is_ignored("app.log")
+        assert not matcher.is_ignored("src/keep.log")
+        assert matcher.is_ignored("debug/keep.log")
+
+    def test_character_classes_and_escapes(self):
+        """Bracket expressions and escaped metacharacters should follow glob rules."""
+        matcher = IgnoreMatcher(["*.py[co]", "file[!0-9].txt", r"\!important", r"literal\*"])
+
+        assert matcher.is_ignored("mod.pyc")
+        assert not matcher.is_ignored("mod.py")
+        assert matcher.is_ignored("fileA.txt")
+        assert not matcher.is_ignored("file1.txt")
+        assert matcher.is_ignored("!important")
+        assert matcher.is_ignored("literal*")
+        assert not matcher.is_ignored("literally")
+
+    def test_walk_prunes_ignored_directories(self, tmp_path):
+        """walk should not descend into ignored directories or yield ignored files."""
+        for relative_path in ["src/app.py", "src/app.pyc", "node_modules/x/index.js", "README"]:
+            (tmp_path / relative_path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / relative_path).touch()
+        matcher = IgnoreMatcher.from_file(tmp_path / ".indexignore", ["node_modules/", "*.pyc"])
+
+        walked = {
+            relative_directory: (sorted(dir_names), sorted(file_names))
+            for _, relative_directory, dir_names, file_names in matcher.walk(tmp_path)
+        }
+
+        assert walked == {"": (["src"], ["README"]), "src": ([], ["app.py"])}
@@ -0,0 +1,91 @@
+"""Unit tests for cached project structure mapping and dependency inference."""
+
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from agents.software_engineer.tools import project_context
+from agents.software_engineer.tools.code_search import _directory_names_in_structure
+
+
+def _age(path, seconds=10):
+    """Move a directory's mtime into the past, so its listing is trusted once scanned."""
+    mtime_ns = path.stat().st_mtime_ns - seconds * 1_000_000_000
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def project(tmp_path):
+    """Create a small project tree with old directory modification times."""
+    root = tmp_path / "project"
+    for relative_path in ["pyproject.toml", "src/app.py", "src/api/views.py", "docs/index.md"]:
+        (root / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / relative_path).write_text("content")
+    (root / "node_modules" / "pkg").mkdir(parents=True)
+    for directory in [root, root / "src", root / "src" / "api", root / "docs"]:
+        _age(directory)
+    return root
+
+
+class TestMapProjectStructure:
+    """Test cases for map_project_structure caching."""
+
+    def test_unchanged_directories_are_not_scanned_again(self, project):
+        """A second mapping should reuse every listing whose directory did not change."""
+        first = project_context.map_project_structure(str(project))
+        with patch.object(project_context.os, "scandir", wraps=os.scandir) as scandir:
+            second = project_context.map_project_structure(str(project))
+
+        scandir.assert_not_called()
+        assert {key: value for key, value in second.items() if key != "generated_at"} == {
+            key: value for key, value in first.items() if key != "generated_at"
+        }
+
+    def test_only_changed_directories_are_scanned(self, project):
+        """Adding a file should re-scan its directory and show up in the structure."""
+        project_context.map_project_structure(str(project))
+        (project / "src" / "api" / "models.py").write_text("content")
+
+        with patch.object(project_context.os, "scandir", wraps=os.scandir) as scandir:
+            result = project_context.map_project_structure(str(project))
+
+        assert [call.args[0] for call in scandir.call_args_list] == [str(project / "src" / "api")]
+        api = result["directory_tree"]["children"]["src"]["children"]["api"]
+        assert sorted(api["children"]) == ["models.py", "views.py"]
+        assert result["file_types"][".py"] == 3
+
+    def test_structure_without_tree_lists_directories(self, project):
+        """include_tree=False should keep only the flat list of mapped directories."""
+        result = project_context.map_project_structure(str(project), include_tree=False)
+
+        assert "directory_tree" not in result
+        assert result["directories"] == ["docs", "src", "src/api"]
+        assert result["key_files"] == ["pyproject.toml"]
+        assert result["total_directories"] == 4
+        assert _directory_names_in_structure(result) == {"docs", "src", "api"}
+
+
+class TestInferProjectDependencies:
+    """Test cases for infer_project_dependencies caching."""
+
+    def test_only_changed_manifests_are_parsed_again(self, project):
+        """Unchanged manifests should come from the cache, changed ones be re-parsed."""
+        (project / "pyproject.toml").write_text('[project]\ndependencies = ["requests"]\n')
+        (project / "package.json").write_text('{"dependencies": {"react": "^18"}}')
+        for manifest in ["pyproject.toml", "package.json"]:
+            _age(project / manifest)
+        project_context.infer_project_dependencies(str(project))
+
+        (project / "package.json").write_text('{"dependencies": {"vue": "^3"}}')
+        parse_pyproject = MagicMock(wraps=project_context._parse_pyproject)
+        parse_package_json = MagicMock(wraps=project_context._parse_package_json)
+        manifests = [("pyproject.toml", parse_pyproject), ("package.json", parse_package_json)]
+        with patch.object(project_context, "_DEPENDENCY_MANIFESTS", manifests):
+            result = project_context.infer_project_dependencies(str(project))
+
+        parse_pyproject.assert_not_called()
+        parse_package_json.assert_called_once()
+        assert result["python"] == ["requests"]
+        assert result["javascript"] == ["vue"]
+        assert sorted(result["dependency_files_found"]) == ["package.json", "pyproject.toml"]
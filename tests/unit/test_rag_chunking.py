@@ -0,0 +1,173 @@
+"""Unit tests for size-bounded, structure-aware RAG chunking."""
+
+import json
+
+from agents.devops.tools.rag_components.chunking import chunk_file_content, chunk_python_code
+from agents.devops.tools.rag_components.rate_limiter import estimate_tokens
+
+
+def _method(name: str, statements: int) -> str:
+    body = "".join(f"        value_{i} = compute({i})\n" for i in range(statements))
+    return f"    def {name}(self):\n{body}\n"
+
+
+def _assert_bounded(chunks: list[dict], max_tokens: int) -> None:
+    assert chunks
+    assert all(estimate_tokens(chunk["content"]) <= max_tokens for chunk in chunks)
+
+
+class TestPythonChunking:
+    """Test cases for chunk_python_code."""
+
+    def test_small_file_keeps_one_chunk_per_definition(self):
+        """Definitions that are large enough should stay separate, with exact content."""
+        code = "import os\n\n\n" + "".join(
+            f"def func_{n}():\n" + "".join(f"    x_{i} = {i}\n" for i in range(20)) + "\n\n"
+            for n in range(2)
+        )
+
+        chunks = chunk_python_code("mod.py", code, max_tokens=500, min_tokens=10)
+
+        assert [(chunk["name"], chunk["type"]) for chunk in chunks] == [
+            ("func_0", "function"),
+            ("func_1", "function"),
+        ]
+        assert chunks[0]["content"].startswith("import os\n\n\ndef func_0():")
+        assert chunks[1]["content"].endswith("    x_19 = 19")
+
+    def test_oversized_class_is_split_into_methods(self):
+        """A class over the budget should become its header and one chunk per method."""
+        code = 'class Service:\n    """Service."""\n\n' + "".join(
+            _method(f"step_{n}", 20) for n in range(4)
+        )
+
+        chunks = chunk_python_code("service.py", code, max_tokens=250, min_tokens=20)
+
+        _assert_bounded(chunks, 250)
+        names = [chunk["name"] for chunk in chunks]
+        assert names[0].startswith("Service")
+        assert {"Service.step_1", "Service.step_2", "Service.step_3"} <= set(names)
+        method = next(chunk for chunk in chunks if chunk["name"] == "Service.step_2")
+        assert method["type"] == "method"
+        assert method["content"].lstrip().startswith("def step_2(self):")
+
+    def test_oversized_function_is_split_at_blocks(self):
+        """A function over the budget should be split between statements, not mid-block."""
+        blocks = "".join(
+            f"    if flag_{n}:\n" + "".join(f"        out_{i} = {i}\n" for i in range(15))
+            for n in range(6)
+        )
+        code = f"def handler(event):\n{blocks}"
+
+        chunks = chunk_python_code("handler.py", code, max_tokens=150, min_tokens=10)
+
+        _assert_bounded(chunks, 150)
+        assert chunks[0]["type"] == "function"
+        assert {chunk["type"] for chunk in chunks[1:]} == {"function-part"}
+        assert all(chunk["name"] == "handler" for chunk in chunks)
+        assert all(chunk["content"].lstrip().startswith(("def", "if")) for chunk in chunks)
+
+    def test_small_fragments_are_coalesced(self):
+        """Tiny adjacent definitions should share a chunk named after all of them."""
+        code = "".join(f"def tiny_{n}():\n    return {n}\n\n\n" for n in range(3))
+
+        chunks = chunk_python_code("tiny.py", code, max_tokens=500, min_tokens=100)
+
+        assert len(chunks) == 1
+        assert chunks[0]["name"] == "tiny_0, tiny_1, tiny_2"
+        assert (chunks[0]["start_line"], chunks[0]["end_line"]) == (1, 10)
+
+    def test_syntax_error_falls_back_to_bounded_windows(self):
+        """Unparseable code should still be chunked within the budget."""
+        code = "def broken(:\n" + "x = 1\n" * 200
+
+        chunks = chunk_python_code("broken.py", code, max_tokens=100, min_tokens=10)
+
+        _assert_bounded(chunks, 100)
+        assert {chunk["name"] for chunk in chunks} == {"file_content_fallback"}
+
+
+class TestStructuredChunking:
+    """Test cases for chunk_file_content on non-Python files."""
+
+    def test_markdown_is_split_at_headings(self):
+        """Sections should be named by their heading path, ignoring fenced code."""
+        text = (
+            "# Guide\n\nIntro.\n\n## Install\n\n```sh\n# not a heading\n```\n"
+            + "Step.\n" * 60
+            + "\n## Usage\n\n"
+            + "Run it.\n" * 60
+        )
+
+        chunks = chunk_file_content("README.md", text, max_tokens=200, min_tokens=20)
+
+        assert [chunk["name"] for chunk in chunks] == [
+            "Guide, Guide > Install",
+            "Guide > Usage",
+        ]
+
+    def test_yaml_documents_are_named_by_resource(self):
+        """Each Kubernetes document should become a chunk named kind/name."""
+        text = (
+            "apiVersion: v1\nkind: Service\nmetadata:\n  name: web\nspec:\n"
+            + "".join(f"  port_{i}: {i}\n" for i in range(20))
+            + "---\napiVersion: apps/v1\nkind: Deployment\nmetadata:\n  name: api\nspec:\n"
+            + "".join(f"  replicas_{i}: {i}\n" for i in range(20))
+        )
+
+        chunks = chunk_file_content("k8s.yaml", text, max_tokens=500, min_tokens=20)
+
+        assert [(chunk["name"], chunk["type"]) for chunk in chunks] == [
+            ("Service/web", "yaml-document"),
+            ("Deployment/api", "yaml-document"),
+        ]
+
+    def test_large_json_is_split_at_top_level_members(self):
+        """A JSON document over the budget should be split at its top-level keys."""
+        text = json.dumps(
+            {"dependencies": {f"pkg-{i}": "^1.0.0" for i in range(80)}, "name": "app"}, indent=2
+        )
+
+        chunks = chunk_file_content("package.json", text, max_tokens=300, min_tokens=5)
+
+        _assert_bounded(chunks, 300)
+        assert "dependencies" in chunks[0]["name"]
+        assert chunks[-1]["name"] == "name"
+
+    def test_terraform_blocks_keep_their_comments(self):
+        """Each top-level block should be a chunk with the comment above it."""
+        text = (
+            '# Web server\nresource "aws_instance" "web" {\n  ami = "ami-123"\n}\n\n'
+            'variable "region" {\n  default = "us-east-1"\n}\n'
+        )
+
+        chunks = chunk_file_content("main.tf", text, max_tokens=500, min_tokens=1)
+
+        assert [chunk["name"] for chunk in chunks] == [
+            "resource.aws_instance.web",
+            "variable.region",
+        ]
+        assert chunks[0]["content"].startswith("# Web server")
+
+    def test_go_funcs_are_named_with_receivers(self):
+        """Go methods should be named Receiver.Method."""
+        text = (
+            "package main\n\n// Run starts the server.\nfunc (s *Server) Run() error {\n"
+            "\treturn nil\n}\n\nfunc main() {\n\tnew(Server).Run()\n}\n"
+        )
+
+        chunks = chunk_file_content("main.go", text, max_tokens=500, min_tokens=1)
+
+        assert [(chunk["name"], chunk["type"]) for chunk in chunks] == [
+            ("text_1-1", "text"),
+            ("Server.Run", "method"),
+            ("main", "function"),
+        ]
+
+    def test_long_lines_are_split_into_bounded_parts(self):
+        """Unstructured files, even a single huge line, should respect the budget."""
+        chunks = chunk_file_content("data.txt", "x" * 5000, max_tokens=300, min_tokens=10)
+
+        _assert_bounded(chunks, 300)
+        assert len({chunk["name"] for chunk in chunks}) == len(chunks)
+        assert "".join(chunk["content"] for chunk in chunks) == "x" * 5000
@@ -0,0 +1,122 @@
+"""Unit tests for pluggable RAG embedding backends."""
+
+from unittest.mock import MagicMock, patch
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+
+from agents.devops.tools import rag_tools
+from agents.devops.tools.rag_components import indexing, retriever
+from agents.devops.tools.rag_components.embedding_backends import (
+    HashingEmbeddingBackend,
+    collection_name_for_backend,
+)
+from agents.devops.tools.rag_components.lexical_index import LexicalIndex
+from agents.devops.tools.rag_components.manifest import IndexManifest
+
+
+@pytest.fixture
+def hashing_backend():
+    """Select the offline hashing backend for the test."""
+    backend = HashingEmbeddingBackend(256)
+    with patch.object(indexing, "EMBEDDING_BACKEND", backend):
+        yield backend
+
+
+class TestHashingEmbeddingBackend:
+    """Test cases for HashingEmbeddingBackend."""
+
+    def test_tokenize_splits_identifiers(self):
+        """Identifiers should be kept whole and split into snake_case and camelCase words."""
+        tokens = HashingEmbeddingBackend.tokenize("getHTTPResponse(user_id)")
+
+        assert tokens == ["gethttpresponse", "get", "http", "response", "user_id", "user", "id"]
+
+    def test_embeddings_are_deterministic_and_normalized(self):
+        """The same text should always map to the same unit vector."""
+        backend = HashingEmbeddingBackend(128)
+        first, second = backend.embed(["def deploy(cluster): pass", "def deploy(cluster): pass"])
+
+        assert first == second
+        assert len(first) == 128
+        assert np.linalg.norm(first) == pytest.approx(1.0, abs=1e-6)
+
+    def test_shared_identifiers_are_similar(self):
+        """Texts sharing identifiers should be closer than unrelated texts."""
+        auth, auth_user, kube = (
+            np.array(v)
+            for v in HashingEmbeddingBackend().embed(
+                ["def authenticate(user)", "authenticateUser(user)", "kubectl rollout status"]
+            )
+        )
+
+        assert auth @ auth_user > auth @ kube
+
+
+class TestBackendSelection:
+    """Test cases for backend configuration."""
+
+    def test_collections_are_separated_per_model(self):
+        """Each backend model should get its own valid collection name."""
+        name = collection_name_for_backend("devops_codebase_index_v2", HashingEmbeddingBackend(64))
+
+        assert name == "devops_codebase_index_v2_hashing-v1-64"
+        assert name != collection_name_for_backend(
+            "devops_codebase_index_v2", HashingEmbeddingBackend(128)
+        )
+
+    def test_unavailable_backend_falls_back_to_hashing(self):
+        """Unknown backends and missing optional dependencies should fall back to hashing."""
+        assert isinstance(indexing.create_embedding_backend("nope"), HashingEmbeddingBackend)
+        with patch.dict("sys.modules", {"sentence_transformers": None}):
+            backend = indexing.create_embedding_backend("sentence-transformers")
+
+        assert isinstance(backend, HashingEmbeddingBackend)
+        assert isinstance(
+            indexing.create_embedding_backend("google"), indexing.GoogleGenAIEmbeddingBackend
+        )
+
+    def test_local_backend_skips_api_and_cache(self, hashing_backend):
+        """embed_chunks_batch should embed locally without the API or the disk cache."""
+        client = MagicMock()
+        cache = MagicMock()
+        with (
+            patch.object(indexing, "genai_client", client),
+            patch.object(indexing, "get_embedding_cache", return_value=cache),
+        ):
+            embeddings = indexing.embed_chunks_batch(["x = 1"])
+
+        assert embeddings == hashing_backend.embed(["x = 1"])
+        client.models.embed_content.assert_not_called()
+        cache.get_many.assert_not_called()
+
+    def test_offline_index_and_retrieve(self, hashing_backend, tmp_path):  # noqa: ARG002
+        """A directory should be indexed and searched end to end without network access."""
+        project = tmp_path / "project"
+        project.mkdir()
+        (project / "auth.py").write_text("def authenticate_user(name, password):\n    pass\n")
+        (project / "deploy.py").write_text("def rollout_deployment(cluster):\n    pass\n")
+        collection = chromadb.EphemeralClient().get_or_create_collection(
+            f"test_{uuid.uuid4().hex[:8]}"
+        )
+        lexical_index = LexicalIndex(tmp_path / "lexical_index.json")
+
+        with (
+            patch.object(indexing, "genai_client", None),
+            patch.object(indexing, "get_chroma_collection", return_value=collection),
+            patch.object(retriever, "get_chroma_collection", return_value=collection),
+            patch.object(
+                indexing,
+                "get_collection_manifest",
+                return_value=IndexManifest(tmp_path / "manifest.json"),
+            ),
+            patch.object(indexing, "get_collection_lexical_index", return_value=lexical_index),
+            patch.object(retriever, "get_collection_lexical_index", return_value=lexical_index),
+        ):
+            rag_tools.index_directory_tool.func(str(project))
+            results = retriever.retrieve_relevant_chunks("authenticate user", top_k=1)
+
+        assert collection.count() == 2
+        assert results[0]["metadata"]["chunk_name"] == "authenticate_user"
@@ -0,0 +1,81 @@
+"""Unit tests for the persistent RAG embedding cache."""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from agents.devops.tools.rag_components import indexing
+from agents.devops.tools.rag_components.embedding_cache import EmbeddingCache
+from agents.devops.tools.rag_components.rate_limiter import EmbeddingRateLimiter
+
+
+@pytest.fixture
+def embedding_client():
+    """Patch the GenAI client with one that embeds each text as [len(text), 0.5]."""
+    client = MagicMock()
+
+    def embed_content(model, contents, config):  # noqa: ARG001
+        return SimpleNamespace(
+            embeddings=[SimpleNamespace(values=[float(len(text)), 0.5]) for text in contents]
+        )
+
+    client.models.embed_content.side_effect = embed_content
+    with (
+        patch.object(indexing, "genai_client", client),
+        patch.object(indexing, "get_embedding_rate_limiter", return_value=EmbeddingRateLimiter()),
+    ):
+        yield client
+
+
+class TestEmbeddingCache:
+    """Test cases for EmbeddingCache."""
+
+    def test_entries_persist_across_instances(self, tmp_path):
+        """Embeddings written by one cache should be served by a new one on the same file."""
+        path = str(tmp_path / "cache" / "embeddings.sqlite3")
+        EmbeddingCache(path).put_many("model", "RETRIEVAL_DOCUMENT", ["a", "b"], [[1.0], [2.5]])
+
+        cache = EmbeddingCache(path)
+
+        assert cache.get_many("model", "RETRIEVAL_DOCUMENT", ["b", "c", "a"]) == [
+            [2.5],
+            None,
+            [1.0],
+        ]
+        assert cache.stats()["hits"] == 2
+
+    def test_model_and_task_type_are_part_of_the_key(self):
+        """The same text embedded for another model or task type should not be reused."""
+        cache = EmbeddingCache()
+        cache.put_many("model-a", "RETRIEVAL_DOCUMENT", ["text"], [[1.0]])
+
+        assert cache.get_many("model-b", "RETRIEVAL_DOCUMENT", ["text"]) == [None]
+        assert cache.get_many("model-a", "RETRIEVAL_QUERY", ["text"]) == [None]
+
+
+class TestCachedEmbedding:
+    """Test cases for embed_chunks_batch with the cache."""
+
+    def test_only_misses_are_sent(self, embedding_client):
+        """Cached and duplicated texts should not be sent to the embedding API."""
+        with patch.object(indexing, "get_embedding_cache", return_value=EmbeddingCache()):
+            first = indexing.embed_chunks_batch(["alpha", "beta"])
+            second = indexing.embed_chunks_batch(["beta", "gamma!", "gamma!", "alpha"])
+
+        sent = [
+            call.kwargs["contents"] for call in embedding_client.models.embed_content.mock_calls
+        ]
+        assert sent == [["alpha", "beta"], ["gamma!"]]
+        assert first == [[5.0, 0.5], [4.0, 0.5]]
+        assert second == [[4.0, 0.5], [6.0, 0.5], [6.0, 0.5], [5.0, 0.5]]
+
+    def test_fully_cached_batch_makes_no_call(self, embedding_client):
+        """A batch whose texts are all cached should not reach the API at all."""
+        cache = EmbeddingCache()
+        cache.put_many(indexing.EMBEDDING_MODEL_NAME, "RETRIEVAL_DOCUMENT", ["x"], [[9.0]])
+
+        with patch.object(indexing, "get_embedding_cache", return_value=cache):
+            assert indexing.embed_chunks_batch(["x", "x"]) == [[9.0], [9.0]]
+
+        embedding_client.models.embed_content.assert_not_called()
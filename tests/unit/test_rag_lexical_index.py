@@ -0,0 +1,129 @@
+"""Unit tests for the BM25 lexical index and hybrid retrieval."""
+
+from unittest.mock import patch
+import uuid
+
+import chromadb
+import pytest
+
+from agents.devops.tools.rag_components import indexing, retriever
+from agents.devops.tools.rag_components.lexical_index import LexicalIndex
+
+
+def _chunk(name: str, content: str, chunk_type: str = "function") -> dict:
+    return {
+        "file_path": f"/repo/{name}.py",
+        "name": name,
+        "type": chunk_type,
+        "content": content,
+        "start_line": 1,
+        "end_line": 2,
+    }
+
+
+CHUNKS = [
+    _chunk("authenticate_user", "def authenticate_user(name, password):\n    return check(name)"),
+    _chunk("rollout_deployment", "def rollout_deployment(cluster):\n    return apply(cluster)"),
+    _chunk("render_page", "def render_page(user):\n    return template(user)"),
+]
+
+
+@pytest.fixture
+def hybrid_index(tmp_path):
+    """Index sample chunks into an in-memory collection and a temporary lexical index."""
+    collection = chromadb.EphemeralClient().get_or_create_collection(f"test_{uuid.uuid4().hex[:8]}")
+    lexical_index = LexicalIndex(tmp_path / "lexical_index.json")
+    with (
+        patch.object(indexing, "get_collection_lexical_index", return_value=lexical_index),
+        patch.object(retriever, "get_collection_lexical_index", return_value=lexical_index),
+        patch.object(retriever, "get_chroma_collection", return_value=collection),
+    ):
+        # Every chunk gets the same vector, so only the lexical ranking separates them
+        indexing.upsert_embedded_chunks(collection, CHUNKS, [[1.0, 0.0, 0.0]] * len(CHUNKS))
+        retriever.clear_retrieval_caches()
+        yield collection, lexical_index
+
+
+class TestLexicalIndex:
+    """Test cases for the LexicalIndex store."""
+
+    def test_symbol_names_rank_first(self, tmp_path):
+        """A chunk defining the queried identifier should outrank chunks that mention it."""
+        index = LexicalIndex(tmp_path / "lexical_index.json")
+        index.add_chunks(
+            ["def", "use"],
+            [{"chunk_name": "load_config", "type": "function"}, {"chunk_name": "main"}],
+            ["def load_config(path): ...", "config = load_config(path)\nrun(config)"],
+        )
+
+        assert [chunk_id for chunk_id, _ in index.search("load_config", 2)] == ["def", "use"]
+
+    def test_removed_chunks_are_not_found(self, tmp_path):
+        """Removing a chunk should drop it from every posting list."""
+        index = LexicalIndex(tmp_path / "lexical_index.json")
+        index.add_chunks(["a", "b"], [{}, {}], ["alpha beta", "beta gamma"])
+
+        index.remove_chunks(["a"])
+
+        assert index.search("alpha", 5) == []
+        assert [chunk_id for chunk_id, _ in index.search("beta", 5)] == ["b"]
+
+    def test_index_round_trips_through_disk(self, tmp_path):
+        """A saved index should be loaded by a new index for the same path."""
+        index = LexicalIndex(tmp_path / "lexical_index.json")
+        index.add_chunks(["a"], [{"chunk_name": "deploy"}], ["def deploy(): ..."])
+        index.save()
+
+        reloaded = LexicalIndex(tmp_path / "lexical_index.json")
+
+        assert reloaded.search("deploy", 1) == index.search("deploy", 1)
+
+
+class TestHybridRetrieval:
+    """Test cases for retrieve_relevant_chunks with lexical and vector rankings."""
+
+    def test_exact_identifier_is_ranked_first(self, hybrid_index):  # noqa: ARG002
+        """An identifier query should surface its definition even when vectors tie."""
+        with patch.object(retriever, "embed_chunks_batch", return_value=[[1.0, 0.0, 0.0]]):
+            results = retriever.retrieve_relevant_chunks("rollout_deployment", top_k=2)
+
+        assert results[0]["id"].startswith("/repo/rollout_deployment.py")
+        assert results[0]["lexical_score"] > 0.0
+        assert results[0]["distance"] is not None
+
+    def test_falls_back_to_lexical_when_embedding_fails(self, hybrid_index):  # noqa: ARG002
+        """Lexical matches should be returned, and not cached, if the query can't be embedded."""
+        with patch.object(retriever, "embed_chunks_batch", return_value=None):
+            results = retriever.retrieve_relevant_chunks("authenticate user", top_k=1)
+
+        assert results[0]["metadata"]["chunk_name"] == "authenticate_user"
+        assert results[0]["distance"] is None
+        assert retriever.get_retrieval_cache_stats()["results"]["entries"] == 0
+
+    def test_lexical_only_weight_skips_embedding(self, hybrid_index):  # noqa: ARG002
+        """A lexical weight of 1 should answer without embedding the query."""
+        with (
+            patch.object(retriever, "RAG_HYBRID_LEXICAL_WEIGHT", 1.0),
+            patch.object(retriever, "embed_chunks_batch") as embed,
+        ):
+            results = retriever.retrieve_relevant_chunks("render_page", top_k=1)
+
+        embed.assert_not_called()
+        assert results[0]["metadata"]["chunk_name"] == "render_page"
+
+    def test_deleted_chunks_leave_the_lexical_index(self, hybrid_index):
+        """delete_chunks should keep the lexical index in sync with the collection."""
+        collection, lexical_index = hybrid_index
+        chunk_id = indexing.make_chunk_id(CHUNKS[0])
+
+        indexing.delete_chunks(collection, [chunk_id])
+
+        assert chunk_id not in dict(lexical_index.search("authenticate_user", 5))
+
+    def test_rebuild_from_collection(self, hybrid_index):
+        """A lost lexical index should be rebuilt from the stored chunks."""
+        collection, lexical_index = hybrid_index
+        lexical_index.clear()
+
+        assert indexing.rebuild_lexical_index(collection, page_size=2) == len(CHUNKS)
+        assert len(lexical_index) == len(CHUNKS)
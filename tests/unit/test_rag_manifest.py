@@ -0,0 +1,163 @@
+"""Unit tests for manifest-based incremental RAG indexing."""
+
+import os
+from unittest.mock import patch
+import uuid
+
+import chromadb
+import pytest
+
+from agents.devops.tools import rag_tools
+from agents.devops.tools.rag_components import indexing
+from agents.devops.tools.rag_components.lexical_index import LexicalIndex
+from agents.devops.tools.rag_components.manifest import IndexManifest, ManifestEntry
+
+index_directory = rag_tools.index_directory_tool.func
+
+
+@pytest.fixture
+def rag_index(tmp_path):
+    """Point indexing at an in-memory collection and a temporary manifest."""
+    collection = chromadb.EphemeralClient().get_or_create_collection(f"test_{uuid.uuid4().hex[:8]}")
+    manifest = IndexManifest(tmp_path / "manifest.json")
+    embedded = []
+
+    def fake_embed(chunks_content, **_kwargs):
+        embedded.extend(chunks_content)
+        return [[float(len(content)), 1.0, 0.0] for content in chunks_content]
+
+    with (
+        patch.object(indexing, "get_chroma_collection", return_value=collection),
+        patch.object(indexing, "get_collection_manifest", return_value=manifest),
+        patch.object(
+            indexing,
+            "get_collection_lexical_index",
+            return_value=LexicalIndex(tmp_path / "lexical_index.json"),
+        ),
+        patch.object(indexing, "embed_chunks_batch", side_effect=fake_embed),
+    ):
+        yield collection, manifest, embedded
+
+
+@pytest.fixture
+def project(tmp_path):
+    """Create a small project directory to index."""
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "a.py").write_text("def first():\n    return 1\n\n\ndef second():\n    return 2\n")
+    (root / "notes.md").write_text("# Notes\n\nSome notes.\n")
+    return root
+
+
+def _stored_paths(collection):
+    return {metadata["file_path"] for metadata in collection.get()["metadatas"]}
+
+
+class TestIndexManifest:
+    """Test cases for the IndexManifest store."""
+
+    def test_manifest_round_trips_through_disk(self, tmp_path):
+        """Saved entries should be loaded by a new manifest for the same path."""
+        manifest = IndexManifest(tmp_path / "manifest.json")
+        manifest.set("/repo/a.py", ManifestEntry(10, 123, "hash", ["id1", "id2"]))
+        manifest.save()
+
+        reloaded = IndexManifest(tmp_path / "manifest.json")
+
+        assert reloaded.get("/repo/a.py") == ManifestEntry(10, 123, "hash", ["id1", "id2"])
+        assert reloaded.paths_under("/repo") == ["/repo/a.py"]
+        assert reloaded.paths_under("/rep") == []
+
+    def test_corrupt_manifest_starts_empty(self, tmp_path):
+        """An unreadable manifest should be ignored rather than failing indexing."""
+        path = tmp_path / "manifest.json"
+        path.write_text("{not json")
+
+        assert len(IndexManifest(path)) == 0
+
+
+class TestIncrementalIndexing:
+    """Test cases for index_directory_tool with a manifest."""
+
+    def test_unchanged_files_are_not_reembedded(self, rag_index, project):
+        """A second run over an unchanged tree should not read or embed anything."""
+        collection, manifest, embedded = rag_index
+        index_directory(str(project))
+        first_count = collection.count()
+        embedded.clear()
+
+        summary = index_directory(str(project))
+
+        assert embedded == []
+        assert collection.count() == first_count
+        assert "2 unchanged files skipped" in summary
+        assert len(manifest) == 2
+
+    def test_touched_file_with_same_content_is_skipped(self, rag_index, project):
+        """A new mtime with identical content should only refresh the manifest entry."""
+        _, manifest, embedded = rag_index
+        index_directory(str(project))
+        embedded.clear()
+        notes = project / "notes.md"
+        stat_result = notes.stat()
+        os.utime(notes, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+
+        index_directory(str(project))
+
+        assert embedded == []
+        assert manifest.get(str(notes)).mtime_ns == stat_result.st_mtime_ns + 10**9
+
+    def test_changed_file_replaces_its_stale_chunks(self, rag_index, project):
+        """Only the changed file should be re-embedded, and its removed chunks deleted."""
+        collection, manifest, embedded = rag_index
+        index_directory(str(project))
+        embedded.clear()
+        (project / "a.py").write_text("def first():\n    return 10\n")
+
+        index_directory(str(project))
+
+        a_chunks = collection.get(where={"file_path": str(project / "a.py")})
+        assert [m["chunk_name"] for m in a_chunks["metadatas"]] == ["first"]
+        assert a_chunks["documents"] == ["def first():\n    return 10"]
+        assert all("Notes" not in content for content in embedded)
+        assert manifest.get(str(project / "a.py")).chunk_ids == a_chunks["ids"]
+
+    def test_deleted_and_ignored_files_are_purged(self, rag_index, project):
+        """Files gone from disk or newly ignored should leave the collection and manifest."""
+        collection, manifest, _ = rag_index
+        index_directory(str(project))
+        (project / "a.py").unlink()
+        (project / "extra.md").write_text("extra")
+        index_directory(str(project))
+        (project / ".indexignore").write_text("extra.md\n")
+
+        summary = index_directory(str(project))
+
+        assert _stored_paths(collection) == {str(project / "notes.md")}
+        assert manifest.paths_under(project) == [str(project / "notes.md")]
+        assert "Removed 1 deleted or ignored files" in summary
+
+    def test_force_reindex_embeds_everything_again(self, rag_index, project):
+        """force_reindex should bypass the manifest without duplicating chunks."""
+        collection, _, embedded = rag_index
+        index_directory(str(project))
+        count = collection.count()
+        embedded.clear()
+
+        index_directory(str(project), force_reindex=True)
+
+        assert len(embedded) == count
+        assert collection.count() == count
+
+    def test_failed_force_reindex_forgets_the_deleted_files(self, rag_index, project):
+        """Files whose chunks were deleted up front must be indexed again by the next run."""
+        collection, manifest, _ = rag_index
+        index_directory(str(project))
+
+        with patch.object(indexing, "embed_chunks_batch", return_value=None):
+            index_directory(str(project), force_reindex=True)
+
+        assert collection.count() == 0
+        assert len(manifest) == 0
+        index_directory(str(project))
+        assert _stored_paths(collection) == {str(project / "a.py"), str(project / "notes.md")}
@@ -0,0 +1,103 @@
+"""Unit tests for the batched RAG embedding pipeline."""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from agents.devops.tools.rag_components import indexing
+from agents.devops.tools.rag_components.pipeline import EmbeddingPipeline
+
+
+def _chunks(file_path: str, count: int, size: int = 40) -> list[dict]:
+    return [
+        {
+            "file_path": file_path,
+            "name": f"chunk{i}",
+            "type": "function",
+            "content": f"{file_path}:{i}:" + "x" * size,
+            "start_line": i * 10 + 1,
+            "end_line": i * 10 + 9,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def embed_calls():
+    """Record embedding requests and answer them with dummy vectors."""
+    calls = []
+
+    def fake_embed(chunks_content, **_kwargs):
+        calls.append(list(chunks_content))
+        if any("fail" in content for content in chunks_content):
+            return None
+        return [[1.0, 0.0] for _ in chunks_content]
+
+    with patch.object(indexing, "embed_chunks_batch", side_effect=fake_embed):
+        yield calls
+
+
+class TestEmbeddingPipeline:
+    """Test cases for EmbeddingPipeline."""
+
+    def test_chunks_from_many_files_share_requests(self, embed_calls):
+        """Small files should be packed together up to the batch size."""
+        collection = MagicMock()
+        with EmbeddingPipeline(collection, max_batch_size=5, max_in_flight=1) as pipeline:
+            for i in range(6):
+                pipeline.add_file(f"file{i}.py", _chunks(f"file{i}.py", 2))
+            results = pipeline.close()
+
+        assert [len(call) for call in embed_calls] == [5, 5, 2]
+        assert results == {f"file{i}.py": True for i in range(6)}
+        upserted_ids = collection.upsert.call_args.kwargs["ids"]
+        assert len(upserted_ids) == 12
+        assert collection.upsert.call_count == 1
+
+    def test_batches_respect_the_token_limit(self, embed_calls):
+        """A request should never exceed the estimated token budget when chunks allow."""
+        with EmbeddingPipeline(MagicMock(), max_batch_tokens=60, max_in_flight=1) as pipeline:
+            pipeline.add_file("a.py", _chunks("a.py", 5, size=100))
+            pipeline.close()
+
+        assert [len(call) for call in embed_calls] == [2, 2, 1]
+
+    @pytest.mark.usefixtures("embed_calls")
+    def test_failed_request_drops_only_its_files(self):
+        """A file with any unembedded chunk should not be written at all."""
+        collection = MagicMock()
+        with EmbeddingPipeline(collection, max_batch_size=2, max_in_flight=2) as pipeline:
+            pipeline.add_file("good.py", _chunks("good.py", 2))
+            pipeline.add_file("bad.py", _chunks("bad.py", 1) + _chunks("fail.py", 1))
+            results = pipeline.close()
+
+        assert results == {"good.py": True, "bad.py": False}
+        written = {m["file_path"] for m in collection.upsert.call_args.kwargs["metadatas"]}
+        assert written == {"good.py"}
+
+    def test_in_flight_requests_are_bounded(self):
+        """No more than max_in_flight embedding requests should run concurrently."""
+        lock = threading.Lock()
+        active = [0]
+        peak = [0]
+
+        def slow_embed(chunks_content, **_kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return [[1.0] for _ in chunks_content]
+
+        with (
+            patch.object(indexing, "embed_chunks_batch", side_effect=slow_embed),
+            EmbeddingPipeline(MagicMock(), max_batch_size=1, max_in_flight=3) as pipeline,
+        ):
+            pipeline.add_file("a.py", _chunks("a.py", 12))
+            results = pipeline.close()
+
+        assert results == {"a.py": True}
+        assert 1 < peak[0] <= 3
@@ -0,0 +1,135 @@
+"""Unit tests for the adaptive embedding rate limiter."""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from google.genai import errors as genai_errors
+import pytest
+
+from agents.devops.tools.rag_components import indexing
+from agents.devops.tools.rag_components.embedding_cache import EmbeddingCache
+from agents.devops.tools.rag_components.rate_limiter import (
+    EmbeddingRateLimiter,
+    get_retry_after,
+    is_rate_limit_error,
+)
+
+
+class FakeClock:
+    """Deterministic clock whose sleep advances time."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """Create a fake clock."""
+    return FakeClock()
+
+
+def _limiter(clock, requests_per_minute=60, tokens_per_minute=6000):
+    return EmbeddingRateLimiter(
+        requests_per_minute, tokens_per_minute, clock=clock, sleep=clock.sleep
+    )
+
+
+def _rate_limit_error(retry_after=None):
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    return genai_errors.ClientError(
+        429,
+        {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "Quota exceeded"}},
+        SimpleNamespace(headers=headers),
+    )
+
+
+class TestEmbeddingRateLimiter:
+    """Test cases for EmbeddingRateLimiter."""
+
+    def test_requests_wait_once_the_bucket_is_empty(self, clock):
+        """A full bucket should grant a burst, then pace requests at the configured rate."""
+        limiter = _limiter(clock, requests_per_minute=60)
+
+        waits = [limiter.acquire() for _ in range(62)]
+
+        assert waits[:60] == [0.0] * 60
+        assert waits[60] == pytest.approx(1.0)
+        assert waits[61] == pytest.approx(1.0)
+
+    def test_token_budget_limits_large_requests(self, clock):
+        """Requests should also wait for tokens/min, independently of requests/min."""
+        limiter = _limiter(clock, requests_per_minute=1000, tokens_per_minute=600)
+
+        assert limiter.acquire(600) == 0.0
+        assert limiter.acquire(300) == pytest.approx(30.0)
+
+    def test_rate_limit_pauses_and_slows_down(self, clock):
+        """A 429 should honor Retry-After and halve the rates until successes recover them."""
+        limiter = _limiter(clock)
+
+        assert limiter.record_rate_limited(retry_after=7) == 7
+        assert limiter.acquire() == pytest.approx(7.0)
+        state = limiter.state()
+        assert state["requests_per_minute"] == 30
+        assert state["rate_limited_responses"] == 1
+
+        for _ in range(20):
+            limiter.record_success()
+        assert limiter.state()["requests_per_minute"] == 60
+
+    def test_backoff_without_retry_after_grows(self, clock):
+        """Consecutive 429s without a hint should back off exponentially."""
+        limiter = _limiter(clock)
+
+        assert [limiter.record_rate_limited() for _ in range(3)] == [5.0, 10.0, 20.0]
+
+
+class TestRateLimitErrors:
+    """Test cases for rate limit error inspection."""
+
+    def test_retry_after_header_and_retry_info(self):
+        """The retry hint should come from the header, or from RetryInfo details."""
+        retry_info = genai_errors.ClientError(
+            429,
+            {
+                "error": {
+                    "status": "RESOURCE_EXHAUSTED",
+                    "details": [
+                        {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "34s"}
+                    ],
+                }
+            },
+        )
+
+        assert is_rate_limit_error(_rate_limit_error(12))
+        assert get_retry_after(_rate_limit_error(12)) == 12
+        assert get_retry_after(retry_info) == 34
+        assert get_retry_after(_rate_limit_error()) is None
+
+    def test_embed_chunks_batch_retries_through_the_limiter(self, clock):
+        """embed_chunks_batch should report 429s to the shared limiter and then succeed."""
+        limiter = _limiter(clock)
+        client = MagicMock()
+        client.models.embed_content.side_effect = [
+            _rate_limit_error(3),
+            SimpleNamespace(embeddings=[SimpleNamespace(values=[0.1, 0.2])]),
+        ]
+
+        with (
+            patch.object(indexing, "genai_client", client),
+            patch.object(indexing, "get_embedding_rate_limiter", return_value=limiter),
+            patch.object(indexing, "get_embedding_cache", return_value=EmbeddingCache()),
+        ):
+            embeddings = indexing.embed_chunks_batch(["some code"])
+
+        assert embeddings == [[0.1, 0.2]]
+        assert clock.sleeps == [pytest.approx(3.0)]
+        assert limiter.state()["requests_granted"] == 2
@@ -0,0 +1,75 @@
+"""Unit tests for query embedding and retrieval result caching."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from agents.devops.tools.rag_components import indexing, retriever
+from agents.devops.tools.rag_components.lexical_index import LexicalIndex
+
+
+@pytest.fixture
+def search_backend(tmp_path):
+    """Patch the retriever's embedding call and collection."""
+    collection = MagicMock()
+    collection.name = "test_collection"
+    collection.query.return_value = {
+        "ids": [["chunk1"]],
+        "metadatas": [[{"file_path": "src/auth.py", "chunk_name": "authenticate"}]],
+        "documents": [["def authenticate(user): ..."]],
+        "distances": [[0.12]],
+    }
+    with (
+        patch.object(retriever, "embed_chunks_batch", return_value=[[0.1, 0.2]]) as embed,
+        patch.object(retriever, "get_chroma_collection", return_value=collection),
+        patch.object(
+            retriever, "get_collection_lexical_index", return_value=LexicalIndex(tmp_path / "lex")
+        ),
+    ):
+        yield embed, collection
+
+
+class TestRetrievalCaching:
+    """Test cases for retrieve_relevant_chunks caching."""
+
+    def test_repeated_query_makes_no_calls(self, search_backend):
+        """The same query should be served from cache without embedding or querying."""
+        embed, collection = search_backend
+
+        first = retriever.retrieve_relevant_chunks("How does auth work?", top_k=3)
+        second = retriever.retrieve_relevant_chunks("  How does   auth work? ", top_k=3)
+
+        assert first == second
+        assert embed.call_count == 1
+        assert collection.query.call_count == 1
+        assert retriever.get_retrieval_cache_stats()["results"]["hits"] == 1
+
+    @pytest.mark.usefixtures("search_backend")
+    def test_cached_results_are_not_shared_with_callers(self):
+        """Mutating returned results should not corrupt the cache."""
+        first = retriever.retrieve_relevant_chunks("auth", top_k=1)
+        first[0]["metadata"]["file_path"] = "changed.py"
+
+        second = retriever.retrieve_relevant_chunks("auth", top_k=1)
+
+        assert second[0]["metadata"]["file_path"] == "src/auth.py"
+
+    def test_index_changes_invalidate_results_but_not_query_embeddings(self, search_backend):
+        """A new index generation should re-run the search with the cached query embedding."""
+        embed, collection = search_backend
+        retriever.retrieve_relevant_chunks("auth", top_k=3)
+
+        indexing.bump_index_generation()
+        retriever.retrieve_relevant_chunks("auth", top_k=3)
+        retriever.retrieve_relevant_chunks("auth", top_k=5)
+
+        assert embed.call_count == 1
+        assert collection.query.call_count == 3
+
+    def test_deleting_chunks_bumps_the_generation(self):
+        """Index mutations should advance the generation used in result cache keys."""
+        before = indexing.get_index_generation()
+
+        indexing.delete_chunks(MagicMock(), ["chunk1"])
+
+        assert indexing.get_index_generation() == before + 1
@@ -0,0 +1,141 @@
+"""Unit tests for live RAG index maintenance from filesystem events."""
+
+import threading
+from unittest.mock import patch
+import uuid
+
+import chromadb
+import pytest
+
+from agents.devops.tools import rag_tools
+from agents.devops.tools.rag_components import indexing
+from agents.devops.tools.rag_components.lexical_index import LexicalIndex
+from agents.devops.tools.rag_components.manifest import IndexManifest
+from agents.devops.tools.rag_components.watcher import DebouncedIndexWatcher
+
+index_directory = rag_tools.index_directory_tool.func
+EXTENSIONS = {".py", ".md"}
+
+
+@pytest.fixture
+def rag_index(tmp_path):
+    """Point indexing at an in-memory collection and a temporary manifest."""
+    collection = chromadb.EphemeralClient().get_or_create_collection(f"test_{uuid.uuid4().hex[:8]}")
+    manifest = IndexManifest(tmp_path / "manifest.json")
+    embedded = []
+
+    def fake_embed(chunks_content, **_kwargs):
+        embedded.extend(chunks_content)
+        return [[float(len(content)), 1.0, 0.0] for content in chunks_content]
+
+    with (
+        patch.object(indexing, "get_chroma_collection", return_value=collection),
+        patch.object(indexing, "get_collection_manifest", return_value=manifest),
+        patch.object(
+            indexing,
+            "get_collection_lexical_index",
+            return_value=LexicalIndex(tmp_path / "lexical_index.json"),
+        ),
+        patch.object(indexing, "embed_chunks_batch", side_effect=fake_embed),
+    ):
+        yield collection, manifest, embedded
+
+
+@pytest.fixture
+def project(tmp_path):
+    """Create a small project directory to index."""
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "a.py").write_text("def first():\n    return 1\n")
+    (root / "notes.md").write_text("# Notes\n\nSome notes.\n")
+    return root
+
+
+def _stored_paths(collection):
+    return {metadata["file_path"] for metadata in collection.get()["metadatas"]}
+
+
+class TestDebouncedIndexWatcher:
+    """Test cases for DebouncedIndexWatcher."""
+
+    def test_burst_of_events_is_flushed_once(self, tmp_path):
+        """Changes recorded in quick succession should reach on_changes as one batch."""
+        batches = []
+        flushed = threading.Event()
+
+        def on_changes(paths):
+            batches.append(paths)
+            flushed.set()
+
+        watcher = DebouncedIndexWatcher(tmp_path, on_changes, debounce_seconds=0.2)
+        watcher.start()
+        try:
+            for name in ["a.py", "b.py", "a.py"]:
+                watcher.record([str(tmp_path / name)])
+            assert flushed.wait(5)
+        finally:
+            watcher.stop()
+
+        assert batches == [{str(tmp_path / "a.py"), str(tmp_path / "b.py")}]
+
+    def test_filtered_paths_are_not_recorded(self, tmp_path):
+        """Paths rejected by the filter should never be flushed."""
+        batches = []
+        watcher = DebouncedIndexWatcher(
+            tmp_path, batches.append, path_filter=lambda path: not path.endswith(".sqlite3")
+        )
+
+        watcher.record([str(tmp_path / "index.sqlite3")])
+
+        assert watcher.flush() == set()
+        assert batches == []
+
+
+class TestUpdateChangedFiles:
+    """Test cases for re-indexing the files behind watched changes."""
+
+    def test_only_changed_files_are_reembedded(self, rag_index, project):
+        """A modified file should be re-embedded and a deleted one removed."""
+        collection, manifest, embedded = rag_index
+        index_directory(str(project))
+        embedded.clear()
+        (project / "a.py").write_text("def first():\n    return 10\n")
+        (project / "notes.md").unlink()
+
+        rag_tools._update_changed_files(
+            project, EXTENSIONS, {str(project / "a.py"), str(project / "notes.md")}
+        )
+
+        assert embedded == ["def first():\n    return 10"]
+        assert _stored_paths(collection) == {str(project / "a.py")}
+        assert manifest.get(str(project / "notes.md")) is None
+
+    def test_new_directories_are_scanned_and_ignored_files_skipped(self, rag_index, project):
+        """A created directory should be indexed, except for files .indexignore excludes."""
+        collection, _, _ = rag_index
+        index_directory(str(project))
+        (project / ".indexignore").write_text("*_test.py\n")
+        package = project / "pkg"
+        package.mkdir()
+        (package / "mod.py").write_text("def mod():\n    return 1\n")
+        (package / "mod_test.py").write_text("def test_mod():\n    assert True\n")
+
+        rag_tools._update_changed_files(project, EXTENSIONS, {str(package)})
+
+        assert str(package / "mod.py") in _stored_paths(collection)
+        assert str(package / "mod_test.py") not in _stored_paths(collection)
+
+    def test_deleted_directory_removes_its_files(self, rag_index, project):
+        """Removing a directory should drop every indexed file below it."""
+        collection, manifest, _ = rag_index
+        package = project / "pkg"
+        package.mkdir()
+        (package / "mod.py").write_text("def mod():\n    return 1\n")
+        index_directory(str(project))
+        (package / "mod.py").unlink()
+        package.rmdir()
+
+        rag_tools._update_changed_files(project, EXTENSIONS, {str(package)})
+
+        assert str(package / "mod.py") not in _stored_paths(collection)
+        assert manifest.paths_under(package) == []
@@ -0,0 +1,121 @@
+"""Unit tests for the content-addressed token count cache."""
+
+from unittest.mock import Mock
+
+from google import genai
+from google.genai.types import CountTokensResponse
+
+from agents.devops.components.context_management.context_manager import ContextManager
+from agents.devops.components.context_management.token_cache import TokenCountCache
+
+
+class TestTokenCountCache:
+    """Test cases for TokenCountCache."""
+
+    def test_get_or_count_caches_results(self):
+        """Repeated text should only be counted once per namespace."""
+        cache = TokenCountCache(max_entries=10)
+        counter = Mock(return_value=7)
+
+        assert cache.get_or_count("model:native", "hello world", counter) == 7
+        assert cache.get_or_count("model:native", "hello world", counter) == 7
+
+        counter.assert_called_once_with("hello world")
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_namespaces_are_isolated(self):
+        """Counts for different models/strategies must not be shared."""
+        cache = TokenCountCache(max_entries=10)
+        cache.put("model-a:native", "text", 3)
+
+        assert cache.get("model-a:native", "text") == 3
+        assert cache.get("model-b:native", "text") is None
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted once the bound is reached."""
+        cache = TokenCountCache(max_entries=2)
+        cache.put("ns", "a", 1)
+        cache.put("ns", "b", 2)
+        assert cache.get("ns", "a") == 1  # "a" becomes most recently used
+        cache.put("ns", "c", 3)
+
+        assert cache.get("ns", "b") is None
+        assert cache.get("ns", "a") == 1
+        assert cache.get("ns", "c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """A new cache instance backed by the same file starts warm."""
+        db_path = str(tmp_path / "token_counts.sqlite")
+        cache = TokenCountCache(max_entries=10, persist_path=db_path)
+        cache.put("ns", "persisted text", 42)
+
+        restarted = TokenCountCache(max_entries=10, persist_path=db_path)
+        counter = Mock(return_value=0)
+
+        assert restarted.get_or_count("ns", "persisted text", counter) == 42
+        counter.assert_not_called()
+        assert restarted.stats()["disk_hits"] == 1
+        assert restarted.stats()["persistent"] is True
+
+
+def create_native_context_manager(total_tokens: int = 5):
+    """Create a ContextManager using a mocked native Google token counter."""
+    mock_client = Mock(spec=genai.Client)
+    mock_response = Mock(spec=CountTokensResponse)
+    mock_response.total_tokens = total_tokens
+    mock_client.models.count_tokens.return_value = mock_response
+
+    context_manager = ContextManager(
+        model_name="gemini-2.0-flash",
+        max_llm_token_limit=100000,
+        llm_client=mock_client,
+        token_cache=TokenCountCache(max_entries=10),
+    )
+    return context_manager, mock_client
+
+
+class TestContextManagerTokenCaching:
+    """Test that ContextManager routes native token counting through the cache."""
+
+    def test_native_counts_are_cached(self):
+        """Identical text should trigger a single native count_tokens call."""
+        context_manager, mock_client = create_native_context_manager()
+        probe_calls = mock_client.models.count_tokens.call_count
+
+        assert context_manager._count_tokens("repeated system message") == 5
+        assert context_manager._count_tokens("repeated system message") == 5
+
+        assert mock_client.models.count_tokens.call_count == probe_calls + 1
+        assert context_manager.get_token_cache_stats()["hits"] == 1
+
+    def test_count_tokens_batch_deduplicates_and_uses_cache(self):
+        """Batched counting returns per-item counts and only counts unique misses."""
+        context_manager, mock_client = create_native_context_manager()
+        context_manager._count_tokens("already cached")
+        calls_before = mock_client.models.count_tokens.call_count
+
+        counts = context_manager.count_tokens_batch(
+            ["already cached", "new text", None, "", "new text", "another"]
+        )
+
+        assert counts == [5, 5, 0, 0, 5, 5]
+        # Only "new text" and "another" are sent to the native counter
+        assert mock_client.models.count_tokens.call_count == calls_before + 2
+
+    def test_estimates_after_a_failed_native_count_are_not_cached(self):
+        """A fallback estimate must not be served later as the native count."""
+        context_manager, mock_client = create_native_context_manager(total_tokens=7)
+        response = mock_client.models.count_tokens.return_value
+        mock_client.models.count_tokens.side_effect = Exception("quota exceeded")
+
+        context_manager._count_tokens("flaky text")
+        context_manager.count_tokens_batch(["flaky text", "other flaky text"])
+
+        assert context_manager.get_token_cache_stats()["entries"] == 0
+        mock_client.models.count_tokens.side_effect = None
+        mock_client.models.count_tokens.return_value = response
+        assert context_manager._count_tokens("flaky text") == 7
+        assert context_manager.count_tokens_batch(["other flaky text"]) == [7]
@@ -155,6 +155,29 @@ class TestTokenCounter:
         assert result["user_message"] > 0
         assert result["total"] > 0
 
+    def test_count_tokens_batch_returns_per_item_counts(self):
+        """Test batched counting preserves order and handles empty values."""
+        counter = TokenCounter("unknown-model")
+
+        result = counter.count_tokens_batch(["Hello world", None, "", "Hello world", 42])
+
+        assert result == [len("Hello world") // 4, 0, 0, len("Hello world") // 4, 0]
+
+    @patch("agents.software_engineer.shared_libraries.token_optimization.TIKTOKEN_AVAILABLE", True)
+    @patch("tiktoken.encoding_for_model")
+    def test_count_tokens_batch_uses_tiktoken_encode_batch(self, mock_encoding_for_model):
+        """Test batched counting encodes unique texts with a single encode_batch call."""
+        mock_tokenizer = Mock()
+        mock_tokenizer.encode.return_value = [1]
+        mock_tokenizer.encode_batch.return_value = [[1, 2], [1, 2, 3]]
+        mock_encoding_for_model.return_value = mock_tokenizer
+
+        counter = TokenCounter("gpt-4")
+        result = counter.count_tokens_batch(["first", "second", "first"])
+
+        assert result == [2, 3, 2]
+        mock_tokenizer.encode_batch.assert_called_once_with(["first", "second"])
+
     def test_count_llm_request_tokens_error_handling(self):
         """Test error handling in LLM request token counting."""
         counter = TokenCounter("test-model")
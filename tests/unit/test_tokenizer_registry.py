@@ -0,0 +1,101 @@
+"""Unit tests for the process-wide tokenizer registry."""
+
+from unittest.mock import MagicMock, patch
+
+from google import genai
+from google.genai.types import CountTokensResponse
+
+from agents.devops.components.context_management.context_manager import ContextManager
+from agents.devops.components.context_management.tokenizer_registry import (
+    NATIVE_STRATEGY,
+    TIKTOKEN_STRATEGY,
+    TokenizerRegistry,
+    get_tokenizer_registry,
+)
+from agents.software_engineer.shared_libraries.token_optimization import TokenCounter
+
+
+def _fake_encoding():
+    encoding = MagicMock()
+    encoding.name = "fake_encoding"
+    encoding.encode.side_effect = lambda text: list(range(len(text.split())))
+    return encoding
+
+
+def _native_client(total_tokens: int = 5):
+    client = MagicMock(spec=genai.Client)
+    client.models = MagicMock()
+    client.models.count_tokens.return_value = CountTokensResponse(total_tokens=total_tokens)
+    return client
+
+
+class TestTokenizerRegistry:
+    """Test cases for TokenizerRegistry."""
+
+    def test_resolves_each_key_once(self):
+        """Repeated lookups of the same (model, strategy) should call the resolver once."""
+        registry = TokenizerRegistry()
+        resolver = MagicMock(return_value="tokenizer")
+
+        first = registry.get_or_resolve("model-a", TIKTOKEN_STRATEGY, resolver)
+        second = registry.get_or_resolve("model-a", TIKTOKEN_STRATEGY, resolver)
+        registry.get_or_resolve("model-b", TIKTOKEN_STRATEGY, resolver)
+
+        assert first == second == "tokenizer"
+        assert resolver.call_count == 2
+        assert registry.stats()["hits"] == 1
+
+    def test_failed_native_probe_is_retried(self):
+        """A failed native probe should not be remembered, a successful one should."""
+        registry = TokenizerRegistry()
+        prober = MagicMock(side_effect=[False, True, True])
+
+        assert registry.native_counter_available("model-a", None, prober=prober) is False
+        assert registry.native_counter_available("model-a", None, prober=prober) is True
+        assert registry.native_counter_available("model-a", None, prober=prober) is True
+        assert prober.call_count == 2
+
+    def test_warm_up_populates_registry(self):
+        """Warm-up should resolve native and tiktoken entries for every model."""
+        registry = TokenizerRegistry()
+        encoding = _fake_encoding()
+
+        with patch("tiktoken.encoding_for_model", return_value=encoding):
+            thread = registry.warm_up(["model-a", "model-a", ""], _native_client(), True)
+            thread.join(timeout=5)
+
+        assert registry.stats()["entries"] == [
+            f"model-a:{NATIVE_STRATEGY}",
+            f"model-a:{TIKTOKEN_STRATEGY}",
+        ]
+
+
+class TestSharedResolution:
+    """Test cases for counters sharing the process-wide registry."""
+
+    def test_context_managers_share_native_probe(self):
+        """Only the first ContextManager for a model should probe count_tokens."""
+        client = _native_client()
+
+        ContextManager(model_name="shared-model", max_llm_token_limit=1000, llm_client=client)
+        probe_calls = client.models.count_tokens.call_count
+        manager = ContextManager(
+            model_name="shared-model", max_llm_token_limit=1000, llm_client=client
+        )
+
+        assert probe_calls == 1
+        assert client.models.count_tokens.call_count == probe_calls
+        assert manager.token_counting_strategy == NATIVE_STRATEGY
+
+    def test_token_counter_reuses_context_manager_encoding(self):
+        """TokenCounter should pick up the encoding a ContextManager already resolved."""
+        encoding = _fake_encoding()
+        with patch("tiktoken.encoding_for_model", return_value=encoding) as loader:
+            manager = ContextManager(model_name="shared-model", max_llm_token_limit=1000)
+            manager_tokenizer = manager._tiktoken_tokenizer
+            counter = TokenCounter("shared-model")
+
+        assert loader.call_count == 1
+        assert counter._tiktoken_tokenizer is manager_tokenizer is encoding
+        assert counter.count_tokens("three short words") == 3
+        assert get_tokenizer_registry().stats()["hits"] >= 1
@@ -0,0 +1,188 @@
+"""Unit tests for the persistent trigram index used by code search."""
+
+import os
+import shutil
+from types import SimpleNamespace
+from unittest.mock import PropertyMock, patch
+
+import pytest
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+)
+
+from agents.devops.shared_libraries import trigram_index
+from agents.devops.shared_libraries.trigram_index import TrigramIndex, query_trigrams
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """Create a small workspace with ignored, hidden and binary files."""
+    root = tmp_path / "workspace"
+    files = {
+        "src/app.py": "def handle_request(request):\n    return Response(request)\n",
+        "src/util.py": "def slugify(text):\n    return text.lower()\n",
+        "docs/notes.md": "Handle requests carefully.\n",
+        "build/app.py": "def handle_request(): pass\n",
+        ".hidden/app.py": "def handle_request(): pass\n",
+        ".ignore": "build/\n",
+    }
+    for relative_path, content in files.items():
+        (root / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        (root / relative_path).write_text(content)
+    (root / "logo.png").write_bytes(b"\x89PNG\0handle_request")
+    return root
+
+
+class TestQueryTrigrams:
+    """Test cases for extracting required trigrams from a regex query."""
+
+    def test_literal_runs_are_required(self):
+        """Literal text outside optional parts should yield lowercase trigrams."""
+        assert query_trigrams("Foo.bar") == {"foo", "bar"}
+        assert query_trigrams(r"def\s+handle") == {"def", "han", "and", "ndl", "dle"}
+        assert query_trigrams(r"^(Parse)+\b") == {"par", "ars", "rse"}
+
+    def test_queries_without_required_literals_cannot_be_narrowed(self):
+        """Alternations, optional groups, short literals and invalid regexes give None."""
+        assert query_trigrams("foo|bar") is None
+        assert query_trigrams("(handler)?x") is None
+        assert query_trigrams("ab.*cd") is None
+        assert query_trigrams("unbalanced(") is None
+
+
+class TestTrigramIndex:
+    """Test cases for TrigramIndex."""
+
+    def test_candidates_are_files_containing_every_trigram(self, workspace):
+        """Only searchable files containing the query's literal text should be candidates."""
+        index = TrigramIndex(workspace)
+        index.refresh()
+
+        assert index.candidates("handle_request") == ["src/app.py"]
+        assert index.candidates(r"HANDLE\s+REQUEST") == ["docs/notes.md", "src/app.py"]
+        assert index.candidates("nothing_like_this") == []
+        assert index.candidates(".*") is None
+
+    def test_refresh_only_reindexes_changed_files(self, workspace):
+        """Modified, added and deleted files should be picked up by the next refresh."""
+        index = TrigramIndex(workspace)
+        assert index.refresh() == {"indexed": 4, "removed": 0, "files": 4}
+
+        (workspace / "src" / "util.py").write_text("def handle_request_later(): pass\n")
+        (workspace / "src" / "new.py").write_text("x = 1\n")
+        (workspace / "docs" / "notes.md").unlink()
+
+        assert index.refresh() == {"indexed": 2, "removed": 1, "files": 4}
+        assert index.candidates("handle_request") == ["src/app.py", "src/util.py"]
+        assert index.refresh() == {"indexed": 0, "removed": 0, "files": 4}
+
+    def test_large_files_are_always_candidates(self, workspace):
+        """Files above the size limit are not read and must still be searched."""
+        index = TrigramIndex(workspace, max_file_bytes=50)
+        index.refresh()
+
+        assert index.candidates("slugify") == ["src/app.py", "src/util.py"]
+
+    def test_index_persists_between_instances(self, workspace, tmp_path):
+        """A reopened index should only re-read files that changed meanwhile."""
+        db_path = str(tmp_path / "index" / "workspace.sqlite3")
+        TrigramIndex(workspace, db_path).refresh()
+        app = workspace / "src" / "app.py"
+        os.utime(app, ns=(app.stat().st_atime_ns, app.stat().st_mtime_ns + 1_000_000))
+
+        reopened = TrigramIndex(workspace, db_path)
+
+        assert reopened.candidates("slugify") == ["src/util.py"]
+        assert reopened.refresh() == {"indexed": 1, "removed": 0, "files": 4}
+
+
+@pytest.fixture
+def watched_index(workspace):
+    """A fully refreshed index that behaves as if its observer were running."""
+    index = TrigramIndex(workspace)
+    with patch.object(TrigramIndex, "watching", new_callable=PropertyMock, return_value=True):
+        index.refresh()
+        yield index
+
+
+class TestChangeTracking:
+    """Test cases for keeping the index current from filesystem events."""
+
+    def test_changed_files_are_reindexed_from_events(self, watched_index, workspace):
+        """Files reported by events should be re-indexed without walking the tree."""
+        (workspace / "src" / "util.py").write_text("def handle_request_later(): pass\n")
+        (workspace / "src" / "new.py").write_text("x = 1\n")
+        (workspace / "docs" / "notes.md").unlink()
+        for event in [
+            FileModifiedEvent(str(workspace / "src" / "util.py")),
+            FileCreatedEvent(str(workspace / "src" / "new.py")),
+            FileDeletedEvent(str(workspace / "docs" / "notes.md")),
+        ]:
+            watched_index.record_event(event)
+
+        assert not watched_index.current
+        with patch.object(watched_index, "scan") as scan:
+            assert watched_index.update_changed() == {"indexed": 2, "removed": 1}
+        scan.assert_not_called()
+        assert watched_index.current
+        assert watched_index.candidates("handle_request") == ["src/app.py", "src/util.py"]
+
+    def test_unsearchable_paths_do_not_make_the_index_stale(self, watched_index, workspace):
+        """Events for hidden or ignored files should not require any update."""
+        watched_index.record_event(FileModifiedEvent(str(workspace / ".hidden" / "app.py")))
+        watched_index.record_event(FileModifiedEvent(str(workspace / "build" / "app.py")))
+
+        assert watched_index.current
+
+    def test_new_directories_and_ignore_files_need_a_full_refresh(self, watched_index, workspace):
+        """Changes that can add many files at once should wait for a walk of the tree."""
+        (workspace / "lib").mkdir()
+        watched_index.record_event(DirCreatedEvent(str(workspace / "lib")))
+        assert watched_index.needs_full_refresh
+
+        watched_index.refresh()
+        watched_index.record_event(FileModifiedEvent(str(workspace / ".ignore")))
+        assert watched_index.needs_full_refresh
+
+    def test_deleted_directory_removes_its_files(self, watched_index, workspace):
+        """Removing a directory should drop every indexed file below it."""
+        shutil.rmtree(workspace / "src")
+        watched_index.record_event(DirDeletedEvent(str(workspace / "src")))
+
+        assert watched_index.update_changed() == {"indexed": 0, "removed": 2}
+        assert watched_index.candidates("handle_request") == []
+
+
+class TestFindCandidateFiles:
+    """Test cases for find_candidate_files."""
+
+    @pytest.fixture(autouse=True)
+    def enabled(self):
+        """Enable the index in config without starting a real observer."""
+        config = SimpleNamespace(CODE_SEARCH_TRIGRAM_INDEX=True, CODE_SEARCH_TRIGRAM_INDEX_PATH="")
+        with (
+            patch.dict("sys.modules", {"agents.devops.config": config}),
+            patch.object(TrigramIndex, "start_watching"),
+        ):
+            yield
+
+    def test_index_needing_a_full_refresh_is_not_used(self, workspace):
+        """Until a walk has finished, searches should fall back and the walk run elsewhere."""
+        index = TrigramIndex(workspace)
+        with (
+            patch.object(trigram_index, "get_trigram_index", return_value=index),
+            patch.object(index, "refresh_in_background") as refresh_in_background,
+        ):
+            assert trigram_index.find_candidate_files(workspace, "handle_request") is None
+
+        refresh_in_background.assert_called_once()
+
+    def test_current_index_narrows_and_empty_results_fall_back(self, watched_index, workspace):
+        """Candidates should come from a current index; no candidates means "use rg"."""
+        with patch.object(trigram_index, "get_trigram_index", return_value=watched_index):
+            assert trigram_index.find_candidate_files(workspace, "handle_request") == ["src/app.py"]
+            assert trigram_index.find_candidate_files(workspace, "nothing_like_this") is None